@@ -13,11 +13,15 @@ import re
 import typing
 from collections import ChainMap
 
+from django.conf import settings
+
 from apps.core.concurrent import controller
 from apps.node_man import constants, models
 from apps.utils import concurrent
 from common.api import GseApi
 
+from .cache import AGENT_STATE_CACHE
+
 InfoDict = typing.Dict[str, typing.Any]
 InfoDictList = typing.List[InfoDict]
 AgentIdInfoMap = typing.Dict[str, InfoDict]
@@ -177,11 +181,27 @@ class GseApiBaseHelper(abc.ABC):
         )
         return dict(ChainMap(*agent_id__proc_status_info_map_list))
 
-    def list_agent_state(self, host_info_list: InfoDictList) -> AgentIdInfoMap:
+    def list_agent_state(self, host_info_list: InfoDictList, use_cache: bool = True) -> AgentIdInfoMap:
         """
         获取 Agent 状态信息
         版本 / 状态
         :param host_info_list: AgentId - Agent 状态信息映射关系
+        :param use_cache: 是否使用短时缓存，需要最新状态时传入 False
+        :return:
+        """
+        if settings.BKAPP_GSE_AGENT_STATE_CACHE_TTL <= 0:
+            return self._batch_list_agent_state(host_info_list)
+        return AGENT_STATE_CACHE.list_agent_state(
+            version=self.version,
+            agent_id__host_info_map={self.get_agent_id(host_info): host_info for host_info in host_info_list},
+            fetch_func=self._batch_list_agent_state,
+            use_cache=use_cache,
+        )
+
+    def _batch_list_agent_state(self, host_info_list: InfoDictList) -> AgentIdInfoMap:
+        """
+        分批并发获取 Agent 状态信息
+        :param host_info_list: 主机信息列表
         :return:
         """
 
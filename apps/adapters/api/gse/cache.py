@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import threading
+import typing
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.cache import caches
+
+from apps.prometheus import metrics
+
+InfoDict = typing.Dict[str, typing.Any]
+AgentIdInfoMap = typing.Dict[str, InfoDict]
+
+
+class AgentStateCache:
+    """
+    Agent 状态缓存
+    - 按 Agent 唯一标识缓存状态信息，使用 Redis 缓存（批量读写分别为一次 MGET 及一次 pipeline），多进程共享
+    - 同一进程内并发查询的 Agent 合并为一次上游请求，后到的调用方等待先发起请求的调用方返回
+    """
+
+    # 全局缓存默认为数据库缓存，逐 Agent 读写开销大，固定使用 Redis 缓存
+    CACHE_ALIAS = "redis"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: typing.Dict[typing.Tuple[str, str], Future] = {}
+
+    @staticmethod
+    def cache_key(version: str, agent_id: str) -> str:
+        return f"{settings.APP_CODE}:gse:{version}:agent_state:{agent_id}"
+
+    def list_agent_state(
+        self,
+        version: str,
+        agent_id__host_info_map: typing.Dict[str, InfoDict],
+        fetch_func: typing.Callable[[typing.List[InfoDict]], AgentIdInfoMap],
+        use_cache: bool = True,
+    ) -> AgentIdInfoMap:
+        """
+        获取 Agent 状态信息
+        :param version: GSE 版本
+        :param agent_id__host_info_map: Agent 唯一标识 - 主机信息映射关系
+        :param fetch_func: 向上游查询 Agent 状态的方法
+        :param use_cache: 是否使用缓存，为 False 时查询最新状态，查询结果不写入缓存
+        :return:
+        """
+        cache = caches[self.CACHE_ALIAS]
+        agent_id__agent_state_info_map: AgentIdInfoMap = {}
+        if use_cache:
+            cache_key__agent_id_map: typing.Dict[str, str] = {
+                self.cache_key(version, agent_id): agent_id for agent_id in agent_id__host_info_map
+            }
+            for cache_key, agent_state_info in cache.get_many(list(cache_key__agent_id_map.keys())).items():
+                agent_id__agent_state_info_map[cache_key__agent_id_map[cache_key]] = agent_state_info
+
+        owned_agent_ids: typing.List[str] = []
+        to_be_fetched_agent_ids: typing.List[str] = []
+        agent_id__future_map: typing.Dict[str, Future] = {}
+        with self._lock:
+            for agent_id in agent_id__host_info_map:
+                if agent_id in agent_id__agent_state_info_map:
+                    continue
+                future: typing.Optional[Future] = self._inflight.get((version, agent_id))
+                if future is None:
+                    self._inflight[(version, agent_id)] = Future()
+                    owned_agent_ids.append(agent_id)
+                    to_be_fetched_agent_ids.append(agent_id)
+                elif use_cache:
+                    agent_id__future_map[agent_id] = future
+                else:
+                    # 需要最新状态时不等待其他调用方的查询结果
+                    to_be_fetched_agent_ids.append(agent_id)
+
+        for result, count in [
+            ("hit", len(agent_id__agent_state_info_map)),
+            ("miss", len(to_be_fetched_agent_ids)),
+            ("coalesced", len(agent_id__future_map)),
+        ]:
+            metrics.app_gse_agent_state_cache_total.labels(version=version, result=result).inc(count)
+
+        fetched_agent_id__agent_state_info_map: AgentIdInfoMap = {}
+        try:
+            if to_be_fetched_agent_ids:
+                fetched_agent_id__agent_state_info_map = fetch_func(
+                    [agent_id__host_info_map[agent_id] for agent_id in to_be_fetched_agent_ids]
+                )
+            if use_cache and fetched_agent_id__agent_state_info_map:
+                cache.set_many(
+                    {
+                        self.cache_key(version, agent_id): agent_state_info
+                        for agent_id, agent_state_info in fetched_agent_id__agent_state_info_map.items()
+                    },
+                    settings.BKAPP_GSE_AGENT_STATE_CACHE_TTL,
+                )
+        except BaseException as e:
+            self._resolve(version, owned_agent_ids, exception=e)
+            raise
+        self._resolve(version, owned_agent_ids, agent_id__agent_state_info_map=fetched_agent_id__agent_state_info_map)
+        agent_id__agent_state_info_map.update(fetched_agent_id__agent_state_info_map)
+
+        for agent_id, future in agent_id__future_map.items():
+            agent_state_info: typing.Optional[InfoDict] = future.result()
+            if agent_state_info is not None:
+                agent_id__agent_state_info_map[agent_id] = dict(agent_state_info)
+
+        return agent_id__agent_state_info_map
+
+    def _resolve(
+        self,
+        version: str,
+        agent_ids: typing.List[str],
+        agent_id__agent_state_info_map: typing.Optional[AgentIdInfoMap] = None,
+        exception: typing.Optional[BaseException] = None,
+    ):
+        with self._lock:
+            futures: typing.Dict[str, Future] = {
+                agent_id: self._inflight.pop((version, agent_id)) for agent_id in agent_ids
+            }
+        for agent_id, future in futures.items():
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                # 发起请求的调用方可能修改状态信息，等待方使用副本
+                agent_state_info: typing.Optional[InfoDict] = agent_id__agent_state_info_map.get(agent_id)
+                future.set_result(None if agent_state_info is None else dict(agent_state_info))
+
+
+AGENT_STATE_CACHE = AgentStateCache()
@@ -197,7 +197,7 @@ class ChooseAccessPointService(AgentBaseService, remote.RemoteServiceMixin):
             detect_hosts: Set[str] = self.fetch_detect_hosts(
                 host=remote_conn_helper.host, endpoint_infos=ap_info["endpoint_infos"]
             )
-            async with conns.AsyncsshConn(**remote_conn_helper.conns_init_params) as conn:
+            async with conns.ssh_session_cache.session(**remote_conn_helper.conns_init_params) as conn:
                 for detect_host in detect_hosts:
                     ping_cmd = self.get_ping_cmd(remote_conn_helper.host, detect_host=detect_host)
                     if use_sudo:
@@ -233,20 +233,23 @@ class ChooseAccessPointService(AgentBaseService, remote.RemoteServiceMixin):
                 ping_times_gby_ap_id[ap_id].append(self.parse_ping_time(remote_conn_helper.host.os_type, stdout))
         return self.handle_single_detect_result(remote_conn_helper, ping_times_gby_ap_id)
 
-    @controller.ConcurrentController(
-        data_list_name="remote_conn_helpers",
-        batch_call_func=concurrent.batch_call,
-        get_config_dict_func=core.get_config_dict,
-        get_config_dict_kwargs={"config_name": core.ServiceCCConfigName.SSH.value},
-    )
     def handle_detect_condition__ssh(self, remote_conn_helpers: List[ExternalRemoteConnHelper]):
         """
         批量处理 SSH 探测
+        在当前工作线程的常驻事件循环中执行，探测时建立的 SSH 会话可被同一线程后续的安装复用
         :param remote_conn_helpers:
         :return:
         """
+        config_obj = controller.ConcurrentControlConfig(
+            config_dict=core.get_config_dict(config_name=core.ServiceCCConfigName.SSH.value)
+        )
         params_list = [{"remote_conn_helper": remote_conn_helper} for remote_conn_helper in remote_conn_helpers]
-        return concurrent.batch_call_coroutine(func=self.detect_host_to_aps_network__ssh, params_list=params_list)
+        return concurrent.batch_call_coroutine(
+            func=self.detect_host_to_aps_network__ssh,
+            params_list=params_list,
+            limit=(config_obj.limit, 0)[config_obj.execute_all],
+            reuse_loop=True,
+        )
 
     @controller.ConcurrentController(
         data_list_name="remote_conn_helpers",
@@ -48,7 +48,7 @@ class ConfigurePolicyService(AgentBaseService):
         return True
 
     def _schedule(self, data, parent_data, callback_data=None):
-        common_data = self.get_common_data(data)
+        common_data = self.get_cached_common_data(data)
         subscription_instance_ids = common_data.subscription_instance_ids
         security_group_type = models.GlobalSettings.get_config(models.GlobalSettings.KeyEnum.SECURITY_GROUP_TYPE.value)
         if not security_group_type:
@@ -52,7 +52,7 @@ class GetAgentStatusService(AgentBaseService):
         data.outputs.host_ids_need_to_query = list(common_data.bk_host_ids)
 
     def _schedule(self, data, parent_data, callback_data=None):
-        common_data: AgentCommonData = self.get_common_data(data)
+        common_data: AgentCommonData = self.get_cached_common_data(data)
         expect_status = data.get_one_of_inputs("expect_status")
 
         # 排除手动终止等已失败的订阅实例ID
@@ -86,7 +86,9 @@ class GetAgentStatusService(AgentBaseService):
 
             hosts.append(host)
 
-        agent_id__agent_state_info_map: Dict[str, Dict] = common_data.gse_api_helper.list_agent_state(hosts)
+        agent_id__agent_state_info_map: Dict[str, Dict] = common_data.gse_api_helper.list_agent_state(
+            hosts, use_cache=False
+        )
 
         # 分隔符，用于构造 bk_cloud_id - ip，status - version 等键
         sep = ":"
@@ -8,6 +8,7 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import asyncio
 import base64
 import binascii
 import json
@@ -18,7 +19,7 @@ import socket
 import time
 import typing
 from collections import defaultdict
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from django.conf import settings
 from django.utils import timezone, translation
@@ -36,7 +37,7 @@ from apps.backend.constants import (
 )
 from apps.backend.subscription.steps.agent_adapter.adapter import AgentStepAdapter
 from apps.backend.utils.redis import REDIS_INST
-from apps.backend.utils.wmi import execute_cmd, put_file
+from apps.backend.utils.wmi import WmiSession, execute_cmd, put_file
 from apps.core.concurrent import controller
 from apps.core.concurrent.retry import RetryHandler
 from apps.core.remote import conns
@@ -44,7 +45,7 @@ from apps.exceptions import ApiResultError, AuthOverdueException, parse_exceptio
 from apps.node_man import constants, models
 from apps.prometheus import metrics
 from apps.prometheus.helper import SetupObserve
-from apps.utils import concurrent, sync
+from apps.utils import basic, concurrent, sync
 from apps.utils.exc import ExceptionHandler
 from common.api import CCApi, JobApi
 from common.log import logger
@@ -55,6 +56,27 @@ from ..base import LogLevel
 from ..common import remote
 from . import base
 
+# 取出列表中的全部数据
+# 先计算出要取数据的长度，再使用 ltrim 保留剩下的，可以保证 report_log 中新 push 的值不会丢失
+DRAIN_LIST_SCRIPT = """
+local length = redis.call("llen", KEYS[1])
+if length == 0 then
+    return {}
+end
+local data = redis.call("lrange", KEYS[1], -length, -1)
+redis.call("ltrim", KEYS[1], 0, -length - 1)
+return data
+"""
+
+try:
+    DRAIN_LIST_FUNC = REDIS_INST.register_script(script=DRAIN_LIST_SCRIPT)
+except Exception as e:
+    DRAIN_LIST_FUNC = None
+    logger.exception(e)
+
+# 单次 Pipeline 提交的订阅实例数量
+DRAIN_REPORT_DATA_CHUNK_SIZE = 1000
+
 
 class InstallSubInstObj(remote.RemoteConnHelper):
     installation_tool: InstallationTools = None
@@ -196,15 +218,12 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
     )
     def handle_lan_windows_sub_inst(self, install_sub_inst_objs: List[InstallSubInstObj]):
         """处理直连windows机器，通过 wmiexe 连接windows机器"""
-        pre_commands_params_list = []
-        push_curl_exe_params_list = []
-        run_install_params_list = []
+        params_list: List[Dict[str, Any]] = []
         for install_sub_inst_obj in install_sub_inst_objs:
             installation_tool = install_sub_inst_obj.installation_tool
             execution_solution: solution_maker.ExecutionSolution = installation_tool.type__execution_solution_map[
                 constants.CommonExecutionSolutionType.BATCH.value
             ]
-            dest_dir = installation_tool.dest_dir
             dependencies: List[str] = []
             run_commands: List[str] = []
             for solution_step in execution_solution.steps[1:]:
@@ -218,57 +237,61 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
                 else:
                     run_commands.extend([content.text for content in solution_step.contents])
 
-            # TODO 快速兼容方式，后续优化
-            pre_commands_params_list.append(
-                {
-                    "sub_inst_id": install_sub_inst_obj.sub_inst_id,
-                    "host": installation_tool.host,
-                    "commands": [content.text for content in execution_solution.steps[0].contents],
-                    "identity_data": installation_tool.identity_data,
-                }
-            )
-            push_curl_exe_params_list.append(
+            params_list.append(
                 {
                     "sub_inst_id": install_sub_inst_obj.sub_inst_id,
                     "host": installation_tool.host,
-                    "dest_dir": dest_dir,
                     "identity_data": installation_tool.identity_data,
+                    "pre_commands": [content.text for content in execution_solution.steps[0].contents],
+                    "dest_dir": installation_tool.dest_dir,
                     "dependencies": dependencies,
-                }
-            )
-            run_install_params_list.append(
-                {
-                    "sub_inst_id": install_sub_inst_obj.sub_inst_id,
-                    "host": installation_tool.host,
-                    "commands": run_commands,
-                    "identity_data": installation_tool.identity_data,
+                    "run_commands": run_commands,
                 }
             )
 
-        def _filter_params_list_in_next_step(
-            _params_list: List[Dict[str, Any]], _succeed_sub_inst_ids: List[Optional[int]]
-        ) -> List[Dict[str, Any]]:
-            _params_list_in_next_step: List[Dict[str, Any]] = []
-            _succeed_sub_inst_ids: Set[Optional[int]] = set(_succeed_sub_inst_ids)
-            for _params in _params_list:
-                if _params["sub_inst_id"] in _succeed_sub_inst_ids:
-                    _params_list_in_next_step.append(_params)
-            return _params_list_in_next_step
-
-        # 前置命令执行较快，可以并发执行
-        succeed_sub_inst_ids = concurrent.batch_call(
-            func=self.execute_windows_commands, params_list=pre_commands_params_list
-        )
-        # 单个调用大约耗时 14s
-        succeed_sub_inst_ids = concurrent.batch_call_serial(
-            func=self.push_curl_exe,
-            params_list=_filter_params_list_in_next_step(push_curl_exe_params_list, succeed_sub_inst_ids),
-        )
-        # 单个调用大约耗时 15s
-        return concurrent.batch_call_serial(
-            func=self.execute_windows_commands,
-            params_list=_filter_params_list_in_next_step(run_install_params_list, succeed_sub_inst_ids),
-        )
+        # 批次内按主机并发，并发数由 WMIEXE 并发控制配置的 limit 决定
+        return concurrent.batch_call(func=self.install_lan_windows_sub_inst, params_list=params_list)
+
+    def install_lan_windows_sub_inst(
+        self,
+        sub_inst_id: int,
+        host: models.Host,
+        identity_data: models.IdentityData,
+        pre_commands: List[str],
+        dest_dir: str,
+        dependencies: List[str],
+        run_commands: List[str],
+    ) -> Optional[int]:
+        """
+        安装单台直连 Windows 机器
+        前置命令、推送依赖文件（单个调用大约耗时 14s）、执行安装命令（单个调用大约耗时 15s）依次执行，并复用同一个 wmiexec 会话
+        """
+        ip = host.login_ip or host.inner_ip or host.inner_ipv6
+        with WmiSession(ip, identity_data.account, identity_data.password) as wmi_session:
+            if not self.execute_windows_commands(
+                sub_inst_id=sub_inst_id,
+                host=host,
+                commands=pre_commands,
+                identity_data=identity_data,
+                wmi_session=wmi_session,
+            ):
+                return None
+            if not self.push_curl_exe(
+                sub_inst_id=sub_inst_id,
+                host=host,
+                dest_dir=dest_dir,
+                identity_data=identity_data,
+                dependencies=dependencies,
+                wmi_session=wmi_session,
+            ):
+                return None
+            return self.execute_windows_commands(
+                sub_inst_id=sub_inst_id,
+                host=host,
+                commands=run_commands,
+                identity_data=identity_data,
+                wmi_session=wmi_session,
+            )
 
     @SetupObserve(
         histogram=metrics.app_core_remote_batch_execute_duration_seconds,
@@ -276,14 +299,15 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
         # 不统计异常耗时
         include_exception_histogram=False,
     )
-    @controller.ConcurrentController(
-        data_list_name="install_sub_inst_objs",
-        batch_call_func=concurrent.batch_call,
-        get_config_dict_func=core.get_config_dict,
-        get_config_dict_kwargs={"config_name": core.ServiceCCConfigName.SSH.value},
-    )
     def handle_lan_shell_sub_inst(self, install_sub_inst_objs: List[InstallSubInstObj]):
-        """处理直连且通过 Shell 执行的机器"""
+        """
+        处理直连且通过 Shell 执行的机器
+        在当前工作线程的常驻事件循环中执行，SSH 并发控制配置的 limit 作为协程并发上限，
+        同一线程的多次调用复用事件循环及缓存的 SSH 会话
+        """
+        config_obj = controller.ConcurrentControlConfig(
+            config_dict=core.get_config_dict(config_name=core.ServiceCCConfigName.SSH.value)
+        )
         params_list = [
             {
                 "meta": {"blueking_language": translation.get_language()},
@@ -292,7 +316,26 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
             }
             for install_sub_inst_obj in install_sub_inst_objs
         ]
-        return concurrent.batch_call_coroutine(func=self.execute_shell_solution_async, params_list=params_list)
+        results = concurrent.batch_call_coroutine(
+            func=self.execute_shell_solution_async,
+            params_list=params_list,
+            limit=(config_obj.limit, 0)[config_obj.execute_all],
+            timeout=settings.BKAPP_SSH_INSTALL_TIMEOUT,
+            reuse_loop=True,
+        )
+
+        timeout_sub_inst_ids: List[int] = [
+            params["sub_inst_id"]
+            for params, result in zip(params_list, results)
+            if isinstance(result, asyncio.TimeoutError)
+        ]
+        if timeout_sub_inst_ids:
+            self.move_insts_to_failed(
+                timeout_sub_inst_ids,
+                log_content=_("执行超时（{timeout}s），已取消").format(timeout=settings.BKAPP_SSH_INSTALL_TIMEOUT),
+            )
+        # 异常已由 execute_shell_solution_async 的异常处理器记录，此处仅移除
+        return [result for result in results if not isinstance(result, BaseException)]
 
     def _execute(self, data, parent_data, common_data: base.AgentCommonData):
         host_id__sub_inst_id = {
@@ -457,7 +500,12 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
     )
     @RetryHandler(interval=0, retry_times=2, exception_types=[ConnectionResetError])
     def execute_windows_commands(
-        self, sub_inst_id: int, host: models.Host, commands: List[str], identity_data: models.IdentityData
+        self,
+        sub_inst_id: int,
+        host: models.Host,
+        commands: List[str],
+        identity_data: models.IdentityData,
+        wmi_session: Optional[WmiSession] = None,
     ):
         # windows command executing
         ip = host.login_ip or host.inner_ip or host.inner_ipv6
@@ -477,11 +525,12 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
                         identity_data.account,
                         identity_data.password,
                         no_output=True,
+                        session=wmi_session,
                     )
                 else:
                     # Other commands is quick and depends on previous ones, using synchronous
                     self.log_info(sub_inst_ids=sub_inst_id, log_content=_("执行命令: {cmd}").format(cmd=cmd))
-                    execute_cmd(cmd, ip, identity_data.account, identity_data.password)
+                    execute_cmd(cmd, ip, identity_data.account, identity_data.password, session=wmi_session)
             except socket.error:
                 self.move_insts_to_failed(
                     [sub_inst_id],
@@ -519,6 +568,7 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
         dest_dir: str,
         identity_data: models.IdentityData,
         dependencies: List[str],
+        wmi_session: Optional[WmiSession] = None,
     ):
         ip = host.login_ip or host.inner_ip or host.outer_ip
         for dependence in dependencies:
@@ -534,6 +584,7 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
                     ip,
                     identity_data.account,
                     identity_data.password,
+                    session=wmi_session,
                 )
             except ConnectionResetError as e:
                 # 高并发模式下可能导致连接重置，记录报错信息并抛出异常，等待上层处理逻辑重试或抛出异常
@@ -690,7 +741,7 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
         ]
         command_converter: Dict = {}
 
-        async with conns.AsyncsshConn(**install_sub_inst_obj.conns_init_params) as conn:
+        async with conns.ssh_session_cache.session(**install_sub_inst_obj.conns_init_params) as conn:
             if install_sub_inst_obj.host.os_type == constants.OsType.WINDOWS:
                 sshd_info = await conn.run(POWERSHELL_SERVICE_CHECK_SSHD, check=False, timeout=SSH_RUN_TIMEOUT)
                 if sshd_info.exit_status == 0 and "cygwin" not in sshd_info.stdout.lower():
@@ -771,16 +822,59 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
                     cmd = content.text
                     command_converter[cmd] = self.convert_shell_to_powershell(cmd)
 
-    def handle_report_data(self, host: models.Host, sub_inst_id: int, success_callback_step: str) -> Dict:
-        """处理上报数据"""
-        name = REDIS_INSTALL_CALLBACK_KEY_TPL.format(sub_inst_id=sub_inst_id)
-        # 先计算出要从redis取数据的长度
-        report_data_len = REDIS_INST.llen(name)
-        # 从redis中取出对应长度的数据
-        report_data = REDIS_INST.lrange(name, -report_data_len, -1)
-        # 后使用ltrim保留剩下的，可以保证report_log中新push的值不会丢失
-        REDIS_INST.ltrim(name, 0, -report_data_len - 1)
-        report_data.reverse()
+    @staticmethod
+    def parse_report_data(raw_report_data: List[bytes]) -> List[Dict[str, Any]]:
+        """批量解析上报日志，优先拼接为 JSON 数组一次性解析，存在异常数据时逐条解析并跳过"""
+        if not raw_report_data:
+            return []
+        try:
+            return json.loads(b"[" + b",".join(raw_report_data) + b"]")
+        except ValueError:
+            pass
+
+        report_data: List[Dict[str, Any]] = []
+        for data in raw_report_data:
+            try:
+                report_data.append(json.loads(data))
+            except ValueError:
+                logger.warning(f"[app_core_remote:parse_report_data] invalid report data -> {data}")
+        return report_data
+
+    def bulk_drain_report_data(self, sub_inst_ids: typing.Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        批量取出订阅实例的上报日志
+        通过 Pipeline 合并各实例的 Lua 脚本调用，每个调度周期只需 len(sub_inst_ids) / DRAIN_REPORT_DATA_CHUNK_SIZE 次网络 IO
+        :param sub_inst_ids: 订阅实例 ID 列表
+        :return: 订阅实例 ID - 按上报时间正序排列的日志
+        """
+        sub_inst_id__report_data_map: Dict[int, List[Dict[str, Any]]] = {}
+        for sub_inst_ids_chunk in basic.chunk_lists(list(sub_inst_ids), DRAIN_REPORT_DATA_CHUNK_SIZE):
+            pipeline: Pipeline = REDIS_INST.pipeline(transaction=False)
+            for sub_inst_id in sub_inst_ids_chunk:
+                DRAIN_LIST_FUNC(keys=[REDIS_INSTALL_CALLBACK_KEY_TPL.format(sub_inst_id=sub_inst_id)], client=pipeline)
+            for sub_inst_id, raw_report_data in zip(sub_inst_ids_chunk, pipeline.execute()):
+                # 日志通过 lpush 写入，按时间倒序排列，需要反转
+                raw_report_data.reverse()
+                sub_inst_id__report_data_map[sub_inst_id] = self.parse_report_data(raw_report_data)
+        return sub_inst_id__report_data_map
+
+    def handle_report_data(
+        self,
+        host: models.Host,
+        sub_inst_id: int,
+        success_callback_step: str,
+        report_data: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict:
+        """
+        处理上报数据
+        :param host: 主机
+        :param sub_inst_id: 订阅实例 ID
+        :param success_callback_step: 成功回调步骤
+        :param report_data: 已取出的上报日志，为空时从 Redis 中取出
+        :return:
+        """
+        if report_data is None:
+            report_data = self.bulk_drain_report_data([sub_inst_id])[sub_inst_id]
         cpu_arch = None
         os_version = None
         agent_id = None
@@ -788,8 +882,6 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
         error_log = ""
         logs = []
         for data in report_data:
-            # redis取出为bytes类型，进行解码
-            data = json.loads(data.decode())
             step = data["step"]
             tag = data.get("prefix") or "[script]"
             log = f"{tag} [{step}] {data['log']}"
@@ -890,7 +982,7 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
 
     def _schedule(self, data, parent_data, callback_data=None):
         """通过轮询redis的方式来处理，避免使用callback的方式频繁调用schedule"""
-        common_data = self.get_common_data(data)
+        common_data = self.get_cached_common_data(data)
         success_callback_step = data.get_one_of_inputs("success_callback_step")
         # 与上一轮次的订阅实例ID取交集，确保本轮次需执行的订阅实例ID已排除手动终止的情况
         scheduling_sub_inst_ids = (
@@ -900,6 +992,9 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
             self.finish_schedule()
             return
 
+        sub_inst_id__report_data_map: Dict[int, List[Dict[str, Any]]] = self.bulk_drain_report_data(
+            scheduling_sub_inst_ids
+        )
         params_list = []
         for sub_inst_id in scheduling_sub_inst_ids:
             host: Optional[models.Host] = self.get_host(common_data, common_data.sub_inst_id__host_id_map[sub_inst_id])
@@ -911,6 +1006,7 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
                     "host": host,
                     "sub_inst_id": sub_inst_id,
                     "success_callback_step": success_callback_step,
+                    "report_data": sub_inst_id__report_data_map[sub_inst_id],
                 }
             )
 
@@ -171,7 +171,7 @@ class InstallOtherAgentService(AgentBaseService):
             self.finish_schedule()
             return True
 
-        common_data = self.get_common_data(data)
+        common_data = self.get_cached_common_data(data)
         polling_time: int = data.get_one_of_outputs("polling_time")
         next_polling_time: int = polling_time + POLLING_INTERVAL
         job_result: Dict[str, Any] = data.get_one_of_outputs("job_result")
@@ -70,7 +70,7 @@ class PushIdentifierHostsService(AgentBaseService):
         data.outputs.polling_time = 0
 
     def _schedule(self, data, parent_data, callback_data=None):
-        common_data: AgentCommonData = self.get_common_data(data)
+        common_data: AgentCommonData = self.get_cached_common_data(data)
         polling_time: int = data.get_one_of_outputs("polling_time")
         push_identifier_task_ids: List[str] = data.get_one_of_outputs("push_identifier_task_ids")
         total_failed_push_host_ids: List[int] = data.get_one_of_outputs("total_failed_push_host_ids") or []
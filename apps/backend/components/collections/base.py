@@ -8,12 +8,17 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import copy
 import logging
 import os
+import threading
+import time
 import traceback
 import typing
-from collections import defaultdict
-from dataclasses import dataclass
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
 from typing import (
     Any,
     Callable,
@@ -28,7 +33,7 @@ from typing import (
 )
 
 from django.conf import settings
-from django.db.models import Value
+from django.db.models import Case, TextField, Value, When
 from django.db.models.functions import Concat
 from django.utils import timezone
 from django.utils.translation import ugettext as _
@@ -43,7 +48,7 @@ from apps.node_man import constants, models
 from apps.node_man.periodic_tasks.sync_cmdb_host import bulk_differential_sync_biz_hosts
 from apps.prometheus import metrics
 from apps.prometheus.helper import SetupObserve
-from apps.utils import cache, time_handler, translation
+from apps.utils import basic, cache, time_handler, translation
 from apps.utils.exc import ExceptionHandler
 from pipeline.core.flow import Service
 
@@ -134,14 +139,122 @@ def get_labels_func(
     return {"code": instance.__class__.__name__}
 
 
+# 单条 UPDATE 语句合并的日志内容数量
+LOG_UPDATE_CHUNK_SIZE: int = 100
+
+
+def append_sub_inst_logs(node_id: str, sub_inst_id__log_map: Dict[int, str]):
+    """
+    追加订阅实例日志
+    开启分片存储时写入日志分片表，否则将相同内容的实例合并，通过 CASE WHEN 批量拼接到日志字段，减少对日志大字段的重复改写
+    :param node_id: Pipeline原子ID
+    :param sub_inst_id__log_map: 订阅实例ID - 待追加日志
+    """
+    if not sub_inst_id__log_map:
+        return
+
+    if settings.BKAPP_SUB_INST_LOG_CHUNK_ENABLED:
+        models.SubscriptionInstanceLogChunk.bulk_append(node_id, sub_inst_id__log_map)
+        for sub_inst_ids in basic.chunk_lists(
+            list(sub_inst_id__log_map.keys()), settings.BKAPP_SUB_INST_LOG_CHUNK_BATCH_SIZE
+        ):
+            models.SubscriptionInstanceStatusDetail.objects.filter(
+                node_id=node_id, subscription_instance_record_id__in=sub_inst_ids
+            ).update(update_time=timezone.now())
+        return
+
+    log__sub_inst_ids_map: Dict[str, List[int]] = defaultdict(list)
+    for sub_inst_id, log in sub_inst_id__log_map.items():
+        log__sub_inst_ids_map[log].append(sub_inst_id)
+
+    for chunk in basic.chunk_lists(list(log__sub_inst_ids_map.items()), LOG_UPDATE_CHUNK_SIZE):
+        if len(chunk) == 1:
+            log_value = Value(chunk[0][0])
+        else:
+            log_value = Case(
+                *[
+                    When(subscription_instance_record_id__in=sub_inst_ids, then=Value(log))
+                    for log, sub_inst_ids in chunk
+                ],
+                default=Value(""),
+                output_field=TextField(),
+            )
+        models.SubscriptionInstanceStatusDetail.objects.filter(
+            node_id=node_id,
+            subscription_instance_record_id__in=[
+                sub_inst_id for __, sub_inst_ids in chunk for sub_inst_id in sub_inst_ids
+            ],
+        ).update(log=Concat("log", log_value), update_time=timezone.now())
+
+
+class LogBuffer:
+    """
+    订阅实例日志缓冲区
+    按订阅实例聚合日志，flush 时批量追加，减少逐条写入的数据库交互
+    """
+
+    # 缓冲日志的字符数超过该阈值时立即落库
+    FLUSH_THRESHOLD: int = 512 * 1024
+
+    def __init__(self, node_id: str):
+        self.node_id = node_id
+        self.sub_inst_id__log_contents_map: Dict[int, List[str]] = defaultdict(list)
+        self.buffered_size: int = 0
+        # flush 全程持锁，保证多线程写入时日志顺序与落库顺序一致
+        self._lock = threading.RLock()
+
+    def append(self, sub_inst_ids: Iterable[int], log_content: str):
+        with self._lock:
+            for sub_inst_id in sub_inst_ids:
+                self.sub_inst_id__log_contents_map[sub_inst_id].append(log_content)
+                self.buffered_size += len(log_content)
+            if self.buffered_size >= self.FLUSH_THRESHOLD:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self.sub_inst_id__log_contents_map:
+                return
+
+            sub_inst_id__log_map: Dict[int, str] = {
+                sub_inst_id: "".join(f"\n{log_content}" for log_content in log_contents)
+                for sub_inst_id, log_contents in self.sub_inst_id__log_contents_map.items()
+            }
+            self.sub_inst_id__log_contents_map = defaultdict(list)
+            self.buffered_size = 0
+            append_sub_inst_logs(self.node_id, sub_inst_id__log_map)
+
+
 class LogMixin:
 
     # 日志类
     log_maker_class: Type[LogMaker] = LogMaker
+    # 日志缓冲区，仅在 execute / schedule 执行期间存在，避免被序列化到 process snapshot
+    log_buffer: Optional[LogBuffer] = None
 
     def get_log_maker(self):
         return self.log_maker_class()
 
+    @contextmanager
+    def log_buffering(self):
+        """在上下文中缓冲订阅实例日志，退出（包括异常退出）时统一落库"""
+        if self.log_buffer is not None:
+            yield
+            return
+
+        self.log_buffer = LogBuffer(node_id=self.id)
+        try:
+            yield
+        finally:
+            log_buffer: LogBuffer = self.log_buffer
+            del self.log_buffer
+            log_buffer.flush()
+
+    def flush_logs(self):
+        """将缓冲的日志落库，直接更新日志字段前需调用，保证日志顺序"""
+        if self.log_buffer is not None:
+            self.log_buffer.flush()
+
     def log_base(
         self, sub_inst_ids: Union[int, List[int], None] = None, log_content: str = None, level: int = LogLevel.INFO
     ):
@@ -152,18 +265,22 @@ class LogMixin:
         :param level:
         :return:
         """
-        filters = {"node_id": self.id}
+        if self.log_buffer is not None and sub_inst_ids is not None:
+            if isinstance(sub_inst_ids, int):
+                sub_inst_ids = [sub_inst_ids]
+            self.log_buffer.append(sub_inst_ids, self.log_maker.get_log_content(level, log_content))
+            return
+
+        self.flush_logs()
         if sub_inst_ids is None:
-            pass
+            sub_inst_ids = models.SubscriptionInstanceStatusDetail.objects.filter(node_id=self.id).values_list(
+                "subscription_instance_record_id", flat=True
+            )
         elif isinstance(sub_inst_ids, int):
-            filters["subscription_instance_record_id"] = sub_inst_ids
-        else:
-            filters["subscription_instance_record_id__in"] = sub_inst_ids
+            sub_inst_ids = [sub_inst_ids]
 
-        models.SubscriptionInstanceStatusDetail.objects.filter(**filters).update(
-            log=Concat("log", Value(f"\n{self.log_maker.get_log_content(level, log_content)}")),
-            update_time=timezone.now(),
-        )
+        log: str = f"\n{self.log_maker.get_log_content(level, log_content)}"
+        append_sub_inst_logs(self.id, {sub_inst_id: log for sub_inst_id in sub_inst_ids})
 
     def log_info(self, sub_inst_ids: Union[int, Iterable[int], None] = None, log_content: str = None):
         self.log_base(sub_inst_ids, log_content, level=LogLevel.INFO)
@@ -263,12 +380,71 @@ class CommonData:
     subscription_instance_ids: Set[int]
 
 
+class CommonDataCache:
+    """
+    节点级 CommonData 缓存（进程内），用于同一节点的多次调度间复用 CommonData
+    缓存键包含本轮需执行的订阅实例 ID，手动终止或失败的实例从待执行实例中移除后缓存键随之变化，旧缓存不再命中
+    缓存键包含节点的执行标识，节点重新执行后标识变化，其他进程中上一次执行遗留的缓存不再命中
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def copy(common_data: CommonData) -> CommonData:
+        # 仅复制容器，避免调用方增删元素影响缓存，容器内的模型对象仍共享
+        common_data = copy.copy(common_data)
+        for field in fields(common_data):
+            value = getattr(common_data, field.name)
+            if isinstance(value, (dict, list, set)):
+                setattr(common_data, field.name, value.copy())
+        return common_data
+
+    def get_or_create(self, key: Tuple, factory: Callable[[], CommonData]) -> CommonData:
+        with self._lock:
+            if key in self._cache:
+                expire_at, common_data = self._cache[key]
+                if expire_at > time.time():
+                    self._cache.move_to_end(key)
+                    metrics.app_task_engine_common_data_cache_total.labels(result="hit").inc()
+                    return self.copy(common_data)
+                self._cache.pop(key)
+
+        metrics.app_task_engine_common_data_cache_total.labels(result="miss").inc()
+        common_data = factory()
+        with self._lock:
+            self._cache[key] = (time.time() + self.ttl, self.copy(common_data))
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return common_data
+
+    def invalidate(self, node_id: str):
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == node_id]:
+                self._cache.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+COMMON_DATA_CACHE = CommonDataCache(
+    maxsize=settings.BKAPP_COMMON_DATA_CACHE_SIZE, ttl=settings.BKAPP_COMMON_DATA_CACHE_TTL
+)
+
+
 class BaseService(Service, LogMixin, DBHelperMixin, PollingTimeoutMixin):
 
     # 失败订阅实例ID - 失败原因 映射关系
     failed_subscription_instance_id_reason_map: Optional[Dict[int, Any]] = None
     # 日志制作类实例
     log_maker: Optional[LogMaker] = None
+    # 节点执行标识在 outputs 中的键，作为 CommonData 缓存键的一部分
+    COMMON_DATA_CACHE_TOKEN_KEY: str = "common_data_cache_token"
 
     def __init__(self, *args, **kwargs):
         self.failed_subscription_instance_id_reason_map: Dict = {}
@@ -334,12 +510,12 @@ class BaseService(Service, LogMixin, DBHelperMixin, PollingTimeoutMixin):
         """
         if not sub_inst_ids:
             return
-        update_fields = {"status": status}
+        self.flush_logs()
         if common_log:
-            update_fields["log"] = Concat("log", Value(f"\n{common_log}"))
+            append_sub_inst_logs(self.id, {sub_inst_id: f"\n{common_log}" for sub_inst_id in sub_inst_ids})
         models.SubscriptionInstanceStatusDetail.objects.filter(
             subscription_instance_record_id__in=sub_inst_ids, node_id=self.id
-        ).update(**{**update_fields, "update_time": timezone.now()})
+        ).update(status=status, update_time=timezone.now())
 
         # 失败的实例需要更新汇总状态
         if status in [constants.JobStatusType.FAILED]:
@@ -461,6 +637,20 @@ class BaseService(Service, LogMixin, DBHelperMixin, PollingTimeoutMixin):
             subscription_instance_ids=subscription_instance_ids,
         )
 
+    def get_cached_common_data(self, data):
+        """
+        获取节点级缓存的 CommonData，用于 schedule 中避免每次轮询重复查询
+        节点重新执行（重试）时缓存失效，缓存有效期内的主机等信息可能滞后于数据库
+        """
+        key = (
+            self.id,
+            data.get_one_of_outputs(self.COMMON_DATA_CACHE_TOKEN_KEY),
+            self.__class__.__name__,
+            data.get_one_of_inputs("subscription_step_id"),
+            frozenset(self.get_subscription_instance_ids(data)),
+        )
+        return COMMON_DATA_CACHE.get_or_create(key, lambda: self.get_common_data(data))
+
     def set_current_id(self, subscription_instance_ids: List[int]):
         # 更新当前实例的pipeline id
         # TODO 偶发死锁
@@ -567,6 +757,14 @@ class BaseService(Service, LogMixin, DBHelperMixin, PollingTimeoutMixin):
     )
     @ExceptionHandler(exc_handler=service_run_exc_handler)
     def execute(self, data, parent_data):
+        with self.log_buffering():
+            return self._run_execute(data, parent_data)
+
+    def _run_execute(self, data, parent_data):
+        # 每次执行生成新的缓存标识，节点重新执行时不会命中任一进程中上一次执行遗留的缓存
+        data.set_outputs(self.COMMON_DATA_CACHE_TOKEN_KEY, uuid.uuid4().hex)
+        # 及时释放本进程内上一次执行遗留的缓存
+        COMMON_DATA_CACHE.invalidate(self.id)
         common_data = self.get_common_data(data)
         act_name = data.get_one_of_inputs("act_name")
         act_type = data.get_one_of_inputs("act_type")
@@ -578,6 +776,8 @@ class BaseService(Service, LogMixin, DBHelperMixin, PollingTimeoutMixin):
             )
 
         subscription_instance_ids = self.get_subscription_instance_ids(data)
+        # 节点重试时，上一次执行的日志分片归档到对应的状态详情，避免与本次执行的日志拼接展示
+        models.SubscriptionInstanceLogChunk.archive(self.id, subscription_instance_ids)
         to_be_created_sub_statuses = [
             models.SubscriptionInstanceStatusDetail(
                 subscription_instance_record_id=sub_inst_id,
@@ -601,7 +801,8 @@ class BaseService(Service, LogMixin, DBHelperMixin, PollingTimeoutMixin):
     )
     @ExceptionHandler(exc_handler=service_run_exc_handler)
     def schedule(self, data, parent_data, callback_data=None):
-        return self.run(self._schedule, data, parent_data, callback_data=callback_data)
+        with self.log_buffering():
+            return self.run(self._schedule, data, parent_data, callback_data=callback_data)
 
     def inputs_format(self):
         return [
@@ -118,7 +118,7 @@ class RemoteServiceMixin(base.BaseService, ABC):
         check_result = {"remote_conn_helper": remote_conn_helper, "type": SshCheckResultType.AVAILABLE.value}
         conns_init_params = dict(ChainMap({"connect_timeout": 10}, remote_conn_helper.conns_init_params))
         try:
-            async with conns.AsyncsshConn(**conns_init_params):
+            async with conns.ssh_session_cache.session(**conns_init_params):
                 pass
         except (
             core_remote_exceptions.DisconnectError,
@@ -145,17 +145,23 @@ class RemoteServiceMixin(base.BaseService, ABC):
                 ),
             )
 
-    @controller.ConcurrentController(
-        data_list_name="remote_conn_helpers",
-        batch_call_func=concurrent.batch_call,
-        get_config_dict_func=core.get_config_dict,
-        get_config_dict_kwargs={"config_name": core.ServiceCCConfigName.SSH.value},
-    )
     def _bulk_check_ssh(
         self, remote_conn_helpers: typing.List[RemoteConnHelperT]
     ) -> typing.List[typing.Dict[str, typing.Union[str, RemoteConnHelperT]]]:
+        """
+        批量检测 SSH 通道
+        在当前工作线程的常驻事件循环中执行，检测时建立的 SSH 会话可被同一线程后续的安装复用
+        """
+        config_obj = controller.ConcurrentControlConfig(
+            config_dict=core.get_config_dict(config_name=core.ServiceCCConfigName.SSH.value)
+        )
         params_list = [{"remote_conn_helper": remote_conn_helper} for remote_conn_helper in remote_conn_helpers]
-        return concurrent.batch_call_coroutine(func=self.check_ssh, params_list=params_list)
+        return concurrent.batch_call_coroutine(
+            func=self.check_ssh,
+            params_list=params_list,
+            limit=(config_obj.limit, 0)[config_obj.execute_all],
+            reuse_loop=True,
+        )
 
     def bulk_check_ssh(
         self, remote_conn_helpers: typing.List[RemoteConnHelperT]
@@ -14,6 +14,7 @@ import traceback
 from enum import Enum
 from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
+from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 
 from apps.core.concurrent import core_concurrent_constants
@@ -53,8 +54,8 @@ def get_config_dict(config_name: str) -> Dict[str, Any]:
         # 目前 asyncssh 协程执行的最佳批次内数量
         default_concurrent_control_config.update(limit=100)
     elif config_name == ServiceCCConfigName.WMIEXE.value:
-        # Windows 管控数量相对较少，且单个执行约为 30 秒，需要减少批次内串行的数量
-        default_concurrent_control_config.update(limit=4)
+        # 单台 Windows 执行约为 30 秒，批次内按主机并发执行，批次间串行，使并发连接数受 limit 控制
+        default_concurrent_control_config.update(limit=settings.BKAPP_WMIEXE_CONCURRENT_LIMIT)
     elif config_name == ServiceCCConfigName.JOB_CMD.value:
         # 通过作业平台执行时，批次间串行防止触发接口限频
         default_concurrent_control_config.update(is_concurrent_between_batches=False, interval=2)
@@ -67,7 +68,14 @@ def get_config_dict(config_name: str) -> Dict[str, Any]:
     current_controller_settings = models.GlobalSettings.get_config(
         key=models.GlobalSettings.KeyEnum.CONCURRENT_CONTROLLER_SETTINGS.value, default={}
     )
-    return current_controller_settings.get(config_name, default_concurrent_control_config)
+    config_dict: Dict[str, Any] = copy.deepcopy(
+        current_controller_settings.get(config_name, default_concurrent_control_config)
+    )
+    if config_name == ServiceCCConfigName.WMIEXE.value:
+        # WMIEXE 的 limit 表示同时执行的主机数量（而非原先的串行批次大小），批次间必须串行，
+        # 全局配置中保留的旧配置（is_concurrent_between_batches=True）会导致并发数不受控，此处强制覆盖
+        config_dict["is_concurrent_between_batches"] = False
+    return config_dict
 
 
 def default_sub_inst_id_extractor(args: Tuple[Any], kwargs: Dict[str, Any]):
@@ -40,9 +40,10 @@ from apps.backend.components.collections.job import (
 from apps.backend.subscription import errors
 from apps.backend.subscription.steps.adapter import PolicyStepAdapter
 from apps.backend.subscription.tools import (
+    batch_render_config_files_by_config_templates,
     create_group_id,
     get_all_subscription_steps_context,
-    render_config_files_by_config_templates,
+    get_config_render_fingerprint,
 )
 from apps.core.tag import targets
 from apps.core.tag.models import Tag
@@ -51,7 +52,8 @@ from apps.node_man import constants, exceptions, models
 from apps.node_man.handlers.cmdb import CmdbHandler
 from apps.prometheus import metrics
 from apps.prometheus.helper import SetupObserve
-from apps.utils import cache, md5
+from apps.utils import cache, concurrent, md5
+from apps.utils.basic import chunk_lists
 from apps.utils.batch_request import request_multi_thread
 from apps.utils.files import PathHandler
 from common.api import JobApi
@@ -924,7 +926,7 @@ class JobAllocatePortService(PluginExecuteScriptService):
         # 查询未完成的作业, 批量查询作业状态并更新DB
         job_meta = self.get_job_meta(data)
         multi_params = [
-            {"job_sub_map": job_sub_map, "common_data": self.get_common_data(data), "meta": job_meta}
+            {"job_sub_map": job_sub_map, "common_data": self.get_cached_common_data(data), "meta": job_meta}
             for job_sub_map in models.JobSubscriptionInstanceMap.objects.filter(
                 node_id=self.id, status=constants.BkJobStatus.PENDING
             )
@@ -947,41 +949,24 @@ class RenderAndPushConfigService(PluginBaseService, JobV3BaseService):
         job_meta = self.get_job_meta(data)
         subscription_step_id = data.get_one_of_inputs("subscription_step_id")
         process_statuses = common_data.process_statuses
-        policy_step_adapter = common_data.policy_step_adapter
         group_id_instance_map = common_data.group_id_instance_map
         host_id_obj_map = common_data.host_id_obj_map
 
         # 此处 subscription_step 一定有值，否则前置流程已出现异常
         subscription_step = models.SubscriptionStep.objects.get(id=subscription_step_id)
 
+        rendered_configs_list: List[List[Dict[str, Any]]] = self.render_configs(
+            subscription_step, process_statuses, common_data
+        )
+        for process_status, rendered_configs in zip(process_statuses, rendered_configs_list):
+            process_status.configs = rendered_configs
+        self.save_configs(process_statuses)
+
         # 组装调用作业平台的参数
         multi_job_params_map: Dict[str, Dict[str, Any]] = {}
-        for process_status in process_statuses:
-            target_bk_host_id = process_status.bk_host_id
+        for process_status, rendered_configs in zip(process_statuses, rendered_configs_list):
             subscription_instance = group_id_instance_map.get(process_status.group_id)
-            target_host = host_id_obj_map.get(target_bk_host_id)
-            package = self.get_package_by_process_status(process_status, common_data)
-            agent_config = self.get_agent_config_by_process_status(process_status, common_data)
-            # 获取订阅的上下文变量
-            context = get_all_subscription_steps_context(
-                subscription_step,
-                subscription_instance.instance_info,
-                target_host,
-                process_status.name,
-                agent_config,
-                policy_step_adapter,
-            )
-
-            # 根据配置模板和上下文变量渲染配置文件
-            rendered_configs = render_config_files_by_config_templates(
-                policy_step_adapter.get_matching_config_tmpl_objs(target_host.os_type, target_host.cpu_arch),
-                {"group_id": process_status.group_id},
-                context,
-                package_obj=package,
-                source="engine",
-            )
-            process_status.configs = rendered_configs
-            process_status.save()
+            target_host = host_id_obj_map.get(process_status.bk_host_id)
 
             path_handler = PathHandler(target_host.os_type)
             plugin_root = self.get_plugin_root_by_process_status(process_status, common_data)
@@ -1036,9 +1021,114 @@ class RenderAndPushConfigService(PluginBaseService, JobV3BaseService):
             self.finish_schedule()
             return True
 
-        self.rolling_run_job_or_finish_schedule(data, multi_job_params_map)
+        self.push_configs(data, multi_job_params_map)
         return True
 
+    def render_chunk_configs(
+        self,
+        chunk_index: int,
+        subscription_step: models.SubscriptionStep,
+        process_statuses: List[models.ProcessStatus],
+        common_data: PluginCommonData,
+    ) -> Tuple[int, List[List[Dict[str, Any]]]]:
+        """
+        渲染一批进程的配置文件
+        :param chunk_index: 批次序号，用于还原并发执行后的结果顺序
+        :param subscription_step: 订阅步骤
+        :param process_statuses: 进程状态列表
+        :param common_data: 公共数据
+        :return: 批次序号, 与 process_statuses 一一对应的渲染结果
+        """
+        policy_step_adapter = common_data.policy_step_adapter
+        group_id_instance_map = common_data.group_id_instance_map
+        host_id_obj_map = common_data.host_id_obj_map
+
+        render_params_list: List[Dict[str, Any]] = []
+        for process_status in process_statuses:
+            subscription_instance = group_id_instance_map.get(process_status.group_id)
+            target_host = host_id_obj_map.get(process_status.bk_host_id)
+            agent_config = self.get_agent_config_by_process_status(process_status, common_data)
+            config_templates = policy_step_adapter.get_matching_config_tmpl_objs(
+                target_host.os_type, target_host.cpu_arch
+            )
+            package = self.get_package_by_process_status(process_status, common_data)
+            # 记录渲染输入指纹，配置变更检测时输入不变可跳过渲染
+            process_status.configs_fingerprint = (
+                get_config_render_fingerprint(
+                    subscription_step,
+                    subscription_instance.instance_info,
+                    target_host,
+                    {"name": process_status.name, "group_id": process_status.group_id},
+                    agent_config,
+                    policy_step_adapter,
+                    config_templates,
+                    package,
+                )
+                or ""
+            )
+            render_params_list.append(
+                {
+                    "config_templates": config_templates,
+                    "process_status_info": {"group_id": process_status.group_id},
+                    # 获取订阅的上下文变量
+                    "context": get_all_subscription_steps_context(
+                        subscription_step,
+                        subscription_instance.instance_info,
+                        target_host,
+                        process_status.name,
+                        agent_config,
+                        policy_step_adapter,
+                    ),
+                    "package_obj": package,
+                }
+            )
+
+        # 根据配置模板和上下文变量批量渲染配置文件，各主机间一致的部分仅渲染一次
+        return chunk_index, batch_render_config_files_by_config_templates(render_params_list, source="engine")
+
+    @SetupObserve(histogram=metrics.app_task_engine_render_and_push_config_duration_seconds, labels={"phase": "render"})
+    def render_configs(
+        self,
+        subscription_step: models.SubscriptionStep,
+        process_statuses: List[models.ProcessStatus],
+        common_data: PluginCommonData,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        按批次并发渲染配置文件
+        :return: 与 process_statuses 一一对应的渲染结果
+        """
+        params_list: List[Dict[str, Any]] = [
+            {
+                "chunk_index": chunk_index,
+                "subscription_step": subscription_step,
+                "process_statuses": process_statuses_chunk,
+                "common_data": common_data,
+            }
+            for chunk_index, process_statuses_chunk in enumerate(
+                chunk_lists(process_statuses, settings.BKAPP_RENDER_CONFIG_CHUNK_SIZE)
+            )
+        ]
+        # 模板渲染为 CPU 密集型，受 GIL 限制多线程无法并行加速，按批次并发仅用于重叠各批次中的 IO 等待
+        # （如查询订阅步骤、插件包，模板中调用 CMDB 接口），并发数受 CONCURRENT_NUMBER 限制
+        chunk_results: List[Tuple[int, List[List[Dict[str, Any]]]]] = concurrent.batch_call(
+            func=self.render_chunk_configs, params_list=params_list
+        )
+        # 并发执行的结果按完成顺序返回，需按批次序号还原
+        rendered_configs_list: List[List[Dict[str, Any]]] = []
+        for __, chunk_rendered_configs_list in sorted(chunk_results, key=lambda chunk_result: chunk_result[0]):
+            rendered_configs_list.extend(chunk_rendered_configs_list)
+        return rendered_configs_list
+
+    @SetupObserve(histogram=metrics.app_task_engine_render_and_push_config_duration_seconds, labels={"phase": "db"})
+    def save_configs(self, process_statuses: List[models.ProcessStatus]):
+        models.ProcessStatus.objects.bulk_update(
+            process_statuses, fields=["configs", "configs_fingerprint"], batch_size=self.batch_size
+        )
+
+    @SetupObserve(histogram=metrics.app_task_engine_render_and_push_config_duration_seconds, labels={"phase": "job"})
+    def push_configs(self, data, multi_job_params_map: Dict[str, Dict[str, Any]]):
+        self.rolling_run_job_or_finish_schedule(data, multi_job_params_map)
+
 
 class GseOperateProcService(PluginBaseService):
     """调用GSE接口操作插件进程"""
@@ -1285,7 +1375,7 @@ class GseOperateProcService(PluginBaseService):
         op_type = data.get_one_of_inputs("op_type")
         task_id = data.get_one_of_outputs("task_id")
         polling_time = data.get_one_of_outputs("polling_time")
-        common_data = self.get_common_data(data)
+        common_data = self.get_cached_common_data(data)
         process_statuses = common_data.process_statuses
         policy_step_adapter = common_data.policy_step_adapter
         plugin = policy_step_adapter.plugin_desc
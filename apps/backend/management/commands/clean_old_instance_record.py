@@ -19,6 +19,7 @@ from django.db import connection
 from django.db.models import Q
 
 from apps.backend.management.commands import utils
+from apps.backend.utils import pipeline_tree
 from apps.node_man import constants, models
 from pipeline.engine import models as engine_models
 
@@ -35,6 +36,11 @@ def list_tree_node_ids(tree, node_ids=None):
     if node_ids is None:
         node_ids = []
 
+    if pipeline_tree.is_compact(tree):
+        # 订阅任务的 Pipeline 树以紧凑形式存储，无 flows / activities
+        node_ids.extend(pipeline_tree.list_node_ids(tree))
+        return
+
     for flow_id, flow in tree.get("flows", {}).items():
         node_ids.append(flow_id)
         node_ids.append(flow["source"])
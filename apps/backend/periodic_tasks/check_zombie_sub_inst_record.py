@@ -10,9 +10,12 @@ specific language governing permissions and limitations under the License.
 """
 
 import logging
+from collections import defaultdict
 from datetime import timedelta
+from typing import Dict, List
 
 from celery.task import periodic_task
+from django.conf import settings
 from django.db.models import Value
 from django.db.models.functions import Concat
 from django.utils import timezone
@@ -53,12 +56,24 @@ def check_zombie_sub_inst_record():
         **base_update_kwargs
     )
 
-    forced_failed_status_detail_num = models.SubscriptionInstanceStatusDetail.objects.filter(**query_kwargs).update(
-        **base_update_kwargs,
-        log=Concat(
-            "log", Value(_("\n[{time_str} ERROR] 任务长时间处在执行状态，已强制失败").format(time_str=strftime_local(timezone.now())))
-        ),
-    )
+    forced_failed_log = _("\n[{time_str} ERROR] 任务长时间处在执行状态，已强制失败").format(time_str=strftime_local(timezone.now()))
+    if settings.BKAPP_SUB_INST_LOG_CHUNK_ENABLED:
+        node_id__sub_inst_ids_map: Dict[str, List[int]] = defaultdict(list)
+        for node_id, sub_inst_id in models.SubscriptionInstanceStatusDetail.objects.filter(**query_kwargs).values_list(
+            "node_id", "subscription_instance_record_id"
+        ):
+            node_id__sub_inst_ids_map[node_id].append(sub_inst_id)
+        forced_failed_status_detail_num = models.SubscriptionInstanceStatusDetail.objects.filter(**query_kwargs).update(
+            **base_update_kwargs
+        )
+        for node_id, sub_inst_ids in node_id__sub_inst_ids_map.items():
+            models.SubscriptionInstanceLogChunk.bulk_append(
+                node_id, {sub_inst_id: str(forced_failed_log) for sub_inst_id in sub_inst_ids}
+            )
+    else:
+        forced_failed_status_detail_num = models.SubscriptionInstanceStatusDetail.objects.filter(**query_kwargs).update(
+            **base_update_kwargs, log=Concat("log", Value(forced_failed_log))
+        )
 
     logger.info(
         f"periodic_task -> check_zombie_sub_inst_record, number_of_forced_failed_inst -> {forced_failed_inst_num}, "
@@ -22,6 +22,7 @@ from common.log import logger
 
 SUBSCRIPTION_INSTANCE_DETAIL_TABLE = "node_man_subscriptioninstancestatusdetail"
 JOB_SUB_INSTANCE_MAP_TABLE = "node_man_jobsubscriptioninstancemap"
+SUBSCRIPTION_INSTANCE_LOG_CHUNK_TABLE = "node_man_subscriptioninstancelogchunk"
 
 
 @periodic_task(
@@ -74,6 +75,18 @@ def clean_subscription_data():
                 f"deleted subscription instance status detail records -> [{cursor.rowcount}] "
             )
 
+        # 日志分片跟随订阅实例状态详情清理，仅清理状态详情已不存在的分片
+        log_chunk_delete_sql: str = build_log_chunk_delete_query_sql(days=alive_days, limit=limit)
+        logger.info(
+            f"periodic_task -> clean_subscription_data, time -> {strftime_local(timezone.now())}"
+            f"start to execute sql -> [{log_chunk_delete_sql}] "
+        )
+        cursor.execute(log_chunk_delete_sql)
+        logger.info(
+            f"periodic_task -> clean_subscription_data, time -> {strftime_local(timezone.now())}, "
+            f"deleted subscription instance log chunk records -> [{cursor.rowcount}] "
+        )
+
         job_instance_map_delete_sqls: List[str] = build_delete_query_sqls(
             table_name=JOB_SUB_INSTANCE_MAP_TABLE,
             appoint_clean_statuses=job_map_clean_status,
@@ -136,3 +149,15 @@ def build_delete_query_sqls(
             ]
 
     return [f"{head_sql} {where_condition} {limit_condition}" for where_condition in where_conditions]
+
+
+def build_log_chunk_delete_query_sql(days: int, limit: int) -> str:
+    return (
+        f"DELETE FROM {SUBSCRIPTION_INSTANCE_LOG_CHUNK_TABLE} "
+        f"WHERE create_time < DATE_SUB(NOW(), INTERVAL {days} DAY) AND NOT EXISTS ("
+        f"SELECT 1 FROM {SUBSCRIPTION_INSTANCE_DETAIL_TABLE} WHERE "
+        f"{SUBSCRIPTION_INSTANCE_DETAIL_TABLE}.subscription_instance_record_id = "
+        f"{SUBSCRIPTION_INSTANCE_LOG_CHUNK_TABLE}.subscription_instance_record_id AND "
+        f"{SUBSCRIPTION_INSTANCE_DETAIL_TABLE}.node_id = {SUBSCRIPTION_INSTANCE_LOG_CHUNK_TABLE}.node_id"
+        f") ORDER BY create_time limit {limit}"
+    )
@@ -44,4 +44,6 @@ def update_subscription_instances():
         countdown = calculate_countdown(count=count, index=index, duration=SUBSCRIPTION_UPDATE_INTERVAL)
         task_queue = by_biz_dispatch_task_queue(biz_ids_gby_queue, subscription_id__biz_ids_map[subscription_id])
         logger.info(f"subscription({subscription_id}) will be run after {countdown} seconds in queue ({task_queue}).")
-        update_subscription_instances_chunk.apply_async(([subscription_id],), countdown=countdown, queue=task_queue)
+        update_subscription_instances_chunk.apply_async(
+            ([subscription_id],), kwargs={"incremental": True}, countdown=countdown, queue=task_queue
+        )
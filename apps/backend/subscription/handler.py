@@ -398,7 +398,21 @@ class SubscriptionHandler(object):
         tasks.create_task.delay(subscription, subscription_task, instances, instance_actions, language=get_language())
         return {"task_id": subscription_task.id}
 
-    def task_result_detail(self, instance_id: str, task_id_list: List[int] = None) -> Dict:
+    def task_result_detail(
+        self,
+        instance_id: str,
+        task_id_list: List[int] = None,
+        log_offsets: Optional[Dict[str, int]] = None,
+        log_tail: Optional[int] = None,
+    ) -> Dict:
+        """
+        查询订阅实例执行详情
+        :param instance_id: 实例ID
+        :param task_id_list: 任务ID列表
+        :param log_offsets: 原子ID - 已读取的日志分片序号，传入后仅返回该序号之后的日志
+        :param log_tail: 仅返回末尾的日志分片数量
+        :return:
+        """
 
         filter_kwargs = filter_values(
             {"subscription_id": self.subscription_id, "task_id__in": task_id_list, "instance_id": instance_id},
@@ -420,7 +434,7 @@ class SubscriptionHandler(object):
             return instance_status
 
         instance_status_list = task_tools.TaskResultTools.list_subscription_task_instance_status(
-            instance_records=[instance_record], need_detail=True
+            instance_records=[instance_record], need_detail=True, log_offsets=log_offsets, log_tail=log_tail
         )
         if not instance_status_list:
             raise errors.SubscriptionInstanceRecordNotExist()
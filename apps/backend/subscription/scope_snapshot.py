@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import hashlib
+import json
+import logging
+import typing
+
+from django.conf import settings
+from django.db.models import Max, Value
+
+from apps.backend.subscription import tools
+from apps.backend.subscription.constants import MAX_RETRY_TIME
+from apps.backend.utils.redis import REDIS_INST
+from apps.core.tag.constants import TargetType
+from apps.core.tag.models import Tag
+from apps.node_man import constants, models
+from apps.prometheus import metrics
+from apps.utils.basic import chunk_lists
+
+logger = logging.getLogger("app")
+
+# 订阅范围增量计算
+# - 全量计算订阅范围后，记录范围内的主机快照
+# - 消费资源监听事件时，记录各订阅待重新计算的主机（脏主机）
+# - 自动触发订阅变更时，若快照有效，仅重新计算脏主机，并与快照比对得到新增 / 移除 / 变更的实例
+# - 进程状态异常、最近一次执行失败的主机每轮均视为脏主机，与全量计算一致地重新下发
+# - 快照在 BKAPP_SUBSCRIPTION_SCOPE_FULL_SYNC_INTERVAL 后过期，过期、范围 / 步骤变更或插件包 / 配置模板 / 标签变更后回退为全量计算
+# 目前仅支持单业务的「主机 - 拓扑」插件订阅
+
+SNAPSHOT_META_KEY_TPL = f"{settings.APP_CODE}:backend:subscription:scope_snapshot:meta:str:" + "{subscription_id}"
+SNAPSHOT_HOSTS_KEY_TPL = f"{settings.APP_CODE}:backend:subscription:scope_snapshot:hosts:set:" + "{subscription_id}"
+DIRTY_HOSTS_KEY_TPL = f"{settings.APP_CODE}:backend:subscription:scope_snapshot:dirty_hosts:set:" + "{subscription_id}"
+
+
+class ScopeDelta:
+    """订阅范围增量"""
+
+    def __init__(
+        self,
+        added_host_ids: typing.Set[int],
+        removed_host_ids: typing.Set[int],
+        changed_host_ids: typing.Set[int],
+        instances: typing.Dict[str, typing.Dict],
+    ):
+        self.added_host_ids: typing.Set[int] = added_host_ids
+        self.removed_host_ids: typing.Set[int] = removed_host_ids
+        self.changed_host_ids: typing.Set[int] = changed_host_ids
+        # 新增及变更的主机实例
+        self.instances: typing.Dict[str, typing.Dict] = instances
+
+    @property
+    def bk_host_ids(self) -> typing.Set[int]:
+        """需要重新计算变更动作的主机"""
+        return self.added_host_ids | self.removed_host_ids | self.changed_host_ids
+
+
+def is_supported(subscription: models.Subscription) -> bool:
+    if not (
+        subscription.bk_biz_id
+        and subscription.object_type == models.Subscription.ObjectType.HOST
+        and subscription.node_type == models.Subscription.NodeType.TOPO
+    ):
+        return False
+    # 多业务范围需按业务拆分计算，暂不支持
+    for node in subscription.nodes:
+        if node.get("bk_biz_id", subscription.bk_biz_id) != subscription.bk_biz_id:
+            return False
+    return all([step.type == "PLUGIN" for step in subscription.steps])
+
+
+def get_plugin_resources(plugin_names: typing.List[str]) -> typing.Dict[str, typing.Any]:
+    """
+    获取插件包、配置模板及标签的版本标识
+    插件上传新包（如 latest 指向新版本）、新增配置模板或标签指向变更时，标识随之变化
+    """
+    plugin_ids: typing.List[int] = list(
+        models.GsePluginDesc.objects.filter(name__in=plugin_names).values_list("id", flat=True)
+    )
+    return {
+        "max_package_id": models.Packages.objects.filter(project__in=plugin_names).aggregate(max_id=Max("id"))[
+            "max_id"
+        ],
+        "max_config_template_id": models.PluginConfigTemplate.objects.filter(plugin_name__in=plugin_names).aggregate(
+            max_id=Max("id")
+        )["max_id"],
+        "tags": sorted(
+            Tag.objects.filter(target_type=TargetType.PLUGIN.value, target_id__in=plugin_ids).values_list(
+                "target_id", "name", "target_version"
+            )
+        ),
+    }
+
+
+def get_scope_digest(subscription: models.Subscription) -> str:
+    """范围、步骤或步骤所用的插件资源变更后，摘要随之变化，快照失效"""
+    content: str = json.dumps(
+        {
+            "scope": subscription.scope,
+            "steps": [[step.step_id, step.type, step.config, step.params] for step in subscription.steps],
+            "plugin_resources": get_plugin_resources([step.config.get("plugin_name") for step in subscription.steps]),
+        },
+        sort_keys=True,
+    )
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+def list_reconcile_host_ids(subscription: models.Subscription) -> typing.Set[int]:
+    """
+    获取需每轮重新计算变更动作的主机，与全量计算保持一致
+    - 插件进程状态异常且未超过最大重试次数，自动触发时会重新下发
+    - 最近一次执行失败的实例
+    """
+    bk_host_ids: typing.Set[int] = set(
+        models.ProcessStatus.objects.filter(source_id=subscription.id, retry_times__lte=MAX_RETRY_TIME)
+        .exclude(status=constants.ProcStateType.RUNNING)
+        .values_list("bk_host_id", flat=True)
+    )
+    failed_instance_ids: typing.List[str] = list(
+        models.SubscriptionInstanceRecord.objects.filter(
+            subscription_id=subscription.id, is_latest=Value(1), status=constants.JobStatusType.FAILED
+        ).values_list("instance_id", flat=True)
+    )
+    for instance_id in failed_instance_ids:
+        host_info: typing.Dict[str, typing.Any] = tools.parse_host_key(tools.parse_node_id(instance_id)["id"])
+        if "bk_host_id" in host_info:
+            bk_host_ids.add(host_info["bk_host_id"])
+    return bk_host_ids
+
+
+def save_snapshot(subscription: models.Subscription, instances: typing.Dict[str, typing.Dict]):
+    """
+    以全量计算结果重建快照
+    :param subscription: 订阅
+    :param instances: 订阅范围内的全部实例
+    """
+    if not (settings.BKAPP_SUBSCRIPTION_INCREMENTAL_SCOPE_ENABLED and is_supported(subscription)):
+        return
+
+    hosts_key: str = SNAPSHOT_HOSTS_KEY_TPL.format(subscription_id=subscription.id)
+    bk_host_ids: typing.List[int] = [instance["host"]["bk_host_id"] for instance in instances.values()]
+    expire: int = settings.BKAPP_SUBSCRIPTION_SCOPE_FULL_SYNC_INTERVAL
+
+    pipeline = REDIS_INST.pipeline()
+    pipeline.delete(hosts_key)
+    for bk_host_id_chunk in chunk_lists(bk_host_ids, settings.BKAPP_SUBSCRIPTION_SCOPE_SNAPSHOT_BATCH_SIZE):
+        pipeline.sadd(hosts_key, *bk_host_id_chunk)
+    # 主机快照比元数据晚过期，保证元数据存在时快照一定存在
+    pipeline.expire(hosts_key, 2 * expire)
+    pipeline.set(
+        SNAPSHOT_META_KEY_TPL.format(subscription_id=subscription.id), get_scope_digest(subscription), ex=expire
+    )
+    pipeline.execute()
+
+    logger.info(
+        "[sub_lifecycle<sub(%s)>][scope_snapshot] save snapshot: host_num -> %s", subscription.id, len(bk_host_ids)
+    )
+
+
+def invalidate_snapshot(subscription_id: int):
+    REDIS_INST.delete(SNAPSHOT_META_KEY_TPL.format(subscription_id=subscription_id))
+
+
+def apply_scope_delta(subscription: models.Subscription, scope_delta: ScopeDelta):
+    """将增量合并到快照"""
+    hosts_key: str = SNAPSHOT_HOSTS_KEY_TPL.format(subscription_id=subscription.id)
+    pipeline = REDIS_INST.pipeline()
+    if scope_delta.added_host_ids:
+        pipeline.sadd(hosts_key, *scope_delta.added_host_ids)
+    if scope_delta.removed_host_ids:
+        pipeline.srem(hosts_key, *scope_delta.removed_host_ids)
+    pipeline.execute()
+
+
+def record_dirty_hosts(bk_biz_id: int, bk_host_ids: typing.Iterable[int], need_full: bool = False):
+    """
+    记录业务下发生变更的主机，供该业务下的订阅增量计算
+    :param bk_biz_id: 业务ID
+    :param bk_host_ids: 发生变更的主机
+    :param need_full: 是否需要全量计算，例如进程变更无法映射到主机，直接使快照失效
+    """
+    bk_host_ids: typing.Set[int] = set(bk_host_ids)
+    if not (need_full or bk_host_ids):
+        return
+
+    subscription_ids: typing.List[int] = list(
+        models.Subscription.objects.filter(
+            bk_biz_id=bk_biz_id,
+            object_type=models.Subscription.ObjectType.HOST,
+            node_type=models.Subscription.NodeType.TOPO,
+            enable=Value(1),
+            is_deleted=Value(0),
+        ).values_list("id", flat=True)
+    )
+    if not subscription_ids:
+        return
+
+    pipeline = REDIS_INST.pipeline()
+    for subscription_id in subscription_ids:
+        if need_full:
+            pipeline.delete(SNAPSHOT_META_KEY_TPL.format(subscription_id=subscription_id))
+            continue
+        dirty_hosts_key: str = DIRTY_HOSTS_KEY_TPL.format(subscription_id=subscription_id)
+        pipeline.sadd(dirty_hosts_key, *bk_host_ids)
+        pipeline.expire(dirty_hosts_key, settings.BKAPP_SUBSCRIPTION_SCOPE_FULL_SYNC_INTERVAL)
+    pipeline.execute()
+
+
+def pop_dirty_hosts(subscription_id: int) -> typing.Set[int]:
+    dirty_hosts_key: str = DIRTY_HOSTS_KEY_TPL.format(subscription_id=subscription_id)
+    pipeline = REDIS_INST.pipeline()
+    pipeline.smembers(dirty_hosts_key)
+    pipeline.delete(dirty_hosts_key)
+    bk_host_ids, __ = pipeline.execute()
+    return {int(bk_host_id) for bk_host_id in bk_host_ids}
+
+
+def resolve_scope_delta(subscription: models.Subscription) -> typing.Optional[ScopeDelta]:
+    """
+    增量计算订阅范围
+    :param subscription: 订阅
+    :return: 快照不可用时返回 None，调用方需回退为全量计算
+    """
+    if not settings.BKAPP_SUBSCRIPTION_INCREMENTAL_SCOPE_ENABLED:
+        return None
+
+    if not is_supported(subscription):
+        reason: str = "unsupported"
+    else:
+        digest: typing.Optional[typing.Union[str, bytes]] = REDIS_INST.get(
+            SNAPSHOT_META_KEY_TPL.format(subscription_id=subscription.id)
+        )
+        if isinstance(digest, bytes):
+            digest = digest.decode()
+        if digest is None:
+            reason = "expired"
+        elif digest != get_scope_digest(subscription):
+            reason = "scope_changed"
+        else:
+            reason = ""
+
+    if reason:
+        metrics.app_task_subscription_scope_resolutions_total.labels(mode="full", reason=reason).inc()
+        return None
+
+    reconcile_host_ids: typing.Set[int] = list_reconcile_host_ids(subscription)
+    dirty_host_ids: typing.List[int] = list(pop_dirty_hosts(subscription.id) | reconcile_host_ids)
+    try:
+        instances: typing.Dict[str, typing.Dict] = tools.get_topo_host_instances_by_host_ids(
+            subscription.scope, subscription.steps, dirty_host_ids
+        )
+    except Exception:
+        # 已取出的脏主机无法放回，使快照失效，下次回退为全量计算
+        invalidate_snapshot(subscription.id)
+        raise
+    in_scope_host_ids: typing.Set[int] = {instance["host"]["bk_host_id"] for instance in instances.values()}
+
+    # 与快照比对，区分新增 / 移除 / 变更
+    pipeline = REDIS_INST.pipeline()
+    for bk_host_id in dirty_host_ids:
+        pipeline.sismember(SNAPSHOT_HOSTS_KEY_TPL.format(subscription_id=subscription.id), bk_host_id)
+    in_snapshot_host_ids: typing.Set[int] = {
+        bk_host_id for bk_host_id, is_member in zip(dirty_host_ids, pipeline.execute()) if is_member
+    }
+    scope_delta = ScopeDelta(
+        added_host_ids=in_scope_host_ids - in_snapshot_host_ids,
+        # 需重新下发但已不在范围内的主机，与全量计算一致，计算卸载 / 停止动作
+        removed_host_ids=(in_snapshot_host_ids | reconcile_host_ids) - in_scope_host_ids,
+        changed_host_ids=in_scope_host_ids & in_snapshot_host_ids,
+        instances=instances,
+    )
+
+    metrics.app_task_subscription_scope_resolutions_total.labels(mode="incremental", reason="-").inc()
+    logger.info(
+        "[sub_lifecycle<sub(%s)>][scope_snapshot] resolve scope delta: dirty -> %s, reconcile -> %s, added -> %s, "
+        "removed -> %s, changed -> %s",
+        subscription.id,
+        len(dirty_host_ids),
+        len(reconcile_host_ids),
+        len(scope_delta.added_host_ids),
+        len(scope_delta.removed_host_ids),
+        len(scope_delta.changed_host_ids),
+    )
+    return scope_delta
@@ -234,6 +234,10 @@ class TaskResultDetailSerializer(GatewaySerializer):
     task_id = serializers.IntegerField(required=False)
     task_id_list = serializers.ListField(child=serializers.IntegerField(), required=False)
     instance_id = serializers.CharField()
+    log_offsets = serializers.DictField(
+        child=serializers.IntegerField(min_value=0), required=False, label="原子ID - 已读取的日志分片序号"
+    )
+    log_tail = serializers.IntegerField(min_value=1, required=False, label="仅返回末尾的日志分片数量")
 
 
 class InstanceHostStatusSerializer(GatewaySerializer):
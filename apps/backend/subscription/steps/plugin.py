@@ -30,6 +30,7 @@ from apps.core.tag import targets
 from apps.core.tag.models import Tag
 from apps.node_man import constants, models
 from apps.node_man.exceptions import ApIDNotExistsError
+from apps.prometheus import metrics
 from apps.utils import concurrent
 from common.log import logger
 from pipeline.builder import Data, Var
@@ -244,16 +245,39 @@ class PluginStep(Step):
         ap_id_obj_map: Dict,
         process_status_list: List[Dict[str, Any]],
         proc_status_id__configs_map: Dict[int, List[Dict]],
+        proc_status_id__configs_fingerprint_map: Optional[Dict[int, str]] = None,
     ) -> Dict[str, Union[bool, str]]:
         """检测配置是否有变动"""
+        proc_status_id__configs_fingerprint_map = proc_status_id__configs_fingerprint_map or {}
         try:
             for process_status in process_status_list:
-                # 渲染新配置
                 target_host = host_map[process_status["bk_host_id"]]
                 ap = ap_id_obj_map.get(target_host.ap_id)
                 if not ap:
                     raise ApIDNotExistsError()
                 agent_config = ap.agent_config[target_host.os_type.lower()]
+                config_templates = self.get_matching_config_templates(target_host.os_type, target_host.cpu_arch)
+                package_obj = self.get_matching_package(target_host.os_type, target_host.cpu_arch)
+
+                # 渲染输入与上次下发时一致，配置必然一致，跳过渲染
+                last_fingerprint: str = proc_status_id__configs_fingerprint_map.get(process_status["id"])
+                if last_fingerprint:
+                    fingerprint: Optional[str] = tools.get_config_render_fingerprint(
+                        subscription_step,
+                        instance_info,
+                        target_host,
+                        process_status,
+                        agent_config,
+                        self.policy_step_adapter,
+                        config_templates,
+                        package_obj,
+                    )
+                    if fingerprint == last_fingerprint:
+                        metrics.app_plugin_render_config_fingerprint_checks_total.labels(result="hit").inc()
+                        continue
+                metrics.app_plugin_render_config_fingerprint_checks_total.labels(result="miss").inc()
+
+                # 渲染新配置
                 context = tools.get_all_subscription_steps_context(
                     subscription_step,
                     instance_info,
@@ -264,10 +288,10 @@ class PluginStep(Step):
                 )
 
                 rendered_configs = tools.render_config_files_by_config_templates(
-                    self.get_matching_config_templates(target_host.os_type, target_host.cpu_arch),
+                    config_templates,
                     process_status,
                     context,
-                    package_obj=self.get_matching_package(target_host.os_type, target_host.cpu_arch),
+                    package_obj=package_obj,
                     source="migrate",
                 )
 
@@ -544,11 +568,13 @@ class PluginStep(Step):
         proc_configs_list = (
             self.filter_related_process_statuses(auto_trigger=auto_trigger)
             .filter(bk_host_id__in=set(bk_host_ids))
-            .values("id", "configs")
+            .values("id", "configs", "configs_fingerprint")
         )
-        proc_status_id__configs_map: Dict[int, List[Dict]] = {
-            proc_configs["id"]: proc_configs["configs"] for proc_configs in proc_configs_list
-        }
+        proc_status_id__configs_map: Dict[int, List[Dict]] = {}
+        proc_status_id__configs_fingerprint_map: Dict[int, str] = {}
+        for proc_configs in proc_configs_list:
+            proc_status_id__configs_map[proc_configs["id"]] = proc_configs["configs"]
+            proc_status_id__configs_fingerprint_map[proc_configs["id"]] = proc_configs["configs_fingerprint"]
 
         check_config_change_params_list: List[Dict] = []
         for instance_id in instance_ids:
@@ -561,6 +587,7 @@ class PluginStep(Step):
                     "ap_id_obj_map": ap_id_obj_map,
                     "process_status_list": instance_id__proc_statuses_map[instance_id],
                     "proc_status_id__configs_map": proc_status_id__configs_map,
+                    "proc_status_id__configs_fingerprint_map": proc_status_id__configs_fingerprint_map,
                 }
             )
 
@@ -716,6 +743,7 @@ class PluginStep(Step):
         instances: Dict[str, Dict[str, Union[Dict, Any]]],
         auto_trigger: bool = False,
         preview_only: bool = False,
+        scope_host_ids: Optional[Set[int]] = None,
         **kwargs,
     ) -> Dict[str, Dict]:
         """
@@ -723,6 +751,7 @@ class PluginStep(Step):
         :param instances: dict 变更后的实例列表
         :param auto_trigger: bool 是否自动触发
         :param preview_only: 是否仅预览，若为true则不做任何保存或执行动作
+        :param scope_host_ids: 仅计算指定主机的变更（订阅范围增量计算），为 None 时计算订阅下的全部主机
         :return: dict 需要对哪些实例做哪些动作
         """
         migrate_reasons = {}
@@ -768,7 +797,10 @@ class PluginStep(Step):
             bk_host_ids.add(instance["host"]["bk_host_id"])
             id_to_instance_id[instance[instance_key][id_key]] = instance_id
 
-        statuses = list(self.filter_related_process_statuses(auto_trigger=auto_trigger))
+        statuses = self.filter_related_process_statuses(auto_trigger=auto_trigger)
+        if scope_host_ids is not None:
+            statuses = statuses.filter(bk_host_id__in=scope_host_ids)
+        statuses = list(statuses)
         for status in statuses:
             bk_host_ids.add(status["bk_host_id"])
 
@@ -18,7 +18,7 @@ from django.db.models import QuerySet
 from django.utils import timezone
 
 from apps.backend.subscription import tools
-from apps.backend.utils import pipeline_parser
+from apps.backend.utils import pipeline_parser, pipeline_tree
 from apps.core.concurrent import controller
 from apps.node_man import constants, models
 from apps.utils import concurrent
@@ -32,18 +32,26 @@ class TaskResultTools:
     def list_pipeline_processes(pipeline_id: str) -> Dict[str, List[Dict]]:
         pipeline = models.PipelineTree.objects.get(id=pipeline_id).tree
 
+        # 紧凑树直接按分片获取原子链，无需展开
+        if pipeline_tree.is_compact(pipeline):
+            return pipeline_tree.list_chunk_processes(pipeline)
+
         parallel_gw = next(
             (gw for gw in pipeline["gateways"].values() if gw["type"] == pipeline_parser.ActType.PARALLEL), None
         )
 
+        # 按连线索引原子，避免逐个分支遍历全部原子
+        incoming__activity_map: Dict[str, Dict] = {}
+        for activity in pipeline["activities"].values():
+            for incoming in activity["incoming"]:
+                incoming__activity_map[incoming] = activity
+
         pipeline_processes = {}
         for outgoing in parallel_gw["outgoing"]:
             pipeline_process = []
             index = 0
             while True:
-                next_node = next(
-                    (node for node in pipeline["activities"].values() if outgoing in node["incoming"]), None
-                )
+                next_node = incoming__activity_map.get(outgoing)
                 if not next_node:
                     break
                 pipeline_process.append(
@@ -92,7 +100,11 @@ class TaskResultTools:
 
     @classmethod
     def _list_subscription_task_instance_status(
-        cls, instance_records: List[models.SubscriptionInstanceRecord], need_detail=False
+        cls,
+        instance_records: List[models.SubscriptionInstanceRecord],
+        need_detail=False,
+        log_offsets: Optional[Dict[str, int]] = None,
+        log_tail: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         if not instance_records:
             return []
@@ -120,6 +132,19 @@ class TaskResultTools:
                 subscription_instance_record_id__in=set([inst_record.id for inst_record in instance_records])
             ).values(*fields)
         }
+        if need_detail:
+            # 合并存量日志及日志分片
+            key__log_info_map: Dict[str, Dict[str, Any]] = models.SubscriptionInstanceLogChunk.fetch_logs(
+                sub_inst_ids=[inst_record.id for inst_record in instance_records],
+                legacy_logs={
+                    key: status_detail.pop("log") for key, status_detail in node_id_inst_status_detail_map.items()
+                },
+                log_offsets=log_offsets,
+                log_tail=log_tail,
+            )
+            for key, log_info in key__log_info_map.items():
+                if key in node_id_inst_status_detail_map:
+                    node_id_inst_status_detail_map[key].update(log_info)
 
         instance_status_list = []
         for instance_record in instance_records:
@@ -140,8 +165,21 @@ class TaskResultTools:
 
     @classmethod
     def list_subscription_task_instance_status(
-        cls, instance_records: List[models.SubscriptionInstanceRecord], need_detail=False
+        cls,
+        instance_records: List[models.SubscriptionInstanceRecord],
+        need_detail=False,
+        log_offsets: Optional[Dict[str, int]] = None,
+        log_tail: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
+        """
+        查询订阅实例状态
+        :param instance_records: 订阅实例列表
+        :param need_detail: 是否需要详细信息（包括日志）
+        :param log_offsets: 原子ID - 已读取的日志分片序号，用于增量拉取日志
+        :param log_tail: 仅返回末尾的日志分片数量
+        :return:
+        """
+
         @controller.ConcurrentController(
             data_list_name="_instance_records",
             batch_call_func=concurrent.batch_call,
@@ -152,7 +190,7 @@ class TaskResultTools:
             _instance_records: List[models.SubscriptionInstanceRecord], _need_detail=False
         ) -> List[Dict[str, Any]]:
             return cls._list_subscription_task_instance_status(
-                instance_records=_instance_records, need_detail=_need_detail
+                instance_records=_instance_records, need_detail=_need_detail, log_offsets=log_offsets, log_tail=log_tail
             )
 
         return _inner(_instance_records=instance_records, _need_detail=need_detail)
@@ -219,6 +257,7 @@ class TaskResultTools:
                     "step_code": node["step_code"],
                     "pipeline_id": node["node_id"],
                     "log": node_inst_status_detail.get("log", ""),
+                    "log_seq": node_inst_status_detail.get("log_seq", models.SubscriptionInstanceLogChunk.LEGACY_SEQ),
                     "ex_data": None,
                     "status": node_inst_status_detail["status"],
                     "start_time": strftime_local(node_inst_status_detail.get("create_time")),
@@ -23,10 +23,11 @@ from django.utils.translation import ugettext as _
 
 from apps.backend.celery import app
 from apps.backend.components.collections.base import ActivityType
-from apps.backend.subscription import handler, tools
+from apps.backend.subscription import handler, scope_snapshot, tools
 from apps.backend.subscription.constants import TASK_HOST_LIMIT
 from apps.backend.subscription.errors import SubscriptionInstanceEmpty
 from apps.backend.subscription.steps import StepFactory, agent
+from apps.backend.utils import pipeline_tree
 from apps.core.gray.tools import GrayTools
 from apps.node_man import constants, models
 from apps.node_man import tools as node_man_tools
@@ -254,7 +255,9 @@ def create_pipeline(
 
     # 构造pipeline树
     tree = builder.build_tree(start_event, data=global_pipeline_data)
-    models.PipelineTree.objects.create(id=tree["id"], tree=tree)
+    # 各分片一致的原子链仅存储一次，降低树的存储及查询解析开销
+    compact_tree: Optional[Dict[str, Any]] = pipeline_tree.compress(tree)
+    models.PipelineTree.objects.create(id=tree["id"], tree=compact_tree or tree)
 
     parser = PipelineParser(pipeline_tree=tree)
     pipeline = parser.parse()
@@ -281,6 +284,9 @@ def create_task_transaction(create_task_func):
                 subscription.id,
                 subscription_task.id,
             )
+            if not isinstance(err, SubscriptionInstanceEmpty):
+                # 计算结果未能落地，快照可能已与实际部署情况不一致，下次回退为全量计算
+                scope_snapshot.invalidate_snapshot(subscription.id)
             if subscription_task.is_auto_trigger or kwargs.get("preview_only"):
                 # 自动触发的发生异常或者仅预览的情况，记录日志后直接删除此任务即可
                 if subscription_task.id:
@@ -544,6 +550,9 @@ def run_subscription_task_and_create_instance_transaction(func):
                 subscription.id,
                 subscription_task.id,
             )
+            if not isinstance(err, SubscriptionInstanceEmpty):
+                # 计算结果未能落地，快照可能已与实际部署情况不一致，下次回退为全量计算
+                scope_snapshot.invalidate_snapshot(subscription.id)
             if subscription_task.is_auto_trigger or kwargs.get("preview_only"):
                 # 自动触发的发生异常或者仅预览的情况
                 # 记录日志后直接删除此任务即可
@@ -571,12 +580,14 @@ def run_subscription_task_and_create_instance(
     scope: Optional[Dict] = None,
     actions: Optional[Dict] = None,
     preview_only: bool = False,
+    scope_delta: Optional[scope_snapshot.ScopeDelta] = None,
 ):
     """
     自动检查实例及配置的变更，执行相应动作
     :param preview_only: 是否仅预览，若为true则不做任何保存或执行动作
     :param subscription: Subscription
     :param subscription_task: SubscriptionTask
+    :param scope_delta: 订阅范围增量，传入时仅计算增量主机的变更动作
     :param scope
     {
         "bk_biz_id": 2,
@@ -589,7 +600,8 @@ def run_subscription_task_and_create_instance(
     }
     """
     # 如果不传范围，则使用订阅全部范围
-    if not scope:
+    is_full_scope: bool = not scope
+    if is_full_scope:
         scope = subscription.scope
     else:
         scope["object_type"] = subscription.object_type
@@ -597,16 +609,20 @@ def run_subscription_task_and_create_instance(
 
     # 获取订阅范围内全部实例
     steps = subscription.steps
-    tolerance_time: int = (59, 0)[subscription.is_need_realtime()]
-    instances = tools.get_instances_by_scope_with_checker(
-        scope, steps, source="run_subscription_task_and_create_instance", tolerance_time=tolerance_time
-    )
+    if scope_delta is not None:
+        instances = dict(scope_delta.instances)
+    else:
+        tolerance_time: int = (59, 0)[subscription.is_need_realtime()]
+        instances = tools.get_instances_by_scope_with_checker(
+            scope, steps, source="run_subscription_task_and_create_instance", tolerance_time=tolerance_time
+        )
     logger.info(
         "[sub_lifecycle<sub(%s), task(%s)>][run_subscription_task_and_create_instance] "
-        "get_instances_by_scope_with_checker -> %s",
+        "get_instances_by_scope_with_checker -> %s, incremental -> %s",
         subscription.id,
         subscription_task.id,
         len(instances),
+        scope_delta is not None,
     )
 
     # 创建步骤管理器实例
@@ -628,6 +644,13 @@ def run_subscription_task_and_create_instance(
         create_task(subscription, subscription_task, instances, instance_actions)
         return
 
+    if not preview_only:
+        # 全量计算的结果作为快照，供后续增量计算比对
+        if scope_delta is not None:
+            scope_snapshot.apply_scope_delta(subscription, scope_delta)
+        elif is_full_scope:
+            scope_snapshot.save_snapshot(subscription, instances)
+
     # 预注入 Meta，用于变更计算（仅覆盖当前订阅范围，移除场景通过 create_task 兜底注入）
     GrayTools().inject_meta_to_instances(instances)
     logger.info(
@@ -645,7 +668,10 @@ def run_subscription_task_and_create_instance(
     for step in step_managers.values():
         # 计算变更的动作
         migrate_results = step.make_instances_migrate_actions(
-            instances, auto_trigger=subscription_task.is_auto_trigger, preview_only=preview_only
+            instances,
+            auto_trigger=subscription_task.is_auto_trigger,
+            preview_only=preview_only,
+            scope_host_ids=scope_delta.bk_host_ids if scope_delta is not None else None,
         )
         # 归类变更动作
         # eg: {"host|instance|host|1": "MAIN_INSTALL_PLUGIN"}
@@ -835,9 +861,11 @@ def set_record_status(instance_record_ids: List[str], status: str, delay_seconds
 
 
 @app.task(queue="backend_additional_task", ignore_result=True)
-def update_subscription_instances_chunk(subscription_ids: List[int]):
+def update_subscription_instances_chunk(subscription_ids: List[int], incremental: bool = False):
     """
     分片更新订阅状态
+    :param subscription_ids: 订阅ID列表
+    :param incremental: 是否尝试增量计算订阅范围，快照不可用时回退为全量计算
     """
     subscriptions = models.Subscription.objects.filter(id__in=subscription_ids, enable=True)
     for subscription in subscriptions:
@@ -854,6 +882,13 @@ def update_subscription_instances_chunk(subscription_ids: List[int]):
                 logger.info("[update_subscription_instances] skipped: subscription is running")
                 continue
 
+            scope_delta: Optional[scope_snapshot.ScopeDelta] = None
+            if incremental:
+                scope_delta = scope_snapshot.resolve_scope_delta(subscription)
+                if scope_delta is not None and not scope_delta.bk_host_ids:
+                    logger.info("[update_subscription_instances] skipped: no scope delta, do nothing")
+                    continue
+
             # 创建订阅任务记录
             subscription_task = models.SubscriptionTask.objects.create(
                 subscription_id=subscription.id,
@@ -861,7 +896,7 @@ def update_subscription_instances_chunk(subscription_ids: List[int]):
                 actions={},
                 is_auto_trigger=True,
             )
-            run_subscription_task_and_create_instance(subscription, subscription_task)
+            run_subscription_task_and_create_instance(subscription, subscription_task, scope_delta=scope_delta)
             logger.info(f"[update_subscription_instances] succeed: subscription_task -> {subscription_task}")
         except SubscriptionInstanceEmpty:
             logger.info("[update_subscription_instances] skipped: no change, do nothing")
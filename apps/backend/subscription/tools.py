@@ -29,7 +29,7 @@ from django.utils import timezone
 
 from apps.backend.components.collections import core
 from apps.backend.constants import FilterFieldName, InstNodeType
-from apps.backend.subscription import task_tools
+from apps.backend.subscription import task_tools, topo_cache
 from apps.backend.subscription.commons import get_host_by_inst, list_biz_hosts
 from apps.backend.subscription.constants import SUBSCRIPTION_SCOPE_CACHE_TIME
 from apps.backend.subscription.errors import (
@@ -37,7 +37,12 @@ from apps.backend.subscription.errors import (
     MultipleObjectError,
     PipelineTreeParseError,
 )
-from apps.backend.utils.data_renderer import nested_render_data
+from apps.backend.utils.data_renderer import (
+    batch_render_contexts,
+    get_template_key,
+    get_template_variables,
+    nested_render_data,
+)
 from apps.component.esbclient import client_v2
 from apps.core.concurrent import controller
 from apps.core.concurrent.cache import FuncCacheDecorator
@@ -48,7 +53,11 @@ from apps.prometheus import metrics
 from apps.prometheus.helper import SetupObserve, get_call_resource_labels_func
 from apps.utils import concurrent
 from apps.utils.basic import chunk_lists, distinct_dict_list, order_dict
-from apps.utils.batch_request import batch_request, request_multi_thread
+from apps.utils.batch_request import (
+    batch_request,
+    batch_request_iter,
+    request_multi_thread,
+)
 from apps.utils.concurrent import batch_call
 from apps.utils.time_handler import strftime_local
 from common.api import CCApi
@@ -114,41 +123,56 @@ def create_topo_node_id(topo_node: Dict) -> str:
     return "{}|{}".format(topo_node["bk_obj_id"], topo_node["bk_inst_id"])
 
 
-def get_module_to_topo_dict(bk_biz_id: int) -> Dict:
+def get_module_to_topo_dict(bk_biz_id: int, refresh: bool = False) -> Dict:
     """
-    获取业务的模块拓扑映射
+    获取业务的模块拓扑映射，优先读取业务拓扑缓存
     :param bk_biz_id: 业务ID
+    :param refresh: 是否跳过缓存，从 CMDB 拉取并刷新缓存
     :return: {
         "module|1": ["biz|2", "set|3", "module|1"]
     }
     """
+    use_cache: bool = settings.BKAPP_CMDB_TOPO_CACHE_ENABLED
+    if use_cache:
+        # 拉取前读取版本号，拉取期间拓扑失效时，写入的旧版本数据不会被读取
+        version: int = topo_cache.get_version(bk_biz_id)
+        if not refresh:
+            module_to_topo: typing.Optional[Dict] = topo_cache.get_module_to_topo_dict(bk_biz_id, version)
+            if module_to_topo is not None:
+                return module_to_topo
+
     topo_tree = client_v2.cc.search_biz_inst_topo({"bk_username": "admin", "bk_biz_id": bk_biz_id})
     internal_module = client_v2.cc.get_biz_internal_module({"bk_biz_id": bk_biz_id})
+    module_to_topo = topo_cache.build_module_to_topo_dict(bk_biz_id, topo_tree, internal_module)
 
-    node_relations = {}
+    if use_cache:
+        topo_cache.save_module_to_topo_dict(bk_biz_id, version, module_to_topo)
+    return module_to_topo
 
-    for _internal_module in internal_module.get("module") or []:
-        module_node_id = "module|{}".format(_internal_module["bk_module_id"])
-        node_relations[module_node_id] = [f"biz|{bk_biz_id}", f"set|{internal_module['bk_set_id']}", module_node_id]
 
-    queue = topo_tree
-    while queue:
-        topo_node = queue.pop()
-        topo_node_id = create_topo_node_id(topo_node)
-
-        if topo_node_id not in node_relations:
-            node_relations[topo_node_id] = [topo_node_id]
-
-        queue.extend(topo_node["child"])
-        for child in topo_node["child"]:
-            child_node_id = create_topo_node_id(child)
-            node_relations[child_node_id] = node_relations[topo_node_id] + [child_node_id]
+def ensure_instances_module_to_topo(scope: Dict, instances: List[Dict], module_to_topo: Dict) -> Dict:
+    """
+    缓存的模块拓扑可能滞后于 CMDB，实例所属模块不在拓扑中时，从 CMDB 刷新，避免实例被误判为不在范围内
+    :param scope: 目标范围
+    :param instances: 实例列表
+    :param module_to_topo: 模块拓扑映射
+    :return: 模块拓扑映射
+    """
+    bk_biz_id: int = scope["bk_biz_id"]
+    if not (bk_biz_id and settings.BKAPP_CMDB_TOPO_CACHE_ENABLED):
+        return module_to_topo
 
-    return {
-        topo_node_id: node_relations[topo_node_id]
-        for topo_node_id in node_relations
-        if topo_node_id.startswith("module")
-    }
+    for instance in instances:
+        if scope["object_type"] == models.Subscription.ObjectType.HOST:
+            module_ids = instance["host"].get("module") or []
+        else:
+            module_ids = [instance["service"]["bk_module_id"]]
+        for module_id in module_ids:
+            if create_topo_node_id({"bk_obj_id": "module", "bk_inst_id": module_id}) in module_to_topo:
+                continue
+            topo_cache.invalidate(bk_biz_id, reason="module_missing")
+            return get_module_to_topo_dict(bk_biz_id, refresh=True)
+    return module_to_topo
 
 
 def create_node_id(data: Dict) -> str:
@@ -411,13 +435,21 @@ def get_service_instance_by_inst(bk_biz_id, inst_list, module_to_topo):
         )
     else:
         params = {"bk_biz_id": int(bk_biz_id), "with_name": True, "no_request": True}
-        service_instances = batch_request(
+        # 全业务查询时逐页过滤，仅保留目标模块下的服务实例，避免全业务服务实例常驻内存
+        service_instances = []
+        for page_service_instances in batch_request_iter(
             CCApi.list_service_instance_detail,
             params,
             sort="id",
             limit=constants.LIST_SERVICE_INSTANCE_DETAIL_LIMIT,
             interval=constants.LIST_SERVICE_INSTANCE_DETAIL_INTERVAL,
-        )
+        ):
+            service_instances.extend(
+                service_instance
+                for service_instance in page_service_instances
+                if service_instance["bk_module_id"] in module_ids
+            )
+        return service_instances
 
     service_instances = [
         service_instance for service_instance in service_instances if service_instance["bk_module_id"] in module_ids
@@ -512,16 +544,21 @@ def get_service_instances_by_template(bk_obj_id, template_info_list: list, bk_bi
         # 集群模板下的服务实例
         call_func = client_v2.cc.find_host_by_set_template
         params = dict(bk_set_template_ids=template_ids, bk_biz_id=int(bk_biz_id), fields=("bk_host_id", "bk_cloud_id"))
-    host_info_result = batch_request(call_func, params)
-    bk_host_ids = [inst["bk_host_id"] for inst in host_info_result]
-    all_service_instances = batch_request(
+    bk_host_ids: typing.Set[int] = set()
+    for page_host_infos in batch_request_iter(call_func, params):
+        bk_host_ids.update(inst["bk_host_id"] for inst in page_host_infos)
+
+    service_instances = []
+    for page_service_instances in batch_request_iter(
         CCApi.list_service_instance_detail,
         {**params, "no_request": True},
         sort="id",
         limit=constants.LIST_SERVICE_INSTANCE_DETAIL_LIMIT,
         interval=constants.LIST_SERVICE_INSTANCE_DETAIL_INTERVAL,
-    )
-    service_instances = [instance for instance in all_service_instances if instance["bk_host_id"] in bk_host_ids]
+    ):
+        service_instances.extend(
+            instance for instance in page_service_instances if instance["bk_host_id"] in bk_host_ids
+        )
 
     return service_instances
 
@@ -823,10 +860,12 @@ def get_scope_labels_func(
     }
 
 
-def get_instances_by_scope_with_checker(
-    scope: Dict[str, Union[Dict, int, Any]], steps: List[models.SubscriptionStep], *args, **kwargs
-) -> Dict[str, Dict[str, Union[Dict, Any]]]:
-
+def fill_scope_with_info(scope: Dict[str, Union[Dict, int, Any]], steps: List[models.SubscriptionStep]):
+    """
+    根据订阅步骤参数判断是否需要补充进程信息
+    :param scope: 目标范围
+    :param steps: 订阅步骤
+    """
     if "with_info" in scope:
         scope["with_info"]["process"] = False
     else:
@@ -838,9 +877,88 @@ def get_instances_by_scope_with_checker(
             scope["with_info"]["process"] = True
             break
 
+
+def get_instances_by_scope_with_checker(
+    scope: Dict[str, Union[Dict, int, Any]], steps: List[models.SubscriptionStep], *args, **kwargs
+) -> Dict[str, Dict[str, Union[Dict, Any]]]:
+    fill_scope_with_info(scope, steps)
     return get_instances_by_scope(scope, *args, **kwargs)
 
 
+def get_topo_host_instances_by_host_ids(
+    scope: Dict[str, Union[Dict, int, Any]], steps: List[models.SubscriptionStep], bk_host_ids: List[int]
+) -> Dict[str, Dict[str, Union[Dict, Any]]]:
+    """
+    获取指定主机中属于「主机 - 拓扑」范围内的实例，用于增量计算订阅范围
+    与 get_instances_by_scope 的区别在于仅查询给定主机，不在范围内的主机不返回
+    :param scope: 单业务的主机拓扑范围
+    :param steps: 订阅步骤
+    :param bk_host_ids: 主机ID列表
+    :return: 结构同 get_instances_by_scope
+    """
+    fill_scope_with_info(scope, steps)
+    bk_biz_id: int = scope["bk_biz_id"]
+    instance_selector = scope.get("instance_selector")
+    if not bk_host_ids or instance_selector == []:
+        return {}
+
+    relations = defaultdict(lambda: defaultdict(list))
+    for item in find_host_biz_relations(list(bk_host_ids), source="get_topo_host_instances_by_host_ids"):
+        # 已转移到其他业务的主机视为移出范围
+        if item["bk_biz_id"] != bk_biz_id:
+            continue
+        relations[item["bk_host_id"]]["bk_module_ids"].append(item["bk_module_id"])
+        relations[item["bk_host_id"]]["bk_set_ids"].append(item["bk_set_id"])
+    if not relations:
+        return {}
+
+    module_to_topo = get_module_to_topo_dict(bk_biz_id)
+    hosts = get_host_detail(
+        [{"bk_host_id": bk_host_id} for bk_host_id in relations],
+        bk_biz_id=bk_biz_id,
+        source="get_topo_host_instances_by_host_ids",
+    )
+    instances = []
+    for host in hosts:
+        host["bk_biz_id"] = bk_biz_id
+        host["module"] = relations[host["bk_host_id"]]["bk_module_ids"]
+        host["set"] = relations[host["bk_host_id"]]["bk_set_ids"]
+        instances.append({"host": host})
+
+    module_to_topo = ensure_instances_module_to_topo(scope, instances, module_to_topo)
+    for instance in instances:
+        _add_scope_info_to_topo_instances(scope, instance, scope["nodes"], module_to_topo)
+    instances = [instance for instance in instances if instance["scope"]]
+
+    if instance_selector and instances:
+        instance_selector_host_ids = set(
+            HostQuerySqlHelper.multiple_cond_sql(
+                params={
+                    "bk_host_id": [instance["host"]["bk_host_id"] for instance in instances],
+                    "conditions": instance_selector,
+                },
+                biz_scope=[bk_biz_id],
+                return_all_node_type=True,
+            ).values_list("bk_host_id", flat=True)
+        )
+        instances = [instance for instance in instances if instance["host"]["bk_host_id"] in instance_selector_host_ids]
+
+    add_host_info_to_instances(bk_biz_id, scope, instances)
+    if scope["with_info"]["process"]:
+        add_process_info_to_instances(bk_biz_id, scope, instances)
+
+    return {
+        create_node_id(
+            {
+                "object_type": models.Subscription.ObjectType.HOST,
+                "node_type": models.Subscription.NodeType.INSTANCE,
+                "bk_host_id": instance["host"]["bk_host_id"],
+            }
+        ): instance
+        for instance in instances
+    }
+
+
 @support_multi_biz
 @SetupObserve(histogram=metrics.app_task_get_instances_by_scope_duration_seconds, get_labels_func=get_scope_labels_func)
 @FuncCacheDecorator(cache_time=SUBSCRIPTION_SCOPE_CACHE_TIME)
@@ -968,6 +1086,8 @@ def get_instances_by_scope(scope: Dict[str, Union[Dict, int, Any]]) -> Dict[str,
         # 补充必要的主机或实例相关信息
 
         add_host_info_to_instances(bk_biz_id, scope, instances)
+        if scope["node_type"] != models.Subscription.NodeType.INSTANCE:
+            module_to_topo = ensure_instances_module_to_topo(scope, instances, module_to_topo)
         add_scope_info_to_instances(nodes, scope, instances, module_to_topo)
 
         if scope["with_info"]["process"]:
@@ -1190,9 +1310,11 @@ def get_all_subscription_steps_context(
     plugin_name: str,
     agent_config: Dict,
     policy_step_adapter,
+    need_copy: bool = True,
 ) -> Dict:
     """
     获取订阅步骤上下文数据
+    :param need_copy: 是否深拷贝上下文，仅读取上下文时（例如计算指纹）无需深拷贝
     :param agent_config:
     :param SubscriptionStep subscription_step:
     :param dict instance_info: 实例信息
@@ -1235,11 +1357,65 @@ def get_all_subscription_steps_context(
             "constants": get_plugin_common_constants(plugin_name),
         },
     )
-    # 深拷贝一份，避免原数据后续被污染
-    context = copy.deepcopy(context)
+    if need_copy:
+        # 深拷贝一份，避免原数据后续被污染
+        context = copy.deepcopy(context)
     return context
 
 
+def get_config_render_fingerprint(
+    subscription_step: models.SubscriptionStep,
+    instance_info: Dict,
+    target_host: models.Host,
+    process_status_info: Dict[str, Any],
+    agent_config: Dict,
+    policy_step_adapter,
+    config_templates: List[models.PluginConfigTemplate],
+    package_obj: models.Packages,
+) -> typing.Optional[str]:
+    """
+    计算配置渲染输入指纹，指纹一致时渲染结果一致，可跳过渲染
+    指纹覆盖 get_all_subscription_steps_context 及 render_config_files_by_config_templates 的全部输入
+    :param subscription_step: 订阅步骤
+    :param instance_info: 实例信息
+    :param target_host: 目标主机
+    :param process_status_info: 进程信息，需包含 name 及 group_id
+    :param agent_config: AGENT配置
+    :param policy_step_adapter: 策略步骤适配器
+    :param config_templates: 配置文件模板
+    :param package_obj: 插件包对象
+    :return: 配置模板引用了运行时查询的渲染函数时，渲染结果不稳定，返回 None
+    """
+    template_infos: List[List[Any]] = []
+    for template in config_templates:
+        template_variables: typing.Optional[typing.FrozenSet[str]] = get_template_variables(template.content)
+        if template_variables is None or "get_hosts_by_node" in template_variables:
+            # 模板语法错误时不计算指纹，由渲染过程抛出异常
+            return None
+        template_infos.append([template.id, template.name, template.file_path, template.is_main, template.md5])
+
+    context: Dict = get_all_subscription_steps_context(
+        subscription_step,
+        instance_info,
+        target_host,
+        process_status_info["name"],
+        agent_config,
+        policy_step_adapter,
+        need_copy=False,
+    )
+    content: str = json.dumps(
+        {
+            "context": context,
+            "templates": template_infos,
+            "package": [package_obj.id, package_obj.plugin_desc.is_official] if package_obj else None,
+            "group_id": process_status_info["group_id"],
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.md5(content.encode()).hexdigest()
+
+
 def render_config_files(
     config_instances: List[models.PluginConfigInstance],
     host_status: models.ProcessStatus,
@@ -1300,6 +1476,9 @@ def render_config_files_by_config_templates(
     context: Dict,
     package_obj: models.Packages,
     source: typing.Optional[str] = None,
+    is_context_rendered: bool = False,
+    variant_keys: typing.Optional[typing.Set[str]] = None,
+    content_cache: typing.Optional[Dict[str, str]] = None,
 ):
     """
     根据订阅配置及步骤信息渲染配置模板
@@ -1308,6 +1487,9 @@ def render_config_files_by_config_templates(
     :param HostStatus process_status_info: 主机进程信息
     :param dict context: 上下文信息
     :param source: 调用来源
+    :param is_context_rendered: 上下文是否已渲染自身
+    :param variant_keys: 批量渲染时，各上下文间渲染结果可能不一致的顶层变量
+    :param content_cache: 批量渲染时，仅引用一致变量的配置内容缓存，以模板内容摘要为键
     :return: example: [
         {
             "instance_id": config.id,
@@ -1320,10 +1502,22 @@ def render_config_files_by_config_templates(
     """
     rendered_configs = []
     for template in config_templates:
-        try:
-            content = template.render(context)
-        except Exception as e:
-            raise ConfigRenderFailed({"name": template.name, "msg": e})
+        content_key: typing.Optional[str] = None
+        template_variables: typing.Optional[typing.FrozenSet[str]] = (
+            get_template_variables(template.content) if content_cache is not None else None
+        )
+        if template_variables is not None and not template_variables & variant_keys:
+            # 配置内容仅引用了各上下文一致的变量，渲染结果可复用
+            content_key = get_template_key(template.content)
+
+        content: typing.Optional[str] = content_cache.get(content_key) if content_key else None
+        if content is None:
+            try:
+                content = template.render(context, is_context_rendered=is_context_rendered)
+            except Exception as e:
+                raise ConfigRenderFailed({"name": template.name, "msg": e})
+            if content_key:
+                content_cache[content_key] = content
 
         # 计算配置文件的MD5
         md5 = hashlib.md5()
@@ -1362,6 +1556,42 @@ def render_config_files_by_config_templates(
     return rendered_configs
 
 
+def batch_render_config_files_by_config_templates(
+    render_params_list: List[Dict[str, Any]], source: typing.Optional[str] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    批量渲染配置模板，各主机间一致的上下文变量及配置内容仅渲染一次
+    :param render_params_list: 渲染参数列表，参数含义同 render_config_files_by_config_templates
+    [
+        {
+            "config_templates": [PluginConfigTemplate],
+            "process_status_info": {"group_id": "xxx"},
+            "context": {...},
+            "package_obj": Packages,
+        }
+    ]
+    :param source: 调用来源
+    :return: 与 render_params_list 一一对应的渲染结果
+    """
+    variant_keys: typing.Set[str] = batch_render_contexts(
+        [render_params["context"] for render_params in render_params_list]
+    )
+    content_cache: Dict[str, str] = {}
+    return [
+        render_config_files_by_config_templates(
+            render_params["config_templates"],
+            render_params["process_status_info"],
+            render_params["context"],
+            package_obj=render_params["package_obj"],
+            source=source,
+            is_context_rendered=True,
+            variant_keys=variant_keys,
+            content_cache=content_cache,
+        )
+        for render_params in render_params_list
+    ]
+
+
 def get_subscription_task_instance_status(instance_record, pipeline_parser, need_detail=False, need_log=False):
     """
     :param need_log:
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+import logging
+import typing
+
+from django.conf import settings
+
+from apps.backend.utils.redis import REDIS_INST
+from apps.prometheus import metrics
+from apps.utils.basic import chunk_lists
+
+logger = logging.getLogger("app")
+
+# 业务模块拓扑缓存
+# - 以 Hash 结构按业务存储「模块 -> 拓扑路径」索引，多进程共享
+# - 业务拓扑版本号递增即视为失效，旧版本的索引不再被读取，由过期时间回收
+# - 读取方在从 CMDB 拉取拓扑前先取版本号，写入时使用该版本号，避免拉取期间拓扑变更导致旧数据覆盖新版本
+
+TOPO_VERSION_KEY_TPL = f"{settings.APP_CODE}:backend:subscription:topo_cache:version:str:" + "{bk_biz_id}"
+MODULE_TO_TOPO_KEY_TPL = (
+    f"{settings.APP_CODE}:backend:subscription:topo_cache:module_to_topo:hash:" + "{bk_biz_id}:{version}"
+)
+
+
+def build_module_to_topo_dict(bk_biz_id: int, topo_tree: typing.List[typing.Dict], internal_module: typing.Dict):
+    """
+    根据业务拓扑树及空闲机池构造模块拓扑映射
+    :param bk_biz_id: 业务ID
+    :param topo_tree: search_biz_inst_topo 返回的业务拓扑树
+    :param internal_module: get_biz_internal_module 返回的空闲机池
+    :return: {
+        "module|1": ["biz|2", "set|3", "module|1"]
+    }
+    """
+    node_relations = {}
+
+    for _internal_module in internal_module.get("module") or []:
+        module_node_id = "module|{}".format(_internal_module["bk_module_id"])
+        node_relations[module_node_id] = [f"biz|{bk_biz_id}", f"set|{internal_module['bk_set_id']}", module_node_id]
+
+    queue = list(topo_tree)
+    while queue:
+        topo_node = queue.pop()
+        topo_node_id = f"{topo_node['bk_obj_id']}|{topo_node['bk_inst_id']}"
+
+        if topo_node_id not in node_relations:
+            node_relations[topo_node_id] = [topo_node_id]
+
+        queue.extend(topo_node["child"])
+        for child in topo_node["child"]:
+            child_node_id = f"{child['bk_obj_id']}|{child['bk_inst_id']}"
+            node_relations[child_node_id] = node_relations[topo_node_id] + [child_node_id]
+
+    return {
+        topo_node_id: node_relations[topo_node_id]
+        for topo_node_id in node_relations
+        if topo_node_id.startswith("module")
+    }
+
+
+def get_version(bk_biz_id: int) -> int:
+    version: typing.Optional[typing.Union[str, bytes]] = REDIS_INST.get(
+        TOPO_VERSION_KEY_TPL.format(bk_biz_id=bk_biz_id)
+    )
+    return int(version or 0)
+
+
+def get_module_to_topo_dict(bk_biz_id: int, version: int) -> typing.Optional[typing.Dict[str, typing.List[str]]]:
+    """
+    读取指定版本的模块拓扑映射
+    :param bk_biz_id: 业务ID
+    :param version: 拓扑版本号
+    :return: 未缓存时返回 None
+    """
+    module_to_topo_str_map: typing.Dict[bytes, bytes] = REDIS_INST.hgetall(
+        MODULE_TO_TOPO_KEY_TPL.format(bk_biz_id=bk_biz_id, version=version)
+    )
+    if not module_to_topo_str_map:
+        metrics.app_task_topo_cache_requests_total.labels(result="miss").inc()
+        return None
+
+    metrics.app_task_topo_cache_requests_total.labels(result="hit").inc()
+    return {
+        (module_node_id.decode() if isinstance(module_node_id, bytes) else module_node_id): json.loads(topo)
+        for module_node_id, topo in module_to_topo_str_map.items()
+    }
+
+
+def save_module_to_topo_dict(bk_biz_id: int, version: int, module_to_topo: typing.Dict[str, typing.List[str]]):
+    """
+    写入指定版本的模块拓扑映射
+    :param bk_biz_id: 业务ID
+    :param version: 拉取拓扑前读取的版本号
+    :param module_to_topo: 模块拓扑映射
+    """
+    if not module_to_topo:
+        return
+
+    module_to_topo_key: str = MODULE_TO_TOPO_KEY_TPL.format(bk_biz_id=bk_biz_id, version=version)
+    pipeline = REDIS_INST.pipeline()
+    pipeline.delete(module_to_topo_key)
+    for items_chunk in chunk_lists(list(module_to_topo.items()), settings.BKAPP_CMDB_TOPO_CACHE_BATCH_SIZE):
+        pipeline.hset(
+            module_to_topo_key, mapping={module_node_id: json.dumps(topo) for module_node_id, topo in items_chunk}
+        )
+    pipeline.expire(module_to_topo_key, settings.BKAPP_CMDB_TOPO_CACHE_TTL)
+    pipeline.execute()
+
+    logger.info(
+        "[topo_cache] save module_to_topo: bk_biz_id -> %s, version -> %s, module_num -> %s",
+        bk_biz_id,
+        version,
+        len(module_to_topo),
+    )
+
+
+def invalidate(bk_biz_id: int, reason: str):
+    """
+    递增业务拓扑版本号，使已缓存的模块拓扑映射失效
+    :param bk_biz_id: 业务ID
+    :param reason: 失效原因
+    """
+    version: int = REDIS_INST.incr(TOPO_VERSION_KEY_TPL.format(bk_biz_id=bk_biz_id))
+    metrics.app_task_topo_cache_invalidations_total.labels(reason=reason).inc()
+    logger.info("[topo_cache] invalidate: bk_biz_id -> %s, version -> %s, reason -> %s", bk_biz_id, version, reason)
+
+
+def invalidate_if_modules_missing(bk_biz_id: int, bk_module_ids: typing.Iterable[int], reason: str) -> bool:
+    """
+    模块不在缓存的拓扑中时，说明业务拓扑已变更，使缓存失效
+    :param bk_biz_id: 业务ID
+    :param bk_module_ids: 模块ID列表
+    :param reason: 失效原因
+    :return: 是否已失效
+    """
+    bk_module_ids: typing.List[int] = list(set(bk_module_ids))
+    if not bk_module_ids:
+        return False
+
+    module_to_topo_key: str = MODULE_TO_TOPO_KEY_TPL.format(bk_biz_id=bk_biz_id, version=get_version(bk_biz_id))
+    pipeline = REDIS_INST.pipeline()
+    pipeline.exists(module_to_topo_key)
+    for bk_module_id in bk_module_ids:
+        pipeline.hexists(module_to_topo_key, f"module|{bk_module_id}")
+    is_cached, *is_module_exists_list = pipeline.execute()
+
+    # 未缓存无需失效，下次读取时从 CMDB 拉取
+    if not is_cached or all(is_module_exists_list):
+        return False
+
+    invalidate(bk_biz_id, reason=reason)
+    return True
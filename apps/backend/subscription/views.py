@@ -397,7 +397,12 @@ class SubscriptionViewSet(APIViewSet):
             task_id_list.append(task_id)
 
         return Response(
-            SubscriptionHandler(params["subscription_id"]).task_result_detail(params["instance_id"], task_id_list)
+            SubscriptionHandler(params["subscription_id"]).task_result_detail(
+                params["instance_id"],
+                task_id_list,
+                log_offsets=params.get("log_offsets"),
+                log_tail=params.get("log_tail"),
+            )
         )
 
     @swagger_auto_schema(operation_summary="采集任务执行详细结果", tags=SUBSCRIPTION_VIEW_TAGS)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import threading
+import time
+import typing
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.adapters.api.gse.cache import AgentStateCache
+
+
+@override_settings(
+    CACHES={"redis": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    BKAPP_GSE_AGENT_STATE_CACHE_TTL=10,
+)
+class AgentStateCacheTestCase(SimpleTestCase):
+    VERSION = "V2"
+
+    def setUp(self):
+        self.agent_state_cache = AgentStateCache()
+        self.fetched_agent_ids: typing.List[str] = []
+        self.fetch_started = threading.Event()
+        self.fetch_released = threading.Event()
+        self.fetch_released.set()
+
+    def fetch(self, host_info_list):
+        self.fetched_agent_ids.extend(host_info["bk_agent_id"] for host_info in host_info_list)
+        self.fetch_started.set()
+        self.fetch_released.wait(5)
+        return {host_info["bk_agent_id"]: {"version": "2.0.0", "bk_agent_alive": 1} for host_info in host_info_list}
+
+    def list_agent_state(self, agent_ids, use_cache=True):
+        return self.agent_state_cache.list_agent_state(
+            version=self.VERSION,
+            agent_id__host_info_map={agent_id: {"bk_agent_id": agent_id} for agent_id in agent_ids},
+            fetch_func=self.fetch,
+            use_cache=use_cache,
+        )
+
+    def test_cache_hit(self):
+        self.list_agent_state(["a", "b"])
+        result = self.list_agent_state(["a", "b", "c"])
+        self.assertEqual(set(result.keys()), {"a", "b", "c"})
+        # 已缓存的 Agent 不再查询
+        self.assertEqual(self.fetched_agent_ids, ["a", "b", "c"])
+
+    def test_fresh_read(self):
+        self.list_agent_state(["a"])
+        self.list_agent_state(["a"], use_cache=False)
+        self.assertEqual(self.fetched_agent_ids, ["a", "a"])
+
+    def test_coalesce_inflight_request(self):
+        self.fetch_released.clear()
+        results: typing.Dict[str, typing.Dict] = {}
+        owner = threading.Thread(target=lambda: results.update(owner=self.list_agent_state(["a", "b"])))
+        owner.start()
+        self.fetch_started.wait(5)
+
+        # 查询中的 Agent 等待先发起请求的调用方返回，不再重复查询
+        waiter = threading.Thread(target=lambda: results.update(waiter=self.list_agent_state(["b"])))
+        waiter.start()
+        time.sleep(0.2)
+        self.fetch_released.set()
+        owner.join(5)
+        waiter.join(5)
+
+        self.assertEqual(self.fetched_agent_ids, ["a", "b"])
+        self.assertEqual(results["waiter"], {"b": {"version": "2.0.0", "bk_agent_alive": 1}})
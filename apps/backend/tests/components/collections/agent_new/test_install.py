@@ -38,6 +38,7 @@ from apps.exceptions import ApiResultError
 from apps.mock_data import api_mkd, common_unit
 from apps.mock_data import utils as mock_data_utils
 from apps.node_man import constants, models
+from apps.utils.unittest.testcase import CustomBaseTestCase
 from env.constants import GseVersion
 from pipeline.component_framework.test import (
     ComponentTestCase,
@@ -1350,3 +1351,28 @@ class OpenJumpPolicyUsingChannelNotInDirect(InstallWindowsPagentTestCase):
 
         # windows batch方案(保持原有三步)
         self.assertEqual(len(batch_solutions.steps), 3)
+
+
+class BulkDrainReportDataTestCase(CustomBaseTestCase):
+    def test_bulk_drain_report_data(self):
+        sub_inst_ids = [1, 2, 3]
+        for sub_inst_id in sub_inst_ids[:2]:
+            name = REDIS_INSTALL_CALLBACK_KEY_TPL.format(sub_inst_id=sub_inst_id)
+            REDIS_INST.delete(name)
+            REDIS_INST.lpush(
+                name, *[json.dumps({"step": f"step_{idx}", "sub_inst_id": sub_inst_id}) for idx in range(3)]
+            )
+
+        sub_inst_id__report_data_map = install.InstallService().bulk_drain_report_data(sub_inst_ids)
+        for sub_inst_id in sub_inst_ids[:2]:
+            # 按上报顺序返回
+            self.assertEqual(
+                [data["step"] for data in sub_inst_id__report_data_map[sub_inst_id]], ["step_0", "step_1", "step_2"]
+            )
+            self.assertEqual(REDIS_INST.llen(REDIS_INSTALL_CALLBACK_KEY_TPL.format(sub_inst_id=sub_inst_id)), 0)
+        self.assertEqual(sub_inst_id__report_data_map[3], [])
+
+    def test_parse_report_data(self):
+        raw_report_data = [json.dumps({"step": "a"}).encode(), b"{invalid", json.dumps({"step": "b"}).encode()]
+        self.assertEqual(install.InstallService.parse_report_data(raw_report_data), [{"step": "a"}, {"step": "b"}])
+        self.assertEqual(install.InstallService.parse_report_data(raw_report_data[::2]), [{"step": "a"}, {"step": "b"}])
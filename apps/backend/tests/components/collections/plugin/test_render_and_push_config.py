@@ -10,16 +10,22 @@ specific language governing permissions and limitations under the License.
 """
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-from apps.backend.components.collections.plugin import RenderAndPushConfigComponent
+from apps.backend.components.collections.plugin import (
+    RenderAndPushConfigComponent,
+    RenderAndPushConfigService,
+)
 from apps.backend.tests.components.collections.plugin import utils
+from apps.node_man import constants, models
+from apps.utils import concurrent
 from pipeline.component_framework.test import (
     ComponentTestCase,
     ComponentTestMixin,
     ExecuteAssertion,
     ScheduleAssertion,
 )
+from pipeline.core.data.base import DataObject
 
 
 class RenderAndPushConfigTest(TestCase, ComponentTestMixin):
@@ -79,3 +85,71 @@ class RenderAndPushConfigTest(TestCase, ComponentTestMixin):
                 execute_call_assertion=None,
             )
         ]
+
+
+@override_settings(BKAPP_RENDER_CONFIG_CHUNK_SIZE=1)
+class RenderConfigsTest(TestCase):
+    PROCESS_STATUS_NUM = 3
+
+    def setUp(self):
+        self.ids = utils.PluginTestObjFactory.init_db()
+        models.PluginConfigTemplate.objects.create(
+            id=utils.PKG_ID,
+            plugin_name=utils.PKG_PROJECT_NAME,
+            plugin_version="*",
+            name="basereport.conf",
+            version="1",
+            is_main=True,
+            format="yaml",
+            file_path="etc",
+            content="bk_host_id: {{ nodeman.host.bk_host_id }}",
+            is_release_version=True,
+            creator="admin",
+            source_app_code="bk_nodeman",
+            os=constants.OsType.LINUX.lower(),
+            cpu_arch=constants.CpuType.x86_64,
+        )
+        # 同一主机下的多个进程，按批次大小拆分为多个批次渲染
+        process_status = models.ProcessStatus.objects.get(name=utils.PKG_PROJECT_NAME)
+        for index in range(1, self.PROCESS_STATUS_NUM):
+            process_status.pk = None
+            process_status.listen_port = 10000 + index
+            process_status.save()
+
+        self.data = DataObject(
+            inputs=utils.PluginTestObjFactory.inputs(
+                attr_values={
+                    "description": "description",
+                    "bk_host_id": utils.BK_HOST_ID,
+                    "subscription_instance_ids": [self.ids["subscription_instance_record_id"]],
+                    "subscription_step_id": self.ids["subscription_step_id"],
+                },
+                instance_info_attr_values={},
+            )
+        )
+        # 测试数据位于测试事务中，其他线程不可见，批次改为串行执行
+        patch("apps.backend.components.collections.plugin.concurrent.batch_call", concurrent.batch_call_serial).start()
+        self.addCleanup(patch.stopall)
+
+    def test_render_and_save_configs(self):
+        service = RenderAndPushConfigService()
+        common_data = service.get_common_data(self.data)
+        process_statuses = list(common_data.process_statuses)
+        self.assertEqual(len(process_statuses), self.PROCESS_STATUS_NUM)
+
+        with patch.object(service, "render_chunk_configs", wraps=service.render_chunk_configs) as render_chunk_configs:
+            rendered_configs_list = service.render_configs(common_data.subscription_step, process_statuses, common_data)
+        self.assertEqual(render_chunk_configs.call_count, self.PROCESS_STATUS_NUM)
+
+        # 渲染结果按批次序号还原，与进程一一对应
+        self.assertEqual(len(rendered_configs_list), self.PROCESS_STATUS_NUM)
+        for process_status, rendered_configs in zip(process_statuses, rendered_configs_list):
+            self.assertEqual(rendered_configs[0]["content"], f"bk_host_id: {process_status.bk_host_id}")
+            self.assertTrue(process_status.configs_fingerprint)
+            process_status.configs = rendered_configs
+
+        service.save_configs(process_statuses)
+        for process_status in process_statuses:
+            saved_process_status = models.ProcessStatus.objects.get(id=process_status.id)
+            self.assertEqual(saved_process_status.configs, process_status.configs)
+            self.assertEqual(saved_process_status.configs_fingerprint, process_status.configs_fingerprint)
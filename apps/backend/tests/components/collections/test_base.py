@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import mock
+from django.db import IntegrityError
+from django.test import SimpleTestCase, override_settings
+
+from apps.backend.components.collections.base import (
+    BaseService,
+    CommonData,
+    CommonDataCache,
+    LogBuffer,
+    LogMixin,
+)
+from apps.node_man import models
+from apps.utils.unittest.testcase import CustomBaseTestCase
+from pipeline.core.data.base import DataObject
+
+
+class LogService(LogMixin):
+    def __init__(self, node_id: str):
+        self.id = node_id
+        self.log_maker = self.get_log_maker()
+
+
+@override_settings(BKAPP_SUB_INST_LOG_CHUNK_ENABLED=True)
+class LogBufferTestCase(CustomBaseTestCase):
+    NODE_ID = "node_id"
+    SUB_INST_IDS = [1, 2, 3]
+
+    def setUp(self) -> None:
+        super().setUp()
+        models.SubscriptionInstanceStatusDetail.objects.bulk_create(
+            [
+                models.SubscriptionInstanceStatusDetail(
+                    subscription_instance_record_id=sub_inst_id, node_id=self.NODE_ID, log=""
+                )
+                for sub_inst_id in self.SUB_INST_IDS
+            ]
+        )
+
+    def get_sub_inst_id__log_map(self):
+        key__log_info_map = models.SubscriptionInstanceLogChunk.fetch_logs(
+            sub_inst_ids=self.SUB_INST_IDS,
+            legacy_logs={
+                f"{self.NODE_ID}-{sub_inst_id}": log
+                for sub_inst_id, log in models.SubscriptionInstanceStatusDetail.objects.filter(
+                    node_id=self.NODE_ID
+                ).values_list("subscription_instance_record_id", "log")
+            },
+        )
+        return {
+            sub_inst_id: key__log_info_map[f"{self.NODE_ID}-{sub_inst_id}"]["log"] for sub_inst_id in self.SUB_INST_IDS
+        }
+
+    def test_buffering(self):
+        service = LogService(self.NODE_ID)
+        with service.log_buffering():
+            service.log_info(sub_inst_ids=self.SUB_INST_IDS, log_content="common")
+            service.log_error(sub_inst_ids=1, log_content="error")
+            service.log_info(sub_inst_ids=[2, 3], log_content="done")
+            # 缓冲期间不落库
+            self.assertEqual(set(self.get_sub_inst_id__log_map().values()), {""})
+
+        self.assertIsNone(service.log_buffer)
+        sub_inst_id__log_map = self.get_sub_inst_id__log_map()
+        self.assertEqual(
+            [line.split("] ", 1)[-1] for line in sub_inst_id__log_map[1].splitlines() if line], ["common", "error"]
+        )
+        self.assertEqual(sub_inst_id__log_map[2], sub_inst_id__log_map[3])
+        self.assertEqual(
+            [line.split("] ", 1)[-1] for line in sub_inst_id__log_map[2].splitlines() if line], ["common", "done"]
+        )
+
+    def test_flush_before_direct_write(self):
+        service = LogService(self.NODE_ID)
+        with service.log_buffering():
+            service.log_info(sub_inst_ids=1, log_content="buffered")
+            service.log_info(log_content="direct")
+            self.assertEqual(
+                [line.split("] ", 1)[-1] for line in self.get_sub_inst_id__log_map()[1].splitlines() if line],
+                ["buffered", "direct"],
+            )
+
+    def test_flush_threshold(self):
+        log_buffer = LogBuffer(node_id=self.NODE_ID)
+        log_buffer.FLUSH_THRESHOLD = 10
+        log_buffer.append([1], "a" * 5)
+        self.assertEqual(self.get_sub_inst_id__log_map()[1], "")
+        log_buffer.append([1], "b" * 5)
+        self.assertEqual(self.get_sub_inst_id__log_map()[1], "\naaaaa\nbbbbb")
+        self.assertEqual(log_buffer.buffered_size, 0)
+
+
+class SubscriptionInstanceLogChunkTestCase(CustomBaseTestCase):
+    NODE_ID = "node_id"
+    SUB_INST_ID = 1
+
+    def setUp(self) -> None:
+        super().setUp()
+        for idx in range(3):
+            models.SubscriptionInstanceLogChunk.bulk_append(self.NODE_ID, {self.SUB_INST_ID: f"\nline_{idx}"})
+
+    def fetch_log_info(self, **kwargs):
+        return models.SubscriptionInstanceLogChunk.fetch_logs(
+            sub_inst_ids=[self.SUB_INST_ID], legacy_logs={f"{self.NODE_ID}-{self.SUB_INST_ID}": "start"}, **kwargs
+        )[f"{self.NODE_ID}-{self.SUB_INST_ID}"]
+
+    def test_fetch_logs(self):
+        self.assertEqual(self.fetch_log_info(), {"log": "start\nline_0\nline_1\nline_2", "log_seq": 3})
+
+    def test_fetch_logs_with_offset(self):
+        self.assertEqual(self.fetch_log_info(log_offsets={self.NODE_ID: 1}), {"log": "\nline_1\nline_2", "log_seq": 3})
+        # 没有新日志时保持原序号
+        self.assertEqual(self.fetch_log_info(log_offsets={self.NODE_ID: 3}), {"log": "", "log_seq": 3})
+
+    def test_fetch_logs_with_tail(self):
+        self.assertEqual(self.fetch_log_info(log_tail=2), {"log": "\nline_1\nline_2", "log_seq": 3})
+
+    @override_settings(BKAPP_SUB_INST_LOG_CHUNK_COMPRESS_THRESHOLD=16)
+    def test_compress(self):
+        log: str = "\n" + "x" * 1024
+        models.SubscriptionInstanceLogChunk.bulk_append(self.NODE_ID, {self.SUB_INST_ID: log})
+        log_chunk = models.SubscriptionInstanceLogChunk.objects.get(
+            subscription_instance_record_id=self.SUB_INST_ID, seq=4
+        )
+        self.assertTrue(log_chunk.is_compressed)
+        self.assertEqual(log_chunk.log, log)
+
+    def test_archive_on_retry(self):
+        models.SubscriptionInstanceStatusDetail.objects.create(
+            subscription_instance_record_id=self.SUB_INST_ID, node_id=self.NODE_ID, log="start"
+        )
+        # 原子重试：归档上一次执行的日志后新建状态详情
+        models.SubscriptionInstanceLogChunk.archive(self.NODE_ID, [self.SUB_INST_ID])
+        models.SubscriptionInstanceStatusDetail.objects.create(
+            subscription_instance_record_id=self.SUB_INST_ID, node_id=self.NODE_ID, log="restart"
+        )
+        models.SubscriptionInstanceLogChunk.bulk_append(self.NODE_ID, {self.SUB_INST_ID: "\nretry_line"})
+
+        status_details = models.SubscriptionInstanceStatusDetail.objects.filter(
+            subscription_instance_record_id=self.SUB_INST_ID, node_id=self.NODE_ID
+        ).order_by("id")
+        self.assertEqual(status_details[0].log, "start\nline_0\nline_1\nline_2")
+        key__log_info_map = models.SubscriptionInstanceLogChunk.fetch_logs(
+            sub_inst_ids=[self.SUB_INST_ID], legacy_logs={f"{self.NODE_ID}-{self.SUB_INST_ID}": status_details[1].log}
+        )
+        # 仅展示本次执行的日志，序号保持递增
+        self.assertEqual(
+            key__log_info_map[f"{self.NODE_ID}-{self.SUB_INST_ID}"], {"log": "restart\nretry_line", "log_seq": 4}
+        )
+        self.assertEqual(self.fetch_log_info(log_offsets={self.NODE_ID: 3}), {"log": "\nretry_line", "log_seq": 4})
+
+    def test_retry_on_seq_conflict(self):
+        bulk_create = models.SubscriptionInstanceLogChunk.objects.bulk_create
+        call_records = []
+
+        def conflicted_bulk_create(log_chunks, *args, **kwargs):
+            call_records.append([log_chunk.seq for log_chunk in log_chunks])
+            # 模拟并发写入时首次写入序号冲突
+            if len(call_records) == 1:
+                raise IntegrityError("Duplicate entry")
+            return bulk_create(log_chunks, *args, **kwargs)
+
+        with mock.patch.object(
+            models.SubscriptionInstanceLogChunk.objects, "bulk_create", side_effect=conflicted_bulk_create
+        ):
+            models.SubscriptionInstanceLogChunk.bulk_append(self.NODE_ID, {self.SUB_INST_ID: "\nline_3"})
+
+        self.assertEqual(call_records, [[4], [4]])
+        self.assertEqual(self.fetch_log_info(), {"log": "start\nline_0\nline_1\nline_2\nline_3", "log_seq": 4})
+
+    def test_raise_after_max_retry_times(self):
+        with mock.patch.object(
+            models.SubscriptionInstanceLogChunk.objects, "bulk_create", side_effect=IntegrityError("Duplicate entry")
+        ) as bulk_create:
+            with self.assertRaises(IntegrityError):
+                models.SubscriptionInstanceLogChunk.bulk_append(self.NODE_ID, {self.SUB_INST_ID: "\nline_3"})
+        self.assertEqual(bulk_create.call_count, models.SubscriptionInstanceLogChunk.APPEND_MAX_RETRY_TIMES + 1)
+
+
+@override_settings(BKAPP_SUB_INST_LOG_CHUNK_ENABLED=False)
+class LegacyLogBufferTestCase(LogBufferTestCase):
+    def test_log_chunks_not_created(self):
+        LogBuffer(node_id=self.NODE_ID).append(self.SUB_INST_IDS, "log")
+        self.assertFalse(models.SubscriptionInstanceLogChunk.objects.exists())
+
+
+class CommonDataCacheTestCase(SimpleTestCase):
+    NODE_ID = "node_id"
+
+    @staticmethod
+    def make_common_data() -> CommonData:
+        return CommonData(
+            bk_host_ids={1, 2},
+            host_id_obj_map={},
+            sub_inst_id__host_id_map={1: 1, 2: 2},
+            host_id__sub_inst_id_map={1: 1, 2: 2},
+            ap_id_obj_map={},
+            sub_inst_id__sub_inst_obj_map={},
+            gse_api_helper=None,
+            subscription=None,
+            subscription_step=None,
+            subscription_instances=[],
+            subscription_instance_ids={1, 2},
+        )
+
+    def test_get_or_create(self):
+        cache = CommonDataCache(maxsize=1, ttl=60)
+        key = (self.NODE_ID, frozenset([1, 2]))
+        factory = mock.MagicMock(side_effect=self.make_common_data)
+
+        common_data = cache.get_or_create(key, factory)
+        # 调用方修改容器不影响缓存
+        common_data.subscription_instance_ids.remove(1)
+        self.assertEqual(cache.get_or_create(key, factory).subscription_instance_ids, {1, 2})
+        factory.assert_called_once()
+
+        # 超出容量时淘汰最久未使用的缓存
+        cache.get_or_create(("other_node_id", frozenset([3])), factory)
+        cache.get_or_create(key, factory)
+        self.assertEqual(factory.call_count, 3)
+
+        cache.invalidate(self.NODE_ID)
+        cache.get_or_create(key, factory)
+        self.assertEqual(factory.call_count, 4)
+
+    def test_expired(self):
+        cache = CommonDataCache(maxsize=8, ttl=0)
+        factory = mock.MagicMock(side_effect=self.make_common_data)
+        for __ in range(2):
+            cache.get_or_create((self.NODE_ID, frozenset([1, 2])), factory)
+        self.assertEqual(factory.call_count, 2)
+
+    def test_execution_token(self):
+        service = mock.MagicMock(
+            id=self.NODE_ID,
+            COMMON_DATA_CACHE_TOKEN_KEY=BaseService.COMMON_DATA_CACHE_TOKEN_KEY,
+            get_subscription_instance_ids=mock.MagicMock(return_value=[1, 2]),
+            get_common_data=mock.MagicMock(side_effect=lambda data: self.make_common_data()),
+        )
+        data = DataObject(inputs={"subscription_step_id": 1})
+        with mock.patch(
+            "apps.backend.components.collections.base.COMMON_DATA_CACHE", CommonDataCache(maxsize=8, ttl=60)
+        ):
+            for token in ["first", "first", "second"]:
+                data.set_outputs(BaseService.COMMON_DATA_CACHE_TOKEN_KEY, token)
+                BaseService.get_cached_common_data(service, data)
+        # 执行标识变化（节点在其他进程中重新执行）后不再命中旧缓存，无需依赖进程内失效
+        self.assertEqual(service.get_common_data.call_count, 2)
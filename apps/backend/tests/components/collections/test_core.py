@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from django.test import override_settings
+
+from apps.backend.components.collections import core
+from apps.node_man import models
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+@override_settings(BKAPP_WMIEXE_CONCURRENT_LIMIT=4)
+class GetConfigDictTestCase(CustomBaseTestCase):
+    def test_wmiexe_default(self):
+        config_dict = core.get_config_dict(core.ServiceCCConfigName.WMIEXE.value)
+        self.assertEqual(config_dict["limit"], 4)
+        self.assertFalse(config_dict["is_concurrent_between_batches"])
+
+    def test_wmiexe_legacy_override(self):
+        # 旧版本全局配置中 WMIEXE 批次间并发，升级后仍需强制批次间串行以限制同时执行的主机数量
+        models.GlobalSettings.set_config(
+            key=models.GlobalSettings.KeyEnum.CONCURRENT_CONTROLLER_SETTINGS.value,
+            value={
+                core.ServiceCCConfigName.WMIEXE.value: {
+                    "limit": 2,
+                    "interval": 0,
+                    "execute_all": False,
+                    "is_concurrent_between_batches": True,
+                }
+            },
+        )
+        config_dict = core.get_config_dict(core.ServiceCCConfigName.WMIEXE.value)
+        self.assertEqual(config_dict["limit"], 2)
+        self.assertFalse(config_dict["is_concurrent_between_batches"])
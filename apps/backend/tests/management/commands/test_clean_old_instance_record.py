@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from apps.backend.management.commands.clean_old_instance_record import (
+    clean_pipeline_data,
+    list_tree_node_ids,
+)
+from apps.backend.tests.utils.test_pipeline_tree import TestPipelineTree
+from apps.backend.utils import pipeline_tree
+from apps.node_man import models
+from apps.utils.unittest.testcase import CustomBaseTestCase
+from pipeline.engine import models as engine_models
+
+
+class CleanOldInstanceRecordTestCase(CustomBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.compact_tree = pipeline_tree.compress(TestPipelineTree().build_tree())
+
+    def test_list_compact_tree_node_ids(self):
+        compact_node_ids = []
+        list_tree_node_ids(self.compact_tree, compact_node_ids)
+        full_node_ids = []
+        list_tree_node_ids(pipeline_tree.expand(self.compact_tree), full_node_ids)
+        self.assertEqual(set(compact_node_ids), set(full_node_ids))
+
+    def test_clean_compact_pipeline_data(self):
+        pipeline_obj = models.PipelineTree.objects.create(id=self.compact_tree["id"], tree=self.compact_tree)
+        node_ids = [node_id for chunk in self.compact_tree["chunks"] for node_id in chunk["node_ids"]]
+        engine_models.Status.objects.bulk_create(
+            [engine_models.Status(id=node_id, state="FINISHED", version="v") for node_id in node_ids]
+        )
+
+        clean_pipeline_data(execute_id=0, pipeline_objs=[pipeline_obj])
+
+        self.assertFalse(engine_models.Status.objects.filter(id__in=node_ids).exists())
+        self.assertFalse(models.PipelineTree.objects.filter(id=self.compact_tree["id"]).exists())
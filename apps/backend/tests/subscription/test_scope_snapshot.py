@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import mock
+from django.test import override_settings
+
+from apps.backend.subscription import scope_snapshot
+from apps.backend.utils.redis import REDIS_INST
+from apps.node_man import constants, models
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+def make_host_instances(bk_host_ids):
+    return {f"host|instance|host|{bk_host_id}": {"host": {"bk_host_id": bk_host_id}} for bk_host_id in bk_host_ids}
+
+
+@override_settings(BKAPP_SUBSCRIPTION_INCREMENTAL_SCOPE_ENABLED=True)
+class ScopeSnapshotTestCase(CustomBaseTestCase):
+    BK_BIZ_ID = 2
+
+    def setUp(self):
+        super().setUp()
+        self.subscription = models.Subscription.objects.create(
+            bk_biz_id=self.BK_BIZ_ID,
+            object_type=models.Subscription.ObjectType.HOST,
+            node_type=models.Subscription.NodeType.TOPO,
+            nodes=[{"bk_obj_id": "module", "bk_inst_id": 1, "bk_biz_id": self.BK_BIZ_ID}],
+            enable=True,
+        )
+        models.SubscriptionStep.objects.create(
+            subscription_id=self.subscription.id,
+            index=0,
+            step_id="test_plugin",
+            type="PLUGIN",
+            config={"plugin_name": "test_plugin", "plugin_version": "latest"},
+            params={},
+        )
+
+    def tearDown(self):
+        for key_tpl in [
+            scope_snapshot.SNAPSHOT_META_KEY_TPL,
+            scope_snapshot.SNAPSHOT_HOSTS_KEY_TPL,
+            scope_snapshot.DIRTY_HOSTS_KEY_TPL,
+        ]:
+            REDIS_INST.delete(key_tpl.format(subscription_id=self.subscription.id))
+        super().tearDown()
+
+    def test_resolve_without_snapshot(self):
+        self.assertIsNone(scope_snapshot.resolve_scope_delta(self.subscription))
+
+    def test_resolve_after_scope_changed(self):
+        scope_snapshot.save_snapshot(self.subscription, make_host_instances([1, 2]))
+        self.subscription.nodes = [{"bk_obj_id": "module", "bk_inst_id": 2, "bk_biz_id": self.BK_BIZ_ID}]
+        self.assertIsNone(scope_snapshot.resolve_scope_delta(self.subscription))
+
+    def test_resolve_scope_delta(self):
+        scope_snapshot.save_snapshot(self.subscription, make_host_instances([1, 2]))
+        scope_snapshot.record_dirty_hosts(self.BK_BIZ_ID, [2, 3])
+
+        with mock.patch(
+            "apps.backend.subscription.tools.get_topo_host_instances_by_host_ids",
+            return_value=make_host_instances([3]),
+        ):
+            scope_delta = scope_snapshot.resolve_scope_delta(self.subscription)
+
+        self.assertEqual(scope_delta.added_host_ids, {3})
+        self.assertEqual(scope_delta.removed_host_ids, {2})
+        self.assertEqual(scope_delta.changed_host_ids, set())
+        self.assertEqual(scope_delta.bk_host_ids, {2, 3})
+        # 脏主机已被消费
+        self.assertEqual(scope_snapshot.pop_dirty_hosts(self.subscription.id), set())
+
+    def test_record_dirty_hosts_need_full(self):
+        scope_snapshot.save_snapshot(self.subscription, make_host_instances([1]))
+        scope_snapshot.record_dirty_hosts(self.BK_BIZ_ID, [], need_full=True)
+        self.assertIsNone(scope_snapshot.resolve_scope_delta(self.subscription))
+
+    def test_resolve_after_plugin_resources_changed(self):
+        scope_snapshot.save_snapshot(self.subscription, make_host_instances([1, 2]))
+        # 插件上传新包后，latest 指向的版本可能变更，需全量计算
+        with mock.patch(
+            "apps.backend.subscription.scope_snapshot.get_plugin_resources", return_value={"max_package_id": 1}
+        ):
+            self.assertIsNone(scope_snapshot.resolve_scope_delta(self.subscription))
+
+    def test_resolve_with_reconcile_hosts(self):
+        scope_snapshot.save_snapshot(self.subscription, make_host_instances([1, 2, 3]))
+        models.ProcessStatus.objects.create(
+            bk_host_id=1, name="test_plugin", source_id=self.subscription.id, status=constants.ProcStateType.UNKNOWN
+        )
+        models.ProcessStatus.objects.create(
+            bk_host_id=2, name="test_plugin", source_id=self.subscription.id, status=constants.ProcStateType.RUNNING
+        )
+        models.SubscriptionInstanceRecord.objects.create(
+            task_id=1,
+            subscription_id=self.subscription.id,
+            instance_id="host|instance|host|3",
+            instance_info={},
+            steps=[],
+            status=constants.JobStatusType.FAILED,
+            is_latest=True,
+        )
+
+        with mock.patch(
+            "apps.backend.subscription.tools.get_topo_host_instances_by_host_ids",
+            return_value=make_host_instances([1, 3]),
+        ) as get_topo_host_instances_by_host_ids:
+            scope_delta = scope_snapshot.resolve_scope_delta(self.subscription)
+
+        # 无资源变更时，进程异常及执行失败的主机仍需重新计算变更动作
+        self.assertEqual(set(get_topo_host_instances_by_host_ids.call_args[0][2]), {1, 3})
+        self.assertEqual(scope_delta.changed_host_ids, {1, 3})
+        self.assertEqual(scope_delta.bk_host_ids, {1, 3})
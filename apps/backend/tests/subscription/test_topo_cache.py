@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from apps.backend.subscription import topo_cache
+from apps.backend.utils.redis import REDIS_INST
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+TOPO_TREE = [
+    {
+        "bk_obj_id": "biz",
+        "bk_inst_id": 2,
+        "child": [
+            {
+                "bk_obj_id": "set",
+                "bk_inst_id": 3,
+                "child": [{"bk_obj_id": "module", "bk_inst_id": 4, "child": []}],
+            }
+        ],
+    }
+]
+
+INTERNAL_MODULE = {"bk_set_id": 5, "module": [{"bk_module_id": 6}, {"bk_module_id": 7}]}
+
+
+class TopoCacheTestCase(CustomBaseTestCase):
+    BK_BIZ_ID = 2
+
+    def tearDown(self):
+        version: int = topo_cache.get_version(self.BK_BIZ_ID)
+        REDIS_INST.delete(topo_cache.TOPO_VERSION_KEY_TPL.format(bk_biz_id=self.BK_BIZ_ID))
+        for __version in range(version + 1):
+            REDIS_INST.delete(topo_cache.MODULE_TO_TOPO_KEY_TPL.format(bk_biz_id=self.BK_BIZ_ID, version=__version))
+        super().tearDown()
+
+    def test_build_module_to_topo_dict(self):
+        module_to_topo = topo_cache.build_module_to_topo_dict(self.BK_BIZ_ID, TOPO_TREE, INTERNAL_MODULE)
+        self.assertEqual(
+            module_to_topo,
+            {
+                "module|4": ["biz|2", "set|3", "module|4"],
+                "module|6": ["biz|2", "set|5", "module|6"],
+                "module|7": ["biz|2", "set|5", "module|7"],
+            },
+        )
+        # 拓扑树不应被修改
+        self.assertEqual(len(TOPO_TREE), 1)
+
+    def test_save_and_invalidate(self):
+        module_to_topo = topo_cache.build_module_to_topo_dict(self.BK_BIZ_ID, TOPO_TREE, INTERNAL_MODULE)
+        version: int = topo_cache.get_version(self.BK_BIZ_ID)
+        topo_cache.save_module_to_topo_dict(self.BK_BIZ_ID, version, module_to_topo)
+        self.assertEqual(topo_cache.get_module_to_topo_dict(self.BK_BIZ_ID, version), module_to_topo)
+
+        # 模块均在缓存中，不失效
+        self.assertFalse(topo_cache.invalidate_if_modules_missing(self.BK_BIZ_ID, [4, 6], reason="test"))
+        self.assertEqual(topo_cache.get_version(self.BK_BIZ_ID), version)
+
+        # 出现未知模块，版本号递增，旧版本不再被读取
+        self.assertTrue(topo_cache.invalidate_if_modules_missing(self.BK_BIZ_ID, [4, 8], reason="test"))
+        new_version: int = topo_cache.get_version(self.BK_BIZ_ID)
+        self.assertEqual(new_version, version + 1)
+        self.assertIsNone(topo_cache.get_module_to_topo_dict(self.BK_BIZ_ID, new_version))
@@ -10,7 +10,11 @@ specific language governing permissions and limitations under the License.
 """
 from django.test import TestCase
 
-from apps.backend.utils.data_renderer import nested_render_data
+from apps.backend.utils.data_renderer import (
+    batch_render_contexts,
+    get_template_variables,
+    nested_render_data,
+)
 
 
 class TestDataRenderer(TestCase):
@@ -229,3 +233,43 @@ tasks:
       CMDB_LABEL_2: "anything"
     \n    """
         self.assertEqual(content, expect_content)
+
+    def test_batch_render_contexts(self):
+        def make_context(inner_ip: str):
+            return {
+                "period": "{{ default_period }}",
+                "default_period": "60",
+                "host": "{{ cmdb_instance.host.bk_host_innerip }}",
+                "metric_url": "{{ host }}:{{ period }}/metrics",
+                "labels": {
+                    "$for": "cmdb_instance.scope",
+                    "$item": "scope",
+                    "$body": {"bk_target_topo_id": "{{ scope.bk_inst_id }}"},
+                },
+                "cmdb_instance": {
+                    "host": {"bk_host_innerip": inner_ip},
+                    "scope": [{"bk_obj_id": "module", "bk_inst_id": 1}],
+                },
+            }
+
+        inner_ips = ["127.0.0.1", "127.0.0.2", "127.0.0.3"]
+        contexts = [make_context(inner_ip) for inner_ip in inner_ips]
+        expect_contexts = [make_context(inner_ip) for inner_ip in inner_ips]
+        for expect_context in expect_contexts:
+            nested_render_data(expect_context, expect_context)
+
+        variant_keys = batch_render_contexts(contexts)
+
+        self.assertEqual(contexts, expect_contexts)
+        self.assertEqual(variant_keys, {"host", "metric_url", "labels", "cmdb_instance"})
+        self.assertEqual(get_template_variables("{{ host }}:{{ period }}/metrics"), {"host", "period"})
+
+    def test_batch_render_contexts_with_syntax_error(self):
+        contexts = [{"period": 60, "broken": "{{ period ", "label": "{{ period }}s"} for _ in range(2)]
+
+        variant_keys = batch_render_contexts(contexts)
+
+        # 模板语法错误的值保留原值，且视为非一致变量
+        self.assertEqual(variant_keys, {"broken"})
+        self.assertEqual(contexts, [{"period": 60, "broken": "{{ period ", "label": "60s"}] * 2)
+        self.assertIsNone(get_template_variables("{{ period "))
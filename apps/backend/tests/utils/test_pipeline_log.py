@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import logging
+import os
+
+from celery.signals import worker_process_shutdown
+from django.test import TestCase
+
+from apps.backend.utils.pipeline_log import BufferedEngineLogHandler
+from pipeline.log.models import LogEntry
+from pipeline.logging import pipeline_logger
+
+
+class TestBufferedEngineLogHandler(TestCase):
+    NODE_ID = "1" * 32
+
+    def setUp(self):
+        # 后台线程不参与测试，由测试线程显式写入
+        self.handler = BufferedEngineLogHandler(capacity=2, flush_size=10, flush_interval=3600)
+
+    def tearDown(self):
+        self.handler.close()
+
+    def emit(self, message):
+        record = logging.LogRecord("pipeline.logging", logging.INFO, __file__, 0, message, None, None)
+        record._id = self.NODE_ID
+        self.handler.emit(record)
+
+    def test_flush(self):
+        self.emit("a")
+        self.emit("b")
+        self.assertEqual(LogEntry.objects.filter(node_id=self.NODE_ID).count(), 0)
+
+        self.handler.flush()
+        self.assertEqual(
+            list(LogEntry.objects.filter(node_id=self.NODE_ID).order_by("id").values_list("message", flat=True)),
+            ["a", "b"],
+        )
+        self.assertEqual(self.handler.buffered_num, 0)
+
+    def test_backpressure(self):
+        for message in ["a", "b", "c"]:
+            self.emit(message)
+        # 队列已满时同步写入已缓冲的日志
+        self.assertEqual(LogEntry.objects.filter(node_id=self.NODE_ID).count(), 2)
+        self.assertEqual(self.handler.buffered_num, 1)
+
+    def test_flush_on_worker_process_shutdown(self):
+        pipeline_logger.addHandler(self.handler)
+        self.addCleanup(pipeline_logger.removeHandler, self.handler)
+        self.emit("a")
+
+        # prefork 子进程退出前写入缓冲中的日志
+        worker_process_shutdown.send(sender=None, pid=os.getpid(), exitcode=0)
+        self.assertEqual(LogEntry.objects.filter(node_id=self.NODE_ID).count(), 1)
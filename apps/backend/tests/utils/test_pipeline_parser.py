@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import mock
+from django.test import TestCase
+
+from apps.backend.utils import pipeline_parser
+from apps.backend.utils.redis import REDIS_INST
+
+
+def make_state(pipeline_id, state):
+    return {
+        "id": pipeline_id,
+        "state": state,
+        "start_time": "2022-01-01 00:00:00",
+        "finish_time": None,
+        "create_time": "2022-01-01 00:00:00",
+        "children": {
+            f"{pipeline_id}_act": {"state": state, "start_time": "2022-01-01 00:00:01", "finish_time": None},
+        },
+    }
+
+
+class TestPipelineParser(TestCase):
+    PIPELINE_IDS = ["finished_pipeline", "running_pipeline"]
+
+    def tearDown(self):
+        for pipeline_id in self.PIPELINE_IDS:
+            REDIS_INST.delete(pipeline_parser.PIPELINE_NODES_STATE_KEY_TPL.format(pipeline_id=pipeline_id))
+
+    def test_get_pipelines_nodes_state(self):
+        states = [make_state("finished_pipeline", "FINISHED"), make_state("running_pipeline", "RUNNING")]
+        with mock.patch.object(pipeline_parser.PipelineParser, "get_state", return_value=states):
+            nodes_state = pipeline_parser.PipelineParser(self.PIPELINE_IDS).get_all_nodes_state()
+        self.assertEqual(nodes_state["finished_pipeline_act"]["status"], "SUCCESS")
+        self.assertEqual(nodes_state["running_pipeline_act"]["create_time"], "2022-01-01 00:00:00")
+
+        # 终态的 pipeline 命中缓存，仅查询未到达终态的 pipeline
+        with mock.patch.object(
+            pipeline_parser.PipelineParser, "get_state", return_value=[make_state("running_pipeline", "FINISHED")]
+        ) as get_state:
+            pipeline_id__nodes_state_map = pipeline_parser.PipelineParser.get_pipelines_nodes_state(self.PIPELINE_IDS)
+        get_state.assert_called_once_with(["running_pipeline"])
+        self.assertEqual(pipeline_id__nodes_state_map["finished_pipeline"]["finished_pipeline"]["status"], "SUCCESS")
+        self.assertEqual(pipeline_id__nodes_state_map["running_pipeline"]["running_pipeline"]["status"], "SUCCESS")
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from django.test import TestCase
+
+from apps.backend.utils import pipeline_tree
+from pipeline import builder
+from pipeline.builder import Data, NodeOutput, ServiceActivity, Var
+
+
+class TestPipelineTree(TestCase):
+    @staticmethod
+    def build_chunk(subscription_instance_ids, global_pipeline_data):
+        activities = []
+        for component_code in ["init_process_status", "render_and_push_config"]:
+            act = ServiceActivity(component_code=component_code, name=component_code)
+            act.component.inputs.meta = Var(type=Var.PLAIN, value={"GSE_VERSION": "V2"})
+            activities.append(act)
+
+        activities[0].component.inputs.subscription_instance_ids = Var(type=Var.PLAIN, value=subscription_instance_ids)
+        output_name = f"${{succeeded_subscription_instance_ids_{activities[1].id}}}"
+        activities[1].component.inputs.succeeded_subscription_instance_ids = Var(type=Var.SPLICE, value=output_name)
+        global_pipeline_data.inputs[output_name] = NodeOutput(
+            type=Var.SPLICE, source_act=activities[0].id, source_key="succeeded_subscription_instance_ids"
+        )
+        activities[0].extend(activities[1])
+        return activities[0]
+
+    def build_tree(self):
+        global_pipeline_data = Data()
+        global_pipeline_data.inputs["${description}"] = Var(type=Var.PLAIN, value="description")
+        start_event = builder.EmptyStartEvent()
+        parallel_gw = builder.ParallelGateway()
+        sub_processes = [self.build_chunk([1, 2], global_pipeline_data), self.build_chunk([3], global_pipeline_data)]
+        start_event.extend(parallel_gw).connect(*sub_processes).to(parallel_gw).converge(
+            builder.ConvergeGateway()
+        ).extend(builder.EmptyEndEvent())
+        return builder.build_tree(start_event, data=global_pipeline_data)
+
+    def test_compress_and_expand(self):
+        tree = self.build_tree()
+        compact_tree = pipeline_tree.compress(tree)
+
+        self.assertTrue(pipeline_tree.is_compact(compact_tree))
+        # 两个分片的原子链一致，仅存储一份模板
+        self.assertEqual(len(compact_tree["templates"]), 1)
+        self.assertEqual([chunk["subscription_instance_ids"] for chunk in compact_tree["chunks"]], [[1, 2], [3]])
+
+        expanded_tree = pipeline_tree.expand(compact_tree)
+        self.assertEqual(expanded_tree["data"], tree["data"])
+        self.assertEqual(expanded_tree["activities"].keys(), tree["activities"].keys())
+        for node_id, act in tree["activities"].items():
+            self.assertEqual(expanded_tree["activities"][node_id]["component"], act["component"])
+        self.assertEqual(len(expanded_tree["flows"]), len(tree["flows"]))
+        # 多次展开结果一致
+        self.assertEqual(pipeline_tree.expand(compact_tree), expanded_tree)
+
+        pipeline_processes = pipeline_tree.list_chunk_processes(compact_tree)
+        self.assertEqual(
+            [[process["step_code"] for process in processes] for processes in pipeline_processes.values()],
+            [["init_process_status", "render_and_push_config"]] * 2,
+        )
+
+    def test_compress_unsupported_tree(self):
+        tree = self.build_tree()
+        for act in tree["activities"].values():
+            act["component"]["inputs"].pop("succeeded_subscription_instance_ids", None)
+        self.assertIsNone(pipeline_tree.compress(tree))
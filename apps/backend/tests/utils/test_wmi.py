@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.backend.utils import wmi
+
+
+class TestWmiSession(TestCase):
+    def setUp(self) -> None:
+        self.wmiexec_cls_mock = mock.patch("apps.backend.utils.wmi.WMIEXEC").start()
+        self.executor = self.wmiexec_cls_mock.return_value
+        self.addCleanup(mock.patch.stopall)
+
+    def test_reuse_connection(self):
+        with wmi.WmiSession("127.0.0.1", "Administrator", "password") as wmi_session:
+            wmi.execute_cmd("mkdir C:\\tmp", "127.0.0.1", "Administrator", "password", session=wmi_session)
+            wmi.put_file("/tmp/curl.exe", "C:\\tmp", "127.0.0.1", "Administrator", "password", session=wmi_session)
+            wmi.execute_cmd("setup.bat", "127.0.0.1", "Administrator", "password", no_output=True, session=wmi_session)
+
+        # 同一会话内仅建立一次连接
+        self.wmiexec_cls_mock.assert_called_once()
+        self.executor.connect.assert_called_once_with("127.0.0.1")
+        self.assertEqual(
+            self.executor.execute.call_args_list,
+            [
+                mock.call("mkdir C:\\tmp", no_output=False),
+                mock.call("put /tmp/curl.exe C:\\tmp", no_output=False),
+                mock.call("setup.bat", no_output=True),
+            ],
+        )
+        self.executor.close.assert_called_once()
+
+    def test_reconnect_after_failure(self):
+        self.executor.execute.side_effect = [Exception("STATUS_PIPE_BROKEN"), "ok"]
+        with wmi.WmiSession("127.0.0.1", "Administrator", "password") as wmi_session:
+            with self.assertRaises(Exception):
+                wmi_session.run("dir")
+            self.assertEqual(wmi_session.run("dir"), "ok")
+        self.assertEqual(self.executor.connect.call_count, 2)
+
+    def test_session_of_other_host_not_used(self):
+        with wmi.WmiSession("127.0.0.2", "Administrator", "password") as wmi_session:
+            wmi.execute_cmd("dir", "127.0.0.1", "Administrator", "password", session=wmi_session)
+        self.executor.connect.assert_not_called()
+        self.executor.run.assert_called_once_with("127.0.0.1")
@@ -81,3 +81,21 @@ class ReportLogTestCase(ViewBaseTestCase):
             REDIS_INST.lrange(self.gen_redis_list_key(), 0, 0)[0].decode(encoding="utf-8"),
             json.dumps(second_query_params["logs"][-1]),
         )
+
+    def test_batch(self):
+        """验证批量上报"""
+        batch_query_params = [
+            {"task_id": self.PIPELINE_ID, "token": self.gen_token(), "logs": [self.gen_log() for _ in range(3)]}
+            for _ in range(2)
+        ]
+        self.client.post(
+            path="/backend/report_log/",
+            data="\n".join(str(query_params) for query_params in batch_query_params),
+            format=None,
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(REDIS_INST.llen(self.gen_redis_list_key()), 6)
+        self.assertEqual(
+            REDIS_INST.lrange(self.gen_redis_list_key(), 0, 0)[0].decode(encoding="utf-8"),
+            json.dumps(batch_query_params[-1]["logs"][-1]),
+        )
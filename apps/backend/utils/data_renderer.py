@@ -9,17 +9,117 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import copy
+import hashlib
 import logging
+import threading
+import typing
+from collections import OrderedDict
 
 import six
-from jinja2 import Template
+from django.conf import settings
+from jinja2 import Template, TemplateSyntaxError, meta
 
 """
 jinja2渲染相关的公共函数
 """
 logger = logging.getLogger("app")
 
-TEMPLATE_CACHE = {}
+
+class LRUCache:
+    """线程安全的 LRU 缓存，超出容量时淘汰最久未使用的元素"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._cache: OrderedDict = OrderedDict()
+
+    def get_or_create(self, key: typing.Hashable, factory: typing.Callable[[], typing.Any]) -> typing.Any:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        # 构造过程可能较耗时（例如模板编译），不持有锁，并发构造时以后写入的为准
+        value = factory()
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+# 编译后的模板，以模板内容摘要为键
+TEMPLATE_CACHE = LRUCache(maxsize=settings.BKAPP_RENDER_TEMPLATE_CACHE_SIZE)
+# 模板引用的顶层变量，以模板内容摘要为键
+TEMPLATE_VARIABLES_CACHE = LRUCache(maxsize=settings.BKAPP_RENDER_TEMPLATE_CACHE_SIZE)
+
+
+def get_template_key(source: str) -> str:
+    return hashlib.md5(source.encode()).hexdigest()
+
+
+def get_template(source: str) -> Template:
+    """
+    获取编译后的模板
+    :param source: 模板内容
+    :return: Template
+    """
+    return TEMPLATE_CACHE.get_or_create(get_template_key(source), lambda: Template(source))
+
+
+def get_template_variables(source: str) -> typing.Optional[typing.FrozenSet[str]]:
+    """
+    获取模板引用的顶层变量
+    :param source: 模板内容
+    :return: 顶层变量名集合，例如 "{{ cmdb_instance.host.bk_host_id }}" -> {"cmdb_instance"}
+        模板语法错误时无法分析，返回 None，调用方需视为引用了任意变量
+    """
+
+    def _parse() -> typing.Optional[typing.FrozenSet[str]]:
+        try:
+            template = get_template(source)
+            return frozenset(meta.find_undeclared_variables(template.environment.parse(source)))
+        except TemplateSyntaxError as err:
+            logger.warning(f"get_template_variables error: {err}")
+            return None
+
+    return TEMPLATE_VARIABLES_CACHE.get_or_create(get_template_key(source), _parse)
+
+
+def iter_template_strings(data) -> typing.Iterator[str]:
+    """
+    遍历数据中包含 jinja 占位符的字符串
+    :param data: 待渲染数据
+    """
+    if isinstance(data, six.string_types):
+        # 与 nested_render_data 保持一致，仅包含 {{ 的字符串会被渲染
+        if "{{" in data:
+            yield data
+    elif isinstance(data, dict):
+        for value in data.values():
+            yield from iter_template_strings(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from iter_template_strings(value)
+
+
+def has_dynamic_loop(data) -> bool:
+    """数据中是否包含循环动态变量（$for）"""
+    if isinstance(data, dict):
+        if "$for" in data and "$item" in data and "$body" in data:
+            return True
+        return any(has_dynamic_loop(value) for value in data.values())
+    elif isinstance(data, list):
+        return any(has_dynamic_loop(value) for value in data)
+    return False
 
 
 def find_element(element, dict_data):
@@ -46,11 +146,7 @@ def nested_render_data(data, context):
             return data
         try:
             # 尝试渲染用户参数，一旦失败，立即返回原数据
-            template = TEMPLATE_CACHE.get(data)
-            if not template:
-                template = Template(data)
-                TEMPLATE_CACHE[data] = template
-            return template.render(context)
+            return get_template(data).render(context)
         except Exception as err:
             logger.exception(f"nested_render_data error: {err}")
             return data
@@ -77,3 +173,75 @@ def nested_render_data(data, context):
         for index, value in enumerate(data):
             data[index] = nested_render_data(value, context)
     return data
+
+
+def get_invariant_keys(contexts: typing.List[typing.Dict]) -> typing.Set[str]:
+    """
+    计算多个上下文之间渲染结果必然一致的顶层变量
+    变量需同时满足：
+    1. 各上下文中原始值一致
+    2. 不包含循环动态变量
+    3. 值内模板引用的顶层变量均满足上述条件（不存在于任何上下文的变量渲染结果一致，视为满足）
+    4. 值内模板语法正确
+    :param contexts: 上下文列表，各上下文的顶层变量顺序需保持一致
+    :return: 渲染结果一致的顶层变量
+    """
+    if not contexts:
+        return set()
+
+    first_context: typing.Dict = contexts[0]
+    all_keys: typing.Set[str] = set().union(*[context.keys() for context in contexts])
+    invariant_keys: typing.Set[str] = {
+        key
+        for key, value in first_context.items()
+        if not has_dynamic_loop(value) and all(key in context and context[key] == value for context in contexts[1:])
+    }
+    key__variables_map: typing.Dict[str, typing.Set[str]] = {}
+    for key in list(invariant_keys):
+        variables_list: typing.List[typing.Optional[typing.FrozenSet[str]]] = [
+            get_template_variables(source) for source in iter_template_strings(first_context[key])
+        ]
+        if None in variables_list:
+            # 模板语法错误的变量由 nested_render_data 逐个处理（记录日志并保留原值），视为非一致变量
+            invariant_keys.remove(key)
+            continue
+        key__variables_map[key] = set().union(*variables_list)
+
+    # 迭代剔除引用了非一致变量的变量，直至收敛
+    while True:
+        variant_keys: typing.Set[str] = all_keys - invariant_keys
+        removed_keys: typing.Set[str] = {key for key in invariant_keys if key__variables_map[key] & variant_keys}
+        if not removed_keys:
+            return invariant_keys
+        invariant_keys -= removed_keys
+
+
+def batch_render_contexts(contexts: typing.List[typing.Dict]) -> typing.Set[str]:
+    """
+    批量使用上下文渲染自身，等价于对每个上下文执行 nested_render_data(context, context)
+    各上下文间渲染结果一致的顶层变量仅渲染一次，其余变量逐个渲染
+    :param contexts: 上下文列表，原地渲染
+    :return: 渲染结果可能不一致的顶层变量
+    """
+    if not contexts:
+        return set()
+
+    all_keys: typing.Set[str] = set().union(*[context.keys() for context in contexts])
+    # 顶层变量顺序决定了渲染时可见的变量值，顺序不一致时无法复用渲染结果
+    first_keys: typing.List[str] = list(contexts[0].keys())
+    if any(list(context.keys()) != first_keys for context in contexts[1:]) or {"$for", "$item", "$body"} <= set(
+        first_keys
+    ):
+        for context in contexts:
+            nested_render_data(context, context)
+        return all_keys
+
+    invariant_keys: typing.Set[str] = get_invariant_keys(contexts)
+    nested_render_data(contexts[0], contexts[0])
+    for context in contexts[1:]:
+        for key in first_keys:
+            if key in invariant_keys:
+                context[key] = contexts[0][key]
+            else:
+                context[key] = nested_render_data(context[key], context)
+    return all_keys - invariant_keys
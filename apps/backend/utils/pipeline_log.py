@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from apps.prometheus import metrics
+from pipeline.log import handlers
+
+
+class BufferedEngineLogHandler(handlers.BufferedEngineLogHandler):
+    """缓冲写入引擎日志，并上报写入、丢弃及背压指标"""
+
+    def on_flushed(self, count: int, duration: float):
+        metrics.app_task_engine_log_records_total.labels(result="flushed").inc(count)
+        metrics.app_task_engine_log_flush_duration_seconds.observe(duration)
+        metrics.app_task_engine_log_buffered_records.set(self.buffered_num)
+
+    def on_dropped(self, count: int):
+        metrics.app_task_engine_log_records_total.labels(result="dropped").inc(count)
+
+    def on_backpressure(self):
+        metrics.app_task_engine_log_backpressure_total.inc()
@@ -9,14 +9,18 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import json
 import logging
 from collections import defaultdict
 from datetime import datetime
+from typing import Any, Dict, List
 
+from django.conf import settings
 from django.db.models import F, Q
 from django.utils import timezone
 
 from apps.backend.subscription.constants import TASK_TIMEOUT
+from apps.backend.utils.redis import REDIS_INST
 from apps.utils.time_handler import strftime_local
 from apps.utils.time_tools import utc2biz_str, utc_dt_str2utc_dt
 from pipeline.engine.models import Data as PipelineData
@@ -48,6 +52,11 @@ PIPELINE_STATES_MAPPING = {
     "REVOKED": "FAILED",
 }
 
+# 终态的 pipeline 不再发生状态变化，其节点状态投影可缓存
+PIPELINE_FINAL_STATES = frozenset(["FINISHED", "REVOKED"])
+
+PIPELINE_NODES_STATE_KEY_TPL = f"{settings.APP_CODE}:backend:pipeline_parser:nodes_state:str:" + "{pipeline_id}"
+
 
 class ActType(object):
     SUB_PROCESS = "SubProcess"
@@ -165,7 +174,7 @@ class PipelineParser(object):
             return self._sorted_pipeline_tree
         sorted_pipeline_tree = {}
         for pipeline_tree in self.pipeline_trees:
-            pipeline = pipeline_tree.tree
+            pipeline = pipeline_tree.full_tree
             if not pipeline:
                 continue
             single_sorted_pipeline_tree = parse_pipeline(pipeline)
@@ -294,32 +303,76 @@ class PipelineParser(object):
         if hasattr(self, "_all_nodes_state") and not refresh:
             return self._all_nodes_state
 
-        states = self.get_state(self.pipeline_ids)
         nodes_state = {}
-        for state in states:
-            children = state.pop("children", {})
-
-            nodes_state.update(
-                {
-                    state["id"]: {
-                        "finish_time": state["finish_time"],
-                        "start_time": state["start_time"],
-                        "create_time": state["create_time"],
-                        "status": PIPELINE_STATES_MAPPING.get(state["state"], "UNKNOWN"),
-                    }
-                }
-            )
-            for key, value in children.items():
-                nodes_state[key] = {
-                    "finish_time": value["finish_time"],
-                    "start_time": value["start_time"],
-                    "create_time": state["create_time"],
-                    "status": PIPELINE_STATES_MAPPING.get(value["state"], "UNKNOWN"),
-                }
+        for pipeline_nodes_state in self.get_pipelines_nodes_state(self.pipeline_ids).values():
+            nodes_state.update(pipeline_nodes_state)
 
         self._all_nodes_state = nodes_state
         return self._all_nodes_state
 
+    @staticmethod
+    def flatten_state(state: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        将 pipeline 的状态树展开为扁平化的节点状态投影
+        :param state: get_state 返回的 pipeline 状态
+        :return: 节点ID - 节点状态
+        """
+        nodes_state = {
+            state["id"]: {
+                "finish_time": state["finish_time"],
+                "start_time": state["start_time"],
+                "create_time": state["create_time"],
+                "status": PIPELINE_STATES_MAPPING.get(state["state"], "UNKNOWN"),
+            }
+        }
+        for key, value in state.get("children", {}).items():
+            nodes_state[key] = {
+                "finish_time": value["finish_time"],
+                "start_time": value["start_time"],
+                "create_time": state["create_time"],
+                "status": PIPELINE_STATES_MAPPING.get(value["state"], "UNKNOWN"),
+            }
+        return nodes_state
+
+    @classmethod
+    def get_pipelines_nodes_state(cls, pipeline_ids: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        按根 pipeline 获取扁平化的节点状态投影
+        仅查询本次需要的 pipeline，已到达终态的投影按 TTL 缓存，后续查询无需重新构造状态树
+        :param pipeline_ids: 根 pipeline ID 列表
+        :return: 根 pipeline ID - 节点ID - 节点状态
+        """
+        pipeline_ids: List[str] = list({pipeline_id for pipeline_id in pipeline_ids if pipeline_id})
+        if not pipeline_ids:
+            return {}
+
+        pipeline_id__nodes_state_map: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        cached_nodes_states = REDIS_INST.mget(
+            [PIPELINE_NODES_STATE_KEY_TPL.format(pipeline_id=pipeline_id) for pipeline_id in pipeline_ids]
+        )
+        for pipeline_id, cached_nodes_state in zip(pipeline_ids, cached_nodes_states):
+            if cached_nodes_state:
+                pipeline_id__nodes_state_map[pipeline_id] = json.loads(cached_nodes_state)
+
+        uncached_pipeline_ids: List[str] = [
+            pipeline_id for pipeline_id in pipeline_ids if pipeline_id not in pipeline_id__nodes_state_map
+        ]
+        if not uncached_pipeline_ids:
+            return pipeline_id__nodes_state_map
+
+        pipeline = REDIS_INST.pipeline()
+        for state in cls.get_state(uncached_pipeline_ids):
+            nodes_state: Dict[str, Dict[str, Any]] = cls.flatten_state(state)
+            pipeline_id__nodes_state_map[state["id"]] = nodes_state
+            if state["state"] in PIPELINE_FINAL_STATES:
+                pipeline.set(
+                    PIPELINE_NODES_STATE_KEY_TPL.format(pipeline_id=state["id"]),
+                    json.dumps(nodes_state),
+                    ex=settings.BKAPP_PIPELINE_NODES_STATE_CACHE_TTL,
+                )
+        pipeline.execute()
+        return pipeline_id__nodes_state_map
+
     def get_node_state(self, node_id):
         """
         获取单个pipeline节点的执行详情
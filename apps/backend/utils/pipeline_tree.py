@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import copy
+import hashlib
+import json
+import typing
+
+from pipeline.core.constants import PE
+
+"""
+订阅任务 Pipeline 树的紧凑存储
+
+订阅任务的 Pipeline 树形如 StartEvent -> ParallelGateway -> N 条原子链 -> ConvergeGateway -> EndEvent，
+同一批次（相同 meta 及 step_actions）的原子链仅原子ID、订阅实例ID不同，其余内容（组件、输入参数等）完全一致
+紧凑树将原子链描述为模板，仅存储一次，各分片记录引用的模板、原子ID及订阅实例ID：
+{
+    "id": "pipeline_id",
+    "compact_version": 1,
+    "start_event": {"id": "xxx", "name": ""},
+    "parallel_gateway": {"id": "xxx", "name": ""},
+    "converge_gateway": {"id": "xxx", "name": ""},
+    "end_event": {"id": "xxx", "name": ""},
+    "data": {"inputs": {...}, "outputs": []},
+    "templates": [[{"name": "xxx", "component": {...}, ...}, ...]],
+    "chunks": [{"template": 0, "node_ids": ["xxx", ...], "subscription_instance_ids": [1, 2]}]
+}
+原子在紧凑树中的位置（分片序号, 步骤序号）即为其索引，查询任务状态时无需展开，运行前展开为完整的 Pipeline 树
+"""
+
+COMPACT_VERSION = 1
+
+SUB_INST_IDS_INPUT_KEY = "subscription_instance_ids"
+SUCCEEDED_SUB_INST_IDS_INPUT_KEY = "succeeded_subscription_instance_ids"
+
+# 展开时重新生成的原子属性
+NODE_RUNTIME_KEYS = [PE.id, PE.incoming, PE.outgoing]
+
+
+def is_compact(tree: typing.Dict[str, typing.Any]) -> bool:
+    return "compact_version" in (tree or {})
+
+
+def get_succeeded_sub_inst_ids_data_key(node_id: str) -> str:
+    return "${" + f"succeeded_subscription_instance_ids_{node_id}" + "}"
+
+
+def get_succeeded_sub_inst_ids_data_input(source_node_id: str) -> typing.Dict[str, typing.Any]:
+    return {
+        PE.type: PE.splice,
+        PE.value: None,
+        "source_act": source_node_id,
+        "source_key": SUCCEEDED_SUB_INST_IDS_INPUT_KEY,
+    }
+
+
+def get_flow_id(tree_id: str, source_id: str, target_id: str) -> str:
+    """展开时按连线两端生成确定的连线ID，保证同一紧凑树多次展开结果一致"""
+    return hashlib.md5(f"{tree_id}-{source_id}-{target_id}".encode()).hexdigest()
+
+
+def get_event_or_gateway_meta(node: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+    return {PE.id: node[PE.id], PE.name: node.get(PE.name)}
+
+
+def compress(tree: typing.Dict[str, typing.Any]) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """
+    将订阅任务的 Pipeline 树压缩为紧凑树
+    :param tree: build_tree 构造的 Pipeline 树
+    :return: 树结构不符合订阅任务的编排形式时返回 None，调用方需存储完整树
+    """
+    flows: typing.Dict[str, typing.Dict[str, typing.Any]] = tree[PE.flows]
+    nodes: typing.Dict[str, typing.Dict[str, typing.Any]] = {**tree[PE.activities], **tree[PE.gateways]}
+
+    start_event: typing.Dict[str, typing.Any] = tree[PE.start_event]
+    parallel_gw: typing.Optional[typing.Dict[str, typing.Any]] = nodes.get(flows[start_event[PE.outgoing]][PE.target])
+    if not parallel_gw or parallel_gw[PE.type] != PE.ParallelGateway:
+        return None
+
+    data_inputs: typing.Dict[str, typing.Any] = copy.deepcopy(tree[PE.data][PE.inputs])
+    templates: typing.List[typing.List[typing.Dict[str, typing.Any]]] = []
+    template_key__index_map: typing.Dict[str, int] = {}
+    chunks: typing.List[typing.Dict[str, typing.Any]] = []
+    converge_gw: typing.Optional[typing.Dict[str, typing.Any]] = None
+
+    for outgoing in parallel_gw[PE.outgoing]:
+        node: typing.Dict[str, typing.Any] = nodes[flows[outgoing][PE.target]]
+        node_ids: typing.List[str] = []
+        template: typing.List[typing.Dict[str, typing.Any]] = []
+        sub_inst_ids: typing.Optional[typing.List[int]] = None
+        while node[PE.type] == PE.ServiceActivity:
+            act_template: typing.Dict[str, typing.Any] = {
+                key: value for key, value in node.items() if key not in NODE_RUNTIME_KEYS
+            }
+            inputs: typing.Dict[str, typing.Any] = dict(act_template[PE.component][PE.inputs])
+            if not node_ids:
+                # 首个原子传入初始的订阅实例ID
+                sub_inst_ids = inputs.pop(SUB_INST_IDS_INPUT_KEY, {}).get(PE.value)
+            else:
+                # 后续原子引用上个原子成功输出的订阅实例ID
+                data_key: str = get_succeeded_sub_inst_ids_data_key(node[PE.id])
+                if inputs.pop(SUCCEEDED_SUB_INST_IDS_INPUT_KEY, None) != {PE.type: PE.splice, PE.value: data_key}:
+                    return None
+                if data_inputs.pop(data_key, None) != get_succeeded_sub_inst_ids_data_input(node_ids[-1]):
+                    return None
+            act_template[PE.component] = {**act_template[PE.component], PE.inputs: inputs}
+
+            node_ids.append(node[PE.id])
+            template.append(act_template)
+            node = nodes.get(flows[node[PE.outgoing]][PE.target]) or {PE.type: None}
+
+        if sub_inst_ids is None or node[PE.type] != PE.ConvergeGateway:
+            return None
+        if converge_gw is not None and converge_gw[PE.id] != node[PE.id]:
+            return None
+        converge_gw = node
+
+        template_key: str = hashlib.md5(json.dumps(template, sort_keys=True).encode()).hexdigest()
+        if template_key not in template_key__index_map:
+            template_key__index_map[template_key] = len(templates)
+            templates.append(template)
+        chunks.append(
+            {
+                "template": template_key__index_map[template_key],
+                "node_ids": node_ids,
+                "subscription_instance_ids": sub_inst_ids,
+            }
+        )
+
+    if converge_gw is None or flows[converge_gw[PE.outgoing]][PE.target] != tree[PE.end_event][PE.id]:
+        return None
+
+    # 原子总数需与原树一致，避免遗漏无法识别的分支
+    if sum(len(chunk["node_ids"]) for chunk in chunks) != len(tree[PE.activities]):
+        return None
+
+    return {
+        PE.id: tree[PE.id],
+        "compact_version": COMPACT_VERSION,
+        PE.start_event: get_event_or_gateway_meta(start_event),
+        "parallel_gateway": get_event_or_gateway_meta(parallel_gw),
+        "converge_gateway": get_event_or_gateway_meta(converge_gw),
+        PE.end_event: get_event_or_gateway_meta(tree[PE.end_event]),
+        PE.data: {PE.inputs: data_inputs, PE.outputs: tree[PE.data][PE.outputs]},
+        "templates": templates,
+        "chunks": chunks,
+    }
+
+
+def expand(compact_tree: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+    """
+    将紧凑树展开为完整的 Pipeline 树
+    :param compact_tree: 紧凑树
+    :return: 可被 PipelineParser 解析的 Pipeline 树
+    """
+    tree_id: str = compact_tree[PE.id]
+    start_event: typing.Dict[str, typing.Any] = compact_tree[PE.start_event]
+    parallel_gw: typing.Dict[str, typing.Any] = compact_tree["parallel_gateway"]
+    converge_gw: typing.Dict[str, typing.Any] = compact_tree["converge_gateway"]
+    end_event: typing.Dict[str, typing.Any] = compact_tree[PE.end_event]
+
+    flows: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+
+    def _add_flow(source_id: str, target_id: str) -> str:
+        flow_id: str = get_flow_id(tree_id, source_id, target_id)
+        flows[flow_id] = {PE.is_default: False, PE.source: source_id, PE.target: target_id, PE.id: flow_id}
+        return flow_id
+
+    activities: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    data_inputs: typing.Dict[str, typing.Any] = copy.deepcopy(compact_tree[PE.data][PE.inputs])
+    parallel_outgoing: typing.List[str] = []
+    converge_incoming: typing.List[str] = []
+    for chunk in compact_tree["chunks"]:
+        template: typing.List[typing.Dict[str, typing.Any]] = compact_tree["templates"][chunk["template"]]
+        node_ids: typing.List[str] = chunk["node_ids"]
+        incoming: str = _add_flow(parallel_gw[PE.id], node_ids[0])
+        parallel_outgoing.append(incoming)
+        for index, (node_id, act_template) in enumerate(zip(node_ids, template)):
+            next_node_id: str = node_ids[index + 1] if index + 1 < len(node_ids) else converge_gw[PE.id]
+            outgoing: str = _add_flow(node_id, next_node_id)
+
+            act: typing.Dict[str, typing.Any] = copy.deepcopy(act_template)
+            inputs: typing.Dict[str, typing.Any] = act[PE.component][PE.inputs]
+            if index == 0:
+                inputs[SUB_INST_IDS_INPUT_KEY] = {PE.type: PE.plain, PE.value: chunk["subscription_instance_ids"]}
+            else:
+                data_key: str = get_succeeded_sub_inst_ids_data_key(node_id)
+                inputs[SUCCEEDED_SUB_INST_IDS_INPUT_KEY] = {PE.type: PE.splice, PE.value: data_key}
+                data_inputs[data_key] = get_succeeded_sub_inst_ids_data_input(node_ids[index - 1])
+            act.update({PE.id: node_id, PE.incoming: [incoming], PE.outgoing: outgoing})
+            activities[node_id] = act
+
+            incoming = outgoing
+        converge_incoming.append(incoming)
+
+    start_outgoing: str = _add_flow(start_event[PE.id], parallel_gw[PE.id])
+    end_incoming: str = _add_flow(converge_gw[PE.id], end_event[PE.id])
+    return {
+        PE.id: tree_id,
+        PE.start_event: {
+            PE.incoming: "",
+            PE.outgoing: start_outgoing,
+            PE.type: PE.EmptyStartEvent,
+            PE.id: start_event[PE.id],
+            PE.name: start_event[PE.name],
+        },
+        PE.end_event: {
+            PE.incoming: [end_incoming],
+            PE.outgoing: "",
+            PE.type: PE.EmptyEndEvent,
+            PE.id: end_event[PE.id],
+            PE.name: end_event[PE.name],
+        },
+        PE.activities: activities,
+        PE.gateways: {
+            parallel_gw[PE.id]: {
+                PE.id: parallel_gw[PE.id],
+                PE.incoming: [start_outgoing],
+                PE.outgoing: parallel_outgoing,
+                PE.type: PE.ParallelGateway,
+                PE.name: parallel_gw[PE.name],
+            },
+            converge_gw[PE.id]: {
+                PE.id: converge_gw[PE.id],
+                PE.incoming: converge_incoming,
+                PE.outgoing: end_incoming,
+                PE.type: PE.ConvergeGateway,
+                PE.name: converge_gw[PE.name],
+            },
+        },
+        PE.flows: flows,
+        PE.data: {PE.inputs: data_inputs, PE.outputs: compact_tree[PE.data][PE.outputs]},
+    }
+
+
+def get_full_tree(tree: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+    """兼容紧凑树及完整树，返回完整的 Pipeline 树"""
+    return expand(tree) if is_compact(tree) else tree
+
+
+def list_chunk_processes(compact_tree: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.List[typing.Dict]]:
+    """
+    无需展开，直接从紧凑树获取各分片的原子链
+    :return: 分片首个原子ID - 原子链
+    """
+    pipeline_processes: typing.Dict[str, typing.List[typing.Dict]] = {}
+    for chunk in compact_tree["chunks"]:
+        template: typing.List[typing.Dict[str, typing.Any]] = compact_tree["templates"][chunk["template"]]
+        pipeline_processes[chunk["node_ids"][0]] = [
+            {
+                "node_id": node_id,
+                "name": act_template[PE.name],
+                "step_code": act_template[PE.component].get("code"),
+                "index": index,
+            }
+            for index, (node_id, act_template) in enumerate(zip(chunk["node_ids"], template))
+        ]
+    return pipeline_processes
+
+
+def list_node_ids(compact_tree: typing.Dict[str, typing.Any]) -> typing.List[str]:
+    """
+    无需展开，直接从紧凑树获取所有节点（事件、网关、原子及连线）ID，与展开后的完整树一致
+    """
+    tree_id: str = compact_tree[PE.id]
+    parallel_gw_id: str = compact_tree["parallel_gateway"][PE.id]
+    converge_gw_id: str = compact_tree["converge_gateway"][PE.id]
+    start_event_id: str = compact_tree[PE.start_event][PE.id]
+    end_event_id: str = compact_tree[PE.end_event][PE.id]
+
+    node_ids: typing.List[str] = [start_event_id, parallel_gw_id, converge_gw_id, end_event_id]
+    source_target_pairs: typing.List[typing.Tuple[str, str]] = [
+        (start_event_id, parallel_gw_id),
+        (converge_gw_id, end_event_id),
+    ]
+    for chunk in compact_tree["chunks"]:
+        chain: typing.List[str] = [parallel_gw_id] + chunk["node_ids"] + [converge_gw_id]
+        node_ids.extend(chunk["node_ids"])
+        source_target_pairs.extend(zip(chain[:-1], chain[1:]))
+
+    node_ids.extend(get_flow_id(tree_id, source_id, target_id) for source_id, target_id in source_target_pairs)
+    return node_ids
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import threading
+import time
+import typing
+from collections import OrderedDict, defaultdict
+
+from apps.prometheus import metrics
+
+
+class TokenCache:
+    """解析后的 token 缓存，线程安全，超出有效期或容量时淘汰"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache: OrderedDict = OrderedDict()
+
+    def get_or_create(self, key: typing.Hashable, factory: typing.Callable[[], typing.Any]) -> typing.Any:
+        now: float = time.time()
+        with self._lock:
+            item: typing.Optional[typing.Tuple[float, typing.Any]] = self._cache.get(key)
+            if item is not None and item[0] > now:
+                self._cache.move_to_end(key)
+                metrics.app_task_report_log_token_cache_total.labels(result="hit").inc()
+                return item[1]
+
+        metrics.app_task_report_log_token_cache_total.labels(result="miss").inc()
+        # 构造失败时异常直接抛出，不缓存
+        value = factory()
+        with self._lock:
+            self._cache[key] = (now + self.ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class _Batch:
+    def __init__(self):
+        self.entries: typing.List[typing.Tuple[str, typing.List[str]]] = []
+        self.request_count: int = 0
+        self.flushed = threading.Event()
+        self.exception: typing.Optional[BaseException] = None
+
+
+class ReportLogWriter:
+    """
+    安装日志批量写入
+    - 并发请求的日志先登记到当前批次，由首个拿到写入锁的请求将批次内所有日志通过一次 Redis pipeline 写入
+    - 写入期间到达的请求登记到下一批次，等待当前写入完成后由其中一个请求写入，请求返回时日志均已写入 Redis
+    """
+
+    def __init__(self, write_func: typing.Callable[[typing.Dict[str, typing.List[str]]], None]):
+        """
+        :param write_func: 写入函数，接收 Redis 键 - 日志列表映射关系
+        """
+        self.write_func = write_func
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._batch = _Batch()
+
+    def write(self, name__logs_map: typing.Dict[str, typing.List[str]]):
+        with self._lock:
+            batch: _Batch = self._batch
+            batch.entries.extend(name__logs_map.items())
+            batch.request_count += 1
+
+        with self._flush_lock:
+            if not batch.flushed.is_set():
+                with self._lock:
+                    # 后续请求登记到新批次
+                    self._batch = _Batch()
+                self._flush(batch)
+
+        if batch.exception is not None:
+            raise batch.exception
+
+    def _flush(self, batch: _Batch):
+        merged_name__logs_map: typing.Dict[str, typing.List[str]] = defaultdict(list)
+        for name, logs in batch.entries:
+            merged_name__logs_map[name].extend(logs)
+
+        start: float = time.perf_counter()
+        try:
+            self.write_func(merged_name__logs_map)
+        except BaseException as e:
+            batch.exception = e
+        finally:
+            batch.flushed.set()
+        metrics.app_task_report_log_flush_duration_seconds.observe(time.perf_counter() - start)
+        metrics.app_task_report_log_flush_requests.observe(batch.request_count)
@@ -8,23 +8,98 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import typing
+
 from apps.utils import basic
 from script_tools.wmiexec import WMIEXEC
 
 
-def put_file(src_file, des_path, des_ip, username, password, domain="", share="ADMIN$"):
+class WmiSession:
+    """
+    复用 SMB / DCOM 连接的 wmiexec 会话，用于对同一台主机依次推送文件及执行命令
+    首次使用时建立连接，执行异常时连接会被关闭，再次使用时重新建立
+    """
+
+    def __init__(self, ipaddr, username, password, domain="", share="ADMIN$"):
+        self.addr = basic.compressed_ip(ipaddr)
+        self.username = username
+        self.password = password
+        self.domain = domain
+        self.share = share
+        self.executor: typing.Optional[WMIEXEC] = None
+
+    def get_executor(self) -> WMIEXEC:
+        if self.executor is None:
+            executor = WMIEXEC(username=self.username, password=self.password, domain=self.domain, share=self.share)
+            executor.connect(self.addr)
+            self.executor = executor
+        return self.executor
+
+    def run(self, cmd_str, no_output=False):
+        executor: WMIEXEC = self.get_executor()
+        try:
+            return executor.execute(cmd_str, no_output=no_output)
+        except Exception:
+            # 执行异常时 executor 已关闭连接
+            self.executor = None
+            raise
+
+    def is_available_for(self, ipaddr) -> bool:
+        return self.addr == basic.compressed_ip(ipaddr)
+
+    def close(self):
+        if self.executor is None:
+            return
+        try:
+            self.executor.close()
+        except Exception:
+            pass
+        self.executor = None
+
+    def __enter__(self) -> "WmiSession":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def put_file(
+    src_file,
+    des_path,
+    des_ip,
+    username,
+    password,
+    domain="",
+    share="ADMIN$",
+    session: typing.Optional[WmiSession] = None,
+):
     """upload file"""
     cmd_str = "put " + str(src_file) + " " + str(des_path)
-    executor = WMIEXEC(cmd_str, username, password, domain, share=share)
-    executor.run(basic.compressed_ip(des_ip))
+    if session is not None and session.is_available_for(des_ip):
+        session.run(cmd_str)
+    else:
+        executor = WMIEXEC(cmd_str, username, password, domain, share=share)
+        executor.run(basic.compressed_ip(des_ip))
     return {
         "result": True,
         "data": "upload {} success to {}:{}".format(src_file, des_ip, des_path),
     }
 
 
-def execute_cmd(cmd_str, ipaddr, username, password, domain="", share="ADMIN$", no_output=False):
+def execute_cmd(
+    cmd_str,
+    ipaddr,
+    username,
+    password,
+    domain="",
+    share="ADMIN$",
+    no_output=False,
+    session: typing.Optional[WmiSession] = None,
+):
     """execute command"""
-    executor = WMIEXEC(cmd_str, username, password, domain, share=share, noOutput=no_output)
-    result_data = executor.run(basic.compressed_ip(ipaddr))
+    if session is not None and session.is_available_for(ipaddr):
+        result_data = session.run(cmd_str, no_output=no_output)
+    else:
+        executor = WMIEXEC(cmd_str, username, password, domain, share=share, noOutput=no_output)
+        result_data = executor.run(basic.compressed_ip(ipaddr))
     return {"result": True, "data": result_data}
@@ -11,7 +11,7 @@ specific language governing permissions and limitations under the License.
 import logging
 import os
 import time
-from typing import Dict
+from typing import Any, Dict, List
 
 import ujson as json
 from bkcrypto.contrib.django.ciphers import symmetric_cipher_manager
@@ -29,11 +29,13 @@ from apps.backend.serializers.views import PackageDownloadSerializer
 from apps.backend.subscription.steps.agent_adapter import legacy
 from apps.backend.subscription.steps.agent_adapter.adapter import AgentStepAdapter
 from apps.backend.utils.redis import REDIS_INST
+from apps.backend.utils.report_log import ReportLogWriter, TokenCache
 from apps.core.files.storage import get_storage
 from apps.exceptions import ValidationError
 from apps.node_man import constants, models
 from apps.node_man.handlers import base_info
 from apps.node_man.models import Host, JobSubscriptionInstanceMap
+from apps.prometheus import metrics
 from pipeline.service import task_service
 
 logger = logging.getLogger("app")
@@ -57,6 +59,21 @@ except Exception as e:
     logger.exception(e)
 
 
+def _write_report_logs(name__logs_map: Dict[str, List[str]]):
+    # 日志会被 Service 消费并持久化，在 Redis 保留一段时间便于排查「主机 -> api-> Redis -log-> DB」 上的问题
+    pipeline = REDIS_INST.pipeline(transaction=False)
+    for name, logs in name__logs_map.items():
+        LPUSH_AND_EXPIRE_FUNC(keys=[name], args=[constants.TimeUnit.DAY] + logs, client=pipeline)
+    pipeline.execute()
+
+
+REPORT_LOG_WRITER = ReportLogWriter(write_func=_write_report_logs)
+# 安装过程中同一实例会频繁上报日志，缓存 token 解析结果，避免每次请求都进行解密
+TOKEN_CACHE = TokenCache(
+    maxsize=settings.BKAPP_REPORT_LOG_TOKEN_CACHE_SIZE, ttl=settings.BKAPP_REPORT_LOG_TOKEN_CACHE_TTL
+)
+
+
 @login_exempt
 @csrf_exempt
 def get_gse_config(request):
@@ -131,22 +148,33 @@ def report_log(request):
             }
         ]
     }
+    Content-Type 为 application/x-ndjson 时支持批量上报，每行为一个上述格式的 JSON
     """
     logger.info(f"[report_log]: {request.body}")
-    data = json.loads(str(request.body, encoding="utf8").replace('\\"', "'").replace("\\", "/"))
+    body: str = str(request.body, encoding="utf8").replace('\\"', "'").replace("\\", "/")
+    if request.content_type == "application/x-ndjson":
+        # 批量上报：每行为一次上报的内容
+        reports: List[Dict[str, Any]] = [json.loads(line) for line in body.splitlines() if line.strip()]
+    else:
+        reports = [json.loads(body)]
 
-    token = data.get("token")
-    decrypted_token = _decrypt_token(token)
+    name__logs_map: Dict[str, List[str]] = {}
+    for data in reports:
+        token = data.get("token")
+        decrypted_token = _decrypt_token_with_cache(token)
 
-    if decrypted_token.get("task_id") != data["task_id"]:
-        logger.error(f"token[{token}] 非法, task_id为:{data['task_id']}, token解析为: {decrypted_token}")
-        raise PermissionError("what are you doing?")
+        if decrypted_token.get("task_id") != data["task_id"]:
+            logger.error(f"token[{token}] 非法, task_id为:{data['task_id']}, token解析为: {decrypted_token}")
+            raise PermissionError("what are you doing?")
 
-    # 把日志写入redis中，由install service中的schedule方法统一读取，避免频繁callback
-    name = REDIS_INSTALL_CALLBACK_KEY_TPL.format(sub_inst_id=decrypted_token["inst_id"])
-    json_dumps_logs = [json.dumps(log) for log in data["logs"]]
-    # 日志会被 Service 消费并持久化，在 Redis 保留一段时间便于排查「主机 -> api-> Redis -log-> DB」 上的问题
-    LPUSH_AND_EXPIRE_FUNC(keys=[name], args=[constants.TimeUnit.DAY] + json_dumps_logs)
+        # 把日志写入redis中，由install service中的schedule方法统一读取，避免频繁callback
+        name = REDIS_INSTALL_CALLBACK_KEY_TPL.format(sub_inst_id=decrypted_token["inst_id"])
+        name__logs_map.setdefault(name, []).extend(json.dumps(log) for log in data["logs"])
+        metrics.app_task_report_log_records_total.inc(len(data["logs"]))
+
+    metrics.app_task_report_log_requests_total.labels(batched=len(reports) > 1).inc()
+    # 并发请求的日志合并为一次 Redis pipeline 写入
+    REPORT_LOG_WRITER.write(name__logs_map)
     return JsonResponse({})
 
 
@@ -181,6 +209,17 @@ def _decrypt_token(token: str) -> dict:
     """
     解析token
     """
+    return _check_token_timestamp(token, _parse_token(token))
+
+
+def _decrypt_token_with_cache(token: str) -> dict:
+    """
+    解析token，解密结果短时缓存，有效期每次校验
+    """
+    return _check_token_timestamp(token, dict(TOKEN_CACHE.get_or_create(token, lambda: _parse_token(token))))
+
+
+def _parse_token(token: str) -> dict:
     try:
         token_decrypt = symmetric_cipher_manager.cipher().decrypt(token)
     except Exception as err:
@@ -196,12 +235,16 @@ def _decrypt_token(token: str) -> dict:
         "inst_id": inst_id,
         "host_ap_id": host_ap_id,
     }
-    # timestamp 超过1小时，认为是非法请求
-    if time.time() - float(timestamp) > 3600:
-        raise PermissionError(f"token[{token}] 非法, timestamp超时不符合预期, {return_value}")
     return return_value
 
 
+def _check_token_timestamp(token: str, decrypted_token: dict) -> dict:
+    # timestamp 超过1小时，认为是非法请求
+    if time.time() - float(decrypted_token["timestamp"]) > 3600:
+        raise PermissionError(f"token[{token}] 非法, timestamp超时不符合预期, {decrypted_token}")
+    return decrypted_token
+
+
 @login_exempt
 def version(request):
     return JsonResponse(base_info.BaseInfoHandler.version())
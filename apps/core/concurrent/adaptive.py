@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import math
+import threading
+import time
+import typing
+
+from apps.exceptions import parse_exception
+from apps.prometheus import metrics
+
+from . import constants
+
+if typing.TYPE_CHECKING:
+    from .controller import ConcurrentControlConfig
+
+
+class CallStatsCollector:
+    """单次受控调用的统计信息收集器，记录各批次的耗时、异常及限频情况"""
+
+    def __init__(self, throttle_error_codes: typing.Iterable[str]):
+        self.throttle_error_codes: typing.Set[str] = {str(code) for code in throttle_error_codes}
+        self.call_num: int = 0
+        self.error_num: int = 0
+        self.throttled_num: int = 0
+        self.max_latency: float = 0
+        self._lock = threading.Lock()
+
+    @property
+    def error_rate(self) -> float:
+        if not self.call_num:
+            return 0
+        return self.error_num / self.call_num
+
+    def record(self, latency: float, exc: typing.Optional[Exception] = None):
+        with self._lock:
+            self.call_num += 1
+            self.max_latency = max(self.max_latency, latency)
+            if exc is None:
+                return
+            self.error_num += 1
+            if parse_exception(exc)["exc_code"] in self.throttle_error_codes:
+                self.throttled_num += 1
+
+    def wrap(self, func: typing.Callable) -> typing.Callable:
+        def inner(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as exc:
+                self.record(time.perf_counter() - start, exc)
+                raise
+            self.record(time.perf_counter() - start)
+            return result
+
+        return inner
+
+
+class AdaptiveState:
+    """
+    自适应并发状态，基于 AIMD（加性增、乘性减）调整批次大小及批次间隔
+    - 出现限频：批次大小乘性减，批次间隔加倍
+    - 错误率或批次耗时超过阈值：批次大小乘性减
+    - 其他情况：批次大小加性增，批次间隔减半直至回落到配置值
+    """
+
+    def __init__(self, name: str, config_obj: "ConcurrentControlConfig"):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset(config_obj)
+
+    def reset(self, config_obj: "ConcurrentControlConfig"):
+        self.config_obj = config_obj
+        self.limit: int = config_obj.limit
+        self.interval: float = config_obj.interval
+        self.export()
+
+    @property
+    def max_limit(self) -> int:
+        return self.config_obj.max_limit or self.config_obj.limit * constants.ADAPTIVE_MAX_LIMIT_FACTOR
+
+    @property
+    def increase_step(self) -> int:
+        return self.config_obj.increase_step or max(1, self.config_obj.limit // 10)
+
+    def export(self):
+        metrics.app_core_concurrent_controller_limit.labels(name=self.name).set(self.limit)
+        metrics.app_core_concurrent_controller_interval_seconds.labels(name=self.name).set(self.interval)
+
+    def feedback(self, collector: CallStatsCollector):
+        if not collector.call_num:
+            return
+
+        config_obj = self.config_obj
+        with self._lock:
+            if collector.throttled_num:
+                direction = "throttled"
+                self.limit = math.floor(self.limit * config_obj.decrease_factor)
+                self.interval = min(
+                    max(self.interval * 2, constants.ADAPTIVE_MIN_INTERVAL_STEP), config_obj.max_interval
+                )
+            elif collector.error_rate > config_obj.error_rate_threshold or (
+                config_obj.latency_threshold and collector.max_latency > config_obj.latency_threshold
+            ):
+                direction = "decrease"
+                self.limit = math.floor(self.limit * config_obj.decrease_factor)
+            else:
+                direction = "increase"
+                self.limit = self.limit + self.increase_step
+                self.interval = max(self.interval / 2, config_obj.interval)
+                if self.interval < constants.ADAPTIVE_MIN_INTERVAL_STEP:
+                    self.interval = config_obj.interval
+
+            self.limit = min(max(self.limit, config_obj.min_limit), self.max_limit)
+            self.export()
+
+        metrics.app_core_concurrent_controller_adjustments_total.labels(name=self.name, direction=direction).inc()
+
+
+class AdaptiveStateManager:
+    """按配置名称维护进程内的自适应并发状态"""
+
+    _lock = threading.Lock()
+    _name__state_map: typing.Dict[str, AdaptiveState] = {}
+
+    @classmethod
+    def get_state(cls, name: str, config_obj: "ConcurrentControlConfig") -> AdaptiveState:
+        with cls._lock:
+            state: typing.Optional[AdaptiveState] = cls._name__state_map.get(name)
+            if state is None:
+                state = cls._name__state_map[name] = AdaptiveState(name, config_obj)
+            elif state.config_obj != config_obj:
+                # 配置变更后以新配置为基准重新调节
+                state.reset(config_obj)
+            return state
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._name__state_map = {}
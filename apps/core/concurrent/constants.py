@@ -16,7 +16,27 @@ DEFAULT_CONCURRENT_CONTROL_CONFIG = {
     "execute_all": False,
     "is_concurrent_between_batches": True,
     "interval": 0,
+    # 自适应并发，开启后将根据批次耗时、错误率及限频情况动态调整 limit 及 interval
+    "adaptive": False,
+    "min_limit": 1,
+    # 为空时取 limit * ADAPTIVE_MAX_LIMIT_FACTOR
+    "max_limit": None,
+    # 为空时取 limit 的 1/10
+    "increase_step": None,
+    "decrease_factor": 0.5,
+    "max_interval": 10,
+    # 批次耗时阈值（秒），为 0 时不根据耗时进行调整
+    "latency_threshold": 0,
+    "error_rate_threshold": 0.1,
+    # 视为触发限频的异常错误码
+    "throttle_error_codes": [],
 }
 
+# 自适应并发未配置上限时，limit 可增长的倍数
+ADAPTIVE_MAX_LIMIT_FACTOR = 4
+
+# 触发限频时批次间隔的最小步长（秒）
+ADAPTIVE_MIN_INTERVAL_STEP = 0.5
+
 
 DEFAULT_LOCK_EXPIRE = 20
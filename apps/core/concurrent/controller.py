@@ -18,7 +18,7 @@ from rest_framework import exceptions
 from apps.exceptions import ValidationError
 from apps.utils import basic, concurrent
 
-from . import serializers
+from . import adaptive, serializers
 
 
 class ConcurrentControlConfig:
@@ -29,6 +29,16 @@ class ConcurrentControlConfig:
     is_concurrent_between_batches: bool = None
     interval: float = None
 
+    adaptive: bool = None
+    min_limit: int = None
+    max_limit: Optional[int] = None
+    increase_step: Optional[int] = None
+    decrease_factor: float = None
+    max_interval: float = None
+    latency_threshold: float = None
+    error_rate_threshold: float = None
+    throttle_error_codes: List[str] = None
+
     def __init__(self, config_dict: Dict[str, Any]):
         try:
             data_serializer = serializers.ConcurrentControlConfigSerializer(data=config_dict)
@@ -42,6 +52,21 @@ class ConcurrentControlConfig:
         self.is_concurrent_between_batches = validated_data["is_concurrent_between_batches"]
         self.interval = validated_data["interval"]
 
+        self.adaptive = validated_data["adaptive"]
+        self.min_limit = validated_data["min_limit"]
+        self.max_limit = validated_data["max_limit"]
+        self.increase_step = validated_data["increase_step"]
+        self.decrease_factor = validated_data["decrease_factor"]
+        self.max_interval = validated_data["max_interval"]
+        self.latency_threshold = validated_data["latency_threshold"]
+        self.error_rate_threshold = validated_data["error_rate_threshold"]
+        self.throttle_error_codes = validated_data["throttle_error_codes"]
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, ConcurrentControlConfig):
+            return False
+        return self.__dict__ == other.__dict__
+
 
 class ConcurrentController:
     """
@@ -53,6 +78,8 @@ class ConcurrentController:
             经测试，如果需要下发多条命令，一次并发量 <= CONCURRENT_NUMBER 是安全的
         - JOB 执行脚本接口调用限频
         ...
+    自适应模式：配置 adaptive=True 后，同名配置（config_name 或被装饰方法）在进程内共享一份调节状态，
+        每次调用结束后根据批次耗时、错误率及限频错误码调整下一次调用的 limit 及 interval，参考 adaptive.AdaptiveState
     """
 
     # 并发配置类
@@ -147,24 +174,42 @@ class ConcurrentController:
         if config_obj.execute_all:
             return _commit_single()
 
+        limit: int = config_obj.limit
+        interval: float = config_obj.interval
+        adaptive_state: Optional[adaptive.AdaptiveState] = None
+        collector: Optional[adaptive.CallStatsCollector] = None
+        if config_obj.adaptive:
+            adaptive_state = adaptive.AdaptiveStateManager.get_state(self.get_state_name(wrapped), config_obj)
+            limit, interval = adaptive_state.limit, adaptive_state.interval
+            collector = adaptive.CallStatsCollector(throttle_error_codes=config_obj.throttle_error_codes)
+            wrapped = collector.wrap(wrapped)
+
         params_list: List[Dict[str, Any]] = []
-        for chunk_list in basic.chunk_lists(data_list, config_obj.limit):
+        for chunk_list in basic.chunk_lists(data_list, limit):
             params_list.append(dict(ChainMap({self.data_list_name: chunk_list}, kwargs)))
 
         # 如果批次间非并发，batch_call_func 默认使用 batch_call_serial
         if not config_obj.is_concurrent_between_batches:
             self.batch_call_func = concurrent.batch_call_serial
-        return self.batch_call_func(
-            func=wrapped,
-            params_list=params_list,
-            **dict(
-                ChainMap(
-                    self.batch_call_kwargs,
-                    {
-                        "get_data": self.get_data,
-                        "extend_result": self.extend_result,
-                        "interval": config_obj.interval,
-                    },
-                )
+        try:
+            return self.batch_call_func(
+                func=wrapped,
+                params_list=params_list,
+                **dict(
+                    ChainMap(
+                        self.batch_call_kwargs,
+                        {
+                            "get_data": self.get_data,
+                            "extend_result": self.extend_result,
+                            "interval": interval,
+                        },
+                    )
+                ),
             )
-        )
+        finally:
+            if adaptive_state is not None:
+                adaptive_state.feedback(collector)
+
+    def get_state_name(self, wrapped: Callable) -> str:
+        """自适应状态名称，优先使用并发配置名称"""
+        return self.get_config_dict_kwargs.get("config_name") or f"{wrapped.__module__}.{wrapped.__qualname__}"
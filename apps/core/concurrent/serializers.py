@@ -33,3 +33,63 @@ class ConcurrentControlConfigSerializer(serializers.Serializer):
     interval = serializers.FloatField(
         label=_("任务提交间隔"), min_value=0, required=False, default=constants.DEFAULT_CONCURRENT_CONTROL_CONFIG["interval"]
     )
+    adaptive = serializers.BooleanField(
+        label=_("是否开启自适应并发"), required=False, default=constants.DEFAULT_CONCURRENT_CONTROL_CONFIG["adaptive"]
+    )
+    min_limit = serializers.IntegerField(
+        label=_("自适应并发下每批任务的最小执行数量"),
+        required=False,
+        min_value=1,
+        default=constants.DEFAULT_CONCURRENT_CONTROL_CONFIG["min_limit"],
+    )
+    max_limit = serializers.IntegerField(
+        label=_("自适应并发下每批任务的最大执行数量"),
+        required=False,
+        min_value=1,
+        allow_null=True,
+        default=constants.DEFAULT_CONCURRENT_CONTROL_CONFIG["max_limit"],
+    )
+    increase_step = serializers.IntegerField(
+        label=_("自适应并发下每批任务数量的增长步长"),
+        required=False,
+        min_value=1,
+        allow_null=True,
+        default=constants.DEFAULT_CONCURRENT_CONTROL_CONFIG["increase_step"],
+    )
+    decrease_factor = serializers.FloatField(
+        label=_("自适应并发下每批任务数量的收缩系数"),
+        required=False,
+        min_value=0,
+        max_value=1,
+        default=constants.DEFAULT_CONCURRENT_CONTROL_CONFIG["decrease_factor"],
+    )
+    max_interval = serializers.FloatField(
+        label=_("自适应并发下的最大任务提交间隔"),
+        required=False,
+        min_value=0,
+        default=constants.DEFAULT_CONCURRENT_CONTROL_CONFIG["max_interval"],
+    )
+    latency_threshold = serializers.FloatField(
+        label=_("自适应并发下的批次耗时阈值"),
+        required=False,
+        min_value=0,
+        default=constants.DEFAULT_CONCURRENT_CONTROL_CONFIG["latency_threshold"],
+    )
+    error_rate_threshold = serializers.FloatField(
+        label=_("自适应并发下的批次错误率阈值"),
+        required=False,
+        min_value=0,
+        max_value=1,
+        default=constants.DEFAULT_CONCURRENT_CONTROL_CONFIG["error_rate_threshold"],
+    )
+    throttle_error_codes = serializers.ListField(
+        label=_("视为触发限频的错误码"),
+        child=serializers.CharField(),
+        required=False,
+        default=lambda: list(constants.DEFAULT_CONCURRENT_CONTROL_CONFIG["throttle_error_codes"]),
+    )
+
+    def validate(self, attrs):
+        if attrs["max_limit"] is not None and attrs["min_limit"] > attrs["max_limit"]:
+            raise serializers.ValidationError(_("min_limit 不能大于 max_limit"))
+        return attrs
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from typing import List
+
+from apps.exceptions import ApiResultError
+from apps.utils import concurrent
+from apps.utils.unittest import testcase
+
+from .. import adaptive, controller
+
+
+class AdaptiveStateTestCase(testcase.CustomBaseTestCase):
+    def setUp(self) -> None:
+        adaptive.AdaptiveStateManager.clear()
+        super().setUp()
+
+    @staticmethod
+    def get_config_obj(**config_dict) -> controller.ConcurrentControlConfig:
+        return controller.ConcurrentControlConfig(config_dict={"adaptive": True, **config_dict})
+
+    def test_increase(self):
+        state = adaptive.AdaptiveStateManager.get_state("test", self.get_config_obj(limit=10, max_limit=12))
+        collector = adaptive.CallStatsCollector(throttle_error_codes=[])
+        collector.record(latency=0.1)
+        state.feedback(collector)
+        self.assertEqual(state.limit, 11)
+        state.feedback(collector)
+        state.feedback(collector)
+        # 不超过上限
+        self.assertEqual(state.limit, 12)
+
+    def test_decrease_by_error_rate_and_latency(self):
+        state = adaptive.AdaptiveStateManager.get_state(
+            "test", self.get_config_obj(limit=10, min_limit=4, latency_threshold=1)
+        )
+        collector = adaptive.CallStatsCollector(throttle_error_codes=[])
+        collector.record(latency=0.1, exc=ValueError())
+        state.feedback(collector)
+        self.assertEqual(state.limit, 5)
+
+        collector = adaptive.CallStatsCollector(throttle_error_codes=[])
+        collector.record(latency=2)
+        state.feedback(collector)
+        # 不低于下限
+        self.assertEqual(state.limit, 4)
+
+    def test_throttled(self):
+        state = adaptive.AdaptiveStateManager.get_state("test", self.get_config_obj(limit=10, max_interval=1))
+        collector = adaptive.CallStatsCollector(throttle_error_codes=["1306406"])
+        collector.record(latency=0.1, exc=ApiResultError(code=1306406))
+        state.feedback(collector)
+        self.assertEqual(state.limit, 5)
+        self.assertEqual(state.interval, 0.5)
+        state.feedback(collector)
+        self.assertEqual(state.interval, 1)
+
+        # 恢复后间隔逐步回落到配置值
+        collector = adaptive.CallStatsCollector(throttle_error_codes=["1306406"])
+        collector.record(latency=0.1)
+        state.feedback(collector)
+        self.assertEqual(state.interval, 0.5)
+        state.feedback(collector)
+        self.assertEqual(state.interval, 0)
+
+    def test_reset_on_config_change(self):
+        state = adaptive.AdaptiveStateManager.get_state("test", self.get_config_obj(limit=10))
+        collector = adaptive.CallStatsCollector(throttle_error_codes=[])
+        collector.record(latency=0.1)
+        state.feedback(collector)
+        self.assertEqual(state.limit, 11)
+
+        state = adaptive.AdaptiveStateManager.get_state("test", self.get_config_obj(limit=20))
+        self.assertEqual(state.limit, 20)
+
+    def test_controller(self):
+        call_chunk_sizes: List[int] = []
+
+        @controller.ConcurrentController(
+            data_list_name="numbers",
+            batch_call_func=concurrent.batch_call_serial,
+            get_config_dict_func=lambda config_name: {"adaptive": True, "limit": 10},
+            get_config_dict_kwargs={"config_name": "test_controller"},
+        )
+        def list_double_numbers(numbers: List[int]) -> List[int]:
+            call_chunk_sizes.append(len(numbers))
+            return [2 * number for number in numbers]
+
+        self.assertEqual(list_double_numbers(numbers=list(range(30))), [2 * number for number in range(30)])
+        self.assertEqual(call_chunk_sizes, [10, 10, 10])
+
+        # 上一次调用无异常，批次大小增长
+        call_chunk_sizes.clear()
+        list_double_numbers(numbers=list(range(30)))
+        self.assertEqual(call_chunk_sizes, [11, 11, 8])
@@ -35,6 +35,7 @@ class HostTool:
             host_id__agent_state_info: typing.Dict[int, str] = update_or_create_host_agent_status(
                 task_id="[fill_agent_state_info_to_hosts]",
                 host_queryset=Host.objects.filter(bk_host_id__in=bk_host_ids),
+                use_cache=True,
             )
         except Exception as e:
             # 获取主机状态信息失败，跳过填充步骤
@@ -8,7 +8,6 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-import asyncio
 import logging
 import random
 import time
@@ -172,8 +171,9 @@ async def execute_cmds_with_asyncssh(login_info: LoginInfo, cmds: typing.List[st
 
 
 def execute_cmds_with_asyncssh_in_sync(login_info: LoginInfo, cmds: typing.List[str]) -> typing.List[str]:
-    loop = asyncio.new_event_loop()
-    return loop.run_until_complete(execute_cmds_with_asyncssh(login_info, cmds))
+    # 同一线程内的多次登录复用事件循环，避免逐台创建
+    runner: concurrent.EventLoopRunner = concurrent.EventLoopRunner.get_thread_runner()
+    return runner.run([execute_cmds_with_asyncssh(login_info, cmds)])[0]
 
 
 @ExceptionHandler(exc_handler=exc_handler)
@@ -12,5 +12,6 @@ specific language governing permissions and limitations under the License.
 from .asyncssh_impl import AsyncsshConn
 from .base import RunOutput
 from .paramiko_impl import ParamikoConn
+from .session_cache import AsyncsshSessionCache, ssh_session_cache
 
-__all__ = ["AsyncsshConn", "ParamikoConn", "RunOutput"]
+__all__ = ["AsyncsshConn", "ParamikoConn", "RunOutput", "AsyncsshSessionCache", "ssh_session_cache"]
@@ -34,6 +34,18 @@ class AsyncsshConn(base.BaseConn):
     def close(self):
         pass
 
+    def is_connected(self) -> bool:
+        # asyncssh 未提供公开的连接状态接口，连接断开后 _transport 会被置空
+        return self._conn is not None and getattr(self._conn, "_transport", None) is not None
+
+    async def aclose(self):
+        """关闭连接并等待关闭完成"""
+        if self._conn is None:
+            return
+        self._conn.close()
+        await self._conn.wait_closed()
+        self._conn = None
+
     async def connect(self):
         client_keys = []
         for client_key_string in self.client_key_strings:
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import asyncio
+import hashlib
+import json
+import time
+import typing
+import weakref
+
+from django.conf import settings
+
+from apps.prometheus import metrics
+from apps.utils import concurrent
+
+from .. import exceptions
+from .asyncssh_impl import AsyncsshConn
+
+
+class AsyncsshSession:
+    """缓存的 SSH 会话"""
+
+    def __init__(self, key: str, conn: AsyncsshConn):
+        self.key = key
+        self.conn = conn
+        # 正在使用该会话的调用方数量
+        self.ref_count: int = 0
+        self.last_used: float = time.monotonic()
+
+    def is_idle_expired(self, idle_ttl: float) -> bool:
+        return self.ref_count == 0 and time.monotonic() - self.last_used > idle_ttl
+
+
+class AsyncsshSessionContext:
+    """会话上下文，进入时从缓存获取已建立的连接，退出时归还"""
+
+    def __init__(self, cache: "AsyncsshSessionCache", conns_init_params: typing.Dict[str, typing.Any]):
+        self.cache = cache
+        self.conns_init_params = conns_init_params
+        self.session: typing.Optional[AsyncsshSession] = None
+
+    async def __aenter__(self) -> AsyncsshConn:
+        self.session = await self.cache.acquire(self.conns_init_params)
+        return self.session.conn
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.cache.release(self.session, exc_val)
+        self.session = None
+
+
+class AsyncsshSessionCache:
+    """
+    SSH 会话缓存，同一主机的多个执行阶段（可用性检查、文件推送、命令执行）复用已认证的连接，避免重复密钥交换及认证
+    - 按 主机 / 端口 / 用户名 / 凭据摘要 区分会话，凭据变更后不会复用旧连接
+    - asyncssh 连接与事件循环绑定，会话按事件循环隔离
+    - 空闲超过 idle_ttl 的会话在下次访问缓存、批量执行结束或空闲回收定时器触发时关闭
+    """
+
+    METHOD = "asyncssh"
+
+    # 出现以下异常时连接不可再复用
+    BROKEN_EXCEPTION_TYPES = (
+        exceptions.SessionError,
+        exceptions.ConnectionLostError,
+        exceptions.DisconnectError,
+        exceptions.RemoteTimeoutError,
+    )
+
+    def __init__(self, idle_ttl: typing.Optional[float] = None):
+        self._idle_ttl = idle_ttl
+        self._loop__key__session_map: typing.MutableMapping[
+            asyncio.AbstractEventLoop, typing.Dict[str, AsyncsshSession]
+        ] = weakref.WeakKeyDictionary()
+        self._loop__key__lock_map: typing.MutableMapping[
+            asyncio.AbstractEventLoop, typing.Dict[str, asyncio.Lock]
+        ] = weakref.WeakKeyDictionary()
+
+    @property
+    def idle_ttl(self) -> float:
+        return (self._idle_ttl, settings.BKAPP_SSH_SESSION_IDLE_TTL)[self._idle_ttl is None]
+
+    @staticmethod
+    def get_key(conns_init_params: typing.Dict[str, typing.Any]) -> str:
+        credential: str = json.dumps(
+            [conns_init_params.get("password"), conns_init_params.get("client_key_strings") or []]
+        )
+        credential_digest: str = hashlib.sha256(credential.encode()).hexdigest()
+        return (
+            f"{conns_init_params['host']}:{conns_init_params['port']}:"
+            f"{conns_init_params['username']}:{credential_digest}"
+        )
+
+    def session(self, **conns_init_params) -> AsyncsshSessionContext:
+        """
+        获取会话，使用方式与 AsyncsshConn 一致
+            async with ssh_session_cache.session(**conns_init_params) as conn:
+                await conn.run(...)
+        :param conns_init_params: AsyncsshConn 初始化参数
+        """
+        return AsyncsshSessionContext(self, conns_init_params)
+
+    async def acquire(self, conns_init_params: typing.Dict[str, typing.Any]) -> AsyncsshSession:
+        loop = asyncio.get_event_loop()
+        key__session_map: typing.Dict[str, AsyncsshSession] = self._loop__key__session_map.setdefault(loop, {})
+        await self.purge_idle_sessions()
+
+        key: str = self.get_key(conns_init_params)
+        # 同一会话串行建立连接，避免并发访问时重复连接
+        key__lock_map: typing.Dict[str, asyncio.Lock] = self._loop__key__lock_map.setdefault(loop, {})
+        lock: asyncio.Lock = key__lock_map.setdefault(key, asyncio.Lock())
+        async with lock:
+            session: typing.Optional[AsyncsshSession] = key__session_map.get(key)
+            if session and session.conn.is_connected():
+                metrics.app_core_remote_session_cache_requests_total.labels(method=self.METHOD, result="hit").inc()
+            else:
+                if session:
+                    await self.evict(session, reason="disconnected")
+                metrics.app_core_remote_session_cache_requests_total.labels(method=self.METHOD, result="miss").inc()
+                conn = AsyncsshConn(**conns_init_params)
+                await conn.connect()
+                session = key__session_map[key] = AsyncsshSession(key, conn)
+            session.ref_count += 1
+            return session
+
+    async def release(self, session: AsyncsshSession, exc: typing.Optional[BaseException] = None):
+        session.ref_count -= 1
+        session.last_used = time.monotonic()
+        if isinstance(exc, self.BROKEN_EXCEPTION_TYPES) or not session.conn.is_connected():
+            await self.evict(session, reason="broken")
+        elif not self.idle_ttl:
+            await self.evict(session, reason="disabled")
+        elif not self.is_cached(session):
+            # 会话已被其他使用方淘汰，由最后一个使用方归还时关闭
+            await self.close_session(session)
+
+    def is_cached(self, session: AsyncsshSession) -> bool:
+        key__session_map: typing.Dict[str, AsyncsshSession] = self._loop__key__session_map.get(
+            asyncio.get_event_loop(), {}
+        )
+        return key__session_map.get(session.key) is session
+
+    async def evict(self, session: AsyncsshSession, reason: str):
+        if self.is_cached(session):
+            self._loop__key__session_map[asyncio.get_event_loop()].pop(session.key)
+            metrics.app_core_remote_session_cache_evictions_total.labels(method=self.METHOD, reason=reason).inc()
+        await self.close_session(session)
+
+    @staticmethod
+    async def close_session(session: AsyncsshSession):
+        # 仍在使用中的会话由最后一个使用方归还时关闭
+        if session.ref_count > 0:
+            return
+        try:
+            await session.conn.aclose()
+        except Exception:
+            pass
+
+    async def purge_idle_sessions(self):
+        key__session_map: typing.Dict[str, AsyncsshSession] = self._loop__key__session_map.get(
+            asyncio.get_event_loop(), {}
+        )
+        for session in list(key__session_map.values()):
+            if session.is_idle_expired(self.idle_ttl):
+                await self.evict(session, reason="idle")
+
+    async def close_sessions(self):
+        """关闭当前事件循环下的全部会话，事件循环关闭前调用"""
+        key__session_map: typing.Dict[str, AsyncsshSession] = self._loop__key__session_map.get(
+            asyncio.get_event_loop(), {}
+        )
+        for session in list(key__session_map.values()):
+            await self.evict(session, reason="loop_closed")
+
+
+ssh_session_cache = AsyncsshSessionCache()
+
+concurrent.register_loop_cleanup(ssh_session_cache.close_sessions)
+concurrent.register_loop_idle_cleanup(
+    ssh_session_cache.purge_idle_sessions, get_idle_ttl=lambda: ssh_session_cache.idle_ttl
+)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import asyncio
+import time
+
+import mock
+from django.test import override_settings
+
+from apps.mock_data import utils
+from apps.utils import concurrent
+from apps.utils.unittest import testcase
+
+from .. import conns, exceptions
+from . import base
+
+
+class AsyncSSHMockAliveClient(base.AsyncSSHMockClient):
+    _transport = object()
+
+    def close(self):
+        self._transport = None
+
+    async def wait_closed(self):
+        pass
+
+
+class AsyncsshSessionCacheTestCase(testcase.CustomBaseTestCase):
+    CONNS_INIT_PARAMS = {"host": utils.DEFAULT_IP, "port": 22, "username": utils.DEFAULT_USERNAME, "password": "123"}
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.connect_mock = mock.patch(
+            base.ASYNCSSH_CONNECT_MOCK_PATH,
+            side_effect=base.get_asyncssh_mock_connect(AsyncSSHMockAliveClient),
+        ).start()
+        self.session_cache = conns.AsyncsshSessionCache(idle_ttl=60)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    async def run_commands(self, conns_init_params, times: int = 2):
+        for __ in range(times):
+            async with self.session_cache.session(**conns_init_params) as conn:
+                await conn.run("echo hello", check=True)
+                async with await conn.file_client() as file_client:
+                    await file_client.makedirs("/tmp")
+
+    def test_reuse(self):
+        self.loop.run_until_complete(self.run_commands(self.CONNS_INIT_PARAMS, times=3))
+        self.assertEqual(self.connect_mock.call_count, 1)
+
+    def test_credential_changed(self):
+        self.loop.run_until_complete(self.run_commands(self.CONNS_INIT_PARAMS, times=1))
+        self.loop.run_until_complete(self.run_commands({**self.CONNS_INIT_PARAMS, "password": "456"}, times=1))
+        self.assertEqual(self.connect_mock.call_count, 2)
+
+    def test_idle_expired(self):
+        self.session_cache = conns.AsyncsshSessionCache(idle_ttl=0.01)
+        self.loop.run_until_complete(self.run_commands(self.CONNS_INIT_PARAMS, times=1))
+        self.loop.run_until_complete(asyncio.sleep(0.02))
+        self.loop.run_until_complete(self.run_commands(self.CONNS_INIT_PARAMS, times=1))
+        self.assertEqual(self.connect_mock.call_count, 2)
+
+    def test_evict_broken_session(self):
+        async def _run():
+            with self.assertRaises(exceptions.SessionError):
+                async with self.session_cache.session(**self.CONNS_INIT_PARAMS):
+                    raise exceptions.SessionError({"err_msg": "channel open failed"})
+            await self.run_commands(self.CONNS_INIT_PARAMS, times=1)
+
+        self.loop.run_until_complete(_run())
+        self.assertEqual(self.connect_mock.call_count, 2)
+
+    def test_isolated_by_event_loop(self):
+        self.loop.run_until_complete(self.run_commands(self.CONNS_INIT_PARAMS, times=1))
+        other_loop = asyncio.new_event_loop()
+        other_loop.run_until_complete(self.run_commands(self.CONNS_INIT_PARAMS, times=1))
+        other_loop.run_until_complete(self.session_cache.close_sessions())
+        other_loop.close()
+        self.assertEqual(self.connect_mock.call_count, 2)
+
+    @override_settings(BKAPP_SSH_SESSION_IDLE_TTL=0.05)
+    def test_closed_without_further_traffic(self):
+        async def _run():
+            async with conns.ssh_session_cache.session(**self.CONNS_INIT_PARAMS) as conn:
+                return conn
+
+        runner = concurrent.EventLoopRunner()
+        self.addCleanup(runner.close)
+        with mock.patch.object(concurrent.EventLoopRunner, "IDLE_CLEANUP_DELAY_MARGIN", 0.05):
+            conn = runner.run([_run()])[0]
+        self.assertTrue(conn.is_connected())
+
+        # 批量执行结束后不再有任何调用，会话在空闲超时后由定时器关闭
+        time.sleep(0.5)
+        self.assertFalse(conn.is_connected())
+        self.assertFalse(runner.idle_cleanup_timer.is_alive())
@@ -601,6 +601,10 @@ LIST_SERVICE_INSTANCE_DETAIL_INTERVAL = 0.2
 REDIS_NEED_DELETE_HOST_IDS_KEY_TPL = f"{settings.APP_CODE}:node_man:need_delete_host_ids:list"
 # 从redis中读取bk_host_ids最大长度
 MAX_HOST_IDS_LENGTH = 5000
+# Agent 状态摘要（状态、版本及连续未变化次数），按主机 ID 存储
+REDIS_AGENT_STATUS_DIGEST_KEY_TPL = f"{settings.APP_CODE}:node_man:agent_status:digest:hash"
+# Agent 状态下一次同步的时间，按主机 ID 存储
+REDIS_AGENT_STATUS_NEXT_SYNC_KEY_TPL = f"{settings.APP_CODE}:node_man:agent_status:next_sync:zset"
 # 操作系统对应账户名
 OS_ACCOUNT = {"LINUX": LINUX_ACCOUNT, "WINDOWS": WINDOWS_ACCOUNT}
 
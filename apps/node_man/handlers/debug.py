@@ -13,7 +13,7 @@ from collections import defaultdict
 from datetime import timedelta
 from itertools import groupby
 from operator import itemgetter
-from typing import Dict, List, Union
+from typing import Any, Dict, List, Set, Union
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
@@ -29,6 +29,7 @@ from apps.node_man.models import (
     Host,
     ProcessStatus,
     Subscription,
+    SubscriptionInstanceLogChunk,
     SubscriptionInstanceRecord,
     SubscriptionInstanceStatusDetail,
     SubscriptionStep,
@@ -206,6 +207,30 @@ class DebugHandler(APIModel):
         count = SubscriptionInstanceRecord.objects.filter(**query_kwargs).count()
         return {"count": count}
 
+    @staticmethod
+    def match_log_chunk_instance_ids(sub_inst_ids: List[int], keyword_list: List[str]) -> Set[int]:
+        # 日志分片可能经过压缩，无法通过 ORM 匹配，需按订阅实例原子拼接存量日志及分片后逐一匹配
+        sub_inst_ids_with_chunk: List[int] = list(
+            SubscriptionInstanceLogChunk.objects.filter(subscription_instance_record_id__in=sub_inst_ids)
+            .values_list("subscription_instance_record_id", flat=True)
+            .distinct()
+        )
+        match_instance_ids: Set[int] = set()
+        for partial_sub_inst_ids in basic.list_slice(sub_inst_ids_with_chunk, limit=500):
+            legacy_logs: Dict[str, str] = {
+                f"{node_id}-{sub_inst_id}": log
+                for sub_inst_id, node_id, log in SubscriptionInstanceStatusDetail.objects.filter(
+                    subscription_instance_record_id__in=partial_sub_inst_ids
+                ).values_list("subscription_instance_record_id", "node_id", "log")
+            }
+            key__log_info_map: Dict[str, Dict[str, Any]] = SubscriptionInstanceLogChunk.fetch_logs(
+                partial_sub_inst_ids, legacy_logs=legacy_logs
+            )
+            for key, log_info in key__log_info_map.items():
+                if all(keyword in log_info["log"] for keyword in keyword_list):
+                    match_instance_ids.add(int(key.rsplit("-", 1)[1]))
+        return match_instance_ids
+
     def track_host_info_by_log_keywords(self, start_time, end_time, keyword_list: List[str]):
         # 通过SubscriptionInstanceRecord 和 SubscriptionInstanceStatusDetail 找出在  start_time 和 end_time 之间的执行变更的主机记录
         # keyword_list: 关键词列表，主要是因为 Orm 不支持正则查询，所以需要通过关键词列表来进行查询
@@ -231,7 +256,9 @@ class DebugHandler(APIModel):
         )
 
         match_regex_instance_ids = [record.subscription_instance_record_id for record in instance_detaile_records]
-        match_regex_instance_ids = list(set(match_regex_instance_ids))
+        match_regex_instance_ids = list(
+            set(match_regex_instance_ids) | self.match_log_chunk_instance_ids(time_scope_instance_ids, keyword_list)
+        )
 
         # 将匹配到的 instance_id 通过 SubscriptionInstanceRecord 的 id 找到对应的记录，并且通过其中的 instance_info 转换为具体的主机
         instance_records = SubscriptionInstanceRecord.objects.filter(
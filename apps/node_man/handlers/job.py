@@ -891,15 +891,27 @@ class JobHandler(APIModel):
         return job_detail
 
     @staticmethod
-    def get_log_base(subscription_id: int, task_id_list: List[int], instance_id: str) -> list:
+    def get_log_base(
+        subscription_id: int,
+        task_id_list: List[int],
+        instance_id: str,
+        log_offsets: Optional[Dict[str, int]] = None,
+        log_tail: Optional[int] = None,
+    ) -> list:
         """
         根据订阅任务ID，实例ID，获取日志
         :param subscription_id: 订阅任务ID
         :param task_id_list: 任务ID列表
         :param instance_id: 实例ID
+        :param log_offsets: 步骤ID - 已读取的日志分片序号，传入后仅返回该序号之后的日志
+        :param log_tail: 仅返回末尾的日志分片数量
         :return: 日志列表
         """
         params = {"subscription_id": subscription_id, "instance_id": instance_id, "task_id_list": task_id_list}
+        if log_offsets:
+            params["log_offsets"] = log_offsets
+        if log_tail:
+            params["log_tail"] = log_tail
         task_result_detail = NodeApi.get_subscription_task_detail(params)
         logs = []
         if task_result_detail.get("steps"):
@@ -910,20 +922,28 @@ class JobHandler(APIModel):
                             "step": step["node_name"],
                             "status": step["status"],
                             "log": step["log"],
+                            "pipeline_id": step.get("pipeline_id"),
+                            "log_seq": step.get("log_seq"),
                             "start_time": step.get("start_time"),
                             "finish_time": step.get("finish_time"),
                         }
                     )
         return logs
 
-    def get_log(self, instance_id: str) -> list:
+    def get_log(
+        self, instance_id: str, log_offsets: Optional[Dict[str, int]] = None, log_tail: Optional[int] = None
+    ) -> list:
         """
         获得日志
         :param instance_id: 实例ID
+        :param log_offsets: 步骤ID - 已读取的日志分片序号，用于增量拉取日志
+        :param log_tail: 仅返回末尾的日志分片数量
         :return: 日志列表
         """
         # 获得并返回日志
-        return JobHandler.get_log_base(self.data.subscription_id, self.data.task_id_list, instance_id)
+        return JobHandler.get_log_base(
+            self.data.subscription_id, self.data.task_id_list, instance_id, log_offsets=log_offsets, log_tail=log_tail
+        )
 
     def collect_log(self, instance_id: int) -> list:
         return NodeApi.collect_subscription_task_detail({"job_id": self.job_id, "instance_id": instance_id})
@@ -19,31 +19,32 @@ import subprocess
 import tarfile
 import traceback
 import uuid
+import zlib
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from distutils.dir_util import copy_tree
 from enum import Enum
 from functools import cmp_to_key, reduce
-from typing import Any, Dict, List, Optional, Set, Union
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import requests
 import six
 from bkcrypto.contrib.django.fields import SymmetricTextField
 from django.conf import settings
 from django.core.cache import cache
-from django.db import models
-from django.db.models import Q, QuerySet
+from django.db import IntegrityError, models, transaction
+from django.db.models import Max, Q, QuerySet
 from django.utils import timezone
 from django.utils.encoding import force_text
 from django.utils.functional import Promise
 from django.utils.translation import get_language
 from django.utils.translation import ugettext_lazy as _
 from django_mysql.models import JSONField
-from jinja2 import Template
 
 from apps.backend.subscription.errors import PipelineExecuteFailed, SubscriptionNotExist
 from apps.backend.subscription.render_functions import get_hosts_by_node
-from apps.backend.utils.data_renderer import nested_render_data
+from apps.backend.utils.data_renderer import get_template, nested_render_data
+from apps.backend.utils.pipeline_tree import get_full_tree
 from apps.core.concurrent.cache import FuncCacheDecorator
 from apps.core.files.storage import get_storage
 from apps.exceptions import ValidationError
@@ -486,6 +487,7 @@ class ProcessStatus(models.Model):
     )
 
     configs = JSONField(_("配置文件"), default=list)
+    configs_fingerprint = models.CharField(_("配置渲染输入指纹"), max_length=32, default="")
     listen_ip = models.CharField(_("监听IP"), max_length=45, null=True)
     listen_port = models.IntegerField(_("监听端口"), null=True)
 
@@ -1676,9 +1678,16 @@ class PluginConfigTemplate(models.Model):
 
         return instance
 
-    def render(self, context):
-        # 先用context渲染自己，把内部参数都渲染上
-        context = nested_render_data(context, context)
+    def render(self, context, is_context_rendered: bool = False):
+        """
+        渲染配置模板
+        :param context: 上下文
+        :param is_context_rendered: 上下文是否已渲染自身，批量渲染时由调用方预先渲染
+        :return: 渲染后的配置内容
+        """
+        if not is_context_rendered:
+            # 先用context渲染自己，把内部参数都渲染上
+            context = nested_render_data(context, context)
 
         # 如果是拨测或远程采集，需要渲染ip，此时需要注入函数
         context = self.render_function(context)
@@ -1713,7 +1722,7 @@ class PluginConfigInstance(models.Model):
         :param name: 名称参数
         :return: 渲染后的结果
         """
-        template = Template(name)
+        template = get_template(name)
         try:
             render_data = json.loads(self.render_data)
         except BaseException as e:
@@ -1754,7 +1763,7 @@ class PluginConfigInstance(models.Model):
     @property
     def jinja_template(self):
         if not hasattr(self, "_jinja_template"):
-            self._jinja_template = Template(self.template.content)
+            self._jinja_template = get_template(self.template.content)
         return self._jinja_template
 
     @property
@@ -2392,6 +2401,202 @@ class SubscriptionInstanceStatusDetail(models.Model):
         ]
 
 
+class SubscriptionInstanceLogChunk(models.Model):
+    """
+    订阅实例步骤日志分片
+    日志仅追加写入，同一订阅实例原子下按 seq 递增排列，拼接后即为完整日志
+    SubscriptionInstanceStatusDetail.log 中的存量日志视为 seq 为 0 的分片
+    """
+
+    # 存量日志（SubscriptionInstanceStatusDetail.log）对应的分片序号
+    LEGACY_SEQ = 0
+    # 追加日志时序号冲突的最大重试次数
+    APPEND_MAX_RETRY_TIMES = 3
+
+    id = models.BigAutoField(primary_key=True)
+    subscription_instance_record_id = models.BigIntegerField(_("订阅实例ID"))
+    node_id = models.CharField(_("Pipeline原子ID"), max_length=50)
+    seq = models.IntegerField(_("分片序号"))
+    content = models.BinaryField(_("日志内容"))
+    is_compressed = models.BooleanField(_("是否压缩"), default=False)
+    create_time = models.DateTimeField(_("创建时间"), default=timezone.now, db_index=True)
+
+    @property
+    def log(self) -> str:
+        content: bytes = bytes(self.content)
+        if self.is_compressed:
+            content = zlib.decompress(content)
+        return content.decode()
+
+    @classmethod
+    def encode_log(cls, log: str) -> Tuple[bytes, bool]:
+        """
+        编码日志，超过阈值且压缩有收益时使用 zlib 压缩
+        :param log: 日志
+        :return: 日志内容，是否压缩
+        """
+        content: bytes = log.encode()
+        compress_threshold: int = settings.BKAPP_SUB_INST_LOG_CHUNK_COMPRESS_THRESHOLD
+        if compress_threshold and len(content) >= compress_threshold:
+            compressed_content: bytes = zlib.compress(content)
+            if len(compressed_content) < len(content):
+                return compressed_content, True
+        return content, False
+
+    @classmethod
+    def bulk_append(cls, node_id: str, sub_inst_id__log_map: Dict[int, str]):
+        """
+        批量追加日志分片
+        序号取当前最大序号递增，并发写入同一订阅实例原子时可能因唯一约束冲突失败，此时重新分配序号并重试
+        :param node_id: Pipeline原子ID
+        :param sub_inst_id__log_map: 订阅实例ID - 待追加日志
+        """
+        if not sub_inst_id__log_map:
+            return
+
+        # 同一批次中相同的日志仅编码一次
+        log__encoded_map: Dict[str, Tuple[bytes, bool]] = {}
+        for log in sub_inst_id__log_map.values():
+            if log not in log__encoded_map:
+                log__encoded_map[log] = cls.encode_log(log)
+
+        for retry_times in range(cls.APPEND_MAX_RETRY_TIMES + 1):
+            sub_inst_id__max_seq_map: Dict[int, int] = dict(
+                cls.objects.filter(node_id=node_id, subscription_instance_record_id__in=sub_inst_id__log_map.keys())
+                .values("subscription_instance_record_id")
+                .annotate(max_seq=Max("seq"))
+                .values_list("subscription_instance_record_id", "max_seq")
+            )
+            log_chunks: List[SubscriptionInstanceLogChunk] = []
+            for sub_inst_id, log in sub_inst_id__log_map.items():
+                content, is_compressed = log__encoded_map[log]
+                log_chunks.append(
+                    cls(
+                        subscription_instance_record_id=sub_inst_id,
+                        node_id=node_id,
+                        seq=sub_inst_id__max_seq_map.get(sub_inst_id, cls.LEGACY_SEQ) + 1,
+                        content=content,
+                        is_compressed=is_compressed,
+                    )
+                )
+            try:
+                # 保证同一批次的分片全部写入或全部回滚，回滚后可安全重试
+                with transaction.atomic():
+                    cls.objects.bulk_create(log_chunks, batch_size=settings.BKAPP_SUB_INST_LOG_CHUNK_BATCH_SIZE)
+                return
+            except IntegrityError:
+                if retry_times >= cls.APPEND_MAX_RETRY_TIMES:
+                    raise
+                logger.warning(
+                    f"[bulk_append] seq conflict, node_id -> {node_id}, retry_times -> {retry_times + 1}, "
+                    f"sub_inst_ids -> {list(sub_inst_id__log_map.keys())[:10]}"
+                )
+
+    @classmethod
+    def archive(cls, node_id: str, sub_inst_ids: Iterable[int]):
+        """
+        归档原子上一次执行的日志分片
+        原子重试时会新建状态详情，上一次执行的分片拼接回此前最新的状态详情后删除，避免与本次执行的日志拼接展示
+        最大序号的分片清空后保留，使序号保持递增，增量读取方已持有的序号仍然有效
+        :param node_id: Pipeline原子ID
+        :param sub_inst_ids: 订阅实例ID列表
+        """
+        for partial_sub_inst_ids in basic.chunk_lists(list(sub_inst_ids), settings.BKAPP_SUB_INST_LOG_CHUNK_BATCH_SIZE):
+            log_chunks = cls.objects.filter(node_id=node_id, subscription_instance_record_id__in=partial_sub_inst_ids)
+            sub_inst_id__logs_map: Dict[int, List[str]] = defaultdict(list)
+            sub_inst_id__last_chunk_id_map: Dict[int, int] = {}
+            for log_chunk in log_chunks.order_by("seq"):
+                sub_inst_id__logs_map[log_chunk.subscription_instance_record_id].append(log_chunk.log)
+                sub_inst_id__last_chunk_id_map[log_chunk.subscription_instance_record_id] = log_chunk.id
+            sub_inst_id__log_map: Dict[int, str] = {
+                sub_inst_id: "".join(logs) for sub_inst_id, logs in sub_inst_id__logs_map.items()
+            }
+            # 仅剩已清空的分片时无需归档
+            sub_inst_id__log_map = {sub_inst_id: log for sub_inst_id, log in sub_inst_id__log_map.items() if log}
+            if not sub_inst_id__log_map:
+                continue
+
+            sub_inst_id__status_detail_map: Dict[int, SubscriptionInstanceStatusDetail] = {
+                status_detail.subscription_instance_record_id: status_detail
+                for status_detail in SubscriptionInstanceStatusDetail.objects.filter(
+                    node_id=node_id, subscription_instance_record_id__in=sub_inst_id__log_map.keys()
+                ).order_by("id")
+            }
+            for sub_inst_id, status_detail in sub_inst_id__status_detail_map.items():
+                status_detail.log += sub_inst_id__log_map[sub_inst_id]
+
+            last_chunk_ids: List[int] = [
+                sub_inst_id__last_chunk_id_map[sub_inst_id] for sub_inst_id in sub_inst_id__log_map
+            ]
+            with transaction.atomic():
+                SubscriptionInstanceStatusDetail.objects.bulk_update(
+                    sub_inst_id__status_detail_map.values(), fields=["log"]
+                )
+                log_chunks.filter(subscription_instance_record_id__in=sub_inst_id__log_map.keys()).exclude(
+                    id__in=last_chunk_ids
+                ).delete()
+                cls.objects.filter(id__in=last_chunk_ids).update(content=b"", is_compressed=False)
+
+    @classmethod
+    def fetch_logs(
+        cls,
+        sub_inst_ids: Iterable[int],
+        legacy_logs: Dict[str, str] = None,
+        log_offsets: Dict[str, int] = None,
+        log_tail: Optional[int] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        读取日志，支持按序号增量读取及仅读取末尾若干分片
+        :param sub_inst_ids: 订阅实例ID列表
+        :param legacy_logs: f"{node_id}-{sub_inst_id}" - 存量日志
+        :param log_offsets: node_id - 已读取的分片序号，仅返回该序号之后的日志
+        :param log_tail: 仅返回末尾的分片数量
+        :return: f"{node_id}-{sub_inst_id}" - {"log": 日志, "log_seq": 已读取的最大分片序号}
+        """
+        legacy_logs = legacy_logs or {}
+        log_offsets = log_offsets or {}
+
+        key__seq_log_tuples_map: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+        for key, legacy_log in legacy_logs.items():
+            key__seq_log_tuples_map[key].append((cls.LEGACY_SEQ, legacy_log))
+
+        log_chunks = cls.objects.filter(subscription_instance_record_id__in=set(sub_inst_ids)).order_by("seq")
+        if log_offsets:
+            # 增量读取时，已读取过的分片无需查询
+            log_chunks = log_chunks.filter(
+                reduce(
+                    operator.or_,
+                    [Q(node_id=node_id, seq__gt=log_offset) for node_id, log_offset in log_offsets.items()],
+                    ~Q(node_id__in=log_offsets.keys()),
+                )
+            )
+        for log_chunk in log_chunks:
+            key__seq_log_tuples_map[f"{log_chunk.node_id}-{log_chunk.subscription_instance_record_id}"].append(
+                (log_chunk.seq, log_chunk.log)
+            )
+
+        key__log_info_map: Dict[str, Dict[str, Any]] = {}
+        for key, seq_log_tuples in key__seq_log_tuples_map.items():
+            node_id: str = key.split("-", 1)[0]
+            seq_log_tuples = [
+                seq_log_tuple
+                for seq_log_tuple in seq_log_tuples
+                if seq_log_tuple[0] > log_offsets.get(node_id, cls.LEGACY_SEQ - 1)
+            ]
+            if log_tail:
+                seq_log_tuples = seq_log_tuples[-log_tail:]
+            key__log_info_map[key] = {
+                "log": "".join(log for __, log in seq_log_tuples),
+                "log_seq": seq_log_tuples[-1][0] if seq_log_tuples else log_offsets.get(node_id, cls.LEGACY_SEQ),
+            }
+        return key__log_info_map
+
+    class Meta:
+        verbose_name = _("订阅实例日志分片")
+        verbose_name_plural = _("订阅实例日志分片")
+        unique_together = [["subscription_instance_record_id", "node_id", "seq"]]
+
+
 class CmdbEventRecord(models.Model):
     """记录CMDB事件回调"""
 
@@ -2416,9 +2621,14 @@ class PipelineTree(models.Model):
     id = models.CharField(_("PipelineID"), primary_key=True, max_length=32)
     tree = LazyJSONField(_("Pipeline拓扑树"))
 
+    @property
+    def full_tree(self) -> Dict[str, Any]:
+        """订阅任务的 Pipeline 树以紧凑形式存储，运行及解析前需展开"""
+        return get_full_tree(self.tree)
+
     def run(self, priority=None):
         # 根据流程描述结构创建流程对象
-        parser = PipelineParser(pipeline_tree=self.tree)
+        parser = PipelineParser(pipeline_tree=self.full_tree)
         pipeline = parser.parse()
         if priority is not None:
             action_result = task_service.run_pipeline(pipeline, priority=priority)
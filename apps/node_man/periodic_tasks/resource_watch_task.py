@@ -12,6 +12,7 @@ import logging
 import random
 import time
 import typing
+from collections import defaultdict
 from functools import wraps
 
 from django.conf import settings
@@ -19,6 +20,7 @@ from django.core.cache import cache
 from django.db.models import Q
 from django.db.utils import IntegrityError
 
+from apps.backend.subscription import scope_snapshot, topo_cache
 from apps.backend.subscription.tools import (
     by_biz_dispatch_task_queue,
     get_biz_ids_gby_queue,
@@ -286,6 +288,20 @@ def apply_resource_watched_events():
             time.sleep(apply_resource_watched_events_controller["seconds_to_wait_for_no_events"])
             continue
 
+        if settings.BKAPP_CMDB_TOPO_CACHE_ENABLED:
+            try:
+                # 主机转移到缓存中不存在的模块，说明业务拓扑已变更
+                invalidate_topo_cache_by_events(events)
+            except Exception as e:
+                logger.exception(f"[{config_key}] invalidate_topo_cache_by_events failed: error -> {e}")
+
+        if settings.BKAPP_SUBSCRIPTION_INCREMENTAL_SCOPE_ENABLED:
+            try:
+                # 收敛前记录变更主机，供订阅增量计算范围
+                record_subscription_scope_deltas(events)
+            except Exception as e:
+                logger.exception(f"[{config_key}] record_subscription_scope_deltas failed: error -> {e}")
+
         events_after_convergence = HostEventPreprocessHelper.event_convergence(events)
 
         logger.info(f"[{config_key}] length of events_after_convergence -> {len(events_after_convergence)}")
@@ -321,6 +337,49 @@ def apply_resource_watched_events():
             ).inc()
 
 
+def invalidate_topo_cache_by_events(events: typing.Iterable[typing.Dict]):
+    """
+    根据主机关系事件使业务模块拓扑缓存失效
+    :param events: 资源监听事件
+    """
+    bk_biz_id__module_ids_map: typing.Dict[int, typing.Set[int]] = defaultdict(set)
+    for event in events:
+        if event["bk_resource"] != constants.ResourceType.host_relation:
+            continue
+        bk_biz_id: typing.Optional[int] = event["bk_detail"].get("bk_biz_id")
+        bk_module_id: typing.Optional[int] = event["bk_detail"].get("bk_module_id")
+        if bk_biz_id and bk_module_id:
+            bk_biz_id__module_ids_map[bk_biz_id].add(bk_module_id)
+
+    for bk_biz_id, bk_module_ids in bk_biz_id__module_ids_map.items():
+        topo_cache.invalidate_if_modules_missing(bk_biz_id, bk_module_ids, reason="resource_watch")
+
+
+def record_subscription_scope_deltas(events: typing.Iterable[typing.Dict]):
+    """
+    按业务记录事件涉及的主机，供订阅增量计算范围
+    主机、主机关系事件可定位到主机；进程事件无法定位到主机，使该业务下的订阅快照失效
+    :param events: 资源监听事件
+    """
+    bk_biz_id__host_ids_map: typing.Dict[int, typing.Set[int]] = defaultdict(set)
+    need_full_biz_ids: typing.Set[int] = set()
+    for event in events:
+        bk_biz_id: typing.Optional[int] = event["bk_detail"].get("bk_biz_id")
+        if not bk_biz_id:
+            continue
+        if event["bk_resource"] == constants.ResourceType.process:
+            need_full_biz_ids.add(bk_biz_id)
+        elif event["bk_detail"].get("bk_host_id"):
+            bk_biz_id__host_ids_map[bk_biz_id].add(event["bk_detail"]["bk_host_id"])
+
+    for bk_biz_id in set(bk_biz_id__host_ids_map) | need_full_biz_ids:
+        scope_snapshot.record_dirty_hosts(
+            bk_biz_id=bk_biz_id,
+            bk_host_ids=bk_biz_id__host_ids_map.get(bk_biz_id, set()),
+            need_full=bk_biz_id in need_full_biz_ids,
+        )
+
+
 def func_debounce_decorator(func):
     """
     函数防抖装饰器
@@ -435,7 +494,7 @@ def trigger_nodeman_subscription(bk_biz_id, debounce_time=0):
     task_queue: str = by_biz_dispatch_task_queue(biz_ids_gby_queue, [bk_biz_id])
 
     update_subscription_instances_chunk.apply_async(
-        kwargs={"subscription_ids": subscription_ids}, countdown=debounce_time, queue=task_queue
+        kwargs={"subscription_ids": subscription_ids, "incremental": True}, countdown=debounce_time, queue=task_queue
     )
 
     logger.info(
@@ -8,6 +8,8 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import json
+import time
 import typing
 from collections import defaultdict
 
@@ -16,50 +18,172 @@ from django.conf import settings
 from django.db.models import QuerySet
 from django.db.transaction import atomic
 
-from apps.adapters.api.gse import get_gse_api_helper
+from apps.adapters.api.gse import GseApiBaseHelper, get_gse_api_helper
+from apps.backend.subscription import tools
+from apps.backend.utils.redis import REDIS_INST
 from apps.core.gray.tools import GrayTools
 from apps.node_man import constants
-from apps.node_man.models import Host, ProcessStatus
+from apps.node_man.models import Host, ProcessStatus, SubscriptionInstanceRecord
 from apps.node_man.periodic_tasks.utils import query_bk_biz_ids
+from apps.prometheus import metrics
+from apps.prometheus.helper import SetupObserve
 from apps.utils.periodic_task import calculate_countdown
 from common.log import logger
 
+HOST_COLUMNS: typing.Tuple[str, ...] = (
+    "bk_host_id",
+    "bk_agent_id",
+    "bk_cloud_id",
+    "inner_ip",
+    "inner_ipv6",
+    "node_from",
+    "ap_id",
+    "bk_biz_id",
+)
+
+
+def get_sync_interval(stable_times: int) -> int:
+    """
+    根据 Agent 状态连续未变化的次数计算同步间隔，每稳定一次间隔翻倍，直至最大间隔
+    :param stable_times: 连续未变化次数
+    :return: 同步间隔（秒）
+    """
+    multiple: int = min(2**stable_times, settings.BKAPP_SYNC_AGENT_STATUS_MAX_INTERVAL_MULTIPLE)
+    return constants.SYNC_AGENT_STATUS_TASK_INTERVAL * multiple
+
+
+def record_agent_status_digest(
+    bk_host_ids: typing.Iterable[int], host_id__agent_state_info: typing.Dict[int, typing.Dict[str, typing.Any]]
+) -> int:
+    """
+    记录 Agent 状态摘要并计算下一次同步时间
+    :param bk_host_ids: 本次同步的主机 ID
+    :param host_id__agent_state_info: 主机 ID - 最新 Agent 状态
+    :return: 状态发生变化的主机数量
+    """
+    now: float = time.time()
+    host_ids: typing.List[int] = list(host_id__agent_state_info.keys())
+    last_digests: typing.List[typing.Optional[bytes]] = (
+        REDIS_INST.hmget(constants.REDIS_AGENT_STATUS_DIGEST_KEY_TPL, host_ids) if host_ids else []
+    )
+
+    changed_count: int = 0
+    host_id__digest_map: typing.Dict[int, str] = {}
+    host_id__next_sync_time_map: typing.Dict[int, float] = {}
+    for bk_host_id, last_digest in zip(host_ids, last_digests):
+        agent_state_info: typing.Dict[str, typing.Any] = host_id__agent_state_info[bk_host_id]
+        status_version: typing.List[str] = [agent_state_info["status_display"], agent_state_info["version"]]
+        stable_times: int = 0
+        if last_digest:
+            last_status, last_version, last_stable_times = json.loads(last_digest)
+            if [last_status, last_version] == status_version:
+                stable_times = min(last_stable_times + 1, settings.BKAPP_SYNC_AGENT_STATUS_MAX_INTERVAL_MULTIPLE)
+        if not stable_times:
+            changed_count += 1
+        host_id__digest_map[bk_host_id] = json.dumps(status_version + [stable_times])
+        host_id__next_sync_time_map[bk_host_id] = now + get_sync_interval(stable_times)
+
+    # 未查询到状态的主机，下一轮重新同步
+    for bk_host_id in set(bk_host_ids) - host_id__agent_state_info.keys():
+        host_id__next_sync_time_map[bk_host_id] = now
+
+    pipeline = REDIS_INST.pipeline(transaction=False)
+    if host_id__digest_map:
+        pipeline.hset(constants.REDIS_AGENT_STATUS_DIGEST_KEY_TPL, mapping=host_id__digest_map)
+    if host_id__next_sync_time_map:
+        pipeline.zadd(constants.REDIS_AGENT_STATUS_NEXT_SYNC_KEY_TPL, host_id__next_sync_time_map)
+    pipeline.execute()
+    return changed_count
+
+
+def query_not_due_host_ids(task_id: str) -> typing.Set[int]:
+    """
+    查询本轮无需同步 Agent 状态的主机
+    - 下一次同步时间晚于下一轮周期任务的主机本轮跳过
+    - 正在执行订阅任务的主机状态变化频繁，每轮同步
+    - 长期未同步的主机已被移除，清理其状态摘要
+    :param task_id: 任务 ID
+    :return: 无需同步的主机 ID 集合
+    """
+    now: float = time.time()
+    expired_host_ids: typing.List[bytes] = REDIS_INST.zrangebyscore(
+        constants.REDIS_AGENT_STATUS_NEXT_SYNC_KEY_TPL,
+        "-inf",
+        now - 2 * constants.SYNC_AGENT_STATUS_TASK_INTERVAL * settings.BKAPP_SYNC_AGENT_STATUS_MAX_INTERVAL_MULTIPLE,
+    )
+    if expired_host_ids:
+        pipeline = REDIS_INST.pipeline(transaction=False)
+        pipeline.hdel(constants.REDIS_AGENT_STATUS_DIGEST_KEY_TPL, *expired_host_ids)
+        pipeline.zrem(constants.REDIS_AGENT_STATUS_NEXT_SYNC_KEY_TPL, *expired_host_ids)
+        pipeline.execute()
+
+    not_due_host_ids: typing.Set[int] = {
+        int(bk_host_id)
+        for bk_host_id in REDIS_INST.zrangebyscore(
+            constants.REDIS_AGENT_STATUS_NEXT_SYNC_KEY_TPL,
+            f"({now + constants.SYNC_AGENT_STATUS_TASK_INTERVAL}",
+            "+inf",
+        )
+    }
+
+    processing_host_ids: typing.Set[int] = set()
+    for instance_id in SubscriptionInstanceRecord.objects.filter(
+        is_latest=True, status__in=constants.JobStatusType.PROCESSING_STATUS
+    ).values_list("instance_id", flat=True):
+        host_key: str = tools.parse_node_id(instance_id)["id"]
+        if host_key.isdigit():
+            processing_host_ids.add(int(host_key))
+
+    logger.info(
+        f"{task_id} | sync_agent_status_task: not due host count -> {len(not_due_host_ids)}, "
+        f"processing host count -> {len(processing_host_ids)}, expired host count -> {len(expired_host_ids)}"
+    )
+    return not_due_host_ids - processing_host_ids
+
 
 @task(queue="default", ignore_result=True)
-def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet):
+@SetupObserve(histogram=metrics.app_sync_agent_status_duration_seconds)
+def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet, use_cache: bool = False):
     """
     更新 Agent 状态
+    主机信息按列读取，状态比对基于 (bk_host_id, status, version) 集合差集，仅写入发生变化的记录
     :param task_id: 任务 ID
     :param host_queryset: 主机查询条件
+    :param use_cache: 是否允许使用 Agent 状态短时缓存
     :return:
     """
-    hosts: typing.List[typing.Dict[str, typing.Any]] = list(
-        host_queryset.values(
-            "bk_host_id", "bk_agent_id", "bk_cloud_id", "inner_ip", "inner_ipv6", "node_from", "ap_id", "bk_biz_id"
-        )
-    )
-    if not hosts:
+    host_rows: typing.List[typing.Tuple] = list(host_queryset.values_list(*HOST_COLUMNS))
+    if not host_rows:
         # 结束递归
         return
 
+    host_columns: typing.Dict[str, typing.Tuple] = dict(zip(HOST_COLUMNS, zip(*host_rows)))
+    bk_host_ids: typing.Tuple[int, ...] = host_columns["bk_host_id"]
     logger.info(
         f"{task_id} | sync_agent_status_task: Start updating agent status, "
-        f"start Host ID -> {hosts[0]['bk_host_id']}, count -> {len(hosts)}"
+        f"start Host ID -> {bk_host_ids[0]}, count -> {len(bk_host_ids)}"
     )
 
-    # 通过管控区域：内网形式对应bk_host_id&node_from
-    agent_id__host_id_map: typing.Dict[str, int] = {}
-    agent_id__node_from_map: typing.Dict[str, str] = {}
-
-    # 生成查询参数host弄表
     # 需要区分 GSE 版本，(区分方式：灰度业务 or 灰度接入点) -> 使用 V2 API，其他情况 -> 使用 V1 API
+    # GSE 版本仅取决于 (业务, 接入点)，按去重后的组合计算，ApiHelper 按版本复用
     gray_tools_instance: GrayTools = GrayTools()
+    biz_ap__gse_version_map: typing.Dict[typing.Tuple[int, int], str] = {
+        (bk_biz_id, ap_id): gray_tools_instance.get_host_ap_gse_version(bk_biz_id, ap_id)
+        for bk_biz_id, ap_id in set(zip(host_columns["bk_biz_id"], host_columns["ap_id"]))
+    }
+    gse_version__api_helper_map: typing.Dict[str, GseApiBaseHelper] = {
+        gse_version: get_gse_api_helper(gse_version) for gse_version in set(biz_ap__gse_version_map.values())
+    }
+
+    # 通过管控区域：内网形式对应bk_host_id&node_from
+    agent_id__host_id_map: typing.Dict[str, int] = {}
+    cmdb_host_ids: typing.Set[int] = set()
     gse_version__query_hosts_map: typing.Dict[str, typing.List[typing.Dict]] = defaultdict(list)
-    for host in hosts:
-        gse_version = gray_tools_instance.get_host_ap_gse_version(host["bk_biz_id"], host["ap_id"])
-        agent_id = get_gse_api_helper(gse_version).get_agent_id(host)
-        agent_id__host_id_map[agent_id] = host["bk_host_id"]
-        agent_id__node_from_map[agent_id] = host["node_from"]
+    for host in (dict(zip(HOST_COLUMNS, host_row)) for host_row in host_rows):
+        gse_version: str = biz_ap__gse_version_map[(host["bk_biz_id"], host["ap_id"])]
+        agent_id__host_id_map[gse_version__api_helper_map[gse_version].get_agent_id(host)] = host["bk_host_id"]
+        if host["node_from"] == constants.NodeFrom.CMDB:
+            cmdb_host_ids.add(host["bk_host_id"])
         gse_version__query_hosts_map[gse_version].append(
             {
                 "ip": host["inner_ip"] or host["inner_ipv6"],
@@ -70,79 +194,68 @@ def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet):
 
     agent_id__agent_state_info_map: typing.Dict[str, typing.Dict] = {}
     for gse_version, query_hosts in gse_version__query_hosts_map.items():
-        gse_api_helper = get_gse_api_helper(gse_version)
-        agent_id__agent_state_info_map.update(gse_api_helper.list_agent_state(query_hosts))
+        agent_id__agent_state_info_map.update(
+            gse_version__api_helper_map[gse_version].list_agent_state(query_hosts, use_cache=use_cache)
+        )
+
+    # 计算最新状态
+    host_id__agent_state_info: typing.Dict[int, typing.Dict[str, typing.Any]] = {}
+    alive_host_ids: typing.Set[int] = set()
+    for agent_id, agent_state_info in agent_id__agent_state_info_map.items():
+        bk_host_id: int = agent_id__host_id_map[agent_id]
+        if agent_state_info["bk_agent_alive"] == constants.BkAgentStatus.ALIVE.value:
+            alive_host_ids.add(bk_host_id)
+            status = constants.ProcStateType.RUNNING
+        elif bk_host_id in cmdb_host_ids:
+            # Agent 未存活且主机来源于 CMDB，标记为未安装
+            status = constants.ProcStateType.NOT_INSTALLED
+        else:
+            # Agent 未存活且主机来源于自身，标记为终止
+            status = constants.ProcStateType.TERMINATED
+        agent_state_info["status_display"] = status
+        host_id__agent_state_info[bk_host_id] = agent_state_info
+
+    # 如果后面需要添加更多的 Agent 状态属性，此处需要进行变更
+    latest_rows: typing.Set[typing.Tuple[int, str, str]] = {
+        (bk_host_id, agent_state_info["status_display"], agent_state_info["version"])
+        for bk_host_id, agent_state_info in host_id__agent_state_info.items()
+    }
 
     # 查询需要更新主机的ProcessStatus对象
-    process_status_infos: typing.List[typing.Dict[str, typing.Any]] = ProcessStatus.objects.filter(
+    host_id__process_status_id_map: typing.Dict[int, int] = {}
+    recorded_rows: typing.Set[typing.Tuple[int, str, str]] = set()
+    to_be_delete_process_status_ids: typing.List[int] = []
+    for process_status_id, bk_host_id, status, version in ProcessStatus.objects.filter(
         name=ProcessStatus.GSE_AGENT_PROCESS_NAME,
         bk_host_id__in=agent_id__host_id_map.values(),
         source_type=ProcessStatus.SourceType.DEFAULT,
-    ).values("bk_host_id", "id", "status", "version")
-
-    recorded_host_ids: typing.Set[int] = set()
-    to_be_delete_process_status_ids: typing.List[int] = []
-    host_id__process_status_info_map: typing.Dict[int, typing.Dict[str, typing.Any]] = {}
-    for process_status_info in process_status_infos:
-        bk_host_id: int = process_status_info["bk_host_id"]
-        if bk_host_id in recorded_host_ids:
+    ).values_list("id", "bk_host_id", "status", "version"):
+        if bk_host_id in host_id__process_status_id_map:
             # 重复进程状态信息，暂存 id 后续删除
-            to_be_delete_process_status_ids.append(process_status_info["id"])
+            to_be_delete_process_status_ids.append(process_status_id)
             continue
-        recorded_host_ids.add(bk_host_id)
-        host_id__process_status_info_map[process_status_info["bk_host_id"]] = {
-            "id": process_status_info["id"],
-            "status": process_status_info["status"],
-            "version": process_status_info["version"],
-        }
-
-    # 对查询回来的数据进行分类
-    not_need_to_be_updated_process_status_count: int = 0
-    to_be_updated_node_from_host_objs: typing.List[Host] = []
-    to_be_updated_process_status_objs: typing.List[ProcessStatus] = []
-    to_be_created_process_status_objs: typing.List[ProcessStatus] = []
-    host_id__agent_state_info: typing.Dict[int, typing.Dict[str, int]] = {}
-    for agent_id, agent_state_info in agent_id__agent_state_info_map.items():
-        process_status_info: typing.Optional[typing.Dict[str, typing.Any]] = host_id__process_status_info_map.get(
-            agent_id__host_id_map[agent_id]
-        )
-        is_running: bool = agent_state_info["bk_agent_alive"] == constants.BkAgentStatus.ALIVE.value
-        version: str = agent_state_info["version"]
+        host_id__process_status_id_map[bk_host_id] = process_status_id
+        recorded_rows.add((bk_host_id, status, version))
 
-        if is_running:
-            status = constants.ProcStateType.RUNNING
-            if agent_id__node_from_map[agent_id] == constants.NodeFrom.CMDB:
-                # Agent 状态正常的情况下，节点管控权划至节点管理
-                to_be_updated_node_from_host_objs.append(
-                    Host(bk_host_id=agent_id__host_id_map[agent_id], node_from=constants.NodeFrom.NODE_MAN)
-                )
-        else:
-            # Agent 未存活时，细分异常状态
-            if agent_id__node_from_map[agent_id] == constants.NodeFrom.CMDB:
-                # 主机来源于 CMDB，标记为未安装
-                status = constants.ProcStateType.NOT_INSTALLED
-            else:
-                # 主机来源于自身，标记为终止
-                status = constants.ProcStateType.TERMINATED
-
-        agent_state_info["status_display"] = status
-        host_id__agent_state_info[agent_id__host_id_map[agent_id]] = agent_state_info
-
-        if not process_status_info:
-            # 如果不存在 ProcessStatus 对象需要创建
-            to_be_created_process_status_objs.append(
-                ProcessStatus(bk_host_id=agent_id__host_id_map[agent_id], status=status, version=version)
-            )
-        else:
-            if status == process_status_info["status"] and version == process_status_info["version"]:
-                # 状态信息一致，无需更新
-                # 如果后面需要添加更多的 Agent 状态属性，此处需要进行变更
-                not_need_to_be_updated_process_status_count += 1
-                continue
-            to_be_updated_process_status_objs.append(
-                ProcessStatus(id=process_status_info["id"], status=status, version=version)
-            )
+    # 差集即为需要写入的记录，状态信息一致的记录无需更新
+    changed_rows: typing.Set[typing.Tuple[int, str, str]] = latest_rows - recorded_rows
+    to_be_updated_process_status_objs: typing.List[ProcessStatus] = [
+        ProcessStatus(id=host_id__process_status_id_map[bk_host_id], status=status, version=version)
+        for bk_host_id, status, version in changed_rows
+        if bk_host_id in host_id__process_status_id_map
+    ]
+    to_be_created_process_status_objs: typing.List[ProcessStatus] = [
+        ProcessStatus(bk_host_id=bk_host_id, status=status, version=version)
+        for bk_host_id, status, version in changed_rows
+        if bk_host_id not in host_id__process_status_id_map
+    ]
+    # Agent 状态正常的情况下，节点管控权划至节点管理
+    to_be_updated_node_from_host_objs: typing.List[Host] = [
+        Host(bk_host_id=bk_host_id, node_from=constants.NodeFrom.NODE_MAN)
+        for bk_host_id in alive_host_ids & cmdb_host_ids
+    ]
 
+    not_need_to_be_updated_process_status_count: int = len(latest_rows) - len(changed_rows)
     logger.info(
         f"{task_id} | sync_agent_status_task: Not need to update record "
         f"count -> {not_need_to_be_updated_process_status_count}"
@@ -161,9 +274,22 @@ def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet):
         if to_be_delete_process_status_ids:
             __, delete_row_count = ProcessStatus.objects.filter(id__in=to_be_delete_process_status_ids).delete()
             logger.info(f"{task_id} | sync_agent_status_task: Deleted {delete_row_count} duplicate records")
+
+    if settings.BKAPP_SYNC_AGENT_STATUS_INCREMENTAL_ENABLED:
+        changed_count: int = record_agent_status_digest(bk_host_ids, host_id__agent_state_info)
+        logger.info(f"{task_id} | sync_agent_status_task: Recorded digest, changed host count -> {changed_count}")
+
+    for result, count in [
+        ("unchanged", not_need_to_be_updated_process_status_count),
+        ("updated", len(to_be_updated_process_status_objs)),
+        ("created", len(to_be_created_process_status_objs)),
+        ("missing", len(bk_host_ids) - len(host_id__agent_state_info)),
+    ]:
+        metrics.app_sync_agent_status_hosts_total.labels(result=result).inc(count)
+
     logger.info(
         f"{task_id} | sync_agent_status_task: Complete agent status update, "
-        f"start Host ID -> {hosts[0]['bk_host_id']}, count -> {len(hosts)}"
+        f"start Host ID -> {bk_host_ids[0]}, count -> {len(bk_host_ids)}"
     )
 
     return host_id__agent_state_info
@@ -186,10 +312,20 @@ def sync_agent_status_periodic_task():
     # 若没有指定业务时，也同步资源池主机
     bk_biz_ids.append(settings.BK_CMDB_RESOURCE_POOL_BIZ_ID)
 
+    # 增量模式下，按主机最近的状态变化分层同步，跳过未到同步时间的主机
+    not_due_host_ids: typing.Set[int] = set()
+    if settings.BKAPP_SYNC_AGENT_STATUS_INCREMENTAL_ENABLED:
+        not_due_host_ids = query_not_due_host_ids(task_id)
+
     for bk_biz_id in bk_biz_ids:
 
         host_queryset = Host.objects.filter(bk_biz_id=bk_biz_id)
-        count = host_queryset.count()
+        # 按主机 ID 区间分片，避免 offset 分页在主机量大时的深分页查询
+        bk_host_ids: typing.List[int] = list(host_queryset.order_by("bk_host_id").values_list("bk_host_id", flat=True))
+        biz_host_count: int = len(bk_host_ids)
+        bk_host_ids = [bk_host_id for bk_host_id in bk_host_ids if bk_host_id not in not_due_host_ids]
+        count = len(bk_host_ids)
+        metrics.app_sync_agent_status_skipped_hosts_total.inc(biz_host_count - count)
 
         if count == 0:
             logger.info(f"{task_id} | sync_agent_status_task: bk_biz_id -> {bk_biz_id}, host_count -> {count}, skip")
@@ -207,8 +343,15 @@ def sync_agent_status_periodic_task():
                 duration=constants.SYNC_AGENT_STATUS_TASK_INTERVAL,
             )
             logger.info(f"{task_id} | sync_agent_status_task: bk_biz_id -> {bk_biz_id}, sync after {countdown} seconds")
-            update_or_create_host_agent_status.apply_async(
-                (task_id, host_queryset[start : start + constants.QUERY_AGENT_STATUS_HOST_LENS]), countdown=countdown
-            )
+            shard_host_ids: typing.List[int] = bk_host_ids[start : start + constants.QUERY_AGENT_STATUS_HOST_LENS]
+            if count < biz_host_count:
+                # 存在跳过的主机时，区间内的主机 ID 不连续，按主机 ID 查询
+                shard_host_queryset = host_queryset.filter(bk_host_id__in=shard_host_ids)
+            else:
+                shard_host_queryset = host_queryset.filter(
+                    bk_host_id__gte=shard_host_ids[0], bk_host_id__lte=shard_host_ids[-1]
+                )
+            update_or_create_host_agent_status.apply_async((task_id, shard_host_queryset), countdown=countdown)
+        metrics.app_sync_agent_status_dispatched_hosts_total.inc(count)
 
         logger.info(f"{task_id} | sync_agent_status_task: sync agent status complete")
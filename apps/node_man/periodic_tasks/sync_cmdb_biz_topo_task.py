@@ -15,6 +15,7 @@ from celery.task import periodic_task, task
 from django.conf import settings
 from django.core.cache import cache
 
+from apps.backend.subscription import topo_cache
 from apps.component.esbclient import client_v2
 from apps.node_man import constants
 from apps.node_man.handlers import cmdb
@@ -102,6 +103,8 @@ def get_and_cache_format_biz_topo(bk_biz_id: int) -> dict:
     }
     """
     cmdb_tools = cmdb.CmdbHandler()
+    # 拉取前读取版本号，拉取期间拓扑失效时，写入的旧版本数据不会被读取
+    topo_version: int = topo_cache.get_version(bk_biz_id)
     biz_topo_list = cmdb_tools.cmdb_biz_inst_topo(bk_biz_id)
     if not biz_topo_list:
         return {"biz_format_topo": {}, "biz_nodes": []}
@@ -110,6 +113,12 @@ def get_and_cache_format_biz_topo(bk_biz_id: int) -> dict:
     # 空闲机 & 故障机节点补充到业务拓扑中
     free_topo = cmdb_tools.cmdb_biz_free_inst_topo(bk_biz_id)
     logger.info(f"sync_cmdb_biz_topo_task: {free_topo}")
+
+    if settings.BKAPP_CMDB_TOPO_CACHE_ENABLED and "bk_set_id" in free_topo:
+        # 复用本次拉取的拓扑刷新模块拓扑缓存，供订阅范围计算使用
+        topo_cache.save_module_to_topo_dict(
+            bk_biz_id, topo_version, topo_cache.build_module_to_topo_dict(bk_biz_id, biz_topo_list, free_topo)
+        )
     free_modules = []
     if free_topo.get("module", []):
         modules = free_topo.get("module", [])
@@ -29,7 +29,7 @@ from apps.node_man.periodic_tasks.utils import (
     get_sync_host_ap_map_config,
     query_bk_biz_ids,
 )
-from apps.utils.batch_request import batch_request
+from apps.utils.batch_request import batch_request, batch_request_iter
 from apps.utils.concurrent import batch_call, batch_call_serial
 from common.log import logger
 
@@ -62,14 +62,8 @@ def query_biz_hosts(bk_biz_id: int, bk_host_ids: typing.List[int]) -> typing.Lis
     return hosts
 
 
-def _list_biz_hosts(biz_id: int, start: int) -> dict:
-    biz_hosts = client_v2.cc.list_biz_hosts(
-        {
-            "bk_biz_id": biz_id,
-            "fields": constants.CC_HOST_FIELDS,
-            "page": {"start": start, "limit": constants.QUERY_CMDB_LIMIT, "sort": "bk_host_id"},
-        }
-    )
+def _list_biz_hosts(params: typing.Dict) -> dict:
+    biz_hosts = client_v2.cc.list_biz_hosts(params)
     # 去除内网IP为空的主机
     biz_hosts["info"] = [
         host for host in biz_hosts["info"] if host.get("bk_host_innerip") or host.get("bk_host_innerip_v6")
@@ -77,14 +71,9 @@ def _list_biz_hosts(biz_id: int, start: int) -> dict:
     return biz_hosts
 
 
-def _list_resource_pool_hosts(start):
+def _list_resource_pool_hosts(params: typing.Dict) -> dict:
     try:
-        result = client_v2.cc.list_resource_pool_hosts(
-            {
-                "page": {"start": start, "limit": constants.QUERY_CMDB_LIMIT, "sort": "bk_host_id"},
-                "fields": constants.CC_HOST_FIELDS,
-            }
-        )
+        result = client_v2.cc.list_resource_pool_hosts(params)
         return result
     except ComponentCallError:
         return {"info": []}
@@ -430,27 +419,31 @@ def bulk_differential_sync_biz_hosts(expected_bk_host_ids_gby_bk_biz_id: typing.
     batch_call(func=sync_biz_incremental_hosts, params_list=params_list)
 
 
-def _update_or_create_host(biz_id, ap_map_config: SyncHostApMapConfig, is_gse2_gray=False, start=0, task_id=None):
+def _update_or_create_host(biz_id, ap_map_config: SyncHostApMapConfig, is_gse2_gray=False, task_id=None):
     if biz_id == settings.BK_CMDB_RESOURCE_POOL_BIZ_ID:
-        cc_result = _list_resource_pool_hosts(start)
+        query_hosts_func = _list_resource_pool_hosts
+        query_params = {"fields": constants.CC_HOST_FIELDS}
     else:
-        cc_result = _list_biz_hosts(biz_id, start)
-
-    host_data = cc_result.get("info") or []
-    host_count = cc_result.get("count", 0)
-
-    logger.info(
-        f"[sync_cmdb_host] update_or_create_host: task_id -> {task_id}, bk_biz_id -> {biz_id}, "
-        f"host_count -> {host_count}, range -> {start}-{start + constants.QUERY_CMDB_LIMIT}"
-    )
-
-    bk_host_ids = update_or_create_host_base(biz_id, ap_map_config, is_gse2_gray, task_id, host_data)
-
-    # 递归
-    if host_count > start + constants.QUERY_CMDB_LIMIT:
-        bk_host_ids += _update_or_create_host(
-            biz_id, ap_map_config, is_gse2_gray, start + constants.QUERY_CMDB_LIMIT, task_id=task_id
+        query_hosts_func = _list_biz_hosts
+        query_params = {"bk_biz_id": biz_id, "fields": constants.CC_HOST_FIELDS}
+
+    bk_host_ids: typing.List[int] = []
+    # 逐页拉取并落库，处理完的分页即可释放，避免大业务下全量主机数据常驻内存
+    for page_idx, host_data in enumerate(
+        batch_request_iter(
+            query_hosts_func,
+            query_params,
+            get_count=lambda x: x.get("count", 0),
+            limit=constants.QUERY_CMDB_LIMIT,
+            sort="bk_host_id",
+        )
+    ):
+        start = page_idx * constants.QUERY_CMDB_LIMIT
+        logger.info(
+            f"[sync_cmdb_host] update_or_create_host: task_id -> {task_id}, bk_biz_id -> {biz_id}, "
+            f"range -> {start}-{start + constants.QUERY_CMDB_LIMIT}"
         )
+        bk_host_ids += update_or_create_host_base(biz_id, ap_map_config, is_gse2_gray, task_id, host_data)
 
     return bk_host_ids
 
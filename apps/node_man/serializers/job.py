@@ -563,3 +563,17 @@ class JobInstancesOperateSerializer(serializers.Serializer):
 
 class JobInstanceOperateSerializer(serializers.Serializer):
     instance_id = serializers.CharField(label=_("任务实例ID"))
+
+
+class JobLogSerializer(JobInstanceOperateSerializer):
+    log_offsets = serializers.JSONField(
+        label=_("步骤ID - 已读取的日志分片序号"), binary=True, required=False, help_text=_("JSON 格式，用于增量拉取日志")
+    )
+    log_tail = serializers.IntegerField(label=_("仅返回末尾的日志分片数量"), min_value=1, required=False)
+
+    def validate_log_offsets(self, log_offsets):
+        if not isinstance(log_offsets, dict) or not all(
+            isinstance(log_offset, int) and log_offset >= 0 for log_offset in log_offsets.values()
+        ):
+            raise ValidationError(_("log_offsets 需为步骤ID到日志分片序号的映射"))
+        return log_offsets
@@ -8,11 +8,13 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import json
 from unittest.mock import patch
 
 from django.conf import settings
 from django.test import override_settings
 
+from apps.backend.utils.redis import REDIS_INST
 from apps.mock_data.api_mkd.gse.unit import GSE_PROCESS_VERSION
 from apps.mock_data.api_mkd.gse.utils import GseApiMockClient, get_gse_api_helper
 from apps.mock_data.common_unit.host import (
@@ -22,6 +24,8 @@ from apps.mock_data.common_unit.host import (
 from apps.node_man import constants
 from apps.node_man.models import Host, ProcessStatus
 from apps.node_man.periodic_tasks.sync_agent_status_task import (
+    get_sync_interval,
+    query_not_due_host_ids,
     sync_agent_status_periodic_task,
     update_or_create_host_agent_status,
 )
@@ -54,6 +58,19 @@ class TestSyncAgentStatus(CustomBaseTestCase):
         host = Host.objects.get(bk_host_id=host.bk_host_id)
         self.assertEqual(host.node_from, constants.NodeFrom.NODE_MAN)
 
+    @patch(
+        "apps.node_man.periodic_tasks.sync_agent_status_task.get_gse_api_helper",
+        get_gse_api_helper(settings.GSE_VERSION, GseApiMockClient()),
+    )
+    def test_update_or_create_host_agent_status_unchanged(self):
+        Host.objects.create(**HOST_MODEL_DATA)
+        update_or_create_host_agent_status(None, Host.objects.all())
+        # 状态未发生变化时不写入记录
+        with patch.object(ProcessStatus.objects, "bulk_update") as bulk_update:
+            update_or_create_host_agent_status(None, Host.objects.all())
+        bulk_update.assert_called_once_with([], fields=["version", "status"], batch_size=1000)
+        self.assertEqual(ProcessStatus.objects.count(), 1)
+
     @patch(
         "apps.node_man.periodic_tasks.sync_agent_status_task.get_gse_api_helper",
         get_gse_api_helper(
@@ -101,3 +118,30 @@ class TestSyncAgentStatus(CustomBaseTestCase):
         update_or_create_host_agent_status(None, Host.objects.all())
         process_status = ProcessStatus.objects.get(bk_host_id=host.bk_host_id)
         self.assertEqual(process_status.status, constants.ProcStateType.NOT_INSTALLED)
+
+    @override_settings(
+        BKAPP_SYNC_AGENT_STATUS_INCREMENTAL_ENABLED=True, BKAPP_SYNC_AGENT_STATUS_MAX_INTERVAL_MULTIPLE=8
+    )
+    @patch(
+        "apps.node_man.periodic_tasks.sync_agent_status_task.get_gse_api_helper",
+        get_gse_api_helper(settings.GSE_VERSION, GseApiMockClient()),
+    )
+    def test_update_or_create_host_agent_status_incremental(self):
+        REDIS_INST.delete(constants.REDIS_AGENT_STATUS_DIGEST_KEY_TPL, constants.REDIS_AGENT_STATUS_NEXT_SYNC_KEY_TPL)
+        host = Host.objects.create(**HOST_MODEL_DATA)
+
+        # 首次同步视为状态变化，下一轮照常同步
+        update_or_create_host_agent_status(None, Host.objects.all())
+        self.assertEqual(query_not_due_host_ids(None), set())
+
+        # 状态稳定后降低同步频率
+        update_or_create_host_agent_status(None, Host.objects.all())
+        digest = REDIS_INST.hget(constants.REDIS_AGENT_STATUS_DIGEST_KEY_TPL, host.bk_host_id)
+        self.assertEqual(json.loads(digest), [constants.ProcStateType.RUNNING, GSE_PROCESS_VERSION, 1])
+        self.assertEqual(query_not_due_host_ids(None), {host.bk_host_id})
+
+    @override_settings(BKAPP_SYNC_AGENT_STATUS_MAX_INTERVAL_MULTIPLE=8)
+    def test_get_sync_interval(self):
+        self.assertEqual(get_sync_interval(0), constants.SYNC_AGENT_STATUS_TASK_INTERVAL)
+        self.assertEqual(get_sync_interval(2), 4 * constants.SYNC_AGENT_STATUS_TASK_INTERVAL)
+        self.assertEqual(get_sync_interval(8), 8 * constants.SYNC_AGENT_STATUS_TASK_INTERVAL)
@@ -24,6 +24,7 @@ from apps.node_man.serializers.job import (
     InstallSerializer,
     JobInstanceOperateSerializer,
     JobInstancesOperateSerializer,
+    JobLogSerializer,
     ListSerializer,
     OperateSerializer,
     RetrieveSerializer,
@@ -224,11 +225,11 @@ class JobViewSet(ModelViewSet):
 
     @swagger_auto_schema(
         operation_summary="查询日志",
-        query_serializer=JobInstanceOperateSerializer(),
+        query_serializer=JobLogSerializer(),
         responses={status.HTTP_200_OK: response.JobLogResponseSerializer()},
         tags=JOB_VIEW_TAGS,
     )
-    @action(detail=True, serializer_class=JobInstanceOperateSerializer)
+    @action(detail=True, serializer_class=JobLogSerializer)
     def log(self, request, *args, **kwargs):
         """
         @api {GET} /job/{{pk}}/log/ 查询日志
@@ -236,6 +237,8 @@ class JobViewSet(ModelViewSet):
         @apiGroup Job
         @apiParam {Number} job_id 任务ID
         @apiParam {Number} instance_id 实例ID
+        @apiParam {String} [log_offsets] 步骤ID - 已读取的日志分片序号（JSON），传入后仅返回该序号之后的日志
+        @apiParam {Number} [log_tail] 仅返回末尾的日志分片数量
         @apiParamExample {Json} 重装、升级等请求参数
         {
             "bk_host_id": 1
@@ -245,16 +248,25 @@ class JobViewSet(ModelViewSet):
             {
                 "step": "检查网络连通性",
                 "status": "success",
-                "log": "checking network……\nok"
+                "log": "checking network……\nok",
+                "pipeline_id": "6f48169ed1193574961757a57d03a778",
+                "log_seq": 2
             },
             {
                 "step": "检查用户",
                 "status": "success",
-                "log": "checking user……\nusername is root\nok"
+                "log": "checking user……\nusername is root\nok",
+                "pipeline_id": "a3a5d4a1e1d53f1a8a3f77b9ed6d9e0b",
+                "log_seq": 3
             }
         ]
         """
-        return Response(JobHandler(job_id=kwargs["pk"]).get_log(request.query_params["instance_id"]))
+        params = self.validated_data
+        return Response(
+            JobHandler(job_id=kwargs["pk"]).get_log(
+                params["instance_id"], log_offsets=params.get("log_offsets"), log_tail=params.get("log_tail")
+            )
+        )
 
     @swagger_auto_schema(
         operation_summary="查询日志",
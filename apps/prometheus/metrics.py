@@ -94,6 +94,27 @@ app_task_instances_migrate_reasons_total = Counter(
     namespace=NAMESPACE,
 )
 
+app_task_subscription_scope_resolutions_total = Counter(
+    name="app_task_subscription_scope_resolutions_total",
+    documentation="Cumulative count of subscription scope resolutions per mode, per fallback reason.",
+    labelnames=["mode", "reason"],
+    namespace=NAMESPACE,
+)
+
+app_task_topo_cache_requests_total = Counter(
+    name="app_task_topo_cache_requests_total",
+    documentation="Cumulative count of biz module topo cache requests per result.",
+    labelnames=["result"],
+    namespace=NAMESPACE,
+)
+
+app_task_topo_cache_invalidations_total = Counter(
+    name="app_task_topo_cache_invalidations_total",
+    documentation="Cumulative count of biz module topo cache invalidations per reason.",
+    labelnames=["reason"],
+    namespace=NAMESPACE,
+)
+
 app_task_get_instances_by_scope_duration_seconds = Histogram(
     name="app_task_get_instances_by_scope_duration_seconds",
     documentation="Histogram of the time (in seconds) each get instances per source",
@@ -153,6 +174,70 @@ app_task_engine_get_common_data_duration_seconds = Histogram(
     labelnames=["step_type"],
 )
 
+app_task_engine_common_data_cache_total = Counter(
+    name="app_task_engine_common_data_cache_total",
+    documentation="Cumulative count of node scoped common data cache lookups per result.",
+    labelnames=["result"],
+)
+
+app_task_engine_render_and_push_config_duration_seconds = Histogram(
+    name="app_task_engine_render_and_push_config_duration_seconds",
+    documentation="Histogram of the time (in seconds) each render and push config phase per phase.",
+    buckets=get_histogram_buckets_from_env("BKAPP_MONITOR_METRICS_ENGINE_BUCKETS"),
+    labelnames=["phase"],
+)
+
+app_task_engine_log_records_total = Counter(
+    name="app_task_engine_log_records_total",
+    documentation="Cumulative count of buffered engine log records per result.",
+    labelnames=["result"],
+)
+
+app_task_engine_log_backpressure_total = Counter(
+    name="app_task_engine_log_backpressure_total",
+    documentation="Cumulative count of engine log buffer full events that flush synchronously.",
+)
+
+app_task_engine_log_buffered_records = Gauge(
+    name="app_task_engine_log_buffered_records",
+    documentation="Number of engine log records waiting in buffer.",
+)
+
+app_task_engine_log_flush_duration_seconds = Histogram(
+    name="app_task_engine_log_flush_duration_seconds",
+    documentation="Histogram of the time (in seconds) each engine log buffer flush.",
+    buckets=get_histogram_buckets_from_env("BKAPP_MONITOR_METRICS_ENGINE_BUCKETS"),
+)
+
+
+app_task_report_log_requests_total = Counter(
+    name="app_task_report_log_requests_total",
+    documentation="Cumulative count of report log requests per batched.",
+    labelnames=["batched"],
+)
+
+app_task_report_log_records_total = Counter(
+    name="app_task_report_log_records_total",
+    documentation="Cumulative count of reported install log records.",
+)
+
+app_task_report_log_token_cache_total = Counter(
+    name="app_task_report_log_token_cache_total",
+    documentation="Cumulative count of report log token cache lookups per result.",
+    labelnames=["result"],
+)
+
+app_task_report_log_flush_requests = Histogram(
+    name="app_task_report_log_flush_requests",
+    documentation="Histogram of the number of report log requests coalesced into each redis pipeline flush.",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, float("inf")),
+)
+
+app_task_report_log_flush_duration_seconds = Histogram(
+    name="app_task_report_log_flush_duration_seconds",
+    documentation="Histogram of the time (in seconds) each report log redis pipeline flush.",
+    buckets=get_histogram_buckets_from_env("BKAPP_MONITOR_METRICS_CORE_BUCKETS"),
+)
 
 app_task_engine_set_sub_inst_statuses_duration_seconds = Histogram(
     name="app_task_engine_set_sub_inst_statuses_duration_seconds",
@@ -173,6 +258,12 @@ app_plugin_render_configs_total = Counter(
     labelnames=["plugin_name", "name", "os", "cpu_arch", "source", "type"],
 )
 
+app_plugin_render_config_fingerprint_checks_total = Counter(
+    name="app_plugin_render_config_fingerprint_checks_total",
+    documentation="Cumulative count of plugin config change checks per render fingerprint result.",
+    labelnames=["result"],
+)
+
 app_core_remote_connects_total = Counter(
     name="app_core_remote_connects_total",
     documentation="Cumulative count of remote connects per method,"
@@ -213,6 +304,24 @@ app_core_remote_install_exceptions_total = Counter(
     labelnames=["step", "os_type", "node_type"],
 )
 
+app_core_remote_session_cache_requests_total = Counter(
+    name="app_core_remote_session_cache_requests_total",
+    documentation="Cumulative count of remote session cache requests per method, per result.",
+    labelnames=["method", "result"],
+)
+
+app_core_remote_session_cache_evictions_total = Counter(
+    name="app_core_remote_session_cache_evictions_total",
+    documentation="Cumulative count of remote session cache evictions per method, per reason.",
+    labelnames=["method", "reason"],
+)
+
+app_gse_agent_state_cache_total = Counter(
+    name="app_gse_agent_state_cache_total",
+    documentation="Cumulative count of agents queried through gse agent state cache per version, per result.",
+    labelnames=["version", "result"],
+)
+
 app_core_cache_decorator_requests_total = Counter(
     name="app_core_cache_decorator_requests_total",
     documentation="Cumulative count of cache decorator requests per type, per backend, per method, per get_cache.",
@@ -246,6 +355,25 @@ app_core_password_requests_total = Counter(
 )
 
 
+app_core_concurrent_controller_limit = Gauge(
+    name="app_core_concurrent_controller_limit",
+    documentation="Current batch limit of adaptive concurrent controller per name.",
+    labelnames=["name"],
+)
+
+app_core_concurrent_controller_interval_seconds = Gauge(
+    name="app_core_concurrent_controller_interval_seconds",
+    documentation="Current batch interval (in seconds) of adaptive concurrent controller per name.",
+    labelnames=["name"],
+)
+
+app_core_concurrent_controller_adjustments_total = Counter(
+    name="app_core_concurrent_controller_adjustments_total",
+    documentation="Cumulative count of adaptive concurrent controller adjustments per name, per direction.",
+    labelnames=["name", "direction"],
+)
+
+
 app_common_method_requests_total = Counter(
     name="app_common_method_requests_total",
     documentation="Cumulative count of method requests per method, per source.",
@@ -265,6 +393,18 @@ app_common_api_call_exceptions_total = Counter(
     labelnames=["module", "api", "code"],
 )
 
+app_common_api_pool_maxsize = Gauge(
+    name="app_common_api_pool_maxsize",
+    documentation="Max number of keep-alive connections per module, per upstream.",
+    labelnames=["module", "upstream"],
+)
+
+app_common_api_pool_in_flight_requests = Gauge(
+    name="app_common_api_pool_in_flight_requests",
+    documentation="Number of in-flight api requests per module, per upstream.",
+    labelnames=["module", "upstream"],
+)
+
 app_resource_watch_events_total = Counter(
     name="app_resource_watch_events_total",
     documentation="Cumulative count of resource watch events per type, per bk_resource, per bk_event_type.",
@@ -284,6 +424,28 @@ app_resource_watch_biz_events_total = Counter(
 )
 
 
+app_sync_agent_status_duration_seconds = Histogram(
+    name="app_sync_agent_status_duration_seconds",
+    documentation="Histogram of the time (in seconds) each sync agent status shard.",
+    buckets=get_histogram_buckets_from_env("BKAPP_MONITOR_METRICS_CORE_BUCKETS"),
+)
+
+app_sync_agent_status_hosts_total = Counter(
+    name="app_sync_agent_status_hosts_total",
+    documentation="Cumulative count of hosts reconciled by sync agent status per result.",
+    labelnames=["result"],
+)
+
+app_sync_agent_status_dispatched_hosts_total = Counter(
+    name="app_sync_agent_status_dispatched_hosts_total",
+    documentation="Cumulative count of hosts dispatched to sync agent status shards.",
+)
+
+app_sync_agent_status_skipped_hosts_total = Counter(
+    name="app_sync_agent_status_skipped_hosts_total",
+    documentation="Cumulative count of hosts skipped by incremental sync agent status as not yet due.",
+)
+
 app_clean_data_duration_seconds = Histogram(
     name="app_clean_data_duration_seconds",
     documentation="Histogram of the time (in seconds) each clean data per task, per method, per source.",
@@ -9,9 +9,10 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import typing
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from copy import deepcopy
-from multiprocessing.pool import ThreadPool
 
 from django.conf import settings
 from django.utils.translation import get_language
@@ -23,6 +24,9 @@ from apps.utils.local import get_request
 from . import translation
 from .concurrent import inject_request
 
+# 分页并发请求的线程数
+BATCH_REQUEST_MAX_WORKERS = 20
+
 
 def format_params(params, get_count, func):
     # 拆分params适配bk_module_id大于500情况
@@ -67,52 +71,117 @@ def batch_request(
     :param interval: 任务提交间隔
     :return: 请求结果
     """
+    data = []
+    for page_data in batch_request_iter(
+        func,
+        params,
+        get_data=get_data,
+        get_count=get_count,
+        limit=limit,
+        sort=sort,
+        split_params=split_params,
+        interval=interval,
+    ):
+        data.extend(page_data)
+    return data
+
+
+def batch_request_iter(
+    func,
+    params,
+    get_data=lambda x: x["info"],
+    get_count=lambda x: x["count"],
+    limit=constants.QUERY_CMDB_LIMIT,
+    sort=None,
+    split_params=False,
+    interval=0,
+    max_workers=BATCH_REQUEST_MAX_WORKERS,
+    window=None,
+) -> typing.Iterator[typing.List]:
+    """
+    流式并发请求接口，按分页顺序逐页返回数据
+    同一时刻最多有 window 页处于请求中或等待消费的状态，调用方逐页处理后即可丢弃，内存占用与数据总量无关
+    :param func: 请求方法
+    :param params: 请求参数
+    :param get_data: 获取数据函数
+    :param get_count: 获取总数函数
+    :param limit: 一次请求数量
+    :param sort: 排序
+    :param split_params: 是否拆分参数
+    :param interval: 任务提交间隔
+    :param max_workers: 并发请求数
+    :param window: 已提交但未被消费的最大分页数，默认与并发请求数一致
+    :return: 每页的请求结果
+    """
 
     # 如果该接口没有返回count参数，只能同步请求
     if not get_count:
-        return sync_batch_request(func, params, get_data, limit)
+        yield from sync_batch_request_iter(func, params, get_data, limit)
+        return
 
     start = 0
-    data = []
+    first_page_data = None
     if not split_params:
         request_params = dict(page={"start": 0, "limit": limit}, **params)
         if sort:
             request_params["page"]["sort"] = sort
         query_res = func(request_params)
         final_request_params = [{"count": get_count(query_res), "params": params}]
-        data = get_data(query_res) or []
-        # 如果count小于等于limit，直接返回
-        if final_request_params[0]["count"] <= limit:
-            return data
-
+        first_page_data = get_data(query_res) or []
         start = limit
     else:
         final_request_params = format_params(params, get_count, func)
 
-    # 根据请求总数并发请求
-    pool = ThreadPool(20)
-    futures = []
-
+    # 预先计算所有分页的请求参数，按顺序提交
+    page_request_params_list: typing.List[typing.Tuple[int, typing.Dict]] = []
     for idx, req in enumerate(final_request_params):
         while start < req["count"]:
-            if idx != 0 and interval:
-                time.sleep(interval)
             request_params = {"page": {"limit": limit, "start": start}}
             if sort:
                 request_params["page"]["sort"] = sort
             request_params.update(req["params"])
-            futures.append(pool.apply_async(inject_request(func), args=(request_params,)))
-
+            page_request_params_list.append((idx, request_params))
             start += limit
 
-    pool.close()
-    pool.join()
+    # 如果count小于等于limit，直接返回
+    if not page_request_params_list:
+        if first_page_data is not None:
+            yield first_page_data
+        return
 
-    # 取值
-    for future in futures:
-        data.extend(get_data(future.get()))
+    window = window or max_workers
+    page_request_params_iter = iter(page_request_params_list)
+    wrapped_func = inject_request(func)
+    futures: typing.Deque[Future] = deque()
 
-    return data
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+
+        def _submit_next() -> None:
+            try:
+                idx, page_request_params = next(page_request_params_iter)
+            except StopIteration:
+                return
+            if idx != 0 and interval:
+                time.sleep(interval)
+            futures.append(ex.submit(wrapped_func, page_request_params))
+
+        try:
+            for __ in range(window):
+                _submit_next()
+
+            # 首页在后续分页提交后再返回，使调用方处理首页时后续分页已在请求中
+            if first_page_data is not None:
+                yield first_page_data
+                first_page_data = None
+
+            while futures:
+                page_data = get_data(futures.popleft().result())
+                _submit_next()
+                yield page_data
+        finally:
+            # 调用方提前结束迭代或出现异常时，取消尚未开始的请求
+            for future in futures:
+                future.cancel()
 
 
 def sync_batch_request(func, params, get_data=lambda x: x["info"], limit=500):
@@ -124,8 +193,22 @@ def sync_batch_request(func, params, get_data=lambda x: x["info"], limit=500):
     :param limit: 一次请求数量
     :return: 请求结果
     """
-    # 如果该接口没有返回count参数，只能同步请求
     data = []
+    for page_data in sync_batch_request_iter(func, params, get_data, limit):
+        data.extend(page_data)
+    return data
+
+
+def sync_batch_request_iter(func, params, get_data=lambda x: x["info"], limit=500) -> typing.Iterator[typing.List]:
+    """
+    同步请求接口，逐页返回数据
+    :param func: 请求方法
+    :param params: 请求参数
+    :param get_data: 获取数据函数
+    :param limit: 一次请求数量
+    :return: 每页的请求结果
+    """
+    # 如果该接口没有返回count参数，只能同步请求
     start = 0
 
     # 根据请求总数并发请求
@@ -133,14 +216,12 @@ def sync_batch_request(func, params, get_data=lambda x: x["info"], limit=500):
         request_params = {"page": {"limit": limit, "start": start}}
         request_params.update(params)
         result = get_data(func(request_params))
-        data.extend(result)
+        yield result
         if len(result) < limit:
             break
         else:
             start += limit
 
-    return data
-
 
 def request_multi_thread(func, params_list, get_data=lambda x: []):
     """
@@ -10,12 +10,14 @@ specific language governing permissions and limitations under the License.
 """
 import asyncio
 import inspect
+import os
 import sys
+import threading
 import time
 from concurrent.futures import as_completed
 from concurrent.futures.thread import ThreadPoolExecutor
 from multiprocessing import cpu_count, get_context
-from typing import Callable, Coroutine, Dict, List
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
 
 from asgiref.sync import async_to_sync
 from django.conf import settings
@@ -48,7 +50,7 @@ def batch_call(
     get_data=lambda x: x,
     extend_result: bool = False,
     interval: float = 0,
-    **kwargs
+    **kwargs,
 ) -> List:
     """
     # TODO 后续 batch_call 支持 *args 类参数
@@ -97,7 +99,7 @@ def batch_call_serial(
     get_data: Callable = lambda x: x,
     extend_result: bool = False,
     interval: float = 0,
-    **kwargs
+    **kwargs,
 ):
 
     if inspect.iscoroutinefunction(func):
@@ -114,13 +116,176 @@ def batch_call_serial(
     return result
 
 
+# 事件循环关闭前执行的清理协程，用于释放与事件循环绑定的资源（例如缓存的 SSH 会话）
+LOOP_CLEANUP_FUNCS: List[Callable[[], Coroutine]] = []
+# 回收常驻事件循环上空闲资源（例如空闲超时的 SSH 会话）的协程及其空闲超时时间
+# 每次批量执行结束后调用，并在空闲超时后由定时器再次调用，避免没有后续批量执行时资源长期不释放
+LOOP_IDLE_CLEANUP_FUNCS: List[Tuple[Callable[[], Coroutine], Optional[Callable[[], float]]]] = []
+
+
+def register_loop_cleanup(func: Callable[[], Coroutine]) -> Callable[[], Coroutine]:
+    LOOP_CLEANUP_FUNCS.append(func)
+    return func
+
+
+def register_loop_idle_cleanup(
+    func: Callable[[], Coroutine], get_idle_ttl: Optional[Callable[[], float]] = None
+) -> Callable[[], Coroutine]:
+    """
+    注册空闲资源回收协程
+    :param func: 回收协程
+    :param get_idle_ttl: 获取空闲超时时间（秒）的方法，为空或返回 0 时仅在批量执行结束时回收
+    """
+    LOOP_IDLE_CLEANUP_FUNCS.append((func, get_idle_ttl))
+    return func
+
+
+class EventLoopRunner:
+    """
+    协程批量执行器
+    - 通过信号量限制同时执行的协程数量，避免瞬时发起大量连接（例如 SSH 握手）
+    - 单个协程超时后取消并等待其退出，以 asyncio.TimeoutError 作为该协程的结果
+    - 调用方被中断（例如 KeyboardInterrupt）时，取消本次提交的全部协程
+    通过 get_thread_runner 获取的执行器与线程绑定，线程内多次调用复用同一事件循环及与之绑定的资源，
+    仅适用于长期存在的线程（例如 celery threads 模式下的工作线程）
+    常驻事件循环在两次调用之间不运行，空闲资源由定时器线程在事件循环空闲时运行回收协程释放
+    """
+
+    # 空闲回收定时器在空闲超时时间基础上的延后时间，确保定时器触发时资源已超过空闲超时时间
+    IDLE_CLEANUP_DELAY_MARGIN: float = 1
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.pid: int = os.getpid()
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        # 事件循环同一时刻只能在一个线程中运行，执行线程与定时器线程通过该锁互斥
+        self.lock: threading.RLock = threading.RLock()
+        self.idle_cleanup_timer: Optional[threading.Timer] = None
+
+    @classmethod
+    def get_thread_runner(cls) -> "EventLoopRunner":
+        runner: Optional[EventLoopRunner] = getattr(cls._local, "runner", None)
+        if runner is None or runner.is_closed():
+            runner = cls._local.runner = cls()
+        return runner
+
+    def is_closed(self) -> bool:
+        # 子进程不复用父进程创建的事件循环
+        return self.loop.is_closed() or self.pid != os.getpid()
+
+    @staticmethod
+    async def run_one(coro: Coroutine, semaphore: Optional[asyncio.Semaphore], timeout: Optional[float]) -> Any:
+        if semaphore is not None:
+            await semaphore.acquire()
+        try:
+            if not timeout:
+                return await coro
+            task: asyncio.Future = asyncio.ensure_future(coro)
+            try:
+                done, __ = await asyncio.wait([task], timeout=timeout)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            if not done:
+                task.cancel()
+                # 等待被取消的协程完成清理（例如归还 SSH 会话）
+                await asyncio.wait([task])
+                raise asyncio.TimeoutError(f"coroutine timed out after {timeout}s")
+            return task.result()
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    async def run_many(
+        self, coros: List[Coroutine], limit: Optional[int], timeout: Optional[float], tasks: List[asyncio.Future]
+    ) -> List[Any]:
+        # 信号量需在事件循环内创建，以绑定到当前事件循环
+        semaphore: Optional[asyncio.Semaphore] = asyncio.Semaphore(limit) if limit else None
+        tasks.extend([asyncio.ensure_future(self.run_one(coro, semaphore, timeout)) for coro in coros])
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def wait_cancelled(tasks: List[asyncio.Future]):
+        if tasks:
+            await asyncio.wait(tasks)
+
+    def run(self, coros: List[Coroutine], limit: Optional[int] = None, timeout: Optional[float] = None) -> List[Any]:
+        """
+        并发执行协程
+        :param coros: 协程列表
+        :param limit: 同时执行的协程数量上限，为空或 0 时不限制
+        :param timeout: 单个协程的超时时间（秒），为空或 0 时不限制
+        :return: 与 coros 顺序一致的执行结果，执行异常的协程以异常实例作为结果
+        """
+        tasks: List[asyncio.Future] = []
+        with self.lock:
+            self.cancel_idle_cleanup()
+            try:
+                return self.loop.run_until_complete(self.run_many(coros, limit, timeout, tasks))
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                self.loop.run_until_complete(self.wait_cancelled(tasks))
+                # 排队期间被取消的协程未被调度过，显式关闭以免出现 never awaited 告警
+                for coro in coros:
+                    if inspect.iscoroutine(coro) and inspect.getcoroutinestate(coro) == inspect.CORO_CREATED:
+                        coro.close()
+                raise
+            finally:
+                self.run_idle_cleanup()
+                self.schedule_idle_cleanup()
+
+    def run_idle_cleanup(self):
+        for idle_cleanup_func, __ in LOOP_IDLE_CLEANUP_FUNCS:
+            self.loop.run_until_complete(idle_cleanup_func())
+
+    def schedule_idle_cleanup(self):
+        """在空闲超时后回收空闲资源，期间有新的调用时取消"""
+        idle_ttls: List[float] = [get_idle_ttl() for __, get_idle_ttl in LOOP_IDLE_CLEANUP_FUNCS if get_idle_ttl]
+        idle_ttls = [idle_ttl for idle_ttl in idle_ttls if idle_ttl]
+        if not idle_ttls:
+            return
+        self.idle_cleanup_timer = threading.Timer(max(idle_ttls) + self.IDLE_CLEANUP_DELAY_MARGIN, self.idle_cleanup)
+        # 定时器不阻塞进程退出
+        self.idle_cleanup_timer.daemon = True
+        self.idle_cleanup_timer.start()
+
+    def cancel_idle_cleanup(self):
+        if self.idle_cleanup_timer is not None:
+            self.idle_cleanup_timer.cancel()
+            self.idle_cleanup_timer = None
+
+    def idle_cleanup(self):
+        """空闲回收定时器回调，在定时器线程中运行事件循环"""
+        with self.lock:
+            # 执行线程正在运行事件循环时，由本次调用结束时回收
+            if self.is_closed() or self.loop.is_running():
+                return
+            self.run_idle_cleanup()
+
+    def close(self):
+        with self.lock:
+            self.cancel_idle_cleanup()
+            if self.loop.is_closed():
+                return
+            try:
+                for cleanup_func in LOOP_CLEANUP_FUNCS:
+                    self.loop.run_until_complete(cleanup_func())
+            finally:
+                self.loop.close()
+
+
 def batch_call_coroutine(
     func: Callable[..., Coroutine],
     params_list: List[Dict],
     get_data: Callable = lambda x: x,
     extend_result: bool = False,
     interval: float = 0,
-    **kwargs
+    limit: Optional[int] = None,
+    timeout: Optional[float] = None,
+    reuse_loop: bool = False,
+    **kwargs,
 ):
     """
     协程并发
@@ -129,17 +294,30 @@ def batch_call_coroutine(
     :param get_data: 获取数据函数
     :param extend_result: 是否展开结果
     :param interval: 暂不支持
+    :param limit: 协程并发上限，默认为 BKAPP_COROUTINE_CONCURRENCY_LIMIT，为 0 时不限制
+    :param timeout: 单个协程的超时时间（秒），超时的协程被取消并以 asyncio.TimeoutError 作为结果，
+        默认为 BKAPP_COROUTINE_TASK_TIMEOUT，为 0 时不限制
+    :param reuse_loop: 是否复用当前线程的常驻事件循环，否则每次调用创建并关闭事件循环
     :param kwargs:
     :return:
     """
 
-    async def _batch_call_coroutine(_coros: List[Coroutine]):
-        return await asyncio.gather(*_coros, return_exceptions=True)
+    runner: Optional[EventLoopRunner] = EventLoopRunner.get_thread_runner() if reuse_loop else None
+    # 当前线程的事件循环正在运行（嵌套调用，或定时器线程正在回收空闲资源）时，退化为使用临时事件循环
+    is_temporary: bool = runner is None or runner.loop.is_running()
+    if is_temporary:
+        runner = EventLoopRunner()
 
     coros: List[Coroutine] = [func(**params) for params in params_list]
-    loop = asyncio.new_event_loop()
-    coro_results = loop.run_until_complete(_batch_call_coroutine(coros))
-    loop.close()
+    try:
+        coro_results = runner.run(
+            coros,
+            limit=(limit, settings.BKAPP_COROUTINE_CONCURRENCY_LIMIT)[limit is None],
+            timeout=(timeout, settings.BKAPP_COROUTINE_TASK_TIMEOUT)[timeout is None],
+        )
+    finally:
+        if is_temporary:
+            runner.close()
 
     result = []
     for coro_result in coro_results:
@@ -8,6 +8,7 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import asyncio
 import inspect
 from typing import Any, Callable, Coroutine, Dict, Optional, Tuple, Union
 
@@ -66,6 +67,9 @@ class ExceptionHandler:
         """
         try:
             result = await wrapped(*args, **kwargs)
+        except asyncio.CancelledError:
+            # 取消（例如超时）不视为执行异常，交由调用方处理
+            raise
         except Exception as exc:
             if inspect.iscoroutinefunction(self.exc_handler):
                 return await self.exc_handler(wrapped, instance, args, kwargs, exc)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import threading
+import time
+import typing
+
+from apps.utils import batch_request
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+class MockPaginatedApi:
+    def __init__(self, total: int, delay: float = 0):
+        self.total = total
+        self.delay = delay
+        self.call_count = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, params: typing.Dict) -> typing.Dict:
+        with self._lock:
+            self.call_count += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        # 让靠前的分页更慢返回，验证结果仍按分页顺序产出
+        time.sleep(self.delay / (params["page"]["start"] + 1))
+        with self._lock:
+            self._in_flight -= 1
+        start, limit = params["page"]["start"], params["page"]["limit"]
+        return {"count": self.total, "info": list(range(start, min(start + limit, self.total)))}
+
+
+class TestBatchRequest(CustomBaseTestCase):
+    def test_batch_request_iter(self):
+        api = MockPaginatedApi(total=95, delay=0.01)
+        pages = list(batch_request.batch_request_iter(api, {}, limit=10, max_workers=4))
+        self.assertEqual([page[0] for page in pages], list(range(0, 95, 10)))
+        self.assertEqual(sum(pages, []), list(range(95)))
+        self.assertLessEqual(api.max_in_flight, 4)
+
+    def test_batch_request_iter_window(self):
+        api = MockPaginatedApi(total=100)
+        pages_iter = batch_request.batch_request_iter(api, {}, limit=10, max_workers=2, window=3)
+        next(pages_iter)
+        time.sleep(0.1)
+        # 首页 + 窗口内的分页，未被消费的分页数不超过窗口大小
+        self.assertEqual(api.call_count, 1 + 3)
+        pages_iter.close()
+
+    def test_batch_request_iter_single_page(self):
+        api = MockPaginatedApi(total=5)
+        self.assertEqual(list(batch_request.batch_request_iter(api, {}, limit=10)), [list(range(5))])
+        self.assertEqual(api.call_count, 1)
+
+    def test_batch_request(self):
+        api = MockPaginatedApi(total=1001)
+        self.assertEqual(batch_request.batch_request(api, {}, limit=100), list(range(1001)))
+
+    def test_sync_batch_request(self):
+        api = MockPaginatedApi(total=25)
+        self.assertEqual(
+            batch_request.batch_request(api, {}, get_count=None, limit=10),
+            list(range(25)),
+        )
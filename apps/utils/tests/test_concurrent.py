@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import asyncio
+import threading
+
+from apps.utils import concurrent
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+class InFlightCounter:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def run(self, value: int, delay: float = 0.01) -> int:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.in_flight -= 1
+        return value
+
+
+class BatchCallCoroutineTestCase(CustomBaseTestCase):
+    def test_limit(self):
+        counter = InFlightCounter()
+        results = concurrent.batch_call_coroutine(
+            func=counter.run, params_list=[{"value": value} for value in range(20)], limit=5
+        )
+        self.assertEqual(results, list(range(20)))
+        self.assertEqual(counter.max_in_flight, 5)
+
+    def test_timeout(self):
+        counter = InFlightCounter()
+        results = concurrent.batch_call_coroutine(
+            func=counter.run,
+            params_list=[{"value": 1, "delay": 0}, {"value": 2, "delay": 10}],
+            timeout=0.1,
+        )
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], asyncio.TimeoutError)
+        # 超时的协程已被取消并完成清理
+        self.assertEqual(counter.in_flight, 0)
+
+    def test_reuse_loop(self):
+        async def get_loop():
+            return asyncio.get_event_loop()
+
+        def call() -> asyncio.AbstractEventLoop:
+            return concurrent.batch_call_coroutine(func=get_loop, params_list=[{}], reuse_loop=True)[0]
+
+        loop = call()
+        self.assertIs(call(), loop)
+        self.assertFalse(loop.is_closed())
+
+        # 不同线程持有各自的事件循环
+        other_thread_loops = []
+        thread = threading.Thread(target=lambda: other_thread_loops.append(call()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other_thread_loops[0], loop)
+
+        # 非复用模式下事件循环用完即关闭
+        temporary_loop = concurrent.batch_call_coroutine(func=get_loop, params_list=[{}])[0]
+        self.assertTrue(temporary_loop.is_closed())
@@ -32,6 +32,7 @@ from apps.utils.time_handler import timestamp_to_datetime
 
 from .exception import DataAPIException
 from .utils.params import add_esb_info_before_request
+from .utils.pool import session_pool
 
 logger = logging.getLogger("component")
 API_AUTH_KEYS = [
@@ -432,70 +433,76 @@ class DataAPI(object):
         """
 
         # 增加request id
-        session = requests.session()
-        session.headers.update(headers)
-        session.headers.update(
-            {
-                "X-Bkapi-Request-Id": self.request_id,
-                "X-Bkapi-App-Code": params.get("bk_app_code"),
-                "X-Bkapi-App-Secret": params.get("bk_app_secret"),
-                "X-Bkapi-User-Name": params.get("bk_username"),
-                # 通过 session 设置语言类型即将在 Django 4.0 失效
-                # The user language will no longer be stored in request.session in Django 4.0. Read it from
-                # request.COOKIES[settings.LANGUAGE_COOKIE_NAME] instead.
-                "blueking-language": translation.get_language(),
-            }
-        )
+        request_headers: Dict[str, str] = {
+            **headers,
+            "X-Bkapi-Request-Id": self.request_id,
+            "X-Bkapi-App-Code": params.get("bk_app_code"),
+            "X-Bkapi-App-Secret": params.get("bk_app_secret"),
+            "X-Bkapi-User-Name": params.get("bk_username"),
+            # 通过 session 设置语言类型即将在 Django 4.0 失效
+            # The user language will no longer be stored in request.session in Django 4.0. Read it from
+            # request.COOKIES[settings.LANGUAGE_COOKIE_NAME] instead.
+            "blueking-language": translation.get_language(),
+        }
 
         # 设置cookies
+        # Session 在同一上游的所有请求间共享，请求头 / Cookies 只能随请求传递，不能写入 Session
+        cookies: Dict[str, str] = {}
         try:
             local_request = get_request()
         except AppBaseException:
             local_request = None
 
         if local_request and local_request.COOKIES and not use_admin:
-            session.cookies.update(local_request.COOKIES)
+            cookies.update(local_request.COOKIES)
             # 用于跨服务调用透传国际化设置
-            session.cookies.set("blueking_language", translation.get_language())
+            cookies["blueking_language"] = translation.get_language()
 
         url = self.build_actual_url(params)
 
         # headers 申明重载请求方法
         if self.method_override is not None:
-            session.headers.update({"X-METHOD-OVERRIDE": self.method_override})
+            request_headers["X-METHOD-OVERRIDE"] = self.method_override
 
         # headers 增加api认证数据
         api_auth_params: dict = fetch_and_clean_auth_info(params, url)
-        session.headers.update({"X-Bkapi-Authorization": get_request_api_headers(api_auth_params)})
+        request_headers["X-Bkapi-Authorization"] = get_request_api_headers(api_auth_params)
 
         # 发出请求并返回结果
         non_file_data, file_data = self._split_file_data(params)
         request_method = self.method.upper()
+        request_kwargs: Dict[str, typing.Any] = {
+            "method": self.method,
+            "url": url,
+            "headers": request_headers,
+            "cookies": cookies,
+            "verify": False,
+            "timeout": self.timeout,
+        }
         if request_method == "GET":
-            result = session.request(method=self.method, url=url, params=params, verify=False, timeout=self.timeout)
+            request_kwargs["params"] = params
         elif request_method == "DELETE":
-            session.headers.update({"Content-Type": "application/json; charset=utf-8"})
-            result = session.request(
-                method=self.method, url=url, data=json.dumps(non_file_data), verify=False, timeout=self.timeout
-            )
+            request_headers["Content-Type"] = "application/json; charset=utf-8"
+            request_kwargs["data"] = json.dumps(non_file_data)
         elif request_method in ["PUT", "PATCH", "POST"]:
             if not file_data:
-                session.headers.update({"Content-Type": "application/json; charset=utf-8"})
+                request_headers["Content-Type"] = "application/json; charset=utf-8"
                 params = json.dumps(non_file_data)
             else:
                 params = non_file_data
 
             # PUT 方法上传文件时，data需作为
             if request_method == "PUT" and file_data:
-                data = list(file_data.values())[0]
-                result = session.request(method=self.method, url=url, data=data, verify=False, timeout=self.timeout)
+                request_kwargs["data"] = list(file_data.values())[0]
             else:
-                result = session.request(
-                    method=self.method, url=url, data=params, files=file_data, verify=False, timeout=self.timeout
-                )
+                request_kwargs.update(data=params, files=file_data)
         else:
             raise ApiRequestError("异常请求方式，{method}".format(method=self.method))
 
+        # 复用上游的长连接，避免每次请求重新进行 TCP / TLS 握手
+        with session_pool.checkout(module=self.simple_module, url=url) as session:
+            result = session.request(**request_kwargs)
+
         return result
 
     def build_actual_url(self, params):
@@ -583,7 +590,7 @@ class DataDRFAPISet(object):
         "retrieve": DRFActionAPI(method="get"),
     }
 
-    def __init__(self, url, module, primary_key, custom_config=None, url_keys=None, **kwargs):
+    def __init__(self, url, module, primary_key, custom_config=None, url_keys=None, simple_module=None, **kwargs):
         """
         申明具体某一资源的 restful-api 集合工具，透传 DataAPI 配置
 
@@ -616,6 +623,7 @@ class DataDRFAPISet(object):
         self.url_keys = url_keys
         self.custom_config = custom_config
         self.module = module
+        self.simple_module = simple_module or module
         self.primary_key = primary_key
 
         for key in list(kwargs.values()):
@@ -667,6 +675,7 @@ class DataDRFAPISet(object):
             "url": url,
             "url_keys": url_keys,
             "module": self.module,
+            "simple_module": self.simple_module,
         }
         dataapi_kwargs.update(self.dataapi_kwargs)
         dataapi_kwargs.update(action.dataapi_kwargs)
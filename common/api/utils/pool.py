@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import os
+import threading
+import typing
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
+from urllib import parse
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from apps.prometheus import metrics
+
+
+class BlockAllCookiesPolicy(DefaultCookiePolicy):
+    """
+    共享 Session 会被多个用户 / 线程复用，禁止将响应中的 Cookies 回写到 Session，
+    请求所需的 Cookies 需要在每次请求时显式传入
+    """
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+class SessionPool:
+    """
+    按上游（模块 + 协议 + 域名）维护的长连接 Session 池
+    - Session 本身仅承载连接池，请求头 / Cookies 等请求级别的状态不应写入 Session
+    - 进程 fork 后（例如 celery prefork）连接不可复用，会根据 pid 重建
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid: int = os.getpid()
+        self._sessions: typing.Dict[typing.Tuple[str, str], requests.Session] = {}
+
+    @staticmethod
+    def get_upstream(url: str) -> str:
+        parsed_url = parse.urlparse(url)
+        return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+    @staticmethod
+    def create_session(module: str, upstream: str) -> requests.Session:
+        retries: int = settings.BKAPP_API_POOL_CONNECT_RETRIES
+        # 仅针对建立连接失败的场景进行重试，此时请求尚未发出，非幂等请求重试也是安全的
+        max_retries = Retry(
+            total=retries,
+            connect=retries,
+            read=False,
+            redirect=False,
+            status=False,
+            backoff_factor=settings.BKAPP_API_POOL_BACKOFF_FACTOR,
+            raise_on_redirect=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.BKAPP_API_POOL_MAXSIZE,
+            max_retries=max_retries,
+            pool_block=settings.BKAPP_API_POOL_BLOCK,
+        )
+        session = requests.Session()
+        session.mount(upstream, adapter)
+        session.cookies.set_policy(BlockAllCookiesPolicy())
+
+        metrics.app_common_api_pool_maxsize.labels(module=module, upstream=upstream).set(
+            settings.BKAPP_API_POOL_MAXSIZE
+        )
+        return session
+
+    def get_session(self, module: str, url: str) -> requests.Session:
+        upstream: str = self.get_upstream(url)
+        session_key: typing.Tuple[str, str] = (module, upstream)
+
+        session: typing.Optional[requests.Session] = self._sessions.get(session_key)
+        if session is not None and self._pid == os.getpid():
+            return session
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # 子进程不复用父进程的连接
+                self._sessions = {}
+                self._pid = os.getpid()
+            if session_key not in self._sessions:
+                self._sessions[session_key] = self.create_session(module, upstream)
+            return self._sessions[session_key]
+
+    @contextmanager
+    def checkout(self, module: str, url: str) -> typing.Iterator[requests.Session]:
+        """
+        获取上游对应的 Session，并统计该上游正在进行中的请求数，用于观测连接池饱和度
+        :param module: 模块简称
+        :param url: 请求地址
+        """
+        session: requests.Session = self.get_session(module, url)
+        in_flight_gauge = metrics.app_common_api_pool_in_flight_requests.labels(
+            module=module, upstream=self.get_upstream(url)
+        )
+        in_flight_gauge.inc()
+        try:
+            yield session
+        finally:
+            in_flight_gauge.dec()
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+session_pool = SessionPool()
@@ -572,7 +572,11 @@ BK_SCRIPTS_PATH = os.path.join(PROJECT_ROOT, "script_tools")
 # 后台配置
 # ==============================================================================
 
-PIPELINE_DATA_BACKEND = "pipeline.engine.core.data.mysql_backend.MySQLDataBackend"
+# 数据后端，调度密集的场景可使用 pipeline.engine.core.data.hybrid_backend.RedisMySQLDataBackend
+# 将调度数据、调度锁及调度次数保存在 Redis 中，并异步回写 MySQL
+PIPELINE_DATA_BACKEND = get_type_env(
+    key="BKAPP_PIPELINE_DATA_BACKEND", default="pipeline.engine.core.data.mysql_backend.MySQLDataBackend", _type=str
+)
 PIPELINE_END_HANDLER = "apps.backend.agent.signals.pipeline_end_handler"
 ENGINE_ZOMBIE_PROCESS_DOCTORS = [
     {
@@ -582,6 +586,22 @@ ENGINE_ZOMBIE_PROCESS_DOCTORS = [
 ]
 ENGINE_ZOMBIE_PROCESS_HEAL_CRON = {"minute": "*/10"}
 
+# 轮询调度合并：批量安装等场景下大量节点同时轮询，合并后按批发送调度任务，减少消息队列压力
+PIPELINE_SCHEDULE_COALESCE_ENABLED = get_type_env(
+    key="BKAPP_PIPELINE_SCHEDULE_COALESCE_ENABLED", default=False, _type=bool
+)
+PIPELINE_SCHEDULE_COALESCE_BATCH_SIZE = get_type_env(
+    key="BKAPP_PIPELINE_SCHEDULE_COALESCE_BATCH_SIZE", default=20, _type=int
+)
+
+# 引擎日志缓冲写入：日志先写入内存队列，由后台线程批量落库
+PIPELINE_LOG_HANDLER = "apps.backend.utils.pipeline_log.BufferedEngineLogHandler"
+PIPELINE_LOG_BUFFER_CAPACITY = get_type_env(key="BKAPP_PIPELINE_LOG_BUFFER_CAPACITY", default=10000, _type=int)
+PIPELINE_LOG_BUFFER_FLUSH_SIZE = get_type_env(key="BKAPP_PIPELINE_LOG_BUFFER_FLUSH_SIZE", default=500, _type=int)
+PIPELINE_LOG_BUFFER_FLUSH_INTERVAL = get_type_env(
+    key="BKAPP_PIPELINE_LOG_BUFFER_FLUSH_INTERVAL", default=1, _type=float
+)
+
 # API 执行者
 BACKEND_JOB_OPERATOR = os.getenv("BKAPP_BACKEND_JOB_OPERATOR", "admin")
 BACKEND_GSE_OPERATOR = os.getenv("BKAPP_BACKEND_GSE_OPERATOR", "admin")
@@ -820,6 +840,86 @@ GSE_ENABLE_SVR_DISCOVERY = get_type_env(key="GSE_ENABLE_SVR_DISCOVERY", default=
 # 是否使用CMDB订阅机制去主动触发插件下发
 USE_CMDB_SUBSCRIPTION_TRIGGER = get_type_env(key="BKAPP_USE_CMDB_SUBSCRIPTION_TRIGGER", default=True, _type=bool)
 
+# 第三方 API 调用：每个上游（模块 + 协议 + 域名）维持的长连接数上限
+BKAPP_API_POOL_MAXSIZE = get_type_env(key="BKAPP_API_POOL_MAXSIZE", default=50, _type=int)
+# 连接数达到上限后是否阻塞等待空闲连接，开启后可严格限制单个上游的并发连接数
+BKAPP_API_POOL_BLOCK = get_type_env(key="BKAPP_API_POOL_BLOCK", default=False, _type=bool)
+# 建立连接失败时的重试次数及退避系数（重试间隔为 backoff_factor * 2 ^ (重试次数 - 1) 秒）
+BKAPP_API_POOL_CONNECT_RETRIES = get_type_env(key="BKAPP_API_POOL_CONNECT_RETRIES", default=3, _type=int)
+BKAPP_API_POOL_BACKOFF_FACTOR = get_type_env(key="BKAPP_API_POOL_BACKOFF_FACTOR", default=0.2, _type=float)
+
+# 订阅实例步骤日志：是否以追加分片的方式存储，默认在 SubscriptionInstanceStatusDetail.log 上拼接
+BKAPP_SUB_INST_LOG_CHUNK_ENABLED = get_type_env(key="BKAPP_SUB_INST_LOG_CHUNK_ENABLED", default=False, _type=bool)
+# 日志分片超过该字节数时进行 zlib 压缩，为 0 时不压缩
+BKAPP_SUB_INST_LOG_CHUNK_COMPRESS_THRESHOLD = get_type_env(
+    key="BKAPP_SUB_INST_LOG_CHUNK_COMPRESS_THRESHOLD", default=4096, _type=int
+)
+# 日志分片批量写入的批次大小
+BKAPP_SUB_INST_LOG_CHUNK_BATCH_SIZE = get_type_env(key="BKAPP_SUB_INST_LOG_CHUNK_BATCH_SIZE", default=500, _type=int)
+
+# SSH 会话缓存：空闲会话的保留时长（秒），为 0 时不缓存，用完即关闭
+BKAPP_SSH_SESSION_IDLE_TTL = get_type_env(key="BKAPP_SSH_SESSION_IDLE_TTL", default=60, _type=int)
+
+# 协程批量执行（batch_call_coroutine）：同时执行的协程数量上限，为 0 时不限制
+BKAPP_COROUTINE_CONCURRENCY_LIMIT = get_type_env(key="BKAPP_COROUTINE_CONCURRENCY_LIMIT", default=100, _type=int)
+# 协程批量执行：单个协程的超时时间（秒），超时后取消，为 0 时不限制
+BKAPP_COROUTINE_TASK_TIMEOUT = get_type_env(key="BKAPP_COROUTINE_TASK_TIMEOUT", default=0, _type=int)
+# 直连 Shell 安装：单台主机推送文件及执行安装命令的超时时间（秒）
+BKAPP_SSH_INSTALL_TIMEOUT = get_type_env(key="BKAPP_SSH_INSTALL_TIMEOUT", default=600, _type=int)
+# 直连 Windows 安装：WMIEXE 并发控制配置的默认 limit，即同时通过 wmiexec 会话安装的主机数量
+# 批次内并发、批次间固定串行，全局配置 CONCURRENT_CONTROLLER_SETTINGS 中的 limit 含义相同
+BKAPP_WMIEXE_CONCURRENT_LIMIT = get_type_env(key="BKAPP_WMIEXE_CONCURRENT_LIMIT", default=4, _type=int)
+
+# 订阅范围增量计算：自动触发订阅变更时，仅重新计算资源监听事件涉及的主机，目前仅支持单业务的「主机 - 拓扑」插件订阅
+BKAPP_SUBSCRIPTION_INCREMENTAL_SCOPE_ENABLED = get_type_env(
+    key="BKAPP_SUBSCRIPTION_INCREMENTAL_SCOPE_ENABLED", default=False, _type=bool
+)
+# 订阅范围快照的有效期（秒），过期后回退为全量计算，用于兜底事件丢失及非主机类变更
+BKAPP_SUBSCRIPTION_SCOPE_FULL_SYNC_INTERVAL = get_type_env(
+    key="BKAPP_SUBSCRIPTION_SCOPE_FULL_SYNC_INTERVAL", default=6 * 60 * 60, _type=int
+)
+# 订阅范围快照批量写入的批次大小
+BKAPP_SUBSCRIPTION_SCOPE_SNAPSHOT_BATCH_SIZE = get_type_env(
+    key="BKAPP_SUBSCRIPTION_SCOPE_SNAPSHOT_BATCH_SIZE", default=1000, _type=int
+)
+
+# 业务模块拓扑缓存：订阅范围计算优先读取缓存的「模块 -> 拓扑路径」索引，由业务拓扑同步任务刷新，资源监听事件失效
+BKAPP_CMDB_TOPO_CACHE_ENABLED = get_type_env(key="BKAPP_CMDB_TOPO_CACHE_ENABLED", default=True, _type=bool)
+# 业务模块拓扑缓存的有效期（秒）
+BKAPP_CMDB_TOPO_CACHE_TTL = get_type_env(key="BKAPP_CMDB_TOPO_CACHE_TTL", default=30 * 60, _type=int)
+# 业务模块拓扑缓存批量写入的批次大小
+BKAPP_CMDB_TOPO_CACHE_BATCH_SIZE = get_type_env(key="BKAPP_CMDB_TOPO_CACHE_BATCH_SIZE", default=1000, _type=int)
+
+# 配置渲染编译模板缓存的容量（按模板内容摘要缓存，超出后淘汰最久未使用的模板）
+BKAPP_RENDER_TEMPLATE_CACHE_SIZE = get_type_env(key="BKAPP_RENDER_TEMPLATE_CACHE_SIZE", default=2048, _type=int)
+# 下发插件配置时，按批次并发渲染配置文件的批次大小（主机数）
+BKAPP_RENDER_CONFIG_CHUNK_SIZE = get_type_env(key="BKAPP_RENDER_CONFIG_CHUNK_SIZE", default=500, _type=int)
+
+# 调度中复用的节点级 CommonData 缓存（进程内）的容量及有效期（秒）
+BKAPP_COMMON_DATA_CACHE_SIZE = get_type_env(key="BKAPP_COMMON_DATA_CACHE_SIZE", default=256, _type=int)
+BKAPP_COMMON_DATA_CACHE_TTL = get_type_env(key="BKAPP_COMMON_DATA_CACHE_TTL", default=60, _type=int)
+
+# 安装日志上报接口缓存 token 解析结果的容量及有效期（秒）
+BKAPP_REPORT_LOG_TOKEN_CACHE_SIZE = get_type_env(key="BKAPP_REPORT_LOG_TOKEN_CACHE_SIZE", default=10000, _type=int)
+BKAPP_REPORT_LOG_TOKEN_CACHE_TTL = get_type_env(key="BKAPP_REPORT_LOG_TOKEN_CACHE_TTL", default=60, _type=int)
+
+# GSE Agent 状态短时缓存的有效期（秒），多个调用方在有效期内查询同一 Agent 时复用结果，为 0 时不缓存
+BKAPP_GSE_AGENT_STATE_CACHE_TTL = get_type_env(key="BKAPP_GSE_AGENT_STATE_CACHE_TTL", default=10, _type=int)
+
+# Agent 状态增量同步：按主机最近的状态变化分层同步，状态稳定的主机逐步降低同步频率，正在执行订阅任务的主机每轮同步
+BKAPP_SYNC_AGENT_STATUS_INCREMENTAL_ENABLED = get_type_env(
+    key="BKAPP_SYNC_AGENT_STATUS_INCREMENTAL_ENABLED", default=False, _type=bool
+)
+# 状态稳定的主机的最大同步间隔（同步周期的倍数）
+BKAPP_SYNC_AGENT_STATUS_MAX_INTERVAL_MULTIPLE = get_type_env(
+    key="BKAPP_SYNC_AGENT_STATUS_MAX_INTERVAL_MULTIPLE", default=8, _type=int
+)
+
+# 已到达终态的 pipeline 节点状态投影的缓存时间（秒）
+BKAPP_PIPELINE_NODES_STATE_CACHE_TTL = get_type_env(
+    key="BKAPP_PIPELINE_NODES_STATE_CACHE_TTL", default=60 * 60, _type=int
+)
+
 VERSION_LOG = {"MD_FILES_DIR": os.path.join(PROJECT_ROOT, "release"), "LANGUAGE_MAPPINGS": {"en": "en"}}
 
 # ==============================================================================
@@ -48,6 +48,7 @@ PIPELINE_ADDITIONAL_PRIORITY_ROUTING = {
 CELERY_ROUTES = {
     # schedule
     "pipeline.engine.tasks.service_schedule": PIPELINE_SCHEDULE_PRIORITY_ROUTING,
+    "pipeline.engine.tasks.batch_service_schedule": PIPELINE_SCHEDULE_PRIORITY_ROUTING,
     # pipeline
     "pipeline.engine.tasks.batch_wake_up": PIPELINE_PRIORITY_ROUTING,
     "pipeline.engine.tasks.dispatch": PIPELINE_PRIORITY_ROUTING,
@@ -61,6 +62,8 @@ CELERY_ROUTES = {
     "pipeline.engine.tasks.node_timeout_check": PIPELINE_ADDITIONAL_PRIORITY_ROUTING,
     "pipeline.contrib.periodic_task.tasks.periodic_task_start": PIPELINE_ADDITIONAL_PRIORITY_ROUTING,
     "pipeline.engine.tasks.heal_zombie_process": PIPELINE_ADDITIONAL_PRIORITY_ROUTING,
+    "pipeline.engine.tasks.flush_data_backend": PIPELINE_ADDITIONAL_PRIORITY_ROUTING,
+    "pipeline.engine.tasks.coalesce_schedules": PIPELINE_ADDITIONAL_PRIORITY_ROUTING,
 }
 
 
@@ -34,7 +34,7 @@ PIPELINE_ENGINE_ADAPTER_API = getattr(
 PIPELINE_DATA_BACKEND = getattr(
     settings, "PIPELINE_DATA_BACKEND", "pipeline.engine.core.data.mysql_backend.MySQLDataBackend"
 )
-PIPELINE_DATA_CANDIDATE_BACKEND = getattr(settings, "PIPELINE_DATA_BACKEND", None)
+PIPELINE_DATA_CANDIDATE_BACKEND = getattr(settings, "PIPELINE_DATA_CANDIDATE_BACKEND", None)
 PIPELINE_END_HANDLER = getattr(
     settings, "PIPELINE_END_HANDLER", "pipeline.engine.signals.handlers.pipeline_end_handler"
 )
@@ -62,6 +62,15 @@ UUID_DIGIT_STARTS_SENSITIVE = getattr(settings, "UUID_DIGIT_STARTS_SENSITIVE", F
 
 PIPELINE_LOG_LEVEL = getattr(settings, "PIPELINE_LOG_LEVEL", "INFO")
 
+# 引擎日志处理器，BufferedEngineLogHandler 在内存中缓冲日志并批量写入
+PIPELINE_LOG_HANDLER = getattr(settings, "PIPELINE_LOG_HANDLER", "pipeline.log.handlers.EngineLogHandler")
+# 缓冲队列容量，队列满时由写日志的线程同步落库（背压），仍无法入队则丢弃
+PIPELINE_LOG_BUFFER_CAPACITY = getattr(settings, "PIPELINE_LOG_BUFFER_CAPACITY", 10000)
+# 单次批量写入的日志条数，缓冲达到该数量时立即触发写入
+PIPELINE_LOG_BUFFER_FLUSH_SIZE = getattr(settings, "PIPELINE_LOG_BUFFER_FLUSH_SIZE", 500)
+# 后台线程定时写入的间隔（秒）
+PIPELINE_LOG_BUFFER_FLUSH_INTERVAL = getattr(settings, "PIPELINE_LOG_BUFFER_FLUSH_INTERVAL", 1)
+
 # 远程插件包源默认配置
 EXTERNAL_PLUGINS_SOURCE_PROXY = getattr(settings, "EXTERNAL_PLUGINS_SOURCE_PROXY", None)
 EXTERNAL_PLUGINS_SOURCE_SECURE_RESTRICT = getattr(settings, "EXTERNAL_PLUGINS_SOURCE_SECURE_RESTRICT", True)
@@ -69,3 +78,35 @@ EXTERNAL_PLUGINS_SOURCE_SECURE_RESTRICT = getattr(settings, "EXTERNAL_PLUGINS_SO
 # 僵尸进程扫描配置
 ENGINE_ZOMBIE_PROCESS_DOCTORS = getattr(settings, "ENGINE_ZOMBIE_PROCESS_DOCTORS", None)
 ENGINE_ZOMBIE_PROCESS_HEAL_CRON = getattr(settings, "ENGINE_ZOMBIE_PROCESS_HEAL_CRON", {"minute": "*/10"})
+
+# IOField 编解码配置
+# 压缩算法：zlib、lz4、zstd
+# lz4 / zstd 需安装 lz4 / zstandard（见 requirements.txt），且须在所有读写节点安装后再开启，否则其他节点无法解码
+PIPELINE_IO_FIELD_CODEC = getattr(settings, "PIPELINE_IO_FIELD_CODEC", "zlib")
+# 压缩等级，为空时使用字段默认值
+PIPELINE_IO_FIELD_COMPRESS_LEVEL = getattr(settings, "PIPELINE_IO_FIELD_COMPRESS_LEVEL", None)
+# 压缩阈值（字节），pickle 后小于该值的数据不压缩
+PIPELINE_IO_FIELD_COMPRESS_THRESHOLD = getattr(settings, "PIPELINE_IO_FIELD_COMPRESS_THRESHOLD", 1024)
+
+# RedisMySQLDataBackend 配置
+# Redis key 前缀，带 hash tag 以保证集群模式下 Lua 脚本涉及的 key 位于同一个 slot
+PIPELINE_DATA_BACKEND_REDIS_KEY_PREFIX = getattr(settings, "PIPELINE_DATA_BACKEND_REDIS_KEY_PREFIX", "{pipeline_data}:")
+# Redis 中数据的过期时间（秒），过期后从 MySQL 回源
+PIPELINE_DATA_BACKEND_REDIS_EXPIRE = getattr(settings, "PIPELINE_DATA_BACKEND_REDIS_EXPIRE", 60 * 60 * 24)
+# 回写 MySQL 的周期（秒）及单批数量
+PIPELINE_DATA_BACKEND_FLUSH_INTERVAL = getattr(settings, "PIPELINE_DATA_BACKEND_FLUSH_INTERVAL", 5)
+PIPELINE_DATA_BACKEND_FLUSH_BATCH_SIZE = getattr(settings, "PIPELINE_DATA_BACKEND_FLUSH_BATCH_SIZE", 500)
+# 调度锁过期时间（秒），需大于单次调度的最长耗时
+PIPELINE_SCHEDULE_LOCK_EXPIRE = getattr(settings, "PIPELINE_SCHEDULE_LOCK_EXPIRE", 60 * 10)
+
+# 轮询调度合并配置，开启后轮询型调度登记到 Redis，由周期任务分批发送，需配置 REDIS
+PIPELINE_SCHEDULE_COALESCE_ENABLED = getattr(settings, "PIPELINE_SCHEDULE_COALESCE_ENABLED", False)
+PIPELINE_SCHEDULE_COALESCE_REDIS_KEY_PREFIX = getattr(
+    settings, "PIPELINE_SCHEDULE_COALESCE_REDIS_KEY_PREFIX", "pipeline_schedule_coalesce:"
+)
+# 发送到期调度的周期（秒）
+PIPELINE_SCHEDULE_COALESCE_INTERVAL = getattr(settings, "PIPELINE_SCHEDULE_COALESCE_INTERVAL", 1)
+# 单个批量调度任务包含的调度数量
+PIPELINE_SCHEDULE_COALESCE_BATCH_SIZE = getattr(settings, "PIPELINE_SCHEDULE_COALESCE_BATCH_SIZE", 20)
+# 每个分组单次最多取出的到期调度数量，受 Lua unpack 参数数量限制，不宜超过 7000
+PIPELINE_SCHEDULE_COALESCE_MAX_POP_NUM = getattr(settings, "PIPELINE_SCHEDULE_COALESCE_MAX_POP_NUM", 5000)
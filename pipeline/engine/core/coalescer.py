@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+import logging
+import time
+
+from pipeline.conf import settings
+
+logger = logging.getLogger("celery")
+
+"""
+轮询调度合并
+- 轮询型调度的下一次调度不再单独发送带 countdown 的 celery 消息，而是按 celery 路由参数分组登记到 Redis 有序集合，
+  score 为到期时间，同一调度重复登记时仅保留一份
+- 周期任务取出各分组中到期的调度，分批发送 batch_service_schedule 任务，由一次 worker 调用执行一批调度
+"""
+
+# 取出并移除到期的调度，保证多个周期任务并发执行时同一调度仅被取出一次
+POP_DUE_SCRIPT = """
+local members = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, tonumber(ARGV[2]))
+if #members > 0 then
+    redis.call("ZREM", KEYS[1], unpack(members))
+end
+return members
+"""
+
+
+def is_enabled():
+    return settings.PIPELINE_SCHEDULE_COALESCE_ENABLED
+
+
+def _groups_key():
+    return "{}groups".format(settings.PIPELINE_SCHEDULE_COALESCE_REDIS_KEY_PREFIX)
+
+
+def _group_key(group):
+    return "{}schedules:{}".format(settings.PIPELINE_SCHEDULE_COALESCE_REDIS_KEY_PREFIX, group)
+
+
+def register(process_id, schedule_id, countdown, task_options):
+    """
+    登记下一次调度
+    :param process_id: 被调度的节点所属的 PipelineProcess
+    :param schedule_id: 调度 ID
+    :param countdown: 距下一次调度的秒数
+    :param task_options: batch_service_schedule 任务的路由参数，路由参数相同的调度合并执行
+    """
+    register_many([(process_id, schedule_id)], countdown, task_options)
+
+
+def register_many(schedules, countdown, task_options):
+    """
+    批量登记下一次调度
+    :param schedules: [(process_id, schedule_id), ...]
+    """
+    if not schedules:
+        return
+    group = json.dumps(task_options, sort_keys=True)
+    execute_at = time.time() + countdown
+    pipe = settings.redis_inst.pipeline(transaction=False)
+    pipe.sadd(_groups_key(), group)
+    pipe.zadd(_group_key(group), {json.dumps(list(schedule)): execute_at for schedule in schedules})
+    pipe.execute()
+
+
+def pop_due_schedules(group, max_num):
+    """
+    取出分组中到期的调度
+    :return: [(process_id, schedule_id), ...]
+    """
+    pop_due = settings.redis_inst.register_script(POP_DUE_SCRIPT)
+    members = pop_due(keys=[_group_key(group)], args=[time.time(), max_num])
+    return [tuple(json.loads(member)) for member in members]
+
+
+def dispatch(start_func):
+    """
+    分批发送各分组中到期的调度
+    已取出的调度在 Redis 中已被移除，发送失败或因异常中断而未发送的调度重新登记，在下一次分发时重试
+    :param start_func: 发送批量调度任务的函数，接收 args 及路由参数
+    :return: 本次发送的调度数量
+    """
+    batch_size = settings.PIPELINE_SCHEDULE_COALESCE_BATCH_SIZE
+    dispatched_num = 0
+    for group in settings.redis_inst.smembers(_groups_key()):
+        group = group.decode() if isinstance(group, bytes) else group
+        task_options = json.loads(group)
+        undispatched_schedules = pop_due_schedules(group, settings.PIPELINE_SCHEDULE_COALESCE_MAX_POP_NUM)
+        failed_schedules = []
+        try:
+            while undispatched_schedules:
+                batch = undispatched_schedules[:batch_size]
+                try:
+                    start_func(args=[batch], **task_options)
+                except Exception:
+                    logger.exception("[schedule coalescer] dispatch schedules failed, re-register -> %s", len(batch))
+                    failed_schedules.extend(batch)
+                else:
+                    dispatched_num += len(batch)
+                del undispatched_schedules[:batch_size]
+        finally:
+            register_many(failed_schedules + undispatched_schedules, 0, task_options)
+    return dispatched_num
@@ -125,3 +125,35 @@ def get_schedule_parent_data(schedule_id):
 
 def delete_parent_data(schedule_id):
     return del_object("%s_schedule_parent_data" % schedule_id)
+
+
+def is_schedule_state_cached():
+    """数据后端是否托管调度锁及调度次数，否则由 ScheduleService 表维护"""
+    return getattr(_backend, "SCHEDULE_STATE_CACHED", False)
+
+
+def acquire_schedule_lock(schedule_id):
+    return _backend.acquire_schedule_lock(schedule_id)
+
+
+def release_schedule_lock(schedule_id, identifier):
+    return _backend.release_schedule_lock(schedule_id, identifier)
+
+
+def incr_schedule_times(schedule_id, schedule_times):
+    return _backend.incr_schedule_times(schedule_id, schedule_times)
+
+
+def is_flush_required():
+    """数据后端是否需要周期性地将待回写的数据写入数据库"""
+    return any(hasattr(backend, "flush") for backend in [_backend, _candidate_backend])
+
+
+def flush_backend():
+    """将异步回写的数据后端中待回写的数据写入数据库"""
+    for backend in [_backend, _candidate_backend]:
+        if not hasattr(backend, "flush"):
+            continue
+        batch_size = settings.PIPELINE_DATA_BACKEND_FLUSH_BATCH_SIZE
+        while backend.flush(batch_size) >= batch_size:
+            pass
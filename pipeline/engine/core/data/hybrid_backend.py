@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import logging
+import time
+import uuid
+
+from pipeline.conf import settings
+from pipeline.engine.core.data.base_backend import BaseDataBackend
+from pipeline.engine.models.codecs import IOCodec, get_codec
+from pipeline.engine.models.data import DataSnapshot
+
+logger = logging.getLogger("celery")
+
+"""
+Redis 优先、异步回写 MySQL 的数据后端
+- 写入时通过 Lua 原子地写入数据并登记到待回写集合，由周期任务批量回写 DataSnapshot
+- 读取优先命中 Redis，未命中时回源 MySQL 并回填
+- 调度锁及调度次数保存在 Redis 中，调度过程无需再更新 ScheduleService 表
+- 所有 key 使用同一个 hash tag，保证 Lua 脚本中的 key 在集群模式下位于同一个 slot
+"""
+
+SET_OBJECT_SCRIPT = """
+redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[2])
+redis.call("ZADD", KEYS[2], ARGV[3], ARGV[4])
+return 1
+"""
+
+DEL_OBJECT_SCRIPT = """
+redis.call("ZREM", KEYS[2], ARGV[1])
+return redis.call("DEL", KEYS[1])
+"""
+
+# 弹出一批待回写 key 及其数据，KEYS[1] 为待回写集合，KEYS[i + 1] 为 ARGV[i] 对应的数据 key
+# 已被其他回写任务弹出的 key 跳过，数据已过期的返回 false
+POP_DIRTY_SCRIPT = """
+local result = {}
+for index, key in ipairs(ARGV) do
+    if redis.call("ZREM", KEYS[1], key) == 1 then
+        table.insert(result, key)
+        table.insert(result, redis.call("GET", KEYS[index + 1]))
+    end
+end
+return result
+"""
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+# 首次计数时以数据库中的调度次数为初始值
+INCR_SCHEDULE_TIMES_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 0 then
+    redis.call("SET", KEYS[1], ARGV[1])
+end
+local schedule_times = redis.call("INCR", KEYS[1])
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+return schedule_times
+"""
+
+
+class RedisMySQLDataBackend(BaseDataBackend):
+    SCHEDULE_STATE_CACHED = True
+
+    def __init__(self):
+        self.key_prefix = settings.PIPELINE_DATA_BACKEND_REDIS_KEY_PREFIX
+        self.expire = settings.PIPELINE_DATA_BACKEND_REDIS_EXPIRE
+        self.dirty_key = "{}dirty_keys".format(self.key_prefix)
+        self.io_codec = IOCodec(
+            get_codec(settings.PIPELINE_IO_FIELD_CODEC, settings.PIPELINE_IO_FIELD_COMPRESS_LEVEL),
+            settings.PIPELINE_IO_FIELD_COMPRESS_THRESHOLD,
+        )
+        self._scripts = {}
+
+    def _script(self, script):
+        # redis_inst 在 AppConfig.ready 中初始化，脚本需延迟注册
+        if script not in self._scripts:
+            self._scripts[script] = settings.redis_inst.register_script(script)
+        return self._scripts[script]
+
+    def _redis_key(self, key):
+        return "{}{}".format(self.key_prefix, key)
+
+    def _loads(self, payload):
+        return self.io_codec.loads(payload) if payload else None
+
+    def set_object(self, key, obj):
+        self._script(SET_OBJECT_SCRIPT)(
+            keys=[self._redis_key(key), self.dirty_key], args=[self.io_codec.dumps(obj), self.expire, time.time(), key]
+        )
+        return True
+
+    def get_object(self, key):
+        obj = self._loads(settings.redis_inst.get(self._redis_key(key)))
+        if obj is not None:
+            return obj
+
+        obj = DataSnapshot.objects.get_object(key)
+        if obj is not None:
+            # 回源的数据与数据库一致，无需登记回写
+            settings.redis_inst.set(self._redis_key(key), self.io_codec.dumps(obj), ex=self.expire, nx=True)
+        return obj
+
+    def del_object(self, key):
+        self._script(DEL_OBJECT_SCRIPT)(keys=[self._redis_key(key), self.dirty_key], args=[key])
+        return DataSnapshot.objects.del_object(key)
+
+    def expire_cache(self, key, value, expires):
+        settings.redis_inst.set(self._redis_key(key), self.io_codec.dumps(value), ex=expires)
+        return True
+
+    def cache_for(self, key):
+        return self._loads(settings.redis_inst.get(self._redis_key(key)))
+
+    def flush(self, batch_size=None):
+        """
+        将一批待回写的数据写入 DataSnapshot
+        :param batch_size: 单批回写数量
+        :return: 本批成功回写的数量，小于 batch_size 说明已无待回写数据、部分 key 已被其他回写任务弹出或回写异常
+        """
+        batch_size = batch_size or settings.PIPELINE_DATA_BACKEND_FLUSH_BATCH_SIZE
+        dirty_keys = [
+            key.decode() if isinstance(key, bytes) else key
+            for key in settings.redis_inst.zrange(self.dirty_key, 0, batch_size - 1)
+        ]
+        if not dirty_keys:
+            return 0
+        # 脚本访问的 key 均通过 KEYS 声明
+        result = self._script(POP_DIRTY_SCRIPT)(
+            keys=[self.dirty_key] + [self._redis_key(key) for key in dirty_keys], args=dirty_keys
+        )
+
+        flushed_num, failed_keys = 0, []
+        for index in range(0, len(result), 2):
+            key, payload = result[index], result[index + 1]
+            key = key.decode() if isinstance(key, bytes) else key
+            if not payload:
+                logger.warning("[RedisMySQLDataBackend] data of key({}) expired before flush".format(key))
+                continue
+            try:
+                DataSnapshot.objects.set_object(key, self._loads(payload))
+            except Exception:
+                logger.exception("[RedisMySQLDataBackend] flush key({}) failed".format(key))
+                failed_keys.append(key)
+            else:
+                flushed_num += 1
+
+        if failed_keys:
+            # 回写失败的 key 重新登记，期间已被再次写入的 key 保留最新的登记时间
+            settings.redis_inst.zadd(self.dirty_key, {key: time.time() for key in failed_keys}, nx=True)
+
+        return flushed_num
+
+    def acquire_schedule_lock(self, schedule_id):
+        """
+        获取调度锁
+        :return: 成功返回锁标识，失败返回 None
+        """
+        identifier = uuid.uuid4().hex
+        lock_key = self._redis_key("schedule_lock:{}".format(schedule_id))
+        # 锁带有过期时间，worker 异常退出时不会导致调度永久无法加锁
+        if settings.redis_inst.set(lock_key, identifier, ex=settings.PIPELINE_SCHEDULE_LOCK_EXPIRE, nx=True):
+            return identifier
+        return None
+
+    def release_schedule_lock(self, schedule_id, identifier):
+        lock_key = self._redis_key("schedule_lock:{}".format(schedule_id))
+        return self._script(RELEASE_LOCK_SCRIPT)(keys=[lock_key], args=[identifier])
+
+    def incr_schedule_times(self, schedule_id, schedule_times):
+        times_key = self._redis_key("schedule_times:{}".format(schedule_id))
+        return self._script(INCR_SCHEDULE_TIMES_SCRIPT)(keys=[times_key], args=[schedule_times, self.expire])
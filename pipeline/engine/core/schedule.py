@@ -19,7 +19,15 @@ from django.db import transaction
 
 from pipeline.django_signal_valve import valve
 from pipeline.engine import exceptions, signals, states
-from pipeline.engine.core.data import delete_parent_data, get_schedule_parent_data, set_schedule_data
+from pipeline.engine.core.data import (
+    acquire_schedule_lock,
+    delete_parent_data,
+    get_schedule_parent_data,
+    incr_schedule_times,
+    is_schedule_state_cached,
+    release_schedule_lock,
+    set_schedule_data,
+)
 from pipeline.engine.models import Data, MultiCallbackData, PipelineProcess, ScheduleService, Status
 
 logger = logging.getLogger("celery")
@@ -42,12 +50,29 @@ def schedule_exception_handler(process_id, schedule_id):
         delete_parent_data(schedule_id)
 
 
+def lock_schedule(schedule_id):
+    """
+    获取调度锁，数据后端托管调度状态时使用 Redis 锁，否则更新 ScheduleService 表
+    :return: 成功返回锁标识，失败返回 None
+    """
+    if is_schedule_state_cached():
+        return acquire_schedule_lock(schedule_id)
+
+    is_updated = ScheduleService.objects.filter(id=schedule_id, is_scheduling=False).update(is_scheduling=True)
+    return True if is_updated else None
+
+
 @contextlib.contextmanager
-def auto_release_schedule_lock(schedule_id):
-    yield
-    # release schedule lock before exit schedule
-    ScheduleService.objects.filter(id=schedule_id, is_scheduling=True).update(is_scheduling=False)
-    logger.warning("schedule({}) unlock success.".format(schedule_id))
+def auto_release_schedule_lock(schedule_id, lock_identifier=True):
+    try:
+        yield
+    finally:
+        # release schedule lock before exit schedule, even if schedule raise
+        if is_schedule_state_cached():
+            release_schedule_lock(schedule_id, lock_identifier)
+        else:
+            ScheduleService.objects.filter(id=schedule_id, is_scheduling=True).update(is_scheduling=False)
+        logger.warning("schedule({}) unlock success.".format(schedule_id))
 
 
 def schedule(process_id, schedule_id, data_id=None):
@@ -72,10 +97,10 @@ def schedule(process_id, schedule_id, data_id=None):
             return
 
         # try update lock schedule
-        is_updated = ScheduleService.objects.filter(id=schedule_id, is_scheduling=False).update(is_scheduling=True)
+        lock_identifier = lock_schedule(schedule_id)
 
         # lock failed, other worker may locking
-        if is_updated == 0:
+        if lock_identifier is None:
             # retry lock after seconds
             logger.warning("schedule service lock-{} failed, retry after seconds".format(schedule_id))
             valve.send(
@@ -89,7 +114,7 @@ def schedule(process_id, schedule_id, data_id=None):
             )
             return
 
-        with auto_release_schedule_lock(schedule_id):
+        with auto_release_schedule_lock(schedule_id, lock_identifier):
             service_act = sched_service.service_act
             act_id = sched_service.activity_id
             version = sched_service.version
@@ -137,7 +162,11 @@ def schedule(process_id, schedule_id, data_id=None):
                 ex_data = traceback.format_exc()
                 logging.error(ex_data)
 
-            sched_service.schedule_times += 1
+            if is_schedule_state_cached():
+                # 调度次数在 Redis 中累加，随 ScheduleService 的下一次保存写回数据库
+                sched_service.schedule_times = incr_schedule_times(sched_service.id, sched_service.schedule_times)
+            else:
+                sched_service.schedule_times += 1
             set_schedule_data(sched_service.id, parent_data)
 
             # schedule failed
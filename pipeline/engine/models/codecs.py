@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import pickle
+import threading
+import zlib
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+"""
+IOField 数据编解码
+- 编码后的数据以 1 字节头部标识压缩算法，头部之后为（压缩后的）pickle 数据
+- 小于阈值的数据不压缩，仅添加头部
+- 历史数据为不带头部的 zlib 数据，首字节恒为 0x78，与头部取值不冲突，可直接按 zlib 解码
+"""
+
+# pickle 协议 5 需 Python 3.8+，低版本回退为当前支持的最高协议
+PICKLE_PROTOCOL = min(5, pickle.HIGHEST_PROTOCOL)
+
+DEFAULT_CODEC = "zlib"
+
+
+class Codec(object):
+    name = None
+    header = None
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def compress(self, data):
+        raise NotImplementedError
+
+    def decompress(self, data):
+        raise NotImplementedError
+
+
+class RawCodec(Codec):
+    name = "raw"
+    header = b"\x00"
+
+    def compress(self, data):
+        return data
+
+    def decompress(self, data):
+        return data
+
+
+class ZlibCodec(Codec):
+    name = "zlib"
+    header = b"\x01"
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class Lz4Codec(Codec):
+    name = "lz4"
+    header = b"\x02"
+
+    @classmethod
+    def is_available(cls):
+        return lz4_frame is not None
+
+    def compress(self, data):
+        return lz4_frame.compress(data)
+
+    def decompress(self, data):
+        return lz4_frame.decompress(data)
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+    header = b"\x03"
+
+    def __init__(self, level=3):
+        self.level = level
+        # ZstdCompressor / ZstdDecompressor 实例非线程安全，按线程缓存
+        self._local = threading.local()
+
+    @classmethod
+    def is_available(cls):
+        return zstandard is not None
+
+    def compress(self, data):
+        if not hasattr(self._local, "compressor"):
+            self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return self._local.compressor.compress(data)
+
+    def decompress(self, data):
+        if not hasattr(self._local, "decompressor"):
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        # 压缩时写入了内容长度，无需指定 max_output_size
+        return self._local.decompressor.decompress(data)
+
+
+CODEC_CLASSES = [ZlibCodec, Lz4Codec, ZstdCodec]
+
+HEADER_CODEC_MAP = {codec_class.header: codec_class() for codec_class in CODEC_CLASSES + [RawCodec]}
+
+
+def get_codec(name=DEFAULT_CODEC, level=None):
+    """
+    获取压缩算法
+    lz4 / zstd 需显式指定，且依赖的模块未安装时直接报错，避免部分节点写入其他节点无法解码的数据
+    :param name: 算法名称
+    :param level: 压缩等级，仅对 zlib / zstd 生效
+    """
+    for codec_class in CODEC_CLASSES:
+        if name != codec_class.name:
+            continue
+        if not codec_class.is_available():
+            raise RuntimeError("codec({}) is not available, please install it first".format(name))
+        if level is None or codec_class is Lz4Codec:
+            return codec_class()
+        return codec_class(level)
+    raise ValueError("unknown codec({}), choices: {}".format(name, [codec_class.name for codec_class in CODEC_CLASSES]))
+
+
+class IOCodec(object):
+    def __init__(self, codec, threshold=0):
+        """
+        :param codec: 写入时使用的压缩算法
+        :param threshold: 压缩阈值（字节），pickle 后小于该值的数据不压缩
+        """
+        self.codec = codec
+        self.threshold = threshold
+
+    def dumps(self, value):
+        data = pickle.dumps(value, PICKLE_PROTOCOL)
+        if len(data) < self.threshold:
+            return RawCodec.header + data
+        return self.codec.header + self.codec.compress(data)
+
+    @staticmethod
+    def decode(payload):
+        """解码为 pickle 数据，兼容不带头部的历史 zlib 数据"""
+        payload = bytes(payload)
+        codec = HEADER_CODEC_MAP.get(payload[:1])
+        if codec is None:
+            return zlib.decompress(payload)
+        if not codec.is_available():
+            raise RuntimeError("codec({}) is not available, please install it first".format(codec.name))
+        return codec.decompress(payload[1:])
+
+    def loads(self, payload, **kwargs):
+        return pickle.loads(self.decode(payload), **kwargs)
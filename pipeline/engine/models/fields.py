@@ -11,12 +11,12 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-import pickle
 import traceback
-import zlib
 
 from django.db import models
 
+from pipeline.conf import default_settings
+from pipeline.engine.models.codecs import IOCodec, get_codec
 from pipeline.utils.utils import convert_bytes_to_str
 
 
@@ -24,18 +24,31 @@ class IOField(models.BinaryField):
     def __init__(self, compress_level=6, *args, **kwargs):
         super(IOField, self).__init__(*args, **kwargs)
         self.compress_level = compress_level
+        self._io_codec = None
+
+    @property
+    def io_codec(self):
+        if self._io_codec is None:
+            self._io_codec = IOCodec(
+                codec=get_codec(
+                    default_settings.PIPELINE_IO_FIELD_CODEC,
+                    level=default_settings.PIPELINE_IO_FIELD_COMPRESS_LEVEL or self.compress_level,
+                ),
+                threshold=default_settings.PIPELINE_IO_FIELD_COMPRESS_THRESHOLD,
+            )
+        return self._io_codec
 
     def get_prep_value(self, value):
         value = super(IOField, self).get_prep_value(value)
-        return zlib.compress(pickle.dumps(value), self.compress_level)
+        return self.io_codec.dumps(value)
 
     def to_python(self, value):
         try:
             value = super(IOField, self).to_python(value)
-            return pickle.loads(zlib.decompress(value))
+            return self.io_codec.loads(value)
         except UnicodeDecodeError:
             # py2 pickle data process
-            return convert_bytes_to_str(pickle.loads(zlib.decompress(value), encoding="bytes"))
+            return convert_bytes_to_str(self.io_codec.loads(value, encoding="bytes"))
         except Exception:
             return "IOField to_python raise error: {}".format(traceback.format_exc())
 
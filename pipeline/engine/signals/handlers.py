@@ -13,6 +13,7 @@ specific language governing permissions and limitations under the License.
 
 from pipeline.celery.settings import QueueResolver
 from pipeline.engine import tasks
+from pipeline.engine.core import coalescer
 from pipeline.engine.models import NodeCeleryTask, PipelineModel, PipelineProcess, ProcessCeleryTask, ScheduleCeleryTask
 
 
@@ -111,6 +112,11 @@ def schedule_ready_handler(sender, process_id, schedule_id, countdown, data_id=N
     task = tasks.service_schedule
     args_resolver = CeleryTaskArgsResolver(process_id)
 
+    # 轮询型调度合并发送，回调型调度需立即执行
+    if countdown and data_id is None and coalescer.is_enabled():
+        coalescer.register(process_id, schedule_id, countdown, args_resolver.resolve_args(tasks.batch_service_schedule))
+        return
+
     ScheduleCeleryTask.objects.start_task(
         schedule_id=schedule_id,
         start_func=task.apply_async,
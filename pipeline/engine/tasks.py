@@ -12,6 +12,7 @@ specific language governing permissions and limitations under the License.
 """
 
 import logging
+from datetime import timedelta
 
 from celery import task
 from celery.decorators import periodic_task
@@ -20,7 +21,7 @@ from celery.schedules import crontab
 from pipeline.conf import default_settings
 from pipeline.core.pipeline import Pipeline
 from pipeline.engine import api, signals, states
-from pipeline.engine.core import runtime, schedule
+from pipeline.engine.core import coalescer, data, runtime, schedule
 from pipeline.engine.health import zombie
 from pipeline.engine.models import NodeCeleryTask, NodeRelationship, PipelineProcess, ProcessCeleryTask, Status
 
@@ -129,6 +130,15 @@ def service_schedule(process_id, schedule_id, data_id=None):
     schedule.schedule(process_id, schedule_id, data_id)
 
 
+@task(ignore_result=True)
+def batch_service_schedule(schedules):
+    for process_id, schedule_id in schedules:
+        try:
+            schedule.schedule(process_id, schedule_id)
+        except Exception:
+            logger.exception("schedule({} - {}) failed in batch".format(process_id, schedule_id))
+
+
 @task(ignore_result=True)
 def node_timeout_check(node_id, version, root_pipeline_id):
     NodeCeleryTask.objects.destroy(node_id)
@@ -156,3 +166,30 @@ def heal_zombie_process():
         logger.exception("An error occurred when healing zombies")
 
     logger.info("Zombie process heal finish")
+
+
+if data.is_flush_required():
+
+    @periodic_task(
+        run_every=timedelta(seconds=default_settings.PIPELINE_DATA_BACKEND_FLUSH_INTERVAL), ignore_result=True
+    )
+    def flush_data_backend():
+        try:
+            data.flush_backend()
+        except Exception:
+            logger.exception("An error occurred when flushing data backend")
+
+
+if default_settings.PIPELINE_SCHEDULE_COALESCE_ENABLED:
+
+    @periodic_task(
+        run_every=timedelta(seconds=default_settings.PIPELINE_SCHEDULE_COALESCE_INTERVAL), ignore_result=True
+    )
+    def coalesce_schedules():
+        try:
+            dispatched_num = coalescer.dispatch(batch_service_schedule.apply_async)
+        except Exception:
+            logger.exception("An error occurred when dispatching coalesced schedules")
+            return
+        if dispatched_num:
+            logger.info("coalesced schedules dispatched -> {}".format(dispatched_num))
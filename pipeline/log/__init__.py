@@ -15,8 +15,11 @@ import logging
 
 
 def setup(level=None):
-    from pipeline.logging import pipeline_logger as logger
+    from django.utils.module_loading import import_string
+
+    from pipeline.conf import default_settings
     from pipeline.log.handlers import EngineLogHandler
+    from pipeline.logging import pipeline_logger as logger
 
     if level in set(logging._levelToName.values()):
         logger.setLevel(level)
@@ -27,7 +30,7 @@ def setup(level=None):
             if isinstance(hdl, EngineLogHandler):
                 break
         else:
-            hdl = EngineLogHandler()
+            hdl = import_string(default_settings.PIPELINE_LOG_HANDLER)()
             hdl.setLevel(logger.level)
             logger.addHandler(hdl)
     finally:
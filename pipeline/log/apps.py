@@ -21,6 +21,12 @@ class LogConfig(AppConfig):
     verbose_name = "Database Logging"
 
     def ready(self):
+        from celery.signals import worker_process_shutdown
+
         from pipeline.log import setup
+        from pipeline.log.handlers import worker_process_shutdown_handler
 
         setup(level=default_settings.PIPELINE_LOG_LEVEL)
+        worker_process_shutdown.connect(
+            worker_process_shutdown_handler, weak=False, dispatch_uid="_pipeline_log_worker_process_shutdown"
+        )
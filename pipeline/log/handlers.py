@@ -12,16 +12,158 @@ specific language governing permissions and limitations under the License.
 """
 
 import logging
+import os
+import queue
+import threading
+import time
+
+from django.db import close_old_connections
+
+from pipeline.conf import default_settings
 
 from . import models
 
+logger = logging.getLogger("root")
+
 
 class EngineLogHandler(logging.Handler):
-    def emit(self, record):
-        models.LogEntry.objects.create(
+    def make_entry(self, record):
+        return models.LogEntry(
             logger_name=record.name,
             level_name=record.levelname,
             message=self.format(record),
             exception=record.exc_text,
             node_id=record._id,
         )
+
+    def emit(self, record):
+        self.make_entry(record).save(force_insert=True)
+
+
+class BufferedEngineLogHandler(EngineLogHandler):
+    """
+    缓冲写入的引擎日志处理器
+    - 日志先写入有界队列，由后台线程按数量或间隔批量写入
+    - 队列满时由写日志的线程同步写入（背压），仍无法入队则丢弃
+    - 关联执行历史、进程退出（logging.shutdown）及 celery 子进程退出（worker_process_shutdown）前写入缓冲中的日志
+    """
+
+    def __init__(self, capacity=None, flush_size=None, flush_interval=None, level=logging.NOTSET):
+        super(BufferedEngineLogHandler, self).__init__(level)
+        self.capacity = capacity or default_settings.PIPELINE_LOG_BUFFER_CAPACITY
+        self.flush_size = flush_size or default_settings.PIPELINE_LOG_BUFFER_FLUSH_SIZE
+        self.flush_interval = flush_interval or default_settings.PIPELINE_LOG_BUFFER_FLUSH_INTERVAL
+        self._flush_lock = threading.Lock()
+        self._flusher_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._reset()
+
+    def _reset(self):
+        # fork 后子进程不会继承后台线程，且队列中为父进程的日志，需重新初始化
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self.capacity)
+        self._flusher = None
+
+    def _check_fork(self):
+        if self._pid == os.getpid():
+            return
+        with self._flusher_lock:
+            if self._pid != os.getpid():
+                self._reset()
+
+    def _ensure_flusher(self):
+        self._check_fork()
+        if self._flusher is not None:
+            return
+        with self._flusher_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name="engine-log-flusher", daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            # 后台线程长期持有数据库连接，写入前清理超时的连接
+            close_old_connections()
+            self.flush()
+
+    def emit(self, record):
+        try:
+            entry = self.make_entry(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        self._ensure_flusher()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.on_backpressure()
+            self.flush()
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self.on_dropped(1)
+                return
+
+        if self._queue.qsize() >= self.flush_size:
+            self._wakeup.set()
+
+    def _drain(self):
+        entries = []
+        while len(entries) < self.flush_size:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return entries
+
+    def flush(self):
+        self._check_fork()
+        with self._flush_lock:
+            while True:
+                entries = self._drain()
+                if not entries:
+                    break
+                start = time.perf_counter()
+                try:
+                    models.LogEntry.objects.bulk_create(entries, batch_size=self.flush_size)
+                except Exception:
+                    logger.exception("[BufferedEngineLogHandler] bulk_create failed, dropped -> %s", len(entries))
+                    self.on_dropped(len(entries))
+                    continue
+                self.on_flushed(len(entries), time.perf_counter() - start)
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+        super(BufferedEngineLogHandler, self).close()
+
+    @property
+    def buffered_num(self):
+        return self._queue.qsize()
+
+    def on_flushed(self, count, duration):
+        """批量写入成功后的回调，可用于上报监控"""
+
+    def on_dropped(self, count):
+        """日志被丢弃后的回调，可用于上报监控"""
+
+    def on_backpressure(self):
+        """队列已满、写日志的线程同步写入时的回调，可用于上报监控"""
+
+
+def flush_engine_log_handlers():
+    from pipeline.logging import pipeline_logger
+
+    for hdl in pipeline_logger.handlers:
+        if isinstance(hdl, BufferedEngineLogHandler):
+            hdl.flush()
+
+
+def worker_process_shutdown_handler(**kwargs):
+    # celery prefork 子进程通过 os._exit 退出，不会执行 logging.shutdown，需在退出前写入缓冲中的日志
+    flush_engine_log_handlers()
@@ -18,6 +18,10 @@ from django.utils.translation import ugettext_lazy as _
 
 class LogEntryManager(models.Manager):
     def link_history(self, node_id, history_id):
+        from pipeline.log.handlers import flush_engine_log_handlers
+
+        # 关联执行历史前写入缓冲中的日志，避免历史日志残留在当前执行的日志中
+        flush_engine_log_handlers()
         self.filter(node_id=node_id, history_id=-1).update(history_id=history_id)
 
     def plain_log_for_node(self, node_id, history_id):
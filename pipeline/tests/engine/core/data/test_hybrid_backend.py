@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import mock
+from django.test import TestCase, override_settings
+
+from pipeline.conf import settings
+from pipeline.engine.core.data.hybrid_backend import RedisMySQLDataBackend
+from pipeline.engine.models.data import DataSnapshot
+
+KEY_PREFIX = "{pipeline_data_test}:"
+
+
+@override_settings(PIPELINE_DATA_BACKEND_REDIS_KEY_PREFIX=KEY_PREFIX)
+class RedisMySQLDataBackendTestCase(TestCase):
+    def setUp(self):
+        self.backend = RedisMySQLDataBackend()
+        self.key = "test_key"
+        self.obj = {"a": "a", 1: "1", 2: "2", "list": [4, 5, 6]}
+        self.addCleanup(self.clear_redis_keys)
+
+    @staticmethod
+    def clear_redis_keys():
+        keys = list(settings.redis_inst.scan_iter(match="{}*".format(KEY_PREFIX)))
+        if keys:
+            settings.redis_inst.delete(*keys)
+
+    def dirty_keys(self):
+        return [key.decode() for key in settings.redis_inst.zrange(self.backend.dirty_key, 0, -1)]
+
+    def test_set_object(self):
+        self.assertTrue(self.backend.set_object(self.key, self.obj))
+        self.assertEqual(self.backend.get_object(self.key), self.obj)
+        # 数据先写入 Redis 并登记回写，由 flush 写入 MySQL
+        self.assertEqual(self.dirty_keys(), [self.key])
+        self.assertIsNone(DataSnapshot.objects.get_object(self.key))
+
+    def test_get_object__fallback_to_mysql(self):
+        DataSnapshot.objects.set_object(self.key, self.obj)
+        self.assertEqual(self.backend.get_object(self.key), self.obj)
+        # 回源后回填 Redis，无需登记回写
+        self.assertEqual(self.backend.cache_for(self.key), self.obj)
+        self.assertEqual(self.dirty_keys(), [])
+
+    def test_del_object(self):
+        self.backend.set_object(self.key, self.obj)
+        self.backend.del_object(self.key)
+        self.assertIsNone(self.backend.get_object(self.key))
+        self.assertEqual(self.dirty_keys(), [])
+
+    def test_flush(self):
+        keys = ["{}_{}".format(self.key, index) for index in range(3)]
+        for key in keys:
+            self.backend.set_object(key, self.obj)
+
+        self.assertEqual(self.backend.flush(batch_size=2), 2)
+        self.assertEqual(self.backend.flush(batch_size=2), 1)
+        self.assertEqual(self.backend.flush(batch_size=2), 0)
+        self.assertEqual(self.dirty_keys(), [])
+        for key in keys:
+            self.assertEqual(DataSnapshot.objects.get_object(key), self.obj)
+
+    def test_flush__data_expired(self):
+        self.backend.set_object(self.key, self.obj)
+        settings.redis_inst.delete(self.backend._redis_key(self.key))
+
+        # 数据过期的 key 仅从待回写集合中移除
+        self.assertEqual(self.backend.flush(), 0)
+        self.assertEqual(self.dirty_keys(), [])
+        self.assertIsNone(DataSnapshot.objects.get_object(self.key))
+
+    def test_flush__failed(self):
+        self.backend.set_object(self.key, self.obj)
+
+        with mock.patch.object(DataSnapshot.objects, "set_object", mock.MagicMock(side_effect=Exception)):
+            self.assertEqual(self.backend.flush(), 0)
+        # 回写失败的 key 重新登记，下次回写
+        self.assertEqual(self.dirty_keys(), [self.key])
+        self.assertEqual(self.backend.flush(), 1)
+        self.assertEqual(DataSnapshot.objects.get_object(self.key), self.obj)
+
+    def test_schedule_lock(self):
+        identifier = self.backend.acquire_schedule_lock("schedule_id")
+        self.assertIsNotNone(identifier)
+        self.assertIsNone(self.backend.acquire_schedule_lock("schedule_id"))
+
+        # 仅持有锁的一方可以释放
+        self.assertEqual(self.backend.release_schedule_lock("schedule_id", "other_identifier"), 0)
+        self.assertIsNone(self.backend.acquire_schedule_lock("schedule_id"))
+        self.assertEqual(self.backend.release_schedule_lock("schedule_id", identifier), 1)
+        self.assertIsNotNone(self.backend.acquire_schedule_lock("schedule_id"))
+
+    def test_incr_schedule_times(self):
+        # 首次计数以数据库中的调度次数为初始值
+        self.assertEqual(self.backend.incr_schedule_times("schedule_id", 3), 4)
+        self.assertEqual(self.backend.incr_schedule_times("schedule_id", 3), 5)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+
+import mock
+from django.test import TestCase, override_settings
+
+from pipeline.conf import settings
+from pipeline.engine import tasks
+from pipeline.engine.core import coalescer
+from pipeline.engine.signals import handlers
+
+KEY_PREFIX = "pipeline_schedule_coalesce_test:"
+TASK_OPTIONS = {"queue": "pipeline_additional_task", "routing_key": "pipeline_additional_task", "priority": 5}
+
+
+@override_settings(PIPELINE_SCHEDULE_COALESCE_REDIS_KEY_PREFIX=KEY_PREFIX, PIPELINE_SCHEDULE_COALESCE_BATCH_SIZE=2)
+class CoalescerTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(self.clear_redis_keys)
+
+    @staticmethod
+    def clear_redis_keys():
+        keys = list(settings.redis_inst.scan_iter(match="{}*".format(KEY_PREFIX)))
+        if keys:
+            settings.redis_inst.delete(*keys)
+
+    @staticmethod
+    def group():
+        return json.dumps(TASK_OPTIONS, sort_keys=True)
+
+    def test_register(self):
+        coalescer.register("process_id", "schedule_id", 0, TASK_OPTIONS)
+        # 同一调度重复登记时仅保留一份
+        coalescer.register("process_id", "schedule_id", 0, TASK_OPTIONS)
+        coalescer.register("process_id", "not_due_schedule_id", 60, TASK_OPTIONS)
+
+        self.assertEqual(coalescer.pop_due_schedules(self.group(), 10), [("process_id", "schedule_id")])
+        # 已取出的调度不会被再次取出，未到期的调度保留
+        self.assertEqual(coalescer.pop_due_schedules(self.group(), 10), [])
+        self.assertEqual(settings.redis_inst.zcard(coalescer._group_key(self.group())), 1)
+
+    def test_dispatch(self):
+        schedules = [("process_id", "schedule_id_{}".format(index)) for index in range(3)]
+        coalescer.register_many(schedules, 0, TASK_OPTIONS)
+        start_func = mock.MagicMock()
+
+        self.assertEqual(coalescer.dispatch(start_func), 3)
+        self.assertEqual(start_func.call_count, 2)
+        dispatched_schedules = []
+        for call_args in start_func.call_args_list:
+            self.assertEqual(call_args[1]["queue"], TASK_OPTIONS["queue"])
+            dispatched_schedules.extend(call_args[1]["args"][0])
+        self.assertEqual(sorted(dispatched_schedules), schedules)
+        self.assertEqual(coalescer.dispatch(start_func), 0)
+
+    def test_dispatch__failed(self):
+        schedules = [("process_id", "schedule_id_{}".format(index)) for index in range(3)]
+        coalescer.register_many(schedules, 0, TASK_OPTIONS)
+
+        # 发送失败的调度重新登记，下一次分发时重试
+        self.assertEqual(coalescer.dispatch(mock.MagicMock(side_effect=[Exception, None])), 1)
+        start_func = mock.MagicMock()
+        self.assertEqual(coalescer.dispatch(start_func), 2)
+
+    def test_dispatch__interrupted(self):
+        schedules = [("process_id", "schedule_id_{}".format(index)) for index in range(3)]
+        coalescer.register_many(schedules, 0, TASK_OPTIONS)
+
+        # 已取出但因中断未发送的调度重新登记
+        with self.assertRaises(KeyboardInterrupt):
+            coalescer.dispatch(mock.MagicMock(side_effect=KeyboardInterrupt))
+        self.assertEqual(coalescer.dispatch(mock.MagicMock()), 3)
+
+    @mock.patch("pipeline.engine.signals.handlers.coalescer.is_enabled", mock.MagicMock(return_value=True))
+    @mock.patch("pipeline.engine.signals.handlers.coalescer.register", mock.MagicMock())
+    @mock.patch("pipeline.engine.signals.handlers.ScheduleCeleryTask.objects.start_task", mock.MagicMock())
+    def test_schedule_ready_handler(self):
+        resolver = mock.MagicMock()
+        resolver.resolve_args.return_value = TASK_OPTIONS
+        with mock.patch(
+            "pipeline.engine.signals.handlers.CeleryTaskArgsResolver", mock.MagicMock(return_value=resolver)
+        ):
+            # 轮询型调度登记合并
+            handlers.schedule_ready_handler(None, "process_id", "schedule_id", countdown=5)
+            coalescer.register.assert_called_once_with("process_id", "schedule_id", 5, TASK_OPTIONS)
+            resolver.resolve_args.assert_called_once_with(tasks.batch_service_schedule)
+            handlers.ScheduleCeleryTask.objects.start_task.assert_not_called()
+
+            # 回调型及立即执行的调度单独发送
+            handlers.schedule_ready_handler(None, "process_id", "schedule_id", countdown=5, data_id=1)
+            handlers.schedule_ready_handler(None, "process_id", "schedule_id", countdown=0)
+            coalescer.register.assert_called_once()
+            self.assertEqual(handlers.ScheduleCeleryTask.objects.start_task.call_count, 2)
@@ -753,3 +753,53 @@ class ScheduleTestCase(TestCase):
 
                 mock_ss.save.assert_called()
                 mock_ss.set_next_schedule.assert_not_called()
+
+    @mock.patch(PIPELINE_SCHEDULE_SERVICE_FILTER, mock.MagicMock())
+    @mock.patch(PIPELINE_STATUS_FILTER, mock.MagicMock(return_value=MockQuerySet(exists_return=True)))
+    @mock.patch(PIPELINE_PROCESS_GET, mock.MagicMock(return_value=MockPipelineProcess()))
+    @mock.patch(SCHEDULE_GET_SCHEDULE_PARENT_DATA, mock.MagicMock(return_value=PARENT_DATA))
+    @mock.patch(SCHEDULE_SET_SCHEDULE_DATA, mock.MagicMock())
+    @mock.patch("pipeline.engine.core.schedule.is_schedule_state_cached", mock.MagicMock(return_value=True))
+    @mock.patch("pipeline.engine.core.schedule.acquire_schedule_lock", mock.MagicMock(return_value="identifier"))
+    @mock.patch("pipeline.engine.core.schedule.release_schedule_lock", mock.MagicMock())
+    @mock.patch("pipeline.engine.core.schedule.incr_schedule_times", mock.MagicMock(return_value=3))
+    def test_schedule__schedule_state_cached(self):
+        mock_ss = MockScheduleService(schedule_return=True, schedule_done=False)
+
+        with mock.patch(PIPELINE_SCHEDULE_SERVICE_GET, mock.MagicMock(return_value=mock_ss)):
+            schedule.schedule(uniqid(), mock_ss.id)
+
+        # 调度锁及调度次数由数据后端维护，不再更新 ScheduleService 表
+        ScheduleService.objects.filter.assert_not_called()
+        schedule.acquire_schedule_lock.assert_called_once_with(mock_ss.id)
+        schedule.release_schedule_lock.assert_called_once_with(mock_ss.id, "identifier")
+        schedule.incr_schedule_times.assert_called_once_with(mock_ss.id, 0)
+        self.assertEqual(mock_ss.schedule_times, 3)
+        mock_ss.set_next_schedule.assert_called_once()
+
+    @mock.patch(PIPELINE_SCHEDULE_SERVICE_FILTER, mock.MagicMock())
+    @mock.patch("pipeline.engine.core.schedule.is_schedule_state_cached", mock.MagicMock(return_value=True))
+    @mock.patch("pipeline.engine.core.schedule.acquire_schedule_lock", mock.MagicMock(return_value=None))
+    @mock.patch("pipeline.engine.core.schedule.release_schedule_lock", mock.MagicMock())
+    def test_schedule__schedule_state_cached_and_lock_failed(self):
+        mock_ss = MockScheduleService(schedule_return=True, schedule_done=False)
+
+        with mock.patch(PIPELINE_SCHEDULE_SERVICE_GET, mock.MagicMock(return_value=mock_ss)):
+            with mock.patch("pipeline.engine.core.schedule.valve.send", mock.MagicMock()) as valve_send:
+                schedule.schedule(uniqid(), mock_ss.id)
+
+        valve_send.assert_called_once()
+        schedule.release_schedule_lock.assert_not_called()
+        mock_ss.service_act.schedule.assert_not_called()
+
+    @mock.patch("pipeline.engine.core.schedule.is_schedule_state_cached", mock.MagicMock(return_value=True))
+    @mock.patch("pipeline.engine.core.schedule.release_schedule_lock", mock.MagicMock())
+    def test_auto_release_schedule_lock__raise(self):
+        schedule_id = "{}{}".format(uniqid(), uniqid())
+
+        with self.assertRaises(RuntimeError):
+            with schedule.auto_release_schedule_lock(schedule_id, "identifier"):
+                raise RuntimeError()
+
+        # 调度过程抛出异常时仍需释放调度锁
+        schedule.release_schedule_lock.assert_called_once_with(schedule_id, "identifier")
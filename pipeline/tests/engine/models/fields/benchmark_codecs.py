@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+"""
+IOField 编解码微基准测试，覆盖常见的节点数据及进程快照大小
+python -m pipeline.tests.engine.models.fields.benchmark_codecs
+"""
+
+import timeit
+
+from pipeline.engine.models import codecs
+
+# 节点数：单节点输入输出 / 中等规模流程 / 大规模流程快照
+SNAPSHOT_NODE_NUMS = [1, 50, 500, 5000]
+
+
+def make_snapshot(node_num):
+    return {
+        "_pipeline_stack": [],
+        "_children": [],
+        "_root_pipeline": "r" * 32,
+        "_subprocess_stack": [],
+        "nodes": {
+            "{:032x}".format(index): {
+                "inputs": {
+                    "subscription_instance_ids": list(range(index, index + 10)),
+                    "meta": {"GSE_VERSION": "V2", "STEPS": [{"id": "basereport", "action": "MAIN_INSTALL_PLUGIN"}]},
+                    "description": "description",
+                },
+                "outputs": {"succeeded_subscription_instance_ids": list(range(index, index + 10)), "polling_time": 5},
+            }
+            for index in range(node_num)
+        },
+    }
+
+
+def benchmark(number=50):
+    io_codecs = [("raw", codecs.IOCodec(codec=codecs.RawCodec()))] + [
+        (codec_class.name, codecs.IOCodec(codec=codec_class()))
+        for codec_class in codecs.CODEC_CLASSES
+        if codec_class.is_available()
+    ]
+    print("{:>8} {:>6} {:>12} {:>12} {:>12}".format("nodes", "codec", "size(bytes)", "dumps(ms)", "loads(ms)"))
+    for node_num in SNAPSHOT_NODE_NUMS:
+        value = make_snapshot(node_num)
+        for name, io_codec in io_codecs:
+            payload = io_codec.dumps(value)
+            dumps_cost = timeit.timeit(lambda: io_codec.dumps(value), number=number) / number * 1000
+            loads_cost = timeit.timeit(lambda: io_codec.loads(payload), number=number) / number * 1000
+            print("{:>8} {:>6} {:>12} {:>12.3f} {:>12.3f}".format(node_num, name, len(payload), dumps_cost, loads_cost))
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import pickle
+import zlib
+
+import mock
+from django.test import TestCase
+
+from pipeline.engine.models import codecs
+
+from .benchmark_codecs import make_snapshot
+
+
+class IOCodecTestCase(TestCase):
+    def setUp(self):
+        self.value = make_snapshot(node_num=50)
+
+    def test_dumps_and_loads(self):
+        for codec in [codecs.ZlibCodec(), codecs.get_codec()]:
+            io_codec = codecs.IOCodec(codec=codec, threshold=1024)
+            payload = io_codec.dumps(self.value)
+            self.assertEqual(payload[:1], codec.header)
+            self.assertEqual(io_codec.loads(payload), self.value)
+
+    def test_below_threshold(self):
+        io_codec = codecs.IOCodec(codec=codecs.ZlibCodec(), threshold=1024)
+        payload = io_codec.dumps({"a": 1})
+        self.assertEqual(payload[:1], codecs.RawCodec.header)
+        self.assertEqual(io_codec.loads(memoryview(payload)), {"a": 1})
+
+    def test_loads_legacy_data(self):
+        legacy_payload = zlib.compress(pickle.dumps(self.value), 6)
+        self.assertEqual(codecs.IOCodec(codec=codecs.get_codec()).loads(legacy_payload), self.value)
+
+    def test_get_codec(self):
+        codec = codecs.get_codec(level=1)
+        self.assertIsInstance(codec, codecs.ZlibCodec)
+        self.assertEqual(codec.level, 1)
+
+    def test_get_unknown_codec(self):
+        self.assertRaises(ValueError, codecs.get_codec, "unknown")
+
+    def test_get_unavailable_codec(self):
+        with mock.patch.object(codecs.ZstdCodec, "is_available", return_value=False):
+            self.assertRaises(RuntimeError, codecs.get_codec, "zstd")
@@ -322,6 +322,15 @@ class EngineTaskTestCase(TestCase):
         tasks.service_schedule(process_id, schedule_id, data_id)
         schedule.schedule.assert_called_with(process_id, schedule_id, data_id)
 
+    @mock.patch(ENGINE_SCHEDULE, mock.MagicMock(side_effect=[Exception, None]))
+    def test_batch_service_schedule(self):
+        schedules = [(uniqid(), uniqid()), (uniqid(), uniqid())]
+        tasks.batch_service_schedule(schedules)
+        # 单个调度异常不影响同批次的其他调度
+        schedule.schedule.assert_has_calls(
+            [mock.call(process_id, schedule_id) for process_id, schedule_id in schedules]
+        )
+
     @mock.patch(PIPELINE_NODE_CELERYTASK_DESTROY, mock.MagicMock())
     @mock.patch(ENGINE_API_FORCED_FAIL, mock.MagicMock())
     @mock.patch(ENGINE_ACTIVITY_FAIL_SIGNAL, mock.MagicMock())
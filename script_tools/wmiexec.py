@@ -28,6 +28,8 @@ import os
 import sys
 import time
 
+from six import PY2
+
 from impacket import version
 from impacket.dcerpc.v5.dcom import wmi
 from impacket.dcerpc.v5.dcomrt import DCOMConnection
@@ -39,7 +41,6 @@ from impacket.smbconnection import (
     SMB_DIALECT,
     SMBConnection,
 )
-from six import PY2
 
 OUTPUT_FILENAME = "__" + str(time.time())
 CODEC = sys.stdout.encoding
@@ -71,10 +72,16 @@ class WMIEXEC:
         self.__doKerberos = doKerberos
         self.__kdcHost = kdcHost
         self.shell = None
+        self.__smbConnection = None
+        self.__dcom = None
         if hashes is not None:
             self.__lmhash, self.__nthash = hashes.split(":")
 
-    def run(self, addr):
+    def connect(self, addr):
+        """
+        Establish SMB / DCOM connections, the connections can be reused by
+        execute() until close() is called.
+        """
         if self.__noOutput is False:
             smbConnection = SMBConnection(addr, addr)
             if self.__doKerberos is False:
@@ -114,6 +121,8 @@ class WMIEXEC:
             doKerberos=self.__doKerberos,
             kdcHost=self.__kdcHost,
         )
+        self.__smbConnection = smbConnection
+        self.__dcom = dcom
         try:
             iInterface = dcom.CoCreateInstanceEx(wmi.CLSID_WbemLevel1Login, wmi.IID_IWbemLevel1Login)
             iWbemLevel1Login = wmi.IWbemLevel1Login(iInterface)
@@ -123,25 +132,50 @@ class WMIEXEC:
             win32Process, _ = iWbemServices.GetObject("Win32_Process")
 
             self.shell = RemoteShell(self.__share, win32Process, smbConnection)
-            if self.__command != " ":
-                result = self.shell.onecmd(self.__command)
-            else:
-                self.shell.cmdloop()
         except (Exception, KeyboardInterrupt) as e:
-            if logging.getLogger().level == logging.DEBUG:
-                import traceback
+            self.__handle_exception(e)
 
-                traceback.print_exc()
-            logging.error(str(e))
-            if smbConnection is not None:
-                smbConnection.logoff()
-            dcom.disconnect()
-            sys.stdout.flush()
-            # sys.exit(1)
-            raise Exception(str(e))
-        if smbConnection is not None:
-            smbConnection.logoff()
-        dcom.disconnect()
+    def execute(self, command, no_output=False):
+        """
+        Execute a command through the established connections,
+        no_output=True only launches the command without waiting for its output.
+        """
+        try:
+            if no_output:
+                return self.shell.send_data_without_output(command)
+            return self.shell.onecmd(command)
+        except (Exception, KeyboardInterrupt) as e:
+            self.__handle_exception(e)
+
+    def close(self):
+        if self.__smbConnection is not None:
+            self.__smbConnection.logoff()
+            self.__smbConnection = None
+        if self.__dcom is not None:
+            self.__dcom.disconnect()
+            self.__dcom = None
+
+    def __handle_exception(self, e):
+        if logging.getLogger().level == logging.DEBUG:
+            import traceback
+
+            traceback.print_exc()
+        logging.error(str(e))
+        self.close()
+        sys.stdout.flush()
+        # sys.exit(1)
+        raise Exception(str(e))
+
+    def run(self, addr):
+        self.connect(addr)
+        if self.__command != " ":
+            result = self.execute(self.__command)
+        else:
+            try:
+                result = self.shell.cmdloop()
+            except (Exception, KeyboardInterrupt) as e:
+                self.__handle_exception(e)
+        self.close()
         return result
 
 
@@ -339,6 +373,9 @@ class RemoteShell(cmd.Cmd):
             self.__win32Process.Create(command, self.__pwd, None)
         self.get_output()
 
+    def send_data_without_output(self, data):
+        self.__win32Process.Create(self.__shell + data, self.__pwd, None)
+
     def send_data(self, data):
         self.execute_remote(data)
         print(self.__outputBuffer)